@@ -0,0 +1,59 @@
+# app/benchmark.py
+
+import argparse
+import sys
+from modules.benchmark_suite import compare_to_baseline, load_results, run_suite, save_results
+
+
+def main():
+    """
+    Run the performance benchmark suite on synthetic inputs.
+
+    Example usage:
+      python app/benchmark.py --out results.json
+      python app/benchmark.py --out results.json --baseline benchmarks/baseline.json
+      python app/benchmark.py --quick --only planner,audio
+
+    With --baseline, mean / median timings (and throughputs) more than
+    --tolerance worse than the baseline are listed and the exit code is 1;
+    tail statistics and operations under --min_ms are not compared.
+    """
+    parser = argparse.ArgumentParser(description="SmartAR-3D-Robot-Explorer performance benchmarks")
+    parser.add_argument("--out", type=str, default="benchmark_results.json",
+                        help="JSON file receiving the results and hardware info.")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="Previous results JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown before a metric counts as a regression.")
+    parser.add_argument("--min_ms", type=float, default=1.0,
+                        help="Operations shorter than this in the baseline are not compared (noise).")
+    parser.add_argument("--quick", action="store_true",
+                        help="Small sizes and few iterations (smoke test).")
+    parser.add_argument("--only", type=str, default="",
+                        help="Comma-separated subset: ingestion, detection, recognition, planner, "
+                             "audio, human_loop, robot_loop, allocations.")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Show the modules' console output while benchmarking.")
+    args = parser.parse_args()
+
+    only = {name.strip() for name in args.only.split(",") if name.strip()} or None
+    results = run_suite(quick=args.quick, only=only, verbose=args.verbose)
+    save_results(results, args.out)
+
+    print(f"[Benchmark] Results written to {args.out}")
+    for name, value in sorted(results["metrics"].items()):
+        if name.endswith(("mean_ms", "p95_ms", "fps", "_per_s", "realtime_factor")):
+            print(f"  {name}: {value:.4g}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_results(args.baseline), args.tolerance, args.min_ms)
+        if regressions:
+            print(f"[Benchmark] {len(regressions)} regression(s) against {args.baseline}:")
+            for r in regressions:
+                print(f"  {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} ({100 * r['change']:+.0f}%)")
+            sys.exit(1)
+        print(f"[Benchmark] No regressions against {args.baseline} (tolerance {100 * args.tolerance:.0f}%).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,34 @@
 # app/main.py
 
 import argparse
+import asyncio
+import time
 from modules.ingestion import ModelIngestion
 from modules.spatial_audio import SpatialAudioEngine
+from modules.tts import CachedTTS, COMMON_PHRASES, make_tts_engine
 from modules.user_interaction import UserInteraction
+from modules.async_runtime import AsyncUserInteraction
 from modules.object_detection import ObjectDetection
 from modules.object_recognition import ObjectRecognition
 from modules.ml_model_manager import MLModelManager
 from modules.llm_integration import LLMIntegration
+from modules.response_cache import ResponseCache
 from modules.navigation import NavigationAssistance
 from modules.glasses_integration import GlassesIntegration
-from modules.robot_integration import RobotIntegration
+from modules.robot_integration import RobotIntegration, StubRobotBackend
+from modules.robot_simulation import SimulatedRobotBackend, run_load_test
 from modules.robot_navigation import RobotNavigation
+from modules.costmap import LocalCostmap
+from modules.fleet import FleetServer, fleet_scaling_report
+from modules.glasses_server import GlassesServer, glasses_load_report
+from modules.localization import ParticleFilterLocalizer
+from modules.model_updates import LiveModelUpdater
+from modules.path_planner import GridPlanner, OccupancyGrid
+from modules.view_query import ViewQuery
+from modules.instrumentation import configure_logging, telemetry
+from modules.scheduler import LoopScheduler
+from modules.session_recording import (RecordingGlasses, RecordingRobotBackend, ReplayGlassesIntegration,
+                                       ReplayRobotBackend, SessionWriter)
 
 
 def main():
@@ -20,11 +37,17 @@ def main():
     
     Usage Examples:
       python app/main.py --model examples/example_3d_model.obj --furniture_db examples/test_furniture_db.json --mode human
+      python app/main.py --model examples/example_3d_model.obj --furniture_db examples/test_furniture_db.json --mode human --runtime async
       python app/main.py --model examples/example_3d_model.obj --furniture_db examples/test_furniture_db.json --mode robot
+      python app/main.py --model examples/example_3d_model.obj --furniture_db examples/test_furniture_db.json --mode robot --robot_backend sim --load_test 50
+      python app/main.py --model examples/example_3d_model.obj --furniture_db examples/test_furniture_db.json --mode fleet --fleet_size 20
+      python app/main.py --model examples/example_3d_model.obj --furniture_db examples/test_furniture_db.json --mode server --server_port 8765
 
     The '--mode' argument determines whether we run the system in:
       - 'human' mode (AR glasses, spatial audio, voice commands).
       - 'robot' mode (autonomous robot integration, camera feed, path planning).
+      - 'fleet' mode (many simulated robots sharing one map, planner and path reservations).
+      - 'server' mode (many AR-glasses clients served over a local socket by one building server).
     """
 
     # 1. Parse command-line arguments
@@ -33,39 +56,131 @@ def main():
                         help="Path to the 3D building model file (e.g., OBJ, IFC).")
     parser.add_argument("--furniture_db", type=str, required=True,
                         help="Path to the furniture/object database (JSON).")
-    parser.add_argument("--mode", type=str, choices=["human", "robot"], default="human",
-                        help="Run mode: 'human' for AR usage, 'robot' for autonomous robot.")
+    parser.add_argument("--mode", type=str, choices=["human", "robot", "fleet", "server"], default="human",
+                        help="Run mode: 'human' for AR usage, 'robot' for autonomous robot, "
+                             "'fleet' for many robots sharing one planner, "
+                             "'server' for many AR-glasses clients sharing one building server.")
+    parser.add_argument("--robot_backend", type=str, choices=["hardware", "sim"], default="hardware",
+                        help="Robot backend: 'hardware' driver stub or headless 'sim' robot.")
+    parser.add_argument("--load_test", type=int, default=0,
+                        help="With --robot_backend sim: run N simulated robots in lockstep, print stats and exit.")
+    parser.add_argument("--load_test_ticks", type=int, default=200,
+                        help="Number of control ticks to simulate in --load_test.")
+    parser.add_argument("--fleet_size", type=int, default=10,
+                        help="Fleet mode: number of simulated robots served by one process.")
+    parser.add_argument("--fleet_ticks", type=int, default=200,
+                        help="Fleet mode: control ticks per robot (0 = run until Ctrl+C in real time).")
+    parser.add_argument("--fleet_scaling", type=str, default="",
+                        help="Fleet mode: comma-separated fleet sizes for a latency scaling report, e.g. '1,5,10,20'.")
+    parser.add_argument("--server_port", type=int, default=8765,
+                        help="Server mode: TCP port the glasses clients connect to.")
+    parser.add_argument("--server_load_test", type=str, default="",
+                        help="Server mode: comma-separated client counts for a latency load test with "
+                             "stand-in clients, e.g. '1,2,4,8' (no port is kept open).")
+    parser.add_argument("--llm_url", type=str, default=None,
+                        help="OpenAI-compatible LLM endpoint (e.g., http://127.0.0.1:8080/v1). Mock LLM if omitted.")
+    parser.add_argument("--llm_model", type=str, default=None,
+                        help="Model name sent to the LLM endpoint.")
+    parser.add_argument("--llm_stand_in", action="store_true",
+                        help="Start the bundled local stand-in LLM server (offline testing).")
+    parser.add_argument("--llm_cache", type=str, default=None,
+                        help="Optional JSON file persisting cached LLM answers between runs.")
+    parser.add_argument("--llm_cache_ttl", type=float, default=30.0,
+                        help="Seconds a cached LLM answer stays valid (0 disables the cache).")
+    parser.add_argument("--audio_out", type=str, default=None,
+                        help="Write the rendered binaural audio to this WAV file (headless runs).")
+    parser.add_argument("--tts", type=str, choices=["auto", "pyttsx3", "standin"], default="auto",
+                        help="Speech engine for spoken messages ('auto' uses pyttsx3 if installed).")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Record frames, head orientation / robot pose and voice commands to this session file.")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="Replay a recorded session instead of live inputs (human and robot modes); "
+                             "the run ends with the session.")
+    parser.add_argument("--replay_realtime", action="store_true",
+                        help="Replay at the recorded pace instead of as fast as possible.")
+    parser.add_argument("--runtime", type=str, choices=["sync", "async"], default="sync",
+                        help="Human mode: rate-scheduled loop ('sync') or asyncio tasks ('async'), where "
+                             "LLM answers stream without pausing perception and newer commands cancel older ones.")
+    parser.add_argument("--model_updates", type=str, default=None,
+                        help="Folder polled for model changes (.obj mesh groups, .ifc subsets, .json add/remove "
+                             "lists); they are applied to the running system without re-ingesting the model "
+                             "(human sync loop and server mode).")
+    parser.add_argument("--log_level", type=str, default="INFO",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Console log level of the per-frame messages.")
+    parser.add_argument("--metrics_port", type=int, default=0,
+                        help="Collect stage metrics and serve them in Prometheus format on this port (/metrics).")
+    parser.add_argument("--trace_out", type=str, default=None,
+                        help="Collect stage timings and write them as a Chrome trace JSON file on exit.")
     args = parser.parse_args()
 
+    configure_logging(args.log_level)
+    if args.metrics_port or args.trace_out:
+        telemetry.enable(trace=bool(args.trace_out))
+    if args.metrics_port:
+        port = telemetry.serve(args.metrics_port)
+        print(f"[Main] Metrics at http://127.0.0.1:{port}/metrics")
+
     # 2. Ingest the 3D model
     ingestion_module = ModelIngestion()
     building_model = ingestion_module.load_model(args.model)
 
     # 3. Initialize spatial audio engine (useful for human mode; safe to init anyway)
-    audio_engine = SpatialAudioEngine()
+    tts = CachedTTS(make_tts_engine(args.tts))
+    audio_engine = SpatialAudioEngine(sample_rate=tts.sample_rate, output_path=args.audio_out, tts=tts)
     audio_engine.initialize()
 
     # 4. Load machine learning models (object detection + LLM)
-    ml_manager = MLModelManager()
+    ml_manager = MLModelManager(llm_base_url=args.llm_url, llm_model=args.llm_model,
+                                llm_stand_in=args.llm_stand_in)
     detection_model = ml_manager.load_detection_model()  # e.g., YOLO
     llm_model = ml_manager.load_llm()                    # e.g., GPT-based or local model
 
     # 5. Prepare object detection & recognition
     detector = ObjectDetection(detection_model)
     object_recognizer = ObjectRecognition(building_model, args.furniture_db)
+    # Synthesize object names and navigation phrases in the background
+    tts.prewarm(list(object_recognizer.furniture_db) + COMMON_PHRASES)
 
     # 6. Prepare LLM integration
-    llm_integration = LLMIntegration(llm_model)
+    llm_cache = ResponseCache(ttl_s=args.llm_cache_ttl, path=args.llm_cache) if args.llm_cache_ttl > 0 else None
+    llm_integration = LLMIntegration(llm_model, cache=llm_cache)
 
     # 7. Shared navigation references (building structure, etc.)
-    nav_assistance = NavigationAssistance(building_model)
+    planner = GridPlanner(OccupancyGrid(building_model)) if args.model_updates else None
+    nav_assistance = NavigationAssistance(building_model, planner=planner, audio_engine=audio_engine)
+    model_updater = None
+    if args.model_updates and args.mode == "human":
+        # Model changes reach the grid, route cache and indexes incrementally
+        model_updater = LiveModelUpdater(building_model, planner=planner, indexes=[nav_assistance.object_index],
+                                         watch_dir=args.model_updates)
+        # The prompt context summarizes the building; rebuild it on the next question
+        model_updater.add_listener(lambda report: setattr(llm_integration, "context_builder", None))
 
     # 8. Branch logic: Human vs. Robot mode
     if args.mode == "human":
-        # Setup AR glasses hardware integration
-        glasses = GlassesIntegration()
+        # Setup AR glasses hardware integration (or replay a recorded session)
+        if args.replay:
+            glasses = ReplayGlassesIntegration(args.replay, realtime=args.replay_realtime)
+        else:
+            glasses = GlassesIntegration()
+
+        # Estimate the user's position by matching detections to the building model
+        localizer = ParticleFilterLocalizer(building_model)
+        glasses.localizer = localizer
+        if model_updater is not None:
+            model_updater.add_index(localizer.index)
+
+        clock = glasses.clock if args.replay else time.monotonic
+        if args.record:
+            glasses = RecordingGlasses(glasses, SessionWriter(args.record, metadata={"mode": "human"}))
         glasses.connect_hardware()
 
+        # Known objects in the user's view complement the detections in answers
+        view_query = ViewQuery(building_model)
+        if model_updater is not None:
+            model_updater.add_listener(lambda report: view_query.invalidate())
+
         # Create user interaction module (for voice commands, etc.)
         user_interact = UserInteraction(
             glasses_integration=glasses,
@@ -73,51 +188,183 @@ def main():
             object_detector=detector,
             object_recognizer=object_recognizer,
             nav=nav_assistance,
-            llm=llm_integration
+            llm=llm_integration,
+            localizer=localizer,
+            clock=clock,
+            view_query=view_query
         )
 
+        # Render audio on its own thread so perception stalls cannot cause dropouts
+        audio_engine.start_realtime()
+
         print("[Main] Running in HUMAN (AR) mode. Press Ctrl+C to exit.")
+        scheduler = None
+        runtime = None
         try:
-            while True:
-                # Continually poll for camera frames, voice commands, etc.
-                user_interact.process_input()
-
-                # Update spatial audio environment
-                audio_engine.update()
+            if args.runtime == "async":
+                runtime = AsyncUserInteraction(user_interact, serialize_io=bool(args.replay))
+                asyncio.run(runtime.run(stop_when=(lambda: glasses.finished) if args.replay else None))
+            elif args.replay:
+                # Replays set their own pace: process every recorded frame in order
+                while not glasses.finished:
+                    user_interact.process_input()
+            else:
+                # Each stage runs at its own rate; detection is shed first under overload.
+                # Audio is paced by its own render thread (started above).
+                scheduler = LoopScheduler()
+                scheduler.add_task("capture", user_interact.capture_frame, rate_hz=30, priority=0)
+                scheduler.add_task("navigation", user_interact.update_guidance, rate_hz=10, priority=0)
+                scheduler.add_task("voice", user_interact.poll_voice, rate_hz=5, priority=1)
+                scheduler.add_task("detection", user_interact.process_frame, rate_hz=15, priority=2)
+                if model_updater is not None:
+                    scheduler.add_task("model_updates", model_updater.step, rate_hz=1, priority=1)
+                scheduler.run()
         except KeyboardInterrupt:
             print("\n[Main] Exiting HUMAN mode cleanly.")
+        if scheduler is not None:
+            print("[Main] Loop rates: {}".format(scheduler.stats()))
+        if runtime is not None:
+            print("[Main] Async runtime: {}".format(runtime.stats()))
+        if model_updater is not None:
+            print("[Main] Model updates: {}".format(model_updater.stats()))
+        glasses.release()
+
+    elif args.mode == "fleet":
+        if args.fleet_scaling:
+            sizes = [int(n) for n in args.fleet_scaling.split(",") if n.strip()]
+            print("[Main] Fleet scaling report (per-robot tick latency vs fleet size):")
+            for row in fleet_scaling_report(building_model, detector, object_recognizer,
+                                            fleet_sizes=sizes, n_ticks=args.fleet_ticks or 50):
+                print(f"  fleet_size={row['fleet_size']:4d}  tick_mean={row['tick_mean_ms']:.2f} ms  "
+                      f"tick_p95={row['tick_p95_ms']:.2f} ms  realtime_factor={row['realtime_factor']:.2f}")
+        else:
+            # One process hosts the map, spatial index and planner for every robot
+            server = FleetServer(building_model, detector, object_recognizer)
+            for _ in range(args.fleet_size):
+                server.add_simulated_robot()
+            print(f"[Main] Running FLEET mode with {args.fleet_size} robot(s). Press Ctrl+C to exit.")
+            try:
+                if args.fleet_ticks > 0:
+                    report = server.run(args.fleet_ticks)
+                else:
+                    report = server.run(10 ** 9, realtime=True)
+                report.pop("per_robot")
+                print("[Main] Fleet results:")
+                for key, value in report.items():
+                    print(f"  {key}: {value}")
+            except KeyboardInterrupt:
+                print("\n[Main] Exiting FLEET mode cleanly.")
+
+    elif args.mode == "server":
+        if args.server_load_test:
+            levels = [int(n) for n in args.server_load_test.split(",") if n.strip()]
+            print("[Main] Glasses server load test (frame-to-cues latency per client count):")
+            for row in glasses_load_report(building_model, detector, object_recognizer, llm_integration,
+                                           concurrency=levels):
+                print(f"  clients={row['clients']:4d}  latency_mean={row['latency_mean_ms']:.2f} ms  "
+                      f"latency_p95={row['latency_p95_ms']:.2f} ms  drop_rate={row['drop_rate']:.2f}")
+        else:
+            # One process holds the building model and shared models for every client
+            server = GlassesServer(building_model, detector, object_recognizer, llm_integration,
+                                   planner=planner, model_updates=args.model_updates)
+            print("[Main] Running glasses SERVER mode. Press Ctrl+C to exit.")
+            try:
+                asyncio.run(server.serve_forever(port=args.server_port))
+            except KeyboardInterrupt:
+                print("\n[Main] Exiting SERVER mode cleanly.")
+            print("[Main] Server stats: {}".format(server.stats()))
+
+    elif args.robot_backend == "sim" and args.load_test > 0:
+        # Headless load test: many simulated robots sharing the same models
+        stats = run_load_test(
+            building_model, detector, object_recognizer,
+            n_robots=args.load_test, n_ticks=args.load_test_ticks
+        )
+        print("[Main] Load test results:")
+        for key, value in stats.items():
+            print(f"  {key}: {value}")
 
     else:
-        # Setup robot hardware integration
-        robot_integration = RobotIntegration()
+        # Setup robot hardware integration (or the headless simulator)
+        if args.replay:
+            backend = ReplayRobotBackend(args.replay, realtime=args.replay_realtime)
+        elif args.robot_backend == "sim":
+            backend = SimulatedRobotBackend(building_model)
+        else:
+            backend = None
+        clock = backend.clock if args.replay else time.monotonic
+        if args.record:
+            backend = RecordingRobotBackend(backend or StubRobotBackend(),
+                                            SessionWriter(args.record, metadata={"mode": "robot"}))
+        robot_integration = RobotIntegration(backend)
         robot_integration.connect_robot_hardware()
 
-        # Create specialized robot navigation
-        robot_nav = RobotNavigation(building_model, robot_integration)
+        # Create specialized robot navigation with a rolling local costmap
+        # for transient obstacles (people, moved furniture, etc.)
+        local_costmap = LocalCostmap(clock=clock)
+        robot_nav = RobotNavigation(building_model, robot_integration, costmap=local_costmap)
 
         print("[Main] Running in ROBOT mode. Press Ctrl+C to exit.")
-        try:
-            while True:
-                # 1. Retrieve camera frame from the robot (or LiDAR data)
+        robot_frames = telemetry.counter("frames_processed", {"mode": "robot"})
+
+        def perceive():
+            # 1. Retrieve camera frame from the robot (or LiDAR data)
+            with telemetry.span("capture"):
                 frame = robot_integration.get_robot_camera_frame()
-                if frame is not None:
-                    # 2. Detect objects
-                    detections = detector.detect_objects(frame)
-
-                    # 3. Associate detections with 3D environment
-                    recognized_objects = []
-                    for d in detections:
-                        recognized_obj = object_recognizer.associate_detection(
-                            d, camera_pose=robot_integration.get_robot_pose()
-                        )
-                        recognized_objects.append(recognized_obj)
-                        # In a more advanced version, you might log or display these
-
-                # 4. Update robot navigation logic (autonomous movement, obstacle avoidance, etc.)
+            if frame is None:
+                return
+            robot_frames.inc()
+            # 2. Detect objects
+            with telemetry.span("detect"):
+                detections = detector.detect_batch(frame)
+
+            # 3. Associate detections with 3D environment (one columnar batch per frame)
+            with telemetry.span("recognize"):
+                robot_pose = robot_integration.get_robot_pose()
+                recognized_objects = object_recognizer.recognize_batch(detections, camera_pose=robot_pose)
+
+            # Insert what we saw into the local costmap
+            with telemetry.span("costmap"):
+                robot_nav.update_obstacles(recognized_objects, pose=robot_pose)
+
+        def navigate():
+            # 4. Update robot navigation logic (autonomous movement, obstacle avoidance, etc.)
+            with telemetry.span("navigation"):
                 robot_nav.update_navigation()
 
+        scheduler = None
+        try:
+            if args.replay:
+                while not robot_integration.backend.finished:
+                    perceive()
+                    navigate()
+            else:
+                # Motion control keeps its rate; perception is shed under overload
+                scheduler = LoopScheduler()
+                scheduler.add_task("navigation", navigate, rate_hz=20, priority=0)
+                scheduler.add_task("perception", perceive, rate_hz=15, priority=1)
+                scheduler.run()
         except KeyboardInterrupt:
             print("\n[Main] Exiting ROBOT mode cleanly.")
+        if scheduler is not None:
+            print("[Main] Loop rates: {}".format(scheduler.stats()))
+        robot_integration.disconnect()
+
+    # 9. Release LLM connections (and the stand-in server, if started)
+    if llm_cache is not None:
+        llm_cache.save()
+        print("[Main] LLM cache: {}".format(llm_cache.stats()))
+    llm_model.close()
+    ml_manager.shutdown()
+    audio_engine.shutdown()
+
+    # 10. Export stage metrics / trace
+    if telemetry.enabled:
+        print("[Main] Stage timings: {}".format(telemetry.stage_summary()))
+    if args.trace_out:
+        n_events = telemetry.write_chrome_trace(args.trace_out)
+        print(f"[Main] Wrote {n_events} trace event(s) to {args.trace_out}")
+    telemetry.stop_server()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,269 @@
+# app/modules/async_runtime.py
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .instrumentation import telemetry
+
+
+class AsyncGlasses:
+    """
+    Awaitable view of a GlassesIntegration (or a recording / replay wrapper).
+
+    Camera reads and voice capture block on the device, so each runs on its
+    own I/O thread; a slow speech recognizer then cannot stall the camera.
+    With serialize_io=True both share one thread, which keeps replays (one
+    session player behind both calls) deterministic.
+    """
+
+    def __init__(self, glasses, serialize_io=False):
+        self.glasses = glasses
+        self.camera_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="glasses-camera")
+        self.voice_executor = (self.camera_executor if serialize_io else
+                               ThreadPoolExecutor(max_workers=1, thread_name_prefix="glasses-voice"))
+
+    async def get_camera_frame(self):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.camera_executor, self.glasses.get_camera_frame)
+
+    async def capture_voice_command(self):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.voice_executor, self.glasses.capture_voice_command)
+
+    def shutdown(self):
+        # A blocked device read must not hold up the exit
+        self.camera_executor.shutdown(wait=False, cancel_futures=True)
+        self.voice_executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncUserInteraction:
+    """
+    asyncio runtime for the HUMAN / AR-glasses mode.
+
+    The steps of UserInteraction run as independent tasks on one event loop:
+      - perception: camera read (I/O thread) -> detection (worker thread) ->
+        recognition, spatial cues and localization (loop thread);
+      - voice: polls the microphone and handles each command in its own task;
+        a newer command cancels the one still being answered;
+      - guidance: route updates at a fixed rate.
+    LLM answers stream in through LLMIntegration.stream_sentences_async and
+    each sentence is synthesized on a TTS thread, so a slow query or TTS
+    engine no longer freezes detection or audio cues.
+
+    Everything touching the audio engine, navigation or the detected object
+    list runs on the loop thread, so the single-producer audio command ring
+    still has a single producer.
+
+    Typical usage:
+      runtime = AsyncUserInteraction(user_interact)
+      asyncio.run(runtime.run())          # until stop() or Ctrl+C
+      print(runtime.stats())
+    """
+
+    def __init__(self, user_interaction, frame_rate=30.0, voice_rate=5.0, guidance_rate=10.0,
+                 serialize_io=False, lag_probe_s=0.01, llm_executor=None):
+        """
+        :param user_interaction: The UserInteraction whose steps are scheduled.
+        :param frame_rate: Maximum camera frames per second.
+        :param voice_rate: Voice polls per second.
+        :param guidance_rate: Navigation updates per second.
+        :param serialize_io: Run camera and voice reads on one thread (replays).
+        :param lag_probe_s: Interval of the event-loop responsiveness probe.
+        :param llm_executor: Optional shared executor for LLM streams (created by run() if None).
+        """
+        self.ui = user_interaction
+        self.frame_rate = frame_rate
+        self.voice_rate = voice_rate
+        self.guidance_rate = guidance_rate
+        self.serialize_io = serialize_io
+        self.lag_probe_s = lag_probe_s
+
+        self.glasses = None
+        self._detect_executor = None
+        self._tts_executor = None
+        self._llm_executor = llm_executor
+        self._owns_llm_executor = llm_executor is None
+        self._command_task = None
+        self._stop = None
+
+        self.frames = 0
+        self.commands = 0
+        self.superseded = 0
+        self.max_loop_lag_s = 0.0
+        self._start = None
+        self._end = None
+        self._superseded = telemetry.counter("voice_commands_superseded")
+
+    # ------------------------------------------------------------------
+    # Voice commands
+    # ------------------------------------------------------------------
+
+    def submit_command(self, command):
+        """
+        Handle a voice command in a new task, cancelling the previous command
+        if it is still running (e.g. a long LLM answer).
+        :return: The asyncio.Task handling the command.
+        """
+        previous = self._command_task
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.superseded += 1
+            self._superseded.inc()
+            print(f"[AsyncUserInteraction] '{command}' supersedes the previous command.")
+        self.commands += 1
+        self._command_task = asyncio.get_running_loop().create_task(
+            self.handle_intent(self.ui.receive_command(command)))
+        return self._command_task
+
+    def cancel_command(self):
+        """:return: The cancelled command task (to be awaited), or None."""
+        task, self._command_task = self._command_task, None
+        if task is not None:
+            task.cancel()
+        return task
+
+    async def wait_command(self):
+        """Wait for the command being handled, if any, to finish."""
+        if self._command_task is not None:
+            await asyncio.gather(self._command_task, return_exceptions=True)
+
+    async def handle_voice_command(self, command):
+        """
+        Like UserInteraction.handle_voice_command, but open-ended questions
+        are answered without blocking the loop.
+        """
+        await self.handle_intent(self.ui.receive_command(command))
+
+    async def handle_intent(self, intent):
+        """Execute a parsed command (see UserInteraction.handle_intent)."""
+        ui = self.ui
+        if intent.name != "question":
+            # Local intents are cheap (route queries hit the planner cache)
+            ui.handle_intent(intent)
+            return
+
+        sentences = []
+        try:
+            async for sentence in ui.question_sentences(intent, asynchronous=True,
+                                                        executor=self._llm_executor):
+                sentences.append(sentence)
+                await self._speak(sentence)
+        finally:
+            ui.record_answer(sentences)
+
+    async def _speak(self, text):
+        """Synthesize on the TTS thread, then hand only the PCM to the audio engine."""
+        audio = self.ui.audio
+        synthesize = getattr(audio, "synthesize_speech", None)
+        if synthesize is None or self._tts_executor is None:
+            # Remote clients synthesize the text themselves
+            audio.play_text(text)
+            return
+        pcm = await asyncio.get_running_loop().run_in_executor(self._tts_executor, synthesize, text)
+        audio.play_speech(text, pcm)
+
+    # ------------------------------------------------------------------
+    # Tasks
+    # ------------------------------------------------------------------
+
+    async def _perception_loop(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.frame_rate
+        while True:
+            start = loop.time()
+            with telemetry.span("capture"):
+                frame = await self.glasses.get_camera_frame()
+            if frame is not None:
+                detections = await loop.run_in_executor(self._detect_executor, self.ui.detect, frame)
+                self.ui.apply_detections(detections)
+                self.frames += 1
+            await asyncio.sleep(max(0.0, period - (loop.time() - start)))
+
+    async def _voice_loop(self):
+        period = 1.0 / self.voice_rate
+        while True:
+            command = await self.glasses.capture_voice_command()
+            if command:
+                self.submit_command(command)
+            await asyncio.sleep(period)
+
+    async def _guidance_loop(self):
+        period = 1.0 / self.guidance_rate
+        while True:
+            self.ui.update_guidance()
+            await asyncio.sleep(period)
+
+    async def _lag_monitor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_probe_s)
+            self.max_loop_lag_s = max(self.max_loop_lag_s, loop.time() - start - self.lag_probe_s)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def run(self, duration=None, stop_when=None, poll_s=0.01):
+        """
+        Run all tasks until stop() is called, 'duration' seconds have passed
+        or stop_when() returns True; then cancel them and release the threads.
+        """
+        self._stop = asyncio.Event()
+        self.glasses = AsyncGlasses(self.ui.glasses, serialize_io=self.serialize_io)
+        self._detect_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detect")
+        self._tts_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        if self._owns_llm_executor:
+            self._llm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm")
+        loop = asyncio.get_running_loop()
+        self._start = time.monotonic()
+        end = None if duration is None else loop.time() + duration
+        tasks = [loop.create_task(coro) for coro in (
+            self._perception_loop(), self._voice_loop(), self._guidance_loop(), self._lag_monitor())]
+        try:
+            while not self._stop.is_set():
+                if stop_when is not None and stop_when():
+                    break
+                if end is not None and loop.time() >= end:
+                    break
+                for task in tasks:
+                    if task.done():
+                        task.result()  # re-raise a crashed task's exception
+                try:
+                    await asyncio.wait_for(self._stop.wait(), poll_s)
+                except asyncio.TimeoutError:
+                    pass
+            if stop_when is not None:
+                # A finished replay still answers its last command
+                await self.wait_command()
+        finally:
+            self._end = time.monotonic()
+            command_task = self.cancel_command()
+            if command_task is not None:
+                tasks.append(command_task)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.glasses.shutdown()
+            self._detect_executor.shutdown(wait=True)
+            self._tts_executor.shutdown(wait=False, cancel_futures=True)
+            self._tts_executor = None
+            if self._owns_llm_executor:
+                self._llm_executor.shutdown(wait=False, cancel_futures=True)
+                self._llm_executor = None
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    def stats(self):
+        wall = ((self._end or time.monotonic()) - self._start) if self._start is not None else 0.0
+        return {
+            "wall_s": round(wall, 3),
+            "frames": self.frames,
+            "fps": round(self.frames / wall, 2) if wall > 0 else 0.0,
+            "voice_commands": self.commands,
+            "superseded": self.superseded,
+            "max_loop_lag_ms": round(1000.0 * self.max_loop_lag_s, 2),
+        }
@@ -0,0 +1,235 @@
+# app/modules/audio_thread.py
+
+import threading
+import time
+
+import numpy as np
+
+from .instrumentation import telemetry
+
+AUDIO_BLOCK_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.004, 0.008, 0.016, 0.032)
+
+
+class SPSCRing:
+    """
+    Fixed-capacity single-producer / single-consumer ring buffer of commands.
+
+    The producer only advances 'head' and the consumer only advances 'tail';
+    each slot is written before 'head' moves past it, so under the GIL neither
+    side needs a lock. A full ring rejects new items (counted in 'dropped')
+    instead of blocking the producer.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0  # total items pushed (producer-owned)
+        self.tail = 0  # total items popped (consumer-owned)
+        self.dropped = 0
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def push(self, item):
+        if self.head - self.tail >= self.capacity:
+            self.dropped += 1
+            return False
+        self.slots[self.head % self.capacity] = item
+        self.head += 1
+        return True
+
+    def pop(self):
+        if self.tail == self.head:
+            return None
+        index = self.tail % self.capacity
+        item = self.slots[index]
+        self.slots[index] = None
+        self.tail += 1
+        return item
+
+
+class AudioRenderThread:
+    """
+    Renders audio on a dedicated thread, decoupled from the perception loop.
+
+    - Control updates (play/move/stop cues, head yaw) arrive through an
+      SPSCRing and are applied at block boundaries by the render thread.
+    - Rendered blocks are kept 'target_blocks' ahead in a preallocated output
+      ring, which the device callback (pull_block) drains at the audio rate.
+      Headless runs use an internal clock thread in place of a sound device.
+    - Underrun policy: if the ring is empty when the device needs a block, the
+      last block is faded out (then silence), so a late render never clicks.
+
+    Because rendering only depends on the command ring, a stalled perception
+    loop merely delays cue updates; it can never starve the output.
+
+    Typical usage:
+      thread = AudioRenderThread(render_fn, apply_fn, block_size=256, sample_rate=16000, sink=sink)
+      thread.start()
+      thread.submit(("play", "chair", 0.3, 2.0))
+      ...
+      thread.stop()
+      print(thread.stats())
+    """
+
+    def __init__(self, render_fn, apply_fn, block_size, sample_rate, sink=None,
+                 target_blocks=4, command_capacity=256, use_clock=True):
+        """
+        :param render_fn: Callable () -> (block_size, 2) array; renders the next block.
+        :param apply_fn: Callable (command) applying one control command to the renderer.
+        :param block_size: Samples per block.
+        :param sample_rate: Sample rate (Hz).
+        :param sink: Object with write(block); fed by the internal clock thread.
+        :param target_blocks: Blocks rendered ahead (output latency vs. stall tolerance).
+        :param command_capacity: Capacity of the control command ring.
+        :param use_clock: Start the internal clock thread (disable when a real device calls pull_block).
+        """
+        self.render_fn = render_fn
+        self.apply_fn = apply_fn
+        self.block_size = block_size
+        self.sample_rate = sample_rate
+        self.block_s = block_size / float(sample_rate)
+        self.sink = sink
+        self.target_blocks = target_blocks
+        self.use_clock = use_clock
+
+        self.commands = SPSCRing(command_capacity)
+        self._producer_lock = threading.Lock()  # only serializes multiple producers
+
+        self.ring = np.zeros((target_blocks, block_size, 2), dtype=np.float32)
+        self.written = 0  # blocks written (render thread)
+        self.read = 0     # blocks read (device side)
+        self._last = np.zeros((block_size, 2), dtype=np.float32)
+        self._fade_out = np.linspace(1.0, 0.0, block_size, dtype=np.float32)[:, None]
+        self._faded = True
+
+        self.underruns = 0
+        self.late_blocks = 0  # blocks whose render took longer than a block period
+        self.max_render_s = 0.0
+        self._block_seconds = telemetry.histogram("audio_block_seconds", buckets=AUDIO_BLOCK_BUCKETS)
+        self._underruns = telemetry.counter("audio_underruns")
+        self._running = False
+        self._wake = threading.Event()
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # Producer side (perception / UI threads)
+    # ------------------------------------------------------------------
+
+    def submit(self, command):
+        """Queue a control command without blocking on the audio thread."""
+        with self._producer_lock:
+            return self.commands.push(command)
+
+    # ------------------------------------------------------------------
+    # Render thread
+    # ------------------------------------------------------------------
+
+    def render_ahead(self):
+        """
+        Apply pending commands, then render until the output ring is full.
+        :return: Number of blocks rendered.
+        """
+        while True:
+            command = self.commands.pop()
+            if command is None:
+                break
+            self.apply_fn(command)
+
+        rendered = 0
+        while self.written - self.read < self.target_blocks:
+            start = time.perf_counter()
+            self.ring[self.written % self.target_blocks] = self.render_fn()
+            elapsed = time.perf_counter() - start
+            self.max_render_s = max(self.max_render_s, elapsed)
+            self._block_seconds.observe(elapsed)
+            if elapsed > self.block_s:
+                self.late_blocks += 1
+            self.written += 1
+            rendered += 1
+        return rendered
+
+    def _render_loop(self):
+        while self._running:
+            self.render_ahead()
+            # Woken by the device side after each consumed block
+            self._wake.wait(self.block_s)
+            self._wake.clear()
+
+    # ------------------------------------------------------------------
+    # Device side
+    # ------------------------------------------------------------------
+
+    def pull_block(self, out=None):
+        """
+        Hand the next block to the audio device (call from its callback).
+        :return: (block_size, 2) block; a fade-out or silence on underrun.
+        """
+        if out is None:
+            out = np.empty((self.block_size, 2), dtype=np.float32)
+        if self.read < self.written:
+            out[:] = self.ring[self.read % self.target_blocks]
+            self.read += 1
+            self._last[:] = out
+            self._faded = False
+        else:
+            self.underruns += 1
+            self._underruns.inc()
+            if self._faded:
+                out.fill(0.0)
+            else:
+                np.multiply(self._last, self._fade_out, out=out)
+                self._faded = True
+        self._wake.set()
+        return out
+
+    def _clock_loop(self):
+        out = np.empty((self.block_size, 2), dtype=np.float32)
+        next_time = time.monotonic()
+        while self._running:
+            self.pull_block(out)
+            if self.sink is not None:
+                self.sink.write(out)
+            next_time += self.block_s
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.monotonic()  # fell behind: resynchronize
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.render_ahead()  # prime the ring before the device starts pulling
+        targets = [self._render_loop] + ([self._clock_loop] if self.use_clock else [])
+        self._threads = [threading.Thread(target=t, name=f"audio-{t.__name__.strip('_')}", daemon=True)
+                         for t in targets]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+
+    @property
+    def running(self):
+        return self._running
+
+    def stats(self):
+        return {
+            "blocks_rendered": self.written,
+            "blocks_played": self.read,
+            "underruns": self.underruns,
+            "late_blocks": self.late_blocks,
+            "max_render_ms": 1000.0 * self.max_render_s,
+            "dropped_commands": self.commands.dropped,
+            "latency_ms": 1000.0 * self.target_blocks * self.block_s,
+        }
@@ -0,0 +1,472 @@
+# app/modules/benchmark_suite.py
+
+import contextlib
+import gc
+import io
+import json
+import math
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from .binaural import benchmark_renderer
+from .detections import LABELS, DetectionBatch
+from .ingestion import ModelIngestion, pywavefront
+from .llm_integration import LLMIntegration
+from .localization import ParticleFilterLocalizer
+from .navigation import NavigationAssistance
+from .object_detection import ObjectDetection
+from .object_recognition import ObjectRecognition
+from .path_planner import GridPlanner, OccupancyGrid
+from .robot_simulation import SyntheticCameraRenderer, run_load_test
+from .session_recording import ReplayGlassesIntegration, SessionWriter
+from .spatial_audio import SpatialAudioEngine
+from .user_interaction import UserInteraction
+from .voice_manager import VoiceManager
+
+
+FURNITURE_LABELS = ["chair", "table", "fridge", "sofa", "lamp", "desk"]
+
+# Metric name suffixes where a larger value is better; everything else (latencies) is lower-is-better
+HIGHER_IS_BETTER = ("fps", "_per_s", "realtime_factor")
+# Tail and extreme statistics vary too much between identical runs to gate on
+NOISY_STATISTICS = ("min_ms", "max_ms", "p95_ms")
+
+
+# ----------------------------------------------------------------------
+# Synthetic buildings
+# ----------------------------------------------------------------------
+
+def _box(vertices, faces, lo, hi):
+    """Append the 12 triangles of an axis-aligned box."""
+    base = len(vertices)
+    for z in (lo[2], hi[2]):
+        vertices.extend([(lo[0], lo[1], z), (hi[0], lo[1], z), (hi[0], hi[1], z), (lo[0], hi[1], z)])
+    quads = [(0, 1, 2, 3), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+    for a, b, c, d in quads:
+        faces.append((base + a, base + b, base + c))
+        faces.append((base + a, base + c, base + d))
+
+
+def synthetic_building(n_rooms, room_size=4.0, wall_height=2.5, wall_thickness=0.1, door_width=1.0):
+    """
+    Build a grid of 'n_rooms' square rooms connected by doorways, with one
+    piece of furniture per room, in the format produced by ModelIngestion.
+
+    :return: Building model dict ("geometry", "objects", "format").
+    """
+    cols = int(math.ceil(math.sqrt(n_rooms)))
+    rows = int(math.ceil(n_rooms / cols))
+    width, depth = cols * room_size, rows * room_size
+    vertices, faces = [], []
+    t = wall_thickness / 2.0
+
+    # Floor
+    vertices.extend([(0.0, 0.0, 0.0), (width, 0.0, 0.0), (width, depth, 0.0), (0.0, depth, 0.0)])
+    faces.extend([(0, 1, 2), (0, 2, 3)])
+
+    # Walls along x (constant y) and y (constant x); inner walls get a doorway per room
+    for j in range(rows + 1):
+        y = j * room_size
+        for i in range(cols):
+            x0, x1 = i * room_size, (i + 1) * room_size
+            if 0 < j < rows:
+                mid = (x0 + x1) / 2.0
+                _box(vertices, faces, (x0, y - t, 0.0), (mid - door_width / 2.0, y + t, wall_height))
+                _box(vertices, faces, (mid + door_width / 2.0, y - t, 0.0), (x1, y + t, wall_height))
+            else:
+                _box(vertices, faces, (x0, y - t, 0.0), (x1, y + t, wall_height))
+    for i in range(cols + 1):
+        x = i * room_size
+        for j in range(rows):
+            y0, y1 = j * room_size, (j + 1) * room_size
+            if 0 < i < cols:
+                mid = (y0 + y1) / 2.0
+                _box(vertices, faces, (x - t, y0, 0.0), (x + t, mid - door_width / 2.0, wall_height))
+                _box(vertices, faces, (x - t, mid + door_width / 2.0, 0.0), (x + t, y1, wall_height))
+            else:
+                _box(vertices, faces, (x - t, y0, 0.0), (x + t, y1, wall_height))
+
+    objects = []
+    for k in range(n_rooms):
+        i, j = k % cols, k // cols
+        label = FURNITURE_LABELS[k % len(FURNITURE_LABELS)]
+        cx, cy = (i + 0.75) * room_size, (j + 0.75) * room_size
+        lo, hi = (cx - 0.3, cy - 0.3, 0.0), (cx + 0.3, cy + 0.3, 0.9)
+        first = len(faces)
+        _box(vertices, faces, lo, hi)
+        objects.append({"name": label, "label": label, "faces": faces[first:],
+                        "bounds": (lo, hi), "centroid": (cx, cy, 0.45)})
+
+    return {"geometry": {"vertices": vertices, "faces": faces}, "objects": objects, "format": "OBJ"}
+
+
+def write_obj(building_model, path):
+    """Write a building model as a Wavefront OBJ file (one 'o' group per object)."""
+    geometry = building_model["geometry"]
+    object_faces = {id(face) for obj in building_model["objects"] for face in obj["faces"]}
+    with open(path, "w") as f:
+        f.write("# synthetic building\n")
+        for v in geometry["vertices"]:
+            f.write("v {:.4f} {:.4f} {:.4f}\n".format(*v))
+        f.write("o structure\n")
+        for face in geometry["faces"]:
+            if id(face) not in object_faces:
+                f.write("f {} {} {}\n".format(*(i + 1 for i in face)))
+        for k, obj in enumerate(building_model["objects"]):
+            f.write(f"o {obj['name']}_{k}\n")
+            for face in obj["faces"]:
+                f.write("f {} {} {}\n".format(*(i + 1 for i in face)))
+
+
+def write_furniture_db(path, labels=FURNITURE_LABELS):
+    with open(path, "w") as f:
+        json.dump({label: {"name": label, "type": "furniture", "description": f"A {label}."}
+                   for label in labels}, f)
+
+
+# ----------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------
+
+def hardware_info():
+    """Machine and library versions stored with every result file."""
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pywavefront": pywavefront is not None,
+    }
+
+
+def timing_stats(samples_s):
+    """Summarize per-call durations (seconds) in milliseconds."""
+    samples = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    if samples.size == 0:
+        return {"n": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "min_ms": 0.0}
+    return {
+        "n": int(samples.size),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "min_ms": float(samples.min()),
+    }
+
+
+def _time_calls(fn, n):
+    samples = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples[i] = time.perf_counter() - start
+    return samples
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+
+def bench_ingestion(workdir, room_counts=(1, 16, 64), repeats=3):
+    """ModelIngestion.load_model on synthetic OBJ buildings of increasing size."""
+    if pywavefront is None:
+        return {"skipped": "pywavefront not installed"}
+    ingestion = ModelIngestion()
+    results = {}
+    for n_rooms in room_counts:
+        model = synthetic_building(n_rooms)
+        path = os.path.join(workdir, f"building_{n_rooms}.obj")
+        write_obj(model, path)
+        samples = _time_calls(lambda _: ingestion.load_model(path), repeats)
+        results[f"rooms_{n_rooms}"] = dict(timing_stats(samples), faces=len(model["geometry"]["faces"]),
+                                           file_bytes=os.path.getsize(path))
+    return results
+
+
+def bench_detection(detector, n_frames=200, frame_size=(480, 640), seed=0):
+    """ObjectDetection.detect_batch (the frame pipeline's path) latency per frame."""
+    rng = np.random.default_rng(seed)
+    frames = [rng.integers(0, 256, size=frame_size + (3,), dtype=np.uint8) for _ in range(8)]
+    samples = _time_calls(lambda i: detector.detect_batch(frames[i % len(frames)]), n_frames)
+    return {"frame": timing_stats(samples), "frames_per_s": n_frames / samples.sum()}
+
+
+def bench_recognition(recognizer, n_detections=5000):
+    """ObjectRecognition.associate_detection throughput."""
+    labels = FURNITURE_LABELS + ["unknown_thing"]
+    detections = [{"label": labels[i % len(labels)], "bbox": (100 + i % 50, 80, 200, 220), "confidence": 0.9}
+                  for i in range(64)]
+    pose = (0.0, 0.0, 0.0)
+    start = time.perf_counter()
+    for i in range(n_detections):
+        recognizer.associate_detection(detections[i % len(detections)], pose)
+    elapsed = time.perf_counter() - start
+    return {"n": n_detections, "associations_per_s": n_detections / elapsed,
+            "mean_ms": 1000.0 * elapsed / n_detections}
+
+
+def bench_planner(building_model, n_queries=50, seed=0):
+    """GridPlanner.plan latency between random free positions, uncached and cached."""
+    start = time.perf_counter()
+    planner = GridPlanner(OccupancyGrid(building_model))
+    build_s = time.perf_counter() - start
+
+    grid = planner.grid
+    rng = np.random.default_rng(seed)
+    free = np.argwhere(~grid.blocked)
+    picks = free[rng.integers(0, len(free), size=(n_queries, 2))]
+    queries = [(grid.cell_to_world(*a), grid.cell_to_world(*b)) for a, b in picks]
+
+    reachable = []
+
+    def cold(i):
+        planner.invalidate_cache()
+        if planner.plan(*queries[i]) is not None:
+            reachable.append(queries[i])
+
+    cold_samples = _time_calls(cold, n_queries)
+    # Unreachable queries are never cached, so only reachable ones are repeated
+    for q in reachable:
+        planner.plan(*q)
+    warm_samples = _time_calls(lambda i: planner.plan(*reachable[i]), len(reachable))
+    return {"grid_build_ms": 1000.0 * build_s, "grid_cells": int(grid.blocked.size),
+            "unreachable": n_queries - len(reachable),
+            "query": timing_stats(cold_samples), "cached_query": timing_stats(warm_samples)}
+
+
+def bench_audio(source_counts=(1, 8, 32), n_blocks=200):
+    """Binaural renderer CPU cost per block against the number of sources."""
+    results = {}
+    for row in benchmark_renderer(source_counts=source_counts, n_blocks=n_blocks):
+        results[f"sources_{row['sources']}"] = {"block_mean_ms": row["mean_us"] / 1000.0,
+                                                "block_max_ms": row["max_us"] / 1000.0,
+                                                "realtime_load": row["load"]}
+    return results
+
+
+def bench_human_loop(building_model, detector, recognizer, workdir, n_frames=100, frame_size=(240, 320)):
+    """
+    Full UserInteraction.process_input loop (detection, recognition, cues,
+    localization, guidance) fed from a synthetic recorded session.
+    """
+    path = os.path.join(workdir, "human_loop.sar")
+    renderer = SyntheticCameraRenderer(building_model, frame_size=frame_size)
+    frame = renderer.new_frame_buffer()
+    x0, y0 = 1.0, 1.0
+    with SessionWriter(path, frame_format=".png") as writer:
+        for i in range(n_frames):
+            yaw = 2.0 * math.pi * i / n_frames
+            writer.write_head_orientation((yaw, 0.0, 0.0), t=i / 30.0)
+            writer.write_frame(renderer.render((x0, y0, yaw), frame), t=i / 30.0)
+            if i == n_frames // 2:
+                writer.write_voice_command(f"Navigate to the {FURNITURE_LABELS[0]}", t=i / 30.0 + 0.01)
+
+    glasses = ReplayGlassesIntegration(path)
+    localizer = ParticleFilterLocalizer(building_model, n_particles=500)
+    glasses.localizer = localizer
+    glasses.connect_hardware()
+    audio = SpatialAudioEngine()
+    audio.initialize()
+    nav = NavigationAssistance(building_model, audio_engine=audio)
+    interaction = UserInteraction(glasses, audio, detector, recognizer, nav, LLMIntegration(None),
+                                  localizer=localizer, clock=glasses.clock)
+
+    samples = []
+    while not glasses.finished:
+        start = time.perf_counter()
+        interaction.process_input()
+        samples.append(time.perf_counter() - start)
+    audio.shutdown()
+    samples = samples[:-1]  # the last call only discovered the end of the session
+    return {"tick": timing_stats(samples), "fps": len(samples) / sum(samples)}
+
+
+def bench_robot_loop(building_model, detector, recognizer, n_ticks=100):
+    """Full robot tick (render, detect, recognize, costmap, navigation) for one simulated robot."""
+    stats = run_load_test(building_model, detector, recognizer, n_robots=1, n_ticks=n_ticks)
+    return {"tick_mean_ms": stats["robot_tick_mean_ms"], "tick_p95_ms": stats["robot_tick_p95_ms"],
+            "fps": 1000.0 / stats["robot_tick_mean_ms"], "realtime_factor": stats["realtime_factor"]}
+
+
+def _frame_allocations(run_frame, n_frames):
+    """
+    Per-frame memory of 'run_frame(i)' under tracemalloc: bytes and
+    gc-tracked objects still referenced by its result (what a consumer keeps
+    until the next frame), and the peak of transient allocations.
+    """
+    run_frame(0)  # warm caches (DB lookups, label interning, voice pool)
+    retained, peak, objects = [], [], []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for i in range(n_frames):
+            n_objects = len(gc.get_objects())
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            result = run_frame(i)
+            current, high = tracemalloc.get_traced_memory()
+            objects.append(len(gc.get_objects()) - n_objects)
+            retained.append(current - base)
+            peak.append(high - base)
+            del result
+    finally:
+        tracemalloc.stop()
+    return {"retained_bytes": float(np.mean(retained)), "peak_bytes": float(np.mean(peak)),
+            "gc_objects": float(np.mean(objects))}
+
+
+def bench_allocations(recognizer, object_counts=(1, 10, 50), n_frames=50):
+    """
+    Per-frame allocations of the perception -> voice path (detect output,
+    recognition, VoiceManager.update) with per-object dicts versus the
+    columnar DetectionBatch / RecognizedBatch.
+    """
+    labels = FURNITURE_LABELS + ["unknown_thing"]
+    pose = (0.0, 0.0, 0.0)
+    results = {}
+    for n_objects in object_counts:
+        names = [labels[k % len(labels)] for k in range(n_objects)]
+        label_ids = [LABELS.intern(name) for name in names]
+        boxes = [(100.0 + k, 80.0, 200.0 + k, 220.0) for k in range(n_objects)]
+        legacy_voices, batch_voices = VoiceManager(), VoiceManager()
+
+        def legacy(i):
+            detections = [{"label": name, "bbox": box, "confidence": 0.9} for name, box in zip(names, boxes)]
+            recognized = [recognizer.associate_detection(d, pose) for d in detections]
+            legacy_voices.update(recognized, now=i / 30.0)
+            return detections, recognized
+
+        def columnar(i):
+            detections = DetectionBatch(label_ids, boxes, [0.9] * n_objects)
+            recognized = recognizer.recognize_batch(detections, pose)
+            batch_voices.update(recognized, now=i / 30.0)
+            return detections, recognized
+
+        row = {"dicts": _frame_allocations(legacy, n_frames), "batch": _frame_allocations(columnar, n_frames)}
+        row["retained_ratio"] = row["batch"]["retained_bytes"] / max(row["dicts"]["retained_bytes"], 1.0)
+        results[f"objects_{n_objects}"] = row
+    return results
+
+
+# ----------------------------------------------------------------------
+# Suite
+# ----------------------------------------------------------------------
+
+def flatten_metrics(results, prefix=""):
+    """Flatten nested benchmark results into {"a.b.c": number}."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def is_timing_metric(name):
+    leaf = name.rsplit(".", 1)[-1]
+    return leaf.endswith("_ms") or leaf.endswith(HIGHER_IS_BETTER)
+
+
+def _duration_ms(leaf, value):
+    """Time per operation (ms) behind a timing metric, or None for ratios such as realtime_factor."""
+    if leaf.endswith(("fps", "_per_s")):
+        return 1000.0 / value
+    return None if leaf.endswith(HIGHER_IS_BETTER) else value
+
+
+def compare_to_baseline(current, baseline, tolerance=0.2, min_ms=1.0):
+    """
+    Compare the timing metrics of two result dicts (as returned by run_suite).
+    A metric regresses when it is more than 'tolerance' (fraction) worse than
+    the baseline. Only stable statistics are compared: min / max / p95 and
+    counters are skipped, and so are operations shorter than 'min_ms' in the
+    baseline (throughputs count as 1000 / value ms per operation), whose
+    timings are dominated by noise.
+
+    :return: List of {"metric", "baseline", "current", "change"} for regressions,
+             where 'change' is the relative change in the bad direction.
+    """
+    regressions = []
+    base_metrics = baseline.get("metrics", {})
+    for name, value in current.get("metrics", {}).items():
+        old = base_metrics.get(name)
+        leaf = name.rsplit(".", 1)[-1]
+        if old is None or not is_timing_metric(name) or leaf.endswith(NOISY_STATISTICS) or old <= 0:
+            continue
+        duration = _duration_ms(leaf, old)
+        if duration is not None and duration < min_ms:
+            continue
+        if leaf.endswith(HIGHER_IS_BETTER):
+            change = (old - value) / old
+        else:
+            change = (value - old) / old
+        if change > tolerance:
+            regressions.append({"metric": name, "baseline": old, "current": value, "change": change})
+    return sorted(regressions, key=lambda r: -r["change"])
+
+
+def run_suite(quick=False, only=None, verbose=False):
+    """
+    Run every benchmark on synthetic inputs.
+
+    :param quick: Smaller sizes and iteration counts (smoke runs, CI).
+    :param only: Optional set of benchmark names to run.
+    :param verbose: Keep the modules' console output (silenced by default).
+    :return: {"created", "hardware", "benchmarks", "metrics"}
+    """
+    n = (lambda full, small: small if quick else full)
+    building = synthetic_building(n(16, 4))
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "furniture_db.json")
+        write_furniture_db(db_path)
+        quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            detector = ObjectDetection("mock_detection_model")
+            recognizer = ObjectRecognition(building, db_path)
+            benchmarks = {
+                "ingestion": lambda: bench_ingestion(workdir, room_counts=n((1, 16, 64), (1, 4)),
+                                                     repeats=n(3, 1)),
+                "detection": lambda: bench_detection(detector, n_frames=n(200, 20)),
+                "recognition": lambda: bench_recognition(recognizer, n_detections=n(5000, 500)),
+                "planner": lambda: bench_planner(building, n_queries=n(50, 5)),
+                "audio": lambda: bench_audio(source_counts=n((1, 8, 32), (1, 8)), n_blocks=n(200, 20)),
+                "human_loop": lambda: bench_human_loop(building, detector, recognizer, workdir,
+                                                       n_frames=n(100, 10)),
+                "robot_loop": lambda: bench_robot_loop(building, detector, recognizer, n_ticks=n(100, 10)),
+                "allocations": lambda: bench_allocations(recognizer, object_counts=n((1, 10, 50), (1, 10)),
+                                                         n_frames=n(50, 5)),
+            }
+            for name, bench in benchmarks.items():
+                if only and name not in only:
+                    continue
+                start = time.perf_counter()
+                results[name] = bench()
+                results[name]["wall_s"] = time.perf_counter() - start
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "quick": quick,
+        "hardware": hardware_info(),
+        "benchmarks": results,
+        "metrics": flatten_metrics(results),
+    }
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
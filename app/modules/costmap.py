@@ -0,0 +1,311 @@
+# app/modules/costmap.py
+
+import math
+import time
+
+import numpy as np
+
+from .detections import name_type_position
+
+
+def camera_to_world(position, pose):
+    """
+    Transform a position from the camera frame used by ObjectRecognition
+    into the building's floor plane.
+
+    ObjectRecognition.map_2D_to_3D returns (lateral, vertical, forward) offsets
+    relative to the camera. For a robot at pose (x, y, theta) the forward axis
+    points along theta and the lateral axis points to the robot's right.
+
+    :param position: (x, y, z) in the camera frame (x to the right, z forward).
+    :param pose: (x, y, theta) robot pose in the building coordinate system.
+    :return: (X, Y) position on the building floor plane.
+    """
+    lateral, _, forward = position
+    x, y, theta = pose
+    cos_t = math.cos(theta)
+    sin_t = math.sin(theta)
+    return (
+        x + forward * cos_t + lateral * sin_t,
+        y + forward * sin_t - lateral * cos_t,
+    )
+
+
+class LocalCostmap:
+    """
+    A rolling 2D costmap centered on the robot, used for transient obstacles
+    that are not part of the static building model (people, moved chairs, etc.).
+
+    The map keeps two preallocated grids:
+      - 'last_seen': the time each cell was last observed as an obstacle (NaN = free)
+      - 'costs': the inflated uint8 cost values queried by RobotNavigation
+
+    Observations are marked from recognized object positions or LiDAR-like
+    point arrays, cleared by tracing rays from the sensor to each hit, and
+    forgotten once they are older than 'decay_time'. When the robot moves,
+    the window scrolls by whole cells; the grids are shifted into a scratch
+    buffer and swapped, so no new arrays are allocated at run time.
+
+    Typical usage:
+      costmap = LocalCostmap(size_m=6.0, resolution=0.05)
+      costmap.update_origin(x, y)
+      costmap.mark_points(points_xy)
+      if costmap.is_collision(x_ahead, y_ahead): ...
+    """
+
+    FREE = 0
+    INSCRIBED = 253
+    LETHAL = 254
+
+    def __init__(self, size_m=6.0, resolution=0.05, inflation_radius=0.3,
+                 inscribed_radius=0.15, decay_time=2.0, max_range=4.0, clock=time.monotonic):
+        """
+        :param size_m: Edge length of the square window in meters.
+        :param resolution: Cell size in meters.
+        :param inflation_radius: Distance (m) over which obstacle cost decays to zero.
+        :param inscribed_radius: Robot radius (m); cells within it are INSCRIBED.
+        :param decay_time: Seconds after which an unconfirmed obstacle is forgotten.
+        :param max_range: Maximum sensor range (m) used for ray-traced clearing.
+        :param clock: Time source used when no 'now' is given (e.g. a replayed session's clock).
+        """
+        self.clock = clock
+        self.resolution = float(resolution)
+        self.size_cells = int(math.ceil(size_m / self.resolution))
+        self.decay_time = float(decay_time)
+        self.max_range = float(max_range)
+
+        n = self.size_cells
+        self.last_seen = np.full((n, n), np.nan, dtype=np.float64)
+        self.costs = np.zeros((n, n), dtype=np.uint8)
+        self._scratch = np.empty_like(self.last_seen)
+        self._obstacles = np.zeros((n, n), dtype=bool)
+
+        # World cell index of the window's lower-left corner (ix, iy)
+        self.origin_cell = (-(n // 2), -(n // 2))
+        self._dirty = False
+
+        self._kernel = self._build_inflation_kernel(inflation_radius, inscribed_radius)
+        kernel = np.array(self._kernel, dtype=np.int64).reshape(-1, 3)
+        self._kernel_dx = kernel[:, 0]
+        self._kernel_dy = kernel[:, 1]
+        self._kernel_cost = kernel[:, 2].astype(np.uint8)
+
+    def _build_inflation_kernel(self, inflation_radius, inscribed_radius):
+        """
+        Precompute the (dx, dy, cost) offsets of the inflation disc, so inflation
+        never loops over individual cells.
+        """
+        r_cells = int(math.ceil(inflation_radius / self.resolution))
+        offsets = []
+        for dy in range(-r_cells, r_cells + 1):
+            for dx in range(-r_cells, r_cells + 1):
+                dist = math.hypot(dx, dy) * self.resolution
+                if dist > inflation_radius:
+                    continue
+                if dx == 0 and dy == 0:
+                    cost = self.LETHAL
+                elif dist <= inscribed_radius:
+                    cost = self.INSCRIBED
+                else:
+                    # Exponential falloff between inscribed radius and inflation radius
+                    span = max(inflation_radius - inscribed_radius, 1e-6)
+                    factor = math.exp(-3.0 * (dist - inscribed_radius) / span)
+                    cost = int((self.INSCRIBED - 1) * factor)
+                if cost > 0:
+                    offsets.append((dx, dy, cost))
+        return offsets
+
+    # ------------------------------------------------------------------
+    # Coordinate helpers
+    # ------------------------------------------------------------------
+
+    def world_to_cells(self, xs, ys):
+        """
+        Convert world coordinates (arrays or scalars) into local (row, col) indices.
+        :return: (rows, cols, inside) where 'inside' is a boolean mask.
+        """
+        ix = np.floor(np.asarray(xs, dtype=np.float64) / self.resolution).astype(np.int64)
+        iy = np.floor(np.asarray(ys, dtype=np.float64) / self.resolution).astype(np.int64)
+        cols = ix - self.origin_cell[0]
+        rows = iy - self.origin_cell[1]
+        n = self.size_cells
+        inside = (cols >= 0) & (cols < n) & (rows >= 0) & (rows < n)
+        return rows, cols, inside
+
+    def update_origin(self, x, y):
+        """
+        Re-center the window on (x, y). Content is scrolled by whole cells and
+        cells entering the window are reset to unknown/free.
+        """
+        n = self.size_cells
+        new_origin = (
+            int(math.floor(x / self.resolution)) - n // 2,
+            int(math.floor(y / self.resolution)) - n // 2,
+        )
+        dx = new_origin[0] - self.origin_cell[0]
+        dy = new_origin[1] - self.origin_cell[1]
+        if dx == 0 and dy == 0:
+            return
+
+        self.origin_cell = new_origin
+        scratch = self._scratch
+        scratch.fill(np.nan)
+        if abs(dx) < n and abs(dy) < n:
+            src_rows = slice(max(dy, 0), n + min(dy, 0))
+            dst_rows = slice(max(-dy, 0), n + min(-dy, 0))
+            src_cols = slice(max(dx, 0), n + min(dx, 0))
+            dst_cols = slice(max(-dx, 0), n + min(-dx, 0))
+            scratch[dst_rows, dst_cols] = self.last_seen[src_rows, src_cols]
+
+        # Swap buffers instead of allocating a new grid
+        self.last_seen, self._scratch = scratch, self.last_seen
+        self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Observations
+    # ------------------------------------------------------------------
+
+    def mark_points(self, points_xy, now=None):
+        """
+        Mark obstacle hits given as an (N, 2) array of world coordinates.
+        """
+        points = np.asarray(points_xy, dtype=np.float64).reshape(-1, 2)
+        if points.size == 0:
+            return
+        now = self.clock() if now is None else now
+        rows, cols, inside = self.world_to_cells(points[:, 0], points[:, 1])
+        self.last_seen[rows[inside], cols[inside]] = now
+        self._dirty = True
+
+    def clear_rays(self, sensor_xy, points_xy):
+        """
+        Clear every cell crossed by the rays from the sensor to each hit point,
+        excluding the cell containing the hit itself. All rays are sampled at
+        half-cell spacing in one vectorized pass.
+
+        :param sensor_xy: (x, y) of the sensor in world coordinates.
+        :param points_xy: (N, 2) array of hit points in world coordinates.
+        """
+        points = np.asarray(points_xy, dtype=np.float64).reshape(-1, 2)
+        if points.size == 0:
+            return
+        origin = np.asarray(sensor_xy, dtype=np.float64)
+        deltas = points - origin
+        lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        lengths = np.minimum(lengths, self.max_range)
+
+        step = self.resolution * 0.5
+        n_samples = int(math.ceil(self.max_range / step))
+        t = np.arange(n_samples, dtype=np.float64) * step  # (M,)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            directions = deltas / np.where(lengths > 0, lengths, 1.0)[:, None]
+
+        # Stop one cell short of the hit so the obstacle itself survives
+        valid = t[None, :] < (lengths[:, None] - self.resolution)
+        xs = origin[0] + directions[:, 0:1] * t[None, :]
+        ys = origin[1] + directions[:, 1:2] * t[None, :]
+        rows, cols, inside = self.world_to_cells(xs[valid], ys[valid])
+        self.last_seen[rows[inside], cols[inside]] = np.nan
+        self._dirty = True
+
+    def update_from_points(self, sensor_xy, points_xy, now=None):
+        """
+        Raytrace-clear then mark a LiDAR-like scan given in world coordinates.
+        """
+        self.clear_rays(sensor_xy, points_xy)
+        self.mark_points(points_xy, now=now)
+
+    def update_from_recognized_objects(self, recognized_objects, pose, now=None):
+        """
+        Insert recognized objects (from ObjectRecognition.associate_detection)
+        as obstacles, clearing the free space between the robot and each object.
+
+        :param recognized_objects: List of dicts with a camera-frame 'position'.
+        :param pose: (x, y, theta) robot pose used to place the objects.
+        """
+        if not len(recognized_objects):
+            return
+        points = np.array(
+            [camera_to_world(position, pose) for _, _, position in name_type_position(recognized_objects)],
+            dtype=np.float64,
+        )
+        self.update_from_points((pose[0], pose[1]), points, now=now)
+
+    def decay(self, now=None):
+        """
+        Forget obstacles that have not been re-observed within 'decay_time'.
+        """
+        now = self.clock() if now is None else now
+        with np.errstate(invalid="ignore"):
+            expired = (now - self.last_seen) > self.decay_time
+        if expired.any():
+            self.last_seen[expired] = np.nan
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Inflation and queries
+    # ------------------------------------------------------------------
+
+    def _inflate(self):
+        """
+        Recompute the inflated cost grid from the current obstacle cells.
+
+        Sparse maps stamp the kernel at every obstacle cell with one
+        np.maximum.at call; dense maps apply each kernel offset as a shifted
+        np.maximum over the whole window. Both paths are fully vectorized.
+        """
+        np.isfinite(self.last_seen, out=self._obstacles)
+        costs = self.costs
+        costs.fill(self.FREE)
+        rows, cols = np.nonzero(self._obstacles)
+        n = self.size_cells
+        if rows.size == 0:
+            pass
+        elif rows.size * len(self._kernel) <= n * n:
+            stamp_rows = rows[:, None] + self._kernel_dy[None, :]
+            stamp_cols = cols[:, None] + self._kernel_dx[None, :]
+            inside = (stamp_rows >= 0) & (stamp_rows < n) & (stamp_cols >= 0) & (stamp_cols < n)
+            stamp_costs = np.broadcast_to(self._kernel_cost, stamp_rows.shape)
+            np.maximum.at(costs, (stamp_rows[inside], stamp_cols[inside]), stamp_costs[inside])
+        else:
+            obstacles = self._obstacles
+            for dx, dy, cost in self._kernel:
+                src_rows = slice(max(-dy, 0), n - max(dy, 0))
+                dst_rows = slice(max(dy, 0), n - max(-dy, 0))
+                src_cols = slice(max(-dx, 0), n - max(dx, 0))
+                dst_cols = slice(max(dx, 0), n - max(-dx, 0))
+                target = costs[dst_rows, dst_cols]
+                np.maximum(target, obstacles[src_rows, src_cols] * np.uint8(cost), out=target)
+        self._dirty = False
+
+    def update(self, now=None):
+        """
+        Apply decay and refresh the inflated costs if anything changed.
+        Call once per control tick; queries afterwards are O(1).
+        """
+        self.decay(now=now)
+        if self._dirty:
+            self._inflate()
+
+    def cost_at(self, x, y):
+        """
+        Return the inflated cost at world position (x, y).
+        Positions outside the window are treated as FREE (unknown).
+        """
+        if self._dirty:
+            self._inflate()
+        rows, cols, inside = self.world_to_cells(x, y)
+        if not inside:
+            return self.FREE
+        return int(self.costs[rows, cols])
+
+    def is_collision(self, x, y):
+        """
+        True if a robot centered at (x, y) would touch an obstacle.
+        """
+        return self.cost_at(x, y) >= self.INSCRIBED
+
+    def clear(self):
+        """Remove all observations from the map."""
+        self.last_seen.fill(np.nan)
+        self._dirty = True
@@ -0,0 +1,205 @@
+# app/modules/detections.py
+
+import threading
+
+import numpy as np
+
+
+class LabelTable:
+    """
+    Interns label strings as small integer ids, so per-frame batches store
+    one int32 per object instead of a string reference in a fresh dict.
+    Ids are stable for the life of the table; new labels may be interned
+    from several detection threads at once.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, label):
+        """:return: The id of 'label', adding it if new."""
+        label_id = self.ids.get(label)
+        if label_id is None:
+            with self._lock:
+                label_id = self.ids.get(label)
+                if label_id is None:
+                    self.names.append(label)
+                    label_id = self.ids[label] = len(self.names) - 1
+        return label_id
+
+    def name(self, label_id):
+        return self.names[label_id]
+
+
+# Process-wide table shared by detectors, recognizers and their consumers
+LABELS = LabelTable()
+
+
+class _Record:
+    """
+    Read-only mapping access for __slots__ records (obj["name"], obj.get(...),
+    "name" in obj), so code written for the dict format keeps working.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return self.__slots__
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __eq__(self, other):
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()})"
+
+
+class Detection(_Record):
+    """One detector output: label, bbox (x1, y1, x2, y2) in pixels, confidence."""
+
+    __slots__ = ("label", "bbox", "confidence")
+
+    def __init__(self, label, bbox, confidence):
+        self.label = label
+        self.bbox = bbox
+        self.confidence = confidence
+
+
+class RecognizedObject(_Record):
+    """One recognized object; 'position' is (lateral, vertical, forward) in the camera frame."""
+
+    __slots__ = ("name", "type", "description", "position", "confidence")
+
+    def __init__(self, name, type, description, position, confidence):
+        self.name = name
+        self.type = type
+        self.description = description
+        self.position = position
+        self.confidence = confidence
+
+
+class DetectionBatch:
+    """
+    The detections of one frame as columns: interned label ids, (N, 4) integer
+    pixel boxes and confidences. Iterating yields Detection records; to_dicts() gives the
+    legacy list-of-dicts format.
+
+    Typical usage:
+      batch = detector.detect_batch(frame)
+      recognized = recognizer.recognize_batch(batch, camera_pose)
+    """
+
+    __slots__ = ("label_ids", "boxes", "confidences", "labels")
+
+    def __init__(self, label_ids, boxes, confidences, labels=LABELS):
+        self.label_ids = np.asarray(label_ids, dtype=np.int32).reshape(-1)
+        self.boxes = np.rint(np.asarray(boxes, dtype=np.float64)).astype(np.int32).reshape(-1, 4)
+        self.confidences = np.asarray(confidences, dtype=np.float64).reshape(-1)
+        self.labels = labels
+
+    @classmethod
+    def empty(cls, labels=LABELS):
+        return cls(np.zeros(0), np.zeros((0, 4)), np.zeros(0), labels)
+
+    @classmethod
+    def from_records(cls, detections, labels=LABELS):
+        """Build a batch from dicts / Detection records (a DetectionBatch is returned as is)."""
+        if isinstance(detections, DetectionBatch):
+            return detections
+        detections = list(detections or ())
+        return cls([labels.intern(d["label"]) for d in detections],
+                   [d["bbox"] for d in detections] or np.zeros((0, 4)),
+                   [d["confidence"] for d in detections], labels)
+
+    def __len__(self):
+        return self.label_ids.shape[0]
+
+    def __getitem__(self, i):
+        return Detection(self.labels.names[self.label_ids[i]], tuple(self.boxes[i].tolist()),
+                         float(self.confidences[i]))
+
+    def __iter__(self):
+        names = self.labels.names
+        for label_id, box, confidence in zip(self.label_ids.tolist(), self.boxes.tolist(),
+                                             self.confidences.tolist()):
+            yield Detection(names[label_id], tuple(box), confidence)
+
+    def to_dicts(self):
+        return [d.to_dict() for d in self]
+
+
+class RecognizedBatch:
+    """
+    The recognized objects of one frame as columns: interned name and type
+    ids, (N, 3) camera-frame positions and confidences. Descriptions are
+    looked up per name id. Iterating yields RecognizedObject records;
+    to_dicts() gives the legacy list-of-dicts format.
+    """
+
+    __slots__ = ("name_ids", "type_ids", "positions", "confidences", "descriptions", "labels")
+
+    def __init__(self, name_ids, type_ids, positions, confidences, descriptions=None, labels=LABELS):
+        self.name_ids = np.asarray(name_ids, dtype=np.int32).reshape(-1)
+        self.type_ids = np.asarray(type_ids, dtype=np.int32).reshape(-1)
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.confidences = np.asarray(confidences, dtype=np.float64).reshape(-1)
+        self.descriptions = descriptions if descriptions is not None else {}
+        self.labels = labels
+
+    def __len__(self):
+        return self.name_ids.shape[0]
+
+    def names(self):
+        names = self.labels.names
+        return [names[i] for i in self.name_ids.tolist()]
+
+    def types(self):
+        names = self.labels.names
+        return [names[i] for i in self.type_ids.tolist()]
+
+    def __getitem__(self, i):
+        name_id = int(self.name_ids[i])
+        return RecognizedObject(self.labels.names[name_id], self.labels.names[self.type_ids[i]],
+                                self.descriptions.get(name_id, ""), tuple(self.positions[i].tolist()),
+                                float(self.confidences[i]))
+
+    def __iter__(self):
+        names = self.labels.names
+        for name_id, type_id, position, confidence in zip(self.name_ids.tolist(), self.type_ids.tolist(),
+                                                          self.positions.tolist(), self.confidences.tolist()):
+            yield RecognizedObject(names[name_id], names[type_id], self.descriptions.get(name_id, ""),
+                                   tuple(position), confidence)
+
+    def to_dicts(self):
+        return [obj.to_dict() for obj in self]
+
+
+def name_type_position(objects):
+    """
+    Iterate (name, type, position) over recognized objects without building
+    a record per object for a RecognizedBatch; dicts and records also work.
+    """
+    if isinstance(objects, RecognizedBatch):
+        return zip(objects.names(), objects.types(), objects.positions.tolist())
+    return ((obj["name"], obj.get("type", "unknown"), obj["position"]) for obj in objects)
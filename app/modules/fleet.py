@@ -0,0 +1,424 @@
+# app/modules/fleet.py
+
+import asyncio
+import math
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .costmap import LocalCostmap
+from .path_planner import GridPlanner, OccupancyGrid, simplify_path
+from .robot_integration import RobotIntegration
+from .robot_navigation import RobotNavigation
+from .robot_simulation import SimulatedRobotBackend, SyntheticCameraRenderer
+from .spatial_index import SpatialHashIndex
+
+
+class PathReservationTable:
+    """
+    Space-time reservations of grid cells, so robots sharing one building do
+    not plan through the same cell at the same time.
+
+    A planned path reserves each of its cells for the time slot in which the
+    robot is expected to occupy it (plus 'slack_slots' on either side).
+    Other robots see reserved cells as expensive when planning and wait
+    before entering a cell that is reserved for someone else right now.
+    """
+
+    def __init__(self, slot_s=0.5, slack_slots=1):
+        """
+        :param slot_s: Duration of one reservation slot in seconds.
+        :param slack_slots: Extra slots reserved before/after the expected time.
+        """
+        self.slot_s = slot_s
+        self.slack_slots = slack_slots
+        self.slots = {}                        # (cell, slot) -> robot_id
+        self.by_robot = defaultdict(list)      # robot_id -> [(cell, slot)]
+        self.cell_robots = defaultdict(dict)   # cell -> {robot_id: n_slots}
+        self.conflicts = 0
+
+    def _slot(self, t):
+        return int(math.floor(t / self.slot_s))
+
+    def reserve_path(self, robot_id, cells, start_time, cell_time):
+        """
+        Reserve 'cells' for robot_id, assuming it enters cell i at
+        start_time + i * cell_time. Existing reservations of the robot are released.
+
+        :return: Number of (cell, slot) pairs already held by other robots.
+        """
+        self.release(robot_id)
+        conflicts = 0
+        for i, cell in enumerate(cells):
+            center = self._slot(start_time + i * cell_time)
+            for slot in range(center - self.slack_slots, center + self.slack_slots + 1):
+                key = (cell, slot)
+                holder = self.slots.get(key)
+                if holder is not None and holder != robot_id:
+                    conflicts += 1
+                    continue
+                if holder is None:
+                    self.slots[key] = robot_id
+                    self.by_robot[robot_id].append(key)
+                    owners = self.cell_robots[cell]
+                    owners[robot_id] = owners.get(robot_id, 0) + 1
+        self.conflicts += conflicts
+        return conflicts
+
+    def release(self, robot_id):
+        """Drop every reservation held by robot_id."""
+        for key in self.by_robot.pop(robot_id, ()):
+            if self.slots.get(key) == robot_id:
+                del self.slots[key]
+            cell = key[0]
+            owners = self.cell_robots.get(cell)
+            if owners and robot_id in owners:
+                owners[robot_id] -= 1
+                if owners[robot_id] <= 0:
+                    del owners[robot_id]
+                if not owners:
+                    del self.cell_robots[cell]
+
+    def holder(self, cell, t):
+        """Return the robot holding 'cell' at time t, or None."""
+        return self.slots.get((cell, self._slot(t)))
+
+    def cells_reserved_by_others(self, robot_id):
+        """Return the set of cells reserved by any robot other than robot_id."""
+        return {cell for cell, owners in self.cell_robots.items()
+                if len(owners) > 1 or robot_id not in owners}
+
+
+class FleetPlannerService:
+    """
+    Shared map and planning service for a fleet of robots in one building.
+
+    Holds the building model, occupancy grid, planner (with its route cache),
+    spatial index of known objects and the path reservation table exactly once
+    per process. All methods are thread-safe.
+    """
+
+    def __init__(self, building_model, resolution=0.1, robot_speed=0.3,
+                 simplify_tolerance=0.05, seed=0):
+        """
+        :param building_model: Data structure from ingestion.py.
+        :param resolution: Occupancy grid cell size in meters.
+        :param robot_speed: Expected cruise speed (m/s) used to time reservations.
+        :param simplify_tolerance: RDP tolerance (m) for waypoints sent to robots.
+        :param seed: Seed for random goal selection.
+        """
+        self.building_model = building_model
+        self.grid = OccupancyGrid(building_model, resolution=resolution)
+        self.planner = GridPlanner(self.grid)
+        self.index = SpatialHashIndex.from_building_model(building_model)
+        self.reservations = PathReservationTable()
+        self.robot_speed = robot_speed
+        self.simplify_tolerance = simplify_tolerance
+        self.lock = threading.Lock()
+        self.rng = np.random.default_rng(seed)
+        self.plans = 0
+
+    def resolve_goal(self, goal, near=None):
+        """
+        Turn a goal into (x, y): either a coordinate tuple or an object label
+        (resolved to the nearest matching object in the building model).
+        """
+        if isinstance(goal, str):
+            with self.lock:
+                hit = self.index.nearest(near or (0.0, 0.0), label=goal)
+            return None if hit is None else hit[2][:2]
+        return tuple(goal[:2])
+
+    def random_free_goal(self):
+        """Pick a random reachable cell center from the occupancy grid."""
+        with self.lock:
+            free = np.argwhere(~self.grid.blocked)
+            if free.shape[0] == 0:
+                return None
+            row, col = free[int(self.rng.integers(free.shape[0]))]
+            return self.grid.cell_to_world(int(row), int(col))
+
+    def request_path(self, robot_id, start_xy, goal_xy, now):
+        """
+        Plan a path for robot_id avoiding cells reserved by other robots where
+        possible, then reserve it.
+
+        :return: List of (x, y) waypoints, or None if the goal is unreachable.
+        """
+        grid = self.grid
+        with self.lock:
+            penalty = self.reservations.cells_reserved_by_others(robot_id)
+            cells = self.planner.plan_cells(
+                grid.world_to_cell(*start_xy[:2]),
+                grid.world_to_cell(*goal_xy[:2]),
+                penalty_cells=penalty,
+            )
+            self.plans += 1
+            if cells is None:
+                self.reservations.release(robot_id)
+                return None
+            cell_time = grid.resolution / self.robot_speed
+            self.reservations.reserve_path(robot_id, cells, now, cell_time)
+        waypoints = [grid.cell_to_world(r, c) for r, c in cells]
+        return simplify_path(waypoints, self.simplify_tolerance)
+
+    def may_enter(self, robot_id, xy, now):
+        """True unless the cell at xy is reserved by another robot at time 'now'."""
+        cell = self.grid.world_to_cell(*xy[:2])
+        with self.lock:
+            holder = self.reservations.holder(cell, now)
+        return holder is None or holder == robot_id
+
+    def release(self, robot_id):
+        with self.lock:
+            self.reservations.release(robot_id)
+
+
+class RobotSession:
+    """
+    One robot served by the fleet: its own RobotIntegration, RobotNavigation
+    and local costmap, sharing detector, recognizer and planner service with
+    every other session.
+    """
+
+    def __init__(self, robot_id, service, robot_integration, detector, recognizer,
+                 max_wait_ticks=20):
+        """
+        :param robot_id: Unique id within the fleet.
+        :param service: The shared FleetPlannerService.
+        :param robot_integration: Connected RobotIntegration for this robot.
+        :param detector: Shared ObjectDetection.
+        :param recognizer: Shared ObjectRecognition.
+        :param max_wait_ticks: Ticks to wait for a reserved cell before replanning.
+        """
+        self.robot_id = robot_id
+        self.service = service
+        self.robot = robot_integration
+        self.detector = detector
+        self.recognizer = recognizer
+        # Ticks carry the fleet's (possibly virtual) time; obstacle decay follows it
+        self.now = 0.0
+        self.navigation = RobotNavigation(service.building_model, robot_integration,
+                                          costmap=LocalCostmap(clock=lambda: self.now))
+        self.max_wait_ticks = max_wait_ticks
+        self.goal_queue = []
+        self.has_goal = False
+        self.wait_ticks = 0
+        self.ticks = 0
+        self.waits = 0
+        self.replans = 0
+        self.goals_reached = 0
+        self.tick_latencies = []
+
+    def assign_goal(self, goal):
+        """Queue a goal: (x, y) or an object label such as 'fridge'."""
+        self.goal_queue.append(goal)
+
+    def _start_next_goal(self, pose, now):
+        if self.goal_queue:
+            goal = self.service.resolve_goal(self.goal_queue.pop(0), near=pose[:2])
+        else:
+            goal = self.service.random_free_goal()
+        if goal is None:
+            return
+        waypoints = self.service.request_path(self.robot_id, pose[:2], goal, now)
+        if waypoints:
+            self.navigation.set_path(waypoints)
+            self.has_goal = True
+
+    def tick(self, now):
+        """
+        Run one control tick: perception, costmap update, reservation check
+        and navigation. Returns the tick latency in seconds.
+        """
+        t0 = time.perf_counter()
+        self.now = now
+        pose = self.robot.get_robot_pose()
+
+        frame = self.robot.get_robot_camera_frame()
+        if frame is not None:
+            detections = self.detector.detect_batch(frame)
+            recognized = self.recognizer.recognize_batch(detections, camera_pose=pose)
+            self.navigation.update_obstacles(recognized, pose=pose)
+
+        if self.navigation.target_location is None:
+            if self.has_goal:
+                self.goals_reached += 1
+                self.has_goal = False
+                self.service.release(self.robot_id)
+            self._start_next_goal(pose, now)
+
+        waypoint = self.navigation.current_waypoint()
+        if waypoint is not None and not self._next_cell_free(pose, waypoint, now):
+            self.robot.send_motor_command(0.0, 0.0)
+            self.waits += 1
+            self.wait_ticks += 1
+            if self.wait_ticks > self.max_wait_ticks:
+                # Likely a head-on conflict: replan around the other robot's reservation
+                self.wait_ticks = 0
+                self.replans += 1
+                waypoints = self.service.request_path(
+                    self.robot_id, pose[:2], self.navigation.target_location, now)
+                if waypoints:
+                    self.navigation.set_path(waypoints)
+        else:
+            self.wait_ticks = 0
+            self.navigation.update_navigation()
+
+        self.ticks += 1
+        latency = time.perf_counter() - t0
+        self.tick_latencies.append(latency)
+        return latency
+
+    def _next_cell_free(self, pose, waypoint, now):
+        """Check the reservation of the cell one grid step toward the waypoint."""
+        dx = waypoint[0] - pose[0]
+        dy = waypoint[1] - pose[1]
+        dist = math.hypot(dx, dy)
+        if dist < 1e-6:
+            return True
+        step = min(dist, self.service.grid.resolution)
+        ahead = (pose[0] + dx / dist * step, pose[1] + dy / dist * step)
+        return self.service.may_enter(self.robot_id, ahead, now)
+
+    def stats(self):
+        lat = np.asarray(self.tick_latencies, dtype=np.float64) * 1000.0
+        return {
+            "robot_id": self.robot_id,
+            "ticks": self.ticks,
+            "tick_mean_ms": float(lat.mean()) if lat.size else 0.0,
+            "tick_p95_ms": float(np.percentile(lat, 95)) if lat.size else 0.0,
+            "tick_max_ms": float(lat.max()) if lat.size else 0.0,
+            "waits": self.waits,
+            "replans": self.replans,
+            "goals_reached": self.goals_reached,
+        }
+
+
+class FleetServer:
+    """
+    Hosts many robot sessions in one process around a single FleetPlannerService.
+
+    Each session runs as an asyncio task; the CPU-bound tick itself runs on a
+    shared worker pool so slow ticks of one robot do not stall the event loop.
+    In simulated mode ticks run back-to-back on a virtual clock; in real-time
+    mode each session sleeps until its next control deadline.
+
+    Typical usage:
+      server = FleetServer(building_model, detector, recognizer)
+      for _ in range(20):
+          server.add_simulated_robot()
+      report = server.run(n_ticks=200)
+    """
+
+    def __init__(self, building_model, detector, recognizer, control_rate_hz=10.0,
+                 workers=4, seed=0, service=None):
+        """
+        :param building_model: Data structure from ingestion.py (loaded once).
+        :param detector: Shared ObjectDetection instance.
+        :param recognizer: Shared ObjectRecognition instance.
+        :param control_rate_hz: Per-robot control loop rate.
+        :param workers: Size of the worker pool executing ticks.
+        :param seed: Seed for start poses and goals.
+        :param service: Optional existing FleetPlannerService to share between servers.
+        """
+        self.service = service if service is not None else FleetPlannerService(building_model, seed=seed)
+        self.detector = detector
+        self.recognizer = recognizer
+        self.period = 1.0 / control_rate_hz
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+        self.sessions = []
+        self._renderer = None
+
+    def add_robot(self, robot_integration):
+        """Register an already-connected RobotIntegration and return its session."""
+        session = RobotSession(len(self.sessions), self.service, robot_integration,
+                               self.detector, self.recognizer)
+        self.sessions.append(session)
+        return session
+
+    def add_simulated_robot(self):
+        """Create a simulated robot at a random free cell and register it."""
+        if self._renderer is None:
+            self._renderer = SyntheticCameraRenderer(self.service.building_model)
+        start = self.service.random_free_goal() or (0.0, 0.0)
+        theta = float(self.rng.uniform(-math.pi, math.pi))
+        backend = SimulatedRobotBackend(dt=self.period, start_pose=(start[0], start[1], theta),
+                                        renderer=self._renderer, seed=len(self.sessions))
+        robot = RobotIntegration(backend, verbose=False)
+        robot.connect_robot_hardware()
+        return self.add_robot(robot)
+
+    async def _run_session(self, session, n_ticks, realtime, executor):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for i in range(n_ticks):
+            now = (loop.time() - start) if realtime else i * self.period
+            await loop.run_in_executor(executor, session.tick, now)
+            if realtime:
+                delay = start + (i + 1) * self.period - loop.time()
+                await asyncio.sleep(max(delay, 0.0))
+            else:
+                # Yield so sessions interleave fairly
+                await asyncio.sleep(0)
+
+    async def run_async(self, n_ticks, realtime=False):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            await asyncio.gather(*(self._run_session(s, n_ticks, realtime, executor)
+                                   for s in self.sessions))
+
+    def run(self, n_ticks, realtime=False):
+        """
+        Run every session for n_ticks control ticks.
+        :return: The latency report (see report()).
+        """
+        wall_start = time.perf_counter()
+        asyncio.run(self.run_async(n_ticks, realtime=realtime))
+        wall_time = time.perf_counter() - wall_start
+        return self.report(n_ticks, wall_time)
+
+    def report(self, n_ticks, wall_time):
+        """
+        Aggregate per-robot tick latency and fleet-level throughput.
+        """
+        per_robot = [s.stats() for s in self.sessions]
+        all_lat = np.concatenate([np.asarray(s.tick_latencies) for s in self.sessions]) * 1000.0 \
+            if self.sessions else np.zeros(0)
+        sim_time = n_ticks * self.period
+        return {
+            "fleet_size": len(self.sessions),
+            "n_ticks": n_ticks,
+            "wall_time_s": wall_time,
+            "realtime_factor": sim_time / wall_time if wall_time > 0 else float("inf"),
+            "tick_mean_ms": float(all_lat.mean()) if all_lat.size else 0.0,
+            "tick_p95_ms": float(np.percentile(all_lat, 95)) if all_lat.size else 0.0,
+            "plans": self.service.plans,
+            "route_cache_hits": self.service.planner.cache_hits,
+            "reservation_conflicts": self.service.reservations.conflicts,
+            "waits": sum(r["waits"] for r in per_robot),
+            "per_robot": per_robot,
+        }
+
+
+def fleet_scaling_report(building_model, detector, recognizer, fleet_sizes=(1, 5, 10, 20),
+                         n_ticks=50, workers=4):
+    """
+    Run simulated fleets of increasing size and report how per-robot tick
+    latency grows. Each fleet size gets a fresh planner service, so route
+    cache, plan counts and reservations do not carry over between runs.
+
+    :return: List of report dicts (without the per-robot breakdown).
+    """
+    results = []
+    for size in fleet_sizes:
+        server = FleetServer(building_model, detector, recognizer, workers=workers)
+        for _ in range(size):
+            server.add_simulated_robot()
+        report = server.run(n_ticks)
+        report.pop("per_robot")
+        results.append(report)
+    return results
@@ -3,6 +3,8 @@
 import random
 import cv2
 
+from .instrumentation import get_logger
+
 class GlassesIntegration:
     """
     Manages the interface between the Python framework and AR smart glasses (or a fallback webcam).
@@ -28,6 +30,11 @@ class GlassesIntegration:
         self.webcam_index = webcam_index
         self.connected = False
         self.cap = None   # Will store cv2.VideoCapture if using webcam
+        self.log = get_logger("GlassesIntegration", interval_s=10.0)
+
+        # Optional pose source (e.g., ParticleFilterLocalizer) used when the
+        # device itself does not report tracking data
+        self.localizer = None
 
     def connect_hardware(self):
         """
@@ -69,19 +76,24 @@ class GlassesIntegration:
         else:
             # For real AR glasses, you'd capture from the device's camera feed
             # using the manufacturer’s SDK, then convert to an OpenCV/numpy array.
-            print("[GlassesIntegration] Stub: returning None in AR glasses mode.")
+            self.log.warning("Stub: returning None in AR glasses mode.")
             return None
 
     def get_head_orientation(self):
         """
         Return the user’s head orientation (yaw, pitch, roll) or similar data.
         For real glasses, you'd query built-in IMUs or tracking sensors.
-        Here, we provide a simple stub returning zeros.
+        Without device tracking, the yaw comes from the attached localizer
+        (if any) once it has converged; pitch and roll are reported as zero.
         """
         if not self.connected:
             return (0.0, 0.0, 0.0)
 
         # STUB: In real usage, retrieve orientation from device’s sensor API
+        # An unconverged filter's yaw is arbitrary, so it is not reported (as for the position)
+        if self.localizer is not None and self.localizer.is_converged():
+            _, _, yaw = self.localizer.estimate()
+            return (yaw, 0.0, 0.0)
         return (0.0, 0.0, 0.0)
 
     def capture_voice_command(self):
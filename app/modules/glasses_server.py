@@ -0,0 +1,555 @@
+# app/modules/glasses_server.py
+
+import asyncio
+import json
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .async_runtime import AsyncUserInteraction
+from .llm_broker import BrokeredLLM, LLMRequestBroker
+from .localization import ParticleFilterLocalizer
+from .model_updates import LiveModelUpdater
+from .navigation import NavigationAssistance
+from .path_planner import GridPlanner, OccupancyGrid
+from .spatial_index import SpatialHashIndex
+from .user_interaction import UserInteraction
+from .view_query import ViewQuery
+
+
+# Wire format: [header length][body length][JSON header][body]. The header
+# carries the message 'type'; only frames have a body (JPEG bytes).
+#
+#   client -> server: hello {"client"}, frame {"seq", "head"} + JPEG, voice {"text"}, bye
+#   server -> client: welcome {"session"}, cues {"seq", "objects", "position", "server_ms"},
+#                     say {"text"}
+_LENGTHS = struct.Struct("!II")
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends a malformed or oversized message."""
+
+
+def encode_message(header, body=b""):
+    data = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return _LENGTHS.pack(len(data), len(body)) + data + body
+
+
+async def read_message(reader):
+    """
+    :return: (header dict, body bytes), or None if the peer closed the connection.
+    :raises ProtocolError: On oversized or undecodable messages.
+    """
+    try:
+        header_len, body_len = _LENGTHS.unpack(await reader.readexactly(_LENGTHS.size))
+    except asyncio.IncompleteReadError:
+        return None
+    if header_len > MAX_HEADER_BYTES or body_len > MAX_BODY_BYTES:
+        raise ProtocolError(f"Message too large ({header_len} + {body_len} bytes)")
+    try:
+        data = await reader.readexactly(header_len + body_len)
+    except asyncio.IncompleteReadError:
+        return None
+    try:
+        header = json.loads(data[:header_len])
+    except ValueError as exc:
+        raise ProtocolError(f"Bad message header: {exc}") from exc
+    if not isinstance(header, dict) or "type" not in header:
+        raise ProtocolError("Message header without 'type'")
+    return header, data[header_len:]
+
+
+def encode_frame(frame, quality=80):
+    ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return data.tobytes()
+
+
+def decode_frame(data):
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ProtocolError("Undecodable frame")
+    return frame
+
+
+def _object_message(obj):
+    return {
+        "name": obj.get("name"),
+        "type": obj.get("type"),
+        "position": [float(v) for v in obj.get("position", ())],
+        "confidence": float(obj.get("confidence", 0.0)),
+    }
+
+
+class RemoteAudio:
+    """
+    Stands in for SpatialAudioEngine on the server: cues and speech are sent
+    to the client, which renders them locally. 'send' must be thread-safe.
+    """
+
+    def __init__(self, send):
+        self.send = send
+        self.head_yaw = 0.0
+        self.objects = []
+
+    def set_head_orientation(self, yaw):
+        self.head_yaw = yaw
+
+    def update_cues(self, objects, now=None):
+        self.objects = objects
+
+    def play_text(self, text):
+        self.send({"type": "say", "text": text})
+
+
+class _ClientGlasses:
+    """Per-client device state; frames and voice arrive over the connection instead."""
+
+    def __init__(self):
+        self.connected = True
+        self.localizer = None
+        self.head_orientation = (0.0, 0.0, 0.0)
+
+    def get_camera_frame(self):
+        return None
+
+    def get_head_orientation(self):
+        return self.head_orientation
+
+    def capture_voice_command(self):
+        return None
+
+    def release(self):
+        self.connected = False
+
+
+class GlassesSession:
+    """
+    Server-side state of one connected client: its own UserInteraction,
+    navigation and (optionally) localizer around the server's shared models.
+    Only the newest received frame is processed; older unprocessed frames
+    are dropped so a slow client never builds up a backlog.
+    """
+
+    def __init__(self, session_id, name, server):
+        loop = asyncio.get_running_loop()
+        self.session_id = session_id
+        self.name = name
+        self.outbox = asyncio.Queue()
+        self.glasses = _ClientGlasses()
+        self.audio = RemoteAudio(lambda message: loop.call_soon_threadsafe(self.outbox.put_nowait, message))
+        navigation = NavigationAssistance(server.building_model, planner=server.planner,
+                                          audio_engine=self.audio, object_index=server.object_index)
+        localizer = ParticleFilterLocalizer(server.building_model, seed=session_id) if server.localize else None
+        self.ui = UserInteraction(self.glasses, self.audio, server.detector, server.recognizer, navigation,
+                                  BrokeredLLM(server.broker, session_id), localizer=localizer,
+                                  intent_parser=server.intents, view_query=server.view_query)
+        # Voice commands: local intents on the loop, LLM answers through the broker, newer commands cancel older ones
+        self.commands = AsyncUserInteraction(self.ui)
+
+        self.pending = None
+        self.processing = False
+        self.frame_ready = asyncio.Event()
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.process_times = []
+
+    def push_frame(self, header, body):
+        if self.pending is not None:
+            self.frames_dropped += 1
+        self.pending = (header.get("seq"), tuple(header.get("head", (0.0, 0.0, 0.0))), body)
+        self.frames_received += 1
+        self.frame_ready.set()
+
+    def process(self, seq, head, jpeg):
+        """Decode, detect and recognize one frame (worker thread). :return: The 'cues' message."""
+        start = time.perf_counter()
+        frame = decode_frame(jpeg)
+        self.glasses.head_orientation = head
+        self.ui.apply_detections(self.ui.detect(frame))
+        elapsed = time.perf_counter() - start
+        self.process_times.append(elapsed)
+        self.frames_processed += 1
+        return {
+            "type": "cues",
+            "seq": seq,
+            "objects": [_object_message(obj) for obj in self.ui.detected_objects],
+            "position": list(self.ui.user_position) if self.ui.user_position is not None else None,
+            "server_ms": 1000.0 * elapsed,
+        }
+
+    def stats(self):
+        times = np.asarray(self.process_times) * 1000.0
+        return {
+            "session": self.session_id,
+            "client": self.name,
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "process_mean_ms": float(times.mean()) if times.size else 0.0,
+            "voice_commands": self.commands.commands,
+        }
+
+
+class GlassesServer:
+    """
+    One server per building for many AR-glasses clients.
+
+    The building model, occupancy grid / planner (with its route cache),
+    spatial index, intent grammar, detector, recognizer and LLM are held once;
+    each client gets a lightweight GlassesSession. Open-ended questions go
+    through one LLMRequestBroker, which deduplicates and rate-limits them
+    across clients. Clients stream JPEG frames
+    (with head orientation) and voice commands over a local TCP connection
+    and receive recognized objects ('cues') and spoken instructions back.
+    Frame processing runs on a shared worker pool; voice commands and route
+    guidance run on the event loop.
+
+    Typical usage:
+      server = GlassesServer(building_model, detector, recognizer, llm_integration)
+      asyncio.run(server.serve_forever(port=8765))
+    """
+
+    def __init__(self, building_model, detector, recognizer, llm, workers=4, localize=False,
+                 guidance_rate=10.0, planner=None, model_updates=None):
+        """
+        :param building_model: Data structure from ingestion.py (loaded once).
+        :param detector: Shared ObjectDetection instance.
+        :param recognizer: Shared ObjectRecognition instance.
+        :param llm: Shared LLMIntegration instance.
+        :param workers: Size of the worker pool processing frames.
+        :param localize: Run a particle-filter localizer per client.
+        :param guidance_rate: Route guidance updates per second and client.
+        :param planner: Optional existing GridPlanner to share.
+        :param model_updates: Optional folder polled for model deltas (see model_updates.py);
+                              deltas can also be passed to server.model_updater.submit().
+        """
+        self.building_model = building_model
+        self.detector = detector
+        self.recognizer = recognizer
+        self.llm = llm
+        self.broker = LLMRequestBroker(llm)
+        self.workers = workers
+        self.localize = localize
+        self.guidance_period = 1.0 / guidance_rate
+        self.planner = planner if planner is not None else GridPlanner(OccupancyGrid(building_model))
+        self.object_index = SpatialHashIndex.from_building_model(building_model)
+        self.intents = UserInteraction.build_intent_parser(recognizer)
+        self.view_query = ViewQuery(building_model)
+        # Applied on the event loop, which also runs all route planning
+        self.model_updater = LiveModelUpdater(building_model, planner=self.planner,
+                                              indexes=[self.object_index], watch_dir=model_updates)
+        self.model_updater.add_listener(lambda report: setattr(self.llm, "context_builder", None))
+        self.model_updater.add_listener(lambda report: self.view_query.invalidate())
+
+        self.sessions = {}
+        self.finished_sessions = []
+        self.executor = None
+        self._server = None
+        self._next_id = 0
+        self._client_tasks = set()
+        self._update_task = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start listening. :return: The bound port."""
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="glasses-server")
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        self._update_task = asyncio.get_running_loop().create_task(self._model_update_loop())
+        port = self._server.sockets[0].getsockname()[1]
+        print(f"[GlassesServer] Listening on {host}:{port}.")
+        return port
+
+    async def serve_forever(self, host="127.0.0.1", port=8765):
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        self._update_task.cancel()
+        for task in list(self._client_tasks):
+            task.cancel()
+        await asyncio.gather(self._update_task, *self._client_tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        await self.broker.close()
+        self.executor.shutdown(wait=True)
+
+    async def _handle_client(self, reader, writer):
+        self._client_tasks.add(asyncio.current_task())
+        session = None
+        tasks = []
+        try:
+            message = await read_message(reader)
+            if message is None or message[0]["type"] != "hello":
+                raise ProtocolError("Expected 'hello'")
+            session = GlassesSession(self._next_id, str(message[0].get("client", "")), self)
+            self._next_id += 1
+            self.sessions[session.session_id] = session
+            session.outbox.put_nowait({"type": "welcome", "session": session.session_id})
+            loop = asyncio.get_running_loop()
+            process_task = loop.create_task(self._process_loop(session))
+            tasks = [process_task] + [loop.create_task(coro) for coro in (
+                self._write_loop(session, writer), self._guidance_loop(session))]
+
+            while True:
+                message = await read_message(reader)
+                if message is None or message[0]["type"] == "bye":
+                    break
+                header, body = message
+                if header["type"] == "frame":
+                    session.push_frame(header, body)
+                elif header["type"] == "voice":
+                    if header.get("text"):
+                        session.commands.submit_command(header["text"])
+                else:
+                    raise ProtocolError(f"Unknown message type '{header['type']}'")
+            # Let the last frame and answer reach the client before closing
+            while (session.pending is not None or session.processing) and not process_task.done():
+                await asyncio.sleep(0.005)
+            await session.commands.wait_command()
+            await session.outbox.join()
+        except ProtocolError as exc:
+            print(f"[GlassesServer] Dropping client: {exc}")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if session is not None:
+                command_task = session.commands.cancel_command()
+                if command_task is not None:
+                    tasks.append(command_task)
+                self.sessions.pop(session.session_id, None)
+                self.finished_sessions.append(session.stats())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+            self._client_tasks.discard(asyncio.current_task())
+
+    async def _process_loop(self, session):
+        loop = asyncio.get_running_loop()
+        while True:
+            await session.frame_ready.wait()
+            session.frame_ready.clear()
+            (seq, head, jpeg), session.pending = session.pending, None
+            session.processing = True
+            try:
+                message = await loop.run_in_executor(self.executor, session.process, seq, head, jpeg)
+            except ProtocolError as exc:
+                session.frames_dropped += 1
+                print(f"[GlassesServer] Client '{session.name}': {exc}")
+                continue
+            except Exception as exc:
+                # A failing detector or recognizer costs this frame, not the session
+                session.frames_dropped += 1
+                print(f"[GlassesServer] Client '{session.name}': frame {seq} failed: {exc!r}")
+                continue
+            finally:
+                session.processing = False
+            session.outbox.put_nowait(message)
+
+    async def _write_loop(self, session, writer):
+        while True:
+            message = await session.outbox.get()
+            writer.write(encode_message(message))
+            await writer.drain()
+            session.outbox.task_done()
+
+    async def _model_update_loop(self, period=1.0):
+        while True:
+            self.model_updater.step()
+            await asyncio.sleep(period)
+
+    async def _guidance_loop(self, session):
+        while True:
+            session.ui.update_guidance()
+            await asyncio.sleep(self.guidance_period)
+
+    def stats(self):
+        return {
+            "active_sessions": len(self.sessions),
+            "sessions": [s.stats() for s in self.sessions.values()] + self.finished_sessions,
+            "route_cache_hits": self.planner.cache_hits,
+            "intents": self.intents.stats(),
+            "model_updates": self.model_updater.applied,
+            "llm": self.broker.metrics(),
+        }
+
+
+class GlassesClient:
+    """
+    Stand-in AR-glasses client for tests and load generation: sends frames
+    and voice commands, collects cues and spoken text, and measures the
+    frame-to-cues latency per frame.
+
+    Typical usage (inside an asyncio loop):
+      client = GlassesClient("alice")
+      await client.connect("127.0.0.1", port)
+      await client.send_frame(frame)
+      await client.send_voice("Navigate to the fridge")
+      await client.close()
+      print(client.stats())
+    """
+
+    def __init__(self, name="client", jpeg_quality=80):
+        self.name = name
+        self.jpeg_quality = jpeg_quality
+        self.session_id = None
+        self.reader = None
+        self.writer = None
+        self.seq = 0
+        self.sent_at = {}
+        self.latencies = []
+        self.server_ms = []
+        self.cues = []
+        self.spoken = []
+        self._receiver = None
+        self._welcome = None
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self._welcome = asyncio.get_running_loop().create_future()
+        self._receiver = asyncio.get_running_loop().create_task(self._receive_loop())
+        await self._send({"type": "hello", "client": self.name})
+        self.session_id = await self._welcome
+        return self.session_id
+
+    async def _send(self, header, body=b""):
+        self.writer.write(encode_message(header, body))
+        await self.writer.drain()
+
+    async def send_frame(self, frame, head=(0.0, 0.0, 0.0)):
+        """
+        :param frame: BGR image, or already JPEG-encoded bytes.
+        :return: The frame's sequence number.
+        """
+        jpeg = frame if isinstance(frame, (bytes, bytearray)) else encode_frame(frame, self.jpeg_quality)
+        seq = self.seq
+        self.seq += 1
+        self.sent_at[seq] = time.perf_counter()
+        await self._send({"type": "frame", "seq": seq, "head": [float(v) for v in head]}, jpeg)
+        return seq
+
+    async def send_voice(self, text):
+        await self._send({"type": "voice", "text": text})
+
+    async def _receive_loop(self):
+        while True:
+            message = await read_message(self.reader)
+            if message is None:
+                break
+            header = message[0]
+            if header["type"] == "welcome":
+                self._welcome.set_result(header["session"])
+            elif header["type"] == "cues":
+                sent = self.sent_at.pop(header["seq"], None)
+                if sent is not None:
+                    self.latencies.append(time.perf_counter() - sent)
+                self.server_ms.append(header["server_ms"])
+                self.cues.append(header)
+            elif header["type"] == "say":
+                self.spoken.append(header["text"])
+
+    async def close(self):
+        """Say goodbye and wait until the server has sent everything."""
+        try:
+            await self._send({"type": "bye"})
+            await asyncio.wait_for(self._receiver, timeout=10.0)
+        finally:
+            self.writer.close()
+
+    def stats(self):
+        latency = np.asarray(self.latencies) * 1000.0
+        return {
+            "client": self.name,
+            "frames_sent": self.seq,
+            "cues_received": len(self.cues),
+            "latency_mean_ms": float(latency.mean()) if latency.size else 0.0,
+            "latency_p95_ms": float(np.percentile(latency, 95)) if latency.size else 0.0,
+            "latency_max_ms": float(latency.max()) if latency.size else 0.0,
+        }
+
+
+def synthetic_frames(n=8, shape=(240, 320), quality=80, seed=0):
+    """A few JPEG-encoded synthetic camera frames (smooth gradients plus boxes)."""
+    rng = np.random.default_rng(seed)
+    height, width = shape
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :].repeat(height, axis=0)
+    frames = []
+    for _ in range(n):
+        frame = np.stack([gradient, gradient[::-1], np.full_like(gradient, rng.uniform(0, 255))], axis=2)
+        frame = frame.astype(np.uint8)
+        for _ in range(4):
+            x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 40))
+            cv2.rectangle(frame, (x, y), (x + 40, y + 40), tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+        frames.append(encode_frame(frame, quality))
+    return frames
+
+
+async def _run_stand_in_client(host, port, name, frames, n_frames, fps, commands=()):
+    client = GlassesClient(name)
+    await client.connect(host, port)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    commands = dict(commands)
+    for i in range(n_frames):
+        await client.send_frame(frames[i % len(frames)])
+        if i in commands:
+            await client.send_voice(commands[i])
+        await asyncio.sleep(max(0.0, start + (i + 1) / fps - loop.time()))
+    await client.close()
+    return client
+
+
+async def run_load_levels(server, concurrency=(1, 2, 4, 8), n_frames=30, fps=15.0, frame_shape=(240, 320)):
+    """
+    Run the stand-in client load generator against a GlassesServer at
+    increasing concurrency (the server is started once and reused).
+
+    :return: One row per concurrency level with latency and drop statistics.
+    """
+    frames = synthetic_frames(shape=frame_shape)
+    port = await server.start()
+    rows = []
+    try:
+        for n_clients in concurrency:
+            server.finished_sessions = []
+            clients = await asyncio.gather(*(
+                _run_stand_in_client("127.0.0.1", port, f"load-{n_clients}-{i}", frames, n_frames, fps,
+                                     commands={n_frames // 2: "Describe the objects around me"})
+                for i in range(n_clients)))
+            per_client = [c.stats() for c in clients]
+            latencies = np.concatenate([np.asarray(c.latencies) for c in clients]) * 1000.0
+            sent = sum(s["frames_sent"] for s in per_client)
+            answered = sum(s["cues_received"] for s in per_client)
+            rows.append({
+                "clients": n_clients,
+                "frames_sent": sent,
+                "frames_answered": answered,
+                "drop_rate": 1.0 - answered / sent if sent else 0.0,
+                "latency_mean_ms": float(latencies.mean()) if latencies.size else 0.0,
+                "latency_p95_ms": float(np.percentile(latencies, 95)) if latencies.size else 0.0,
+                "latency_max_ms": float(latencies.max()) if latencies.size else 0.0,
+                "per_client": per_client,
+            })
+    finally:
+        await server.stop()
+    return rows
+
+
+def glasses_load_report(building_model, detector, recognizer, llm, concurrency=(1, 2, 4, 8),
+                        n_frames=30, fps=15.0, workers=4):
+    """Synchronous wrapper around run_load_levels for the command line."""
+    server = GlassesServer(building_model, detector, recognizer, llm, workers=workers)
+    return asyncio.run(run_load_levels(server, concurrency, n_frames=n_frames, fps=fps))
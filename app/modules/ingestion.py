@@ -2,6 +2,8 @@
 
 import os
 
+from .mesh_lod import DEFAULT_CELL_SIZES, LOD_CACHE_SUFFIX, MeshLODSet
+
 try:
     import pywavefront  # For parsing OBJ files (pip install PyWavefront)
 except ImportError:
@@ -20,23 +22,31 @@ class ModelIngestion:
     In practice, you'd store geometry, materials, or semantic data (rooms, walls, etc.).
     """
 
-    def __init__(self):
+    def __init__(self, lod_cell_sizes=DEFAULT_CELL_SIZES, lod_cache=True):
         """
-        Optionally configure details (e.g., default formats to handle).
+        :param lod_cell_sizes: Cluster sizes (m) of the generated levels of detail.
+        :param lod_cache: Keep levels of detail in a '<model>.lod.npz' file next to the model.
         """
-        pass
+        self.lod_cell_sizes = lod_cell_sizes
+        self.lod_cache = lod_cache
 
-    def load_model(self, filepath):
+    def load_model(self, filepath, build_lod=False):
         """
         Load a 3D building model from the given filepath. This function supports
         different file formats based on the extension. (OBJ, IFC, etc.)
 
+        Models with mesh geometry also get model_data["lod"], a MeshLODSet
+        with simplified levels of every object. Levels come from the cache
+        file if it matches the model, and are otherwise built on demand.
+
         :param filepath: Path to the 3D model file.
+        :param build_lod: Build every level now and write the cache (offline step).
         :return: A Python data structure representing the building model,
                  e.g. {
                    "geometry": ...,
                    "objects": [...],
-                   "semantic_data": ...
+                   "semantic_data": ...,
+                   "lod": MeshLODSet
                  }
         """
 
@@ -47,7 +57,10 @@ class ModelIngestion:
         ext = os.path.splitext(filepath)[1].lower()
 
         if ext in [".obj"]:
-            return self._load_obj(filepath)
+            model_data = self._load_obj(filepath)
+            if model_data["geometry"]:
+                self._attach_lod(model_data, filepath, build_lod)
+            return model_data
         elif ext in [".ifc"]:
             return self._load_ifc(filepath)
         else:
@@ -79,29 +92,56 @@ class ModelIngestion:
             "format": "OBJ"
         }
 
-        # Extracting vertices and faces from the wavefront scene (simplified approach)
+        # Extracting vertices and faces from the wavefront scene (simplified approach).
+        # scene.vertices is shared by all meshes; each entry is (x, y, z[, r, g, b]).
+        model_data["geometry"]["vertices"] = [tuple(v[:3]) for v in scene.vertices]
+
         for name, mesh in scene.meshes.items():
-            # mesh.vertices is a 1D list of floats [x1, y1, z1, x2, y2, z2, ...]
-            vertices = []
-            for i in range(0, len(mesh.vertices), 3):
-                x = mesh.vertices[i]
-                y = mesh.vertices[i + 1]
-                z = mesh.vertices[i + 2]
-                vertices.append((x, y, z))
-
-            # If faces are collected, mesh.faces is a list of indices
+            # If faces are collected, mesh.faces is a list of indices into scene.vertices
             faces = mesh.faces  # Each is a tuple of vertex indices (e.g., (0, 1, 2))
-
-            # We might store them in a sub-list
-            model_data["geometry"]["vertices"].extend(vertices)
             model_data["geometry"]["faces"].extend(faces)
 
-            # We can also track "objects" if the OBJ is subdivided by groups
-            model_data["objects"].append({"name": name, "mesh": mesh})
+            # We can also track "objects" if the OBJ is subdivided by groups.
+            # Bounds/centroid let other modules place and look up objects spatially.
+            obj = {"name": name, "mesh": mesh, "faces": faces}
+            obj.update(self._object_bounds(model_data["geometry"]["vertices"], faces))
+            model_data["objects"].append(obj)
 
         print(f"[ModelIngestion] OBJ loading complete. Found {len(scene.mesh_list)} mesh(es).")
         return model_data
 
+    def _attach_lod(self, model_data, filepath, build):
+        """Attach a MeshLODSet, reusing the cache file when it matches this model file."""
+        st = os.stat(filepath)
+        lod = MeshLODSet(model_data, cell_sizes=self.lod_cell_sizes,
+                         cache_path=filepath + LOD_CACHE_SUFFIX if self.lod_cache else None,
+                         stamp=f"{st.st_size}:{st.st_mtime_ns}")
+        loaded = self.lod_cache and lod.load()
+        if build and not loaded:
+            lod.build_all()
+            if self.lod_cache:
+                lod.save()
+        if loaded or build:
+            print(f"[ModelIngestion] Levels of detail ({'cached' if loaded else 'built'}): {lod.summary()}")
+        model_data["lod"] = lod
+
+    @staticmethod
+    def _object_bounds(vertices, faces):
+        """
+        Compute the axis-aligned bounds and centroid of the vertices used by 'faces'.
+
+        :return: {"bounds": ((min_x, min_y, min_z), (max_x, max_y, max_z)),
+                  "centroid": (x, y, z)} or {} if the object has no faces.
+        """
+        used = {i for face in faces for i in face}
+        if not used:
+            return {}
+        points = [vertices[i] for i in used]
+        lo = tuple(min(p[k] for p in points) for k in range(3))
+        hi = tuple(max(p[k] for p in points) for k in range(3))
+        centroid = tuple((lo[k] + hi[k]) / 2.0 for k in range(3))
+        return {"bounds": (lo, hi), "centroid": centroid}
+
     def _load_ifc(self, filepath):
         """
         Use ifcopenshell to load a .ifc (Industry Foundation Classes) file.
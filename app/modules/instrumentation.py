@@ -0,0 +1,365 @@
+# app/modules/instrumentation.py
+
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Latency buckets (seconds) shared by all histograms unless overridden
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    """Monotonic counter; inc() is a no-op while telemetry is disabled."""
+
+    __slots__ = ("telemetry", "name", "labels", "value")
+
+    def __init__(self, telemetry, name, labels=()):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, n=1):
+        if self.telemetry.enabled:
+            self.value += n
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (Prometheus semantics: cumulative 'le' buckets,
+    plus sum and count). observe() is a no-op while telemetry is disabled.
+    """
+
+    __slots__ = ("telemetry", "name", "labels", "buckets", "counts", "sum", "count")
+
+    def __init__(self, telemetry, name, labels=(), buckets=DEFAULT_BUCKETS):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        if self.telemetry.enabled:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("telemetry", "name", "histogram", "start")
+
+    def __init__(self, telemetry, name, histogram):
+        self.telemetry = telemetry
+        self.name = name
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.histogram.observe(end - self.start)
+        if self.telemetry.tracing:
+            self.telemetry._trace_event(self.name, self.start, end)
+        return False
+
+
+class Telemetry:
+    """
+    Lightweight metrics and tracing for the pipeline stages.
+
+    - span(stage): times a block into the 'stage_duration_seconds{stage=...}'
+      histogram and, when tracing, into a Chrome trace event.
+    - counter(name) / histogram(name): named metrics with optional labels.
+    - Export as Prometheus text (prometheus_text(), or serve() on /metrics)
+      or as a Chrome trace JSON file (write_chrome_trace(), chrome://tracing
+      or Perfetto).
+
+    Disabled by default: span() then returns a shared no-op context manager
+    and inc()/observe() return immediately, so instrumented hot loops pay
+    only a function call and an attribute check.
+
+    Typical usage:
+      telemetry.enable(trace=True)
+      with telemetry.span("detect"):
+          detections = detector.detect_objects(frame)
+      telemetry.write_chrome_trace("trace.json")
+    """
+
+    def __init__(self, enabled=False, trace=False, max_trace_events=200000, prefix="smartar_"):
+        """
+        :param enabled: Start collecting metrics immediately.
+        :param trace: Also keep Chrome trace events for every span.
+        :param max_trace_events: Trace ring size (oldest events are dropped).
+        :param prefix: Prefix for exported metric names.
+        """
+        self.enabled = enabled
+        self.tracing = enabled and trace
+        self.prefix = prefix
+        self.metrics = {}  # (name, labels) -> Counter / Histogram
+        self._stage_histograms = {}
+        self._lock = threading.Lock()
+        self.trace_events = deque(maxlen=max_trace_events)
+        self._epoch = time.perf_counter()
+        self._server = None
+
+    def enable(self, trace=False):
+        self.enabled = True
+        self.tracing = trace
+
+    def disable(self):
+        self.enabled = False
+        self.tracing = False
+
+    def reset(self):
+        """Drop all recorded values and trace events (metric objects stay valid)."""
+        with self._lock:
+            for metric in self.metrics.values():
+                if isinstance(metric, Counter):
+                    metric.value = 0
+                else:
+                    metric.counts = [0] * len(metric.counts)
+                    metric.sum = 0.0
+                    metric.count = 0
+            self.trace_events.clear()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def _get(self, cls, name, labels, **kwargs):
+        key = (name, tuple(sorted((labels or {}).items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.get(key)
+                if metric is None:
+                    metric = self.metrics[key] = cls(self, name, key[1], **kwargs)
+        if not isinstance(metric, cls):
+            raise TypeError(f"Metric '{name}' is already registered as {type(metric).__name__}")
+        return metric
+
+    def counter(self, name, labels=None):
+        return self._get(Counter, name, labels)
+
+    def histogram(self, name, labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, labels, buckets=buckets)
+
+    # ------------------------------------------------------------------
+    # Spans
+    # ------------------------------------------------------------------
+
+    def _stage_histogram(self, stage):
+        histogram = self._stage_histograms.get(stage)
+        if histogram is None:
+            histogram = self._stage_histograms[stage] = self.histogram(
+                "stage_duration_seconds", {"stage": stage})
+        return histogram
+
+    def span(self, stage):
+        """Context manager timing one pipeline stage."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, self._stage_histogram(stage))
+
+    def record(self, stage, seconds, end=None):
+        """Record a stage duration measured elsewhere (e.g. by an LLM backend)."""
+        if not self.enabled:
+            return
+        self._stage_histogram(stage).observe(seconds)
+        if self.tracing:
+            end = time.perf_counter() if end is None else end
+            self._trace_event(stage, end - seconds, end)
+
+    def _trace_event(self, name, start, end):
+        self.trace_events.append({
+            "name": name, "cat": "stage", "ph": "X",
+            "ts": (start - self._epoch) * 1e6, "dur": (end - start) * 1e6,
+            "pid": os.getpid(), "tid": threading.get_ident(),
+        })
+
+    def stage_summary(self):
+        """:return: {stage: {"count", "mean_ms"}} for every timed stage."""
+        return {stage: {"count": h.count, "mean_ms": 1000.0 * h.mean()}
+                for stage, h in sorted(self._stage_histograms.items())}
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def prometheus_text(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        typed = set()
+        for (name, labels), metric in sorted(self.metrics.items(), key=lambda item: item[0]):
+            full = self.prefix + name
+            if isinstance(metric, Counter):
+                if full not in typed:
+                    lines.append(f"# TYPE {full}_total counter")
+                    typed.add(full)
+                lines.append(f"{full}_total{_label_text(labels)} {metric.value}")
+                continue
+            if full not in typed:
+                lines.append(f"# TYPE {full} histogram")
+                typed.add(full)
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ("+Inf",), metric.counts):
+                cumulative += count
+                lines.append(f"{full}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{full}_sum{_label_text(labels)} {metric.sum:.9f}")
+            lines.append(f"{full}_count{_label_text(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self):
+        return {"traceEvents": list(self.trace_events), "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        return len(self.trace_events)
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """
+        Serve prometheus_text() on http://host:port/metrics from a daemon thread.
+        :return: The bound port.
+        """
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Process-wide instance used by the instrumented modules
+telemetry = Telemetry()
+
+
+# ----------------------------------------------------------------------
+# Logging
+# ----------------------------------------------------------------------
+
+class _ConsoleHandler(logging.Handler):
+    """Writes '[Component] message' to the current sys.stdout (like the former prints)."""
+
+    def emit(self, record):
+        try:
+            component = record.name.split(".", 1)[-1]
+            sys.stdout.write(f"[{component}] {record.getMessage()}\n")
+        except Exception:
+            self.handleError(record)
+
+
+_root_logger = logging.getLogger("smartar")
+if not _root_logger.handlers:
+    _root_logger.addHandler(_ConsoleHandler())
+    _root_logger.setLevel(os.environ.get("SMARTAR_LOG_LEVEL", "INFO").upper())
+
+
+def configure_logging(level):
+    """Set the level of every component logger ("DEBUG", "INFO", "WARNING", ...)."""
+    _root_logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+class RateLimitedLogger:
+    """
+    Leveled logger for hot paths. Messages are formatted lazily (%-style
+    arguments) and only if their level is enabled; repeats of the same
+    message (or 'key') within 'interval_s' are suppressed and counted, and the
+    count is appended to the next message that gets through.
+
+    Typical usage:
+      log = get_logger("RobotIntegration")
+      log.info("Motor cmd - lin: %.2f, ang: %.2f", linear, angular, key="motor")
+    """
+
+    def __init__(self, name, interval_s=1.0):
+        self.logger = logging.getLogger(f"smartar.{name}")
+        self.interval_s = interval_s
+        self._last = {}
+        self.suppressed = {}
+
+    def _log(self, level, msg, args, key):
+        if not self.logger.isEnabledFor(level):
+            return
+        key = msg if key is None else key
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval_s:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return
+        self._last[key] = now
+        count = self.suppressed.pop(key, 0)
+        if count:
+            msg = f"{msg} ({count} similar message(s) suppressed)"
+        self.logger.log(level, msg, *args)
+
+    def debug(self, msg, *args, key=None):
+        self._log(logging.DEBUG, msg, args, key)
+
+    def info(self, msg, *args, key=None):
+        self._log(logging.INFO, msg, args, key)
+
+    def warning(self, msg, *args, key=None):
+        self._log(logging.WARNING, msg, args, key)
+
+    def error(self, msg, *args, key=None):
+        self._log(logging.ERROR, msg, args, key)
+
+
+def get_logger(name, interval_s=1.0):
+    return RateLimitedLogger(name, interval_s)
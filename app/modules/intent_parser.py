@@ -0,0 +1,180 @@
+# app/modules/intent_parser.py
+
+import re
+import time
+
+
+ARTICLES = ("the", "a", "an", "my", "our", "that", "this")
+
+
+class VocabularyTrie:
+    """
+    Word-level trie over known object names (e.g. 'kitchen table'), used to
+    extract the longest known phrase from a command slot.
+    """
+
+    def __init__(self, phrases=()):
+        self.root = {}
+        self.size = 0
+        for phrase in phrases:
+            self.add(phrase)
+
+    def add(self, phrase):
+        words = phrase.lower().split()
+        if not words:
+            return
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        if "$" not in node:
+            node["$"] = " ".join(words)
+            self.size += 1
+
+    def longest_match(self, words):
+        """
+        Find the longest known phrase starting at any position of 'words'.
+        :return: The canonical phrase, or None.
+        """
+        best = None
+        for start in range(len(words)):
+            node = self.root
+            for word in words[start:]:
+                node = node.get(word)
+                if node is None:
+                    break
+                if "$" in node and (best is None or len(node["$"]) > len(best)):
+                    best = node["$"]
+        return best
+
+
+class Intent:
+    """
+    A parsed command: intent name, extracted slots and the original text.
+    """
+
+    __slots__ = ("name", "slots", "text")
+
+    def __init__(self, name, slots, text):
+        self.name = name
+        self.slots = slots
+        self.text = text
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, {self.slots!r})"
+
+
+class IntentParser:
+    """
+    Compiled grammar for the common voice-command families, so they can be
+    handled locally instead of through the LLM:
+
+      navigate  - "navigate to the fridge", "take me to the kitchen table"
+      where_is  - "where is the chair?", "find the kitchen table"
+      describe  - "what am I looking at?", "what is around me?"
+      stop      - "stop", "cancel navigation"
+      repeat    - "repeat", "say that again"
+
+    All patterns are compiled into one regular expression (a single automaton
+    pass per command); target slots are then canonicalized against the
+    furniture DB / building model vocabulary with a word trie. A 'where_is'
+    target must contain a known object name ("where are we going?" is not a
+    lookup). Anything else is an open-ended question ('question' intent) for
+    the LLM.
+
+    Typical usage:
+      parser = IntentParser(vocabulary=furniture_db.keys())
+      intent = parser.parse("Take me to the fridge please")
+      # Intent('navigate', {'target': 'fridge'})
+    """
+
+    GRAMMAR = (
+        ("navigate", r"(?:navigate|take me|guide me|bring me|go|walk me|lead me)\s+(?:to|towards?)\s+(?P<navigate_target>.+?)"),
+        ("where_is", r"(?:where(?:\s+is|'s|\s+are)|find|locate)\s+(?P<where_is_target>.+?)"),
+        ("describe", r"(?:what\s+am\s+i\s+looking\s+at|what(?:\s+is|'s)\s+(?:around(?:\s+me)?|in\s+front\s+of\s+me|here)"
+                     r"|describe(?:\s+(?:the\s+)?(?:scene|surroundings|room|(?:objects|things)(?:\s+around\s+me)?))?"
+                     r"|what\s+do\s+you\s+see)"),
+        ("stop", r"(?:stop|cancel|end|quit)(?:\s+(?:the\s+)?(?:navigation|guidance|route))?"),
+        ("repeat", r"(?:repeat(?:\s+that)?|say\s+(?:that|it)\s+again|what\s+did\s+you\s+say|come\s+again)"),
+    )
+
+    # Intents whose target slot must name a known object; otherwise the command is a question
+    KNOWN_TARGET_INTENTS = ("where_is",)
+
+    def __init__(self, vocabulary=()):
+        """
+        :param vocabulary: Known object names (furniture DB keys, building-model labels).
+        """
+        self.trie = VocabularyTrie(vocabulary)
+        alternatives = "|".join(f"(?P<{name}>{pattern})" for name, pattern in self.GRAMMAR)
+        # Optional politeness around the command, optional trailing punctuation
+        self.pattern = re.compile(
+            r"^\s*(?:(?:hey|ok|okay|please|can you|could you)[\s,]+)*"
+            rf"(?:{alternatives})"
+            r"(?:[\s,]+(?:please|now))*\s*[.!?]*\s*$",
+            re.IGNORECASE,
+        )
+        self.counts = {name: 0 for name, _ in self.GRAMMAR}
+        self.counts["question"] = 0
+        self.parse_time_s = 0.0
+
+    def add_vocabulary(self, phrases):
+        for phrase in phrases:
+            self.trie.add(phrase)
+
+    @staticmethod
+    def _words(phrase):
+        return re.sub(r"[^\w\s]", " ", phrase.lower()).split()
+
+    def known_target(self, phrase):
+        """:return: The longest known vocabulary phrase in a slot phrase, or None."""
+        return self.trie.longest_match(self._words(phrase))
+
+    def canonical_target(self, phrase):
+        """
+        Map a slot phrase to the longest known vocabulary phrase it contains,
+        or to the phrase itself without articles if nothing is known.
+        """
+        known = self.known_target(phrase)
+        if known:
+            return known
+        words = self._words(phrase)
+        while words and words[0] in ARTICLES:
+            words = words[1:]
+        return " ".join(words)
+
+    def parse(self, text):
+        """
+        :return: Intent; 'question' (slots {}) if no command family matches.
+        """
+        start = time.perf_counter()
+        match = self.pattern.match(text)
+        if match is None:
+            intent = Intent("question", {}, text)
+        else:
+            name = match.lastgroup
+            slots = {}
+            target = match.groupdict().get(f"{name}_target")
+            if target is not None:
+                slots["target"] = self.canonical_target(target)
+            if name in self.KNOWN_TARGET_INTENTS and not self.known_target(target):
+                intent = Intent("question", {}, text)
+            else:
+                intent = Intent(name, slots, text)
+        self.counts[intent.name] += 1
+        self.parse_time_s += time.perf_counter() - start
+        return intent
+
+    @property
+    def llm_calls_avoided(self):
+        """Number of parsed commands handled without the LLM."""
+        return sum(n for name, n in self.counts.items() if name != "question")
+
+    def stats(self):
+        parsed = sum(self.counts.values())
+        return {
+            "parsed": parsed,
+            "llm_calls_avoided": self.llm_calls_avoided,
+            "llm_calls": self.counts["question"],
+            "mean_parse_us": (self.parse_time_s / parsed * 1e6) if parsed else 0.0,
+            "counts": dict(self.counts),
+        }
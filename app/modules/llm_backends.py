@@ -0,0 +1,431 @@
+# app/modules/llm_backends.py
+
+import abc
+import http.client
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class LLMBackendError(Exception):
+    """Raised when an LLM backend cannot produce a response (network, timeout, HTTP error)."""
+
+
+class LLMBackend(abc.ABC):
+    """
+    Interface used by LLMIntegration. A backend turns a prompt into text,
+    either all at once (complete) or incrementally (stream). Subclasses
+    implement stream(); backends that can run several prompts in one model
+    call set 'supports_batching' and override complete_batch().
+
+    Each call records {"ttft_s": time to first token, "total_s": total latency,
+    "chunks": n, "chars": n} in the caller's 'stats' dict, if given, and in
+    'last_stats'. A backend shared between threads overwrites 'last_stats',
+    so concurrent callers pass their own dict.
+    """
+
+    name = "base"
+    supports_batching = False
+
+    def __init__(self):
+        self.last_stats = None
+
+    @abc.abstractmethod
+    def stream(self, prompt, system=None, max_tokens=256):
+        """Yield the response text in chunks as they become available."""
+
+    def timed_stream(self, prompt, system=None, max_tokens=256, stats=None):
+        """
+        Wrap stream() and record time-to-first-token and total latency in
+        'stats' (a new dict if None) and last_stats.
+        """
+        start = time.perf_counter()
+        stats = {} if stats is None else stats
+        stats.update({"ttft_s": None, "total_s": None, "chunks": 0, "chars": 0})
+        self.last_stats = stats
+        for chunk in self.stream(prompt, system=system, max_tokens=max_tokens):
+            if not chunk:
+                continue
+            if stats["ttft_s"] is None:
+                stats["ttft_s"] = time.perf_counter() - start
+            stats["chunks"] += 1
+            stats["chars"] += len(chunk)
+            yield chunk
+        stats["total_s"] = time.perf_counter() - start
+        if stats["ttft_s"] is None:
+            stats["ttft_s"] = stats["total_s"]
+
+    def complete(self, prompt, system=None, max_tokens=256, stats=None):
+        """Return the full response text (see timed_stream for latency stats)."""
+        return "".join(self.timed_stream(prompt, system=system, max_tokens=max_tokens, stats=stats))
+
+    def complete_batch(self, prompts, systems=None, max_tokens=256):
+        """
+        Answer several prompts. Backends with 'supports_batching' run them in
+        one model call; this default answers them one after another.
+
+        :return: List of response texts, in the order of 'prompts'.
+        """
+        systems = systems or [None] * len(prompts)
+        return [self.complete(prompt, system=system, max_tokens=max_tokens)
+                for prompt, system in zip(prompts, systems)]
+
+    def close(self):
+        """Release connections or model resources."""
+        pass
+
+
+class MockLLMBackend(LLMBackend):
+    """
+    Placeholder backend used when no real LLM is configured.
+    """
+
+    name = "mock"
+
+    def stream(self, prompt, system=None, max_tokens=256):
+        yield (
+            "I see there are some recognized objects in front of you. "
+            "It looks like a placeholder answer because the LLM is mocked."
+        )
+
+
+class LocalModelBackend(LLMBackend):
+    """
+    Adapter for an in-process model (HuggingFace pipeline, llama.cpp bindings, GPT4All, ...).
+
+    :param generate_fn: Callable (prompt, max_tokens) -> str, or -> iterable of str
+                        chunks for models that support token streaming.
+    :param batch_fn: Optional callable (prompts, max_tokens) -> list of str running
+                     several prompts through the model in one batch.
+    """
+
+    name = "local"
+
+    def __init__(self, generate_fn, max_concurrency=1, batch_fn=None):
+        super().__init__()
+        self.generate_fn = generate_fn
+        self.batch_fn = batch_fn
+        self.supports_batching = batch_fn is not None
+        # Local models are usually not re-entrant; serialize access by default
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def stream(self, prompt, system=None, max_tokens=256):
+        full_prompt = f"{system}\n\n{prompt}" if system else prompt
+        with self._slots:
+            result = self.generate_fn(full_prompt, max_tokens)
+            if isinstance(result, str):
+                yield result
+            else:
+                for chunk in result:
+                    yield chunk
+
+    def complete_batch(self, prompts, systems=None, max_tokens=256):
+        if self.batch_fn is None:
+            return super().complete_batch(prompts, systems, max_tokens)
+        systems = systems or [None] * len(prompts)
+        full_prompts = [f"{system}\n\n{prompt}" if system else prompt
+                        for prompt, system in zip(prompts, systems)]
+        with self._slots:
+            return list(self.batch_fn(full_prompts, max_tokens))
+
+
+class OpenAICompatibleClient(LLMBackend):
+    """
+    Client for OpenAI-compatible chat completion endpoints (OpenAI, vLLM,
+    llama.cpp server, Ollama, LocalStandInLLMServer, ...).
+
+    - Keeps a pool of persistent HTTP/1.1 keep-alive connections, so repeated
+      queries skip TCP/TLS setup.
+    - Limits the number of concurrent requests with a semaphore.
+    - Enforces a connect/read timeout per socket operation and an overall
+      deadline per request.
+    - Streams responses (server-sent events) so time-to-first-token is measured.
+
+    Typical usage:
+      client = OpenAICompatibleClient("http://localhost:8000/v1", model="my-model")
+      text = client.complete("What am I looking at?")
+      print(client.last_stats)
+    """
+
+    name = "openai-compatible"
+
+    def __init__(self, base_url, model, api_key=None, timeout=30.0,
+                 max_concurrency=4, temperature=0.2):
+        """
+        :param base_url: e.g. "https://api.openai.com/v1" or "http://127.0.0.1:8080/v1".
+        :param model: Model name sent with each request.
+        :param api_key: Optional bearer token.
+        :param timeout: Seconds allowed per socket operation and per whole request.
+        :param max_concurrency: Maximum number of in-flight requests (and pooled connections).
+        :param temperature: Sampling temperature.
+        """
+        super().__init__()
+        parsed = urlparse(base_url)
+        self.scheme = parsed.scheme or "http"
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = parsed.path.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pool = queue.LifoQueue()
+        self.connections_opened = 0
+
+    # ------------------------------------------------------------------
+    # Connection pool
+    # ------------------------------------------------------------------
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        self.connections_opened += 1
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _acquire_connection(self):
+        """
+        :return: (connection, pooled) where pooled tells whether it was reused.
+        """
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release_connection(self, conn, reusable):
+        if reusable:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def _build_body(self, prompt, system, max_tokens, stream):
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        return json.dumps({
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": self.temperature,
+            "stream": stream,
+        })
+
+    def _headers(self):
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def stream(self, prompt, system=None, max_tokens=256):
+        body = self._build_body(prompt, system, max_tokens, stream=True)
+        deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(timeout=self.timeout):
+            raise LLMBackendError("Timed out waiting for a free LLM request slot.")
+        conn = None
+        reusable = False
+        try:
+            conn, pooled = self._acquire_connection()
+            try:
+                conn.request("POST", self.path, body=body, headers=self._headers())
+                response = conn.getresponse()
+            except (ConnectionError, http.client.RemoteDisconnected):
+                # A pooled keep-alive connection may have been closed by the server; retry once
+                conn.close()
+                if not pooled:
+                    raise
+                conn = self._new_connection()
+                conn.request("POST", self.path, body=body, headers=self._headers())
+                response = conn.getresponse()
+
+            if response.status != 200:
+                detail = response.read()[:200]
+                raise LLMBackendError(f"LLM endpoint returned HTTP {response.status}: {detail!r}")
+
+            content_type = response.getheader("Content-Type", "")
+            if "text/event-stream" in content_type:
+                for chunk in self._iter_sse(response, deadline):
+                    yield chunk
+            else:
+                payload = json.loads(response.read())
+                yield payload["choices"][0]["message"]["content"]
+            reusable = not response.will_close
+        except (OSError, http.client.HTTPException, ValueError, KeyError) as exc:
+            raise LLMBackendError(f"LLM request failed: {exc}") from exc
+        finally:
+            if conn is not None:
+                self._release_connection(conn, reusable)
+            self._slots.release()
+
+    @staticmethod
+    def _iter_sse(response, deadline):
+        """
+        Parse 'data: {...}' server-sent events and yield delta contents.
+        """
+        while True:
+            if time.monotonic() > deadline:
+                raise LLMBackendError("LLM response exceeded the request timeout.")
+            line = response.readline()
+            if not line:
+                return
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                # Drain the terminating chunk so the connection can be reused
+                response.read()
+                return
+            event = json.loads(data)
+            choices = event.get("choices") or [{}]
+            delta = choices[0].get("delta") or {}
+            content = delta.get("content")
+            if content:
+                yield content
+
+
+def default_stand_in_responder(messages):
+    """
+    Deterministic answer for the stand-in server: lists the object names found
+    in 'Object: <name>, ...' lines of the prompt.
+    """
+    prompt = messages[-1]["content"] if messages else ""
+    names = []
+    for line in prompt.splitlines():
+        line = line.strip()
+        if line.startswith("Object:"):
+            names.append(line[len("Object:"):].split(",")[0].strip())
+    if names:
+        return f"I can see {len(names)} object(s): {', '.join(names)}. The nearest one is the {names[0]}."
+    return "I do not see any recognized objects right now."
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        # Keep test output quiet
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.stats_lock:
+            self.server.requests += 1
+        text = self.server.responder(request.get("messages", []))
+        if self.server.first_token_delay:
+            time.sleep(self.server.first_token_delay)
+
+        if not request.get("stream"):
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": text}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = text.split(" ")
+        try:
+            for i, word in enumerate(words):
+                token = word if i == 0 else " " + word
+                event = json.dumps({"choices": [{"delta": {"content": token}}]})
+                self._write_chunk(f"data: {event}\n\n".encode())
+                if self.server.token_delay:
+                    time.sleep(self.server.token_delay)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up (e.g., timeout); nothing left to do
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class LocalStandInLLMServer:
+    """
+    A tiny OpenAI-compatible chat completion server for offline tests and demos.
+
+    It answers deterministically (see default_stand_in_responder), streams
+    word by word with configurable delays, supports HTTP keep-alive and counts
+    requests and TCP connections so connection reuse can be verified.
+
+    Typical usage:
+      with LocalStandInLLMServer(token_delay=0.01) as server:
+          client = OpenAICompatibleClient(server.base_url, model="stand-in")
+          client.complete("...")
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, responder=None,
+                 first_token_delay=0.0, token_delay=0.0):
+        """
+        :param port: TCP port (0 picks a free one).
+        :param responder: Callable(messages) -> str producing the answer.
+        :param first_token_delay: Seconds to wait before the first token.
+        :param token_delay: Seconds between streamed tokens.
+        """
+        self.httpd = ThreadingHTTPServer((host, port), _StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.responder = responder or default_stand_in_responder
+        self.httpd.first_token_delay = first_token_delay
+        self.httpd.token_delay = token_delay
+        self.httpd.requests = 0
+        self.httpd.connections = 0
+        self.httpd.stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"[LocalStandInLLMServer] Listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
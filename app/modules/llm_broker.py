@@ -0,0 +1,330 @@
+# app/modules/llm_broker.py
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .llm_backends import LLMBackendError
+from .llm_integration import split_sentences
+
+
+PRIORITY_SAFETY = 0       # e.g. "stairs ahead", obstacle warnings
+PRIORITY_NAVIGATION = 1   # route questions
+PRIORITY_DESCRIPTION = 2  # "what is around me", open-ended questions
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a user submits requests faster than their rate limit allows."""
+
+
+class BrokerClosed(Exception):
+    """Raised to callers whose request was still queued when the broker was closed."""
+
+
+class TokenBucket:
+    """
+    Per-user rate limiter: 'rate' requests per second on average, bursts up to 'burst'.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = None
+
+    def allow(self, now):
+        if self.last is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class BrokeredLLM:
+    """
+    One user's view of an LLMRequestBroker, standing in for the LLMIntegration
+    of a UserInteraction (asynchronous answers only), so every session's
+    open-ended questions share the broker's deduplication, batching and rate
+    limits. Rejected requests are answered with a short spoken message.
+
+    Typical usage:
+      ui = UserInteraction(..., BrokeredLLM(broker, "user-1"), ...)
+      AsyncUserInteraction(ui).submit_command("Is the hallway clear?")
+    """
+
+    RATE_LIMITED_ANSWER = "You are asking faster than I can answer. Please wait a moment."
+    CLOSED_ANSWER = "Sorry, I cannot answer questions right now."
+
+    def __init__(self, broker, user_id, priority=PRIORITY_DESCRIPTION):
+        self.broker = broker
+        self.user_id = user_id
+        self.priority = priority
+
+    async def stream_sentences_async(self, user_query, recognized_objects, building_model,
+                                     user_position=None, executor=None):
+        """
+        Like LLMIntegration.stream_sentences_async; the answer arrives whole
+        from the broker and is then split into sentences. 'executor' is unused
+        (the broker runs its own backend threads).
+        """
+        try:
+            answer = await self.broker.submit(self.user_id, user_query, recognized_objects, building_model,
+                                              priority=self.priority, user_position=user_position)
+        except RateLimitExceeded:
+            answer = self.RATE_LIMITED_ANSWER
+        except BrokerClosed:
+            answer = self.CLOSED_ANSWER
+        for sentence in split_sentences([answer]):
+            yield sentence
+
+
+class _Request:
+    __slots__ = ("key", "system", "prompt", "future", "enqueued", "priority",
+                 "user_query", "recognized_objects", "location")
+
+    def __init__(self, key, system, prompt, future, enqueued, priority, user_query, recognized_objects,
+                 location=None):
+        self.key = key
+        self.system = system
+        self.prompt = prompt
+        self.future = future
+        self.enqueued = enqueued
+        self.priority = priority
+        self.user_query = user_query
+        self.recognized_objects = recognized_objects
+        self.location = location
+
+
+class LLMRequestBroker:
+    """
+    Async front end that lets many glasses users share one LLMIntegration.
+
+    - Single-flight: concurrent requests with an identical prompt share one
+      backend call.
+    - Priority: requests wait in a priority queue, so safety and navigation
+      messages are dispatched ahead of descriptions.
+    - Per-user token-bucket rate limits (safety messages are exempt).
+    - Coalescing: when the backend supports batching, requests arriving
+      within 'batch_window_s' are sent as one batched call.
+    - Queueing delay (enqueue -> dispatch) is recorded per priority.
+
+    Typical usage (inside an asyncio loop):
+      broker = LLMRequestBroker(llm_integration)
+      answer = await broker.submit("user-1", "Is the hallway clear?", recognized_objects)
+      print(broker.metrics())
+      await broker.close()
+    """
+
+    def __init__(self, llm_integration, max_batch=8, batch_window_s=0.01, max_parallel=4,
+                 user_rate=1.0, user_burst=3, rate_limit_exempt_priority=PRIORITY_SAFETY,
+                 metrics_window=1000):
+        """
+        :param llm_integration: LLMIntegration providing prompt construction, cache and backend.
+        :param max_batch: Maximum number of requests coalesced into one batched call.
+        :param batch_window_s: Time to wait for more requests once one is dequeued (batching backends only).
+        :param max_parallel: Maximum number of backend calls in flight.
+        :param user_rate: Requests per second allowed per user (long-term average).
+        :param user_burst: Requests a user may issue back to back.
+        :param rate_limit_exempt_priority: Requests at or above this priority (numerically <=) skip rate limiting.
+        :param metrics_window: Number of recent queueing delays kept.
+        """
+        self.integration = llm_integration
+        self.llm = llm_integration.llm
+        self.max_batch = max_batch
+        self.batch_window_s = batch_window_s
+        self.max_parallel = max_parallel
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.rate_limit_exempt_priority = rate_limit_exempt_priority
+
+        self.buckets = {}
+        self.in_flight = {}
+        self._seq = itertools.count()
+        self._queue = None
+        self._slots = None
+        self._dispatcher = None
+        self._pending = []  # requests taken from the queue but not yet dispatched
+        self._tasks = set()
+        self._executor = None
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rate_limited = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.queue_delays = deque(maxlen=metrics_window)  # (priority, seconds)
+
+    def _ensure_started(self):
+        if self._dispatcher is None:
+            self._queue = asyncio.PriorityQueue()
+            self._slots = asyncio.Semaphore(self.max_parallel)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_parallel)
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def submit(self, user_id, user_query, recognized_objects, building_model=None,
+                     priority=PRIORITY_DESCRIPTION, user_position=None):
+        """
+        Queue an environment query and wait for its answer.
+
+        :raises RateLimitExceeded: If the user exceeded their rate limit.
+        :return: The answer text.
+        """
+        self._ensure_started()
+        now = time.monotonic()
+        self.submitted += 1
+
+        if priority > self.rate_limit_exempt_priority:
+            bucket = self.buckets.get(user_id)
+            if bucket is None:
+                bucket = self.buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+            if not bucket.allow(now):
+                self.rate_limited += 1
+                raise RateLimitExceeded(f"User '{user_id}' exceeded {self.user_rate} request(s)/s")
+
+        location = self.integration.cache_location(user_position, building_model)
+        cached = self.integration._cached(user_query, recognized_objects, location)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        system, prompt = self.integration.prepare_prompt(user_query, recognized_objects,
+                                                         building_model, user_position)
+        key = (system, prompt)
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        request = _Request(key, system, prompt, future, now, priority, user_query, recognized_objects,
+                           location)
+        self._queue.put_nowait((priority, next(self._seq), request))
+        return await asyncio.shield(future)
+
+    async def _dispatch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Take a slot first so that waiting requests stay in priority order
+            await self._slots.acquire()
+            batch = self._pending = [(await self._queue.get())[2]]
+            if self.llm.supports_batching:
+                deadline = loop.time() + self.batch_window_s
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append((await asyncio.wait_for(self._queue.get(), timeout))[2])
+                    except asyncio.TimeoutError:
+                        break
+            self._pending = []
+            task = loop.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _call_backend(self, batch):
+        if len(batch) == 1:
+            request = batch[0]
+            return [self.llm.complete(request.prompt, system=request.system,
+                                      max_tokens=self.integration.max_tokens)]
+        return self.llm.complete_batch([r.prompt for r in batch], [r.system for r in batch],
+                                       max_tokens=self.integration.max_tokens)
+
+    async def _run_batch(self, batch):
+        dispatched = time.monotonic()
+        for request in batch:
+            self.queue_delays.append((request.priority, dispatched - request.enqueued))
+        self.batches += 1
+        self.batched_requests += len(batch)
+        try:
+            responses = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._call_backend, batch)
+        except LLMBackendError as exc:
+            self.integration.failures += len(batch)
+            print(f"[LLMRequestBroker] LLM call failed: {exc}")
+            responses = ["Sorry, I could not reach the language model right now."] * len(batch)
+            failed = True
+        except Exception as exc:
+            # Unexpected backend bug: propagate to every waiting caller
+            self._fail(batch, exc)
+            return
+        else:
+            failed = False
+        finally:
+            self._slots.release()
+
+        if len(responses) < len(batch):
+            # A backend answering fewer prompts than it was given must not leave callers waiting
+            self.integration.failures += len(batch) - len(responses)
+            self._fail(batch[len(responses):], LLMBackendError(
+                f"Backend returned {len(responses)} response(s) for {len(batch)} prompt(s)"))
+
+        cache = self.integration.cache
+        for request, response in zip(batch, responses):
+            response = response.strip()
+            if cache is not None and not failed:
+                cache.put(request.user_query, request.recognized_objects, response, location=request.location)
+            self.in_flight.pop(request.key, None)
+            if not request.future.done():
+                request.future.set_result(response)
+
+    def _fail(self, requests, exc):
+        for request in requests:
+            self.in_flight.pop(request.key, None)
+            if not request.future.done():
+                request.future.set_exception(exc)
+
+    def metrics(self):
+        """
+        :return: Dict with counters and queueing delay (ms) overall and per priority.
+        """
+        def summarize(delays):
+            if not delays:
+                return {"count": 0, "mean_ms": 0.0, "p95_ms": 0.0}
+            ordered = sorted(delays)
+            return {
+                "count": len(ordered),
+                "mean_ms": 1000.0 * sum(ordered) / len(ordered),
+                "p95_ms": 1000.0 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+            }
+
+        by_priority = {}
+        for priority, delay in self.queue_delays:
+            by_priority.setdefault(priority, []).append(delay)
+        return {
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "rate_limited": self.rate_limited,
+            "cache_hits": self.cache_hits,
+            "backend_calls": self.batches,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "queue_delay": summarize([d for _, d in self.queue_delays]),
+            "queue_delay_by_priority": {p: summarize(d) for p, d in sorted(by_priority.items())},
+        }
+
+    async def close(self):
+        """
+        Stop the dispatcher and wait for in-flight backend calls. Requests not
+        dispatched yet fail with BrokerClosed.
+        """
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        undispatched, self._pending = self._pending, []
+        while not self._queue.empty():
+            undispatched.append(self._queue.get_nowait()[2])
+        self._fail(undispatched, BrokerClosed("LLM request broker closed"))
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self._dispatcher = None
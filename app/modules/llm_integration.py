@@ -1,5 +1,50 @@
 # app/modules/llm_integration.py
 
+import asyncio
+import functools
+import threading
+import time
+from collections import deque
+
+from .instrumentation import get_logger, telemetry
+from .llm_backends import LLMBackend, LLMBackendError, LocalModelBackend, MockLLMBackend
+from .prompt_context import PromptContextBuilder
+from .response_cache import ResponseCache, location_key
+
+
+SENTENCE_ENDINGS = ".!?"
+
+
+def split_sentences(chunks, min_chars=8):
+    """
+    Regroup streamed text chunks into sentences as soon as each one is complete.
+
+    A sentence ends at '.', '!' or '?' followed by whitespace (so "1.5 m" is not
+    split). Fragments shorter than 'min_chars' (e.g. "Dr.") are merged into the
+    next sentence. Whatever remains when the stream ends is yielded last.
+
+    :param chunks: Iterable of text chunks (e.g., LLM tokens).
+    :return: Generator of stripped sentences.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        i = 0
+        # Only a terminator followed by whitespace is a boundary; the last char may still continue
+        while i < len(buffer) - 1:
+            if buffer[i] in SENTENCE_ENDINGS and buffer[i + 1].isspace():
+                sentence = buffer[start:i + 1].strip()
+                if len(sentence) >= min_chars:
+                    yield sentence
+                    start = i + 1
+            i += 1
+        buffer = buffer[start:]
+    tail = buffer.strip()
+    if tail:
+        yield tail
+
+
 class LLMIntegration:
     """
     Handles queries to a large language model (LLM) regarding the environment.
@@ -7,38 +52,53 @@ class LLMIntegration:
       "What am I looking at?"
     the system can compile relevant context (e.g., recognized objects, building
     layout) into a textual prompt for the LLM, then parse or return the LLM's response.
+
+    The actual model is reached through an LLMBackend (see llm_backends.py):
+    an OpenAI-compatible HTTP client, a local model adapter, or the mock.
+    Time-to-first-token and total latency of each query are kept in 'query_stats'.
+
+    An optional ResponseCache answers repeated questions about a (nearly)
+    unchanged scene without invoking the LLM.
+
+    When a building model is available, prompts are assembled by a
+    PromptContextBuilder (top-K relevant objects, current room, token budget,
+    stable system prefix first); otherwise build_prompt lists every object.
     """
 
-    def __init__(self, llm_instance):
+    SYSTEM_PROMPT = (
+        "You are a navigation assistant for a blind or low-vision user. "
+        "Answer briefly and concretely, using the recognized objects and building layout."
+    )
+
+    def __init__(self, llm_instance, max_tokens=256, stats_window=100, cache=None,
+                 context_builder=None):
         """
         :param llm_instance: A handle or client to a loaded LLM. Could be:
-          - A local model object (e.g., a GPT-2 or GPT-Neo instance).
-          - A remote API client (e.g., OpenAI, Hugging Face Inference API).
-          - A placeholder or mock string for testing.
+          - An LLMBackend (e.g., OpenAICompatibleClient, LocalModelBackend).
+          - A callable (prompt, max_tokens) -> str, wrapped as a local model.
+          - A placeholder or mock string for testing (uses MockLLMBackend).
+        :param max_tokens: Maximum number of tokens to request per answer.
+        :param stats_window: Number of recent queries kept in 'query_stats'.
+        :param cache: Optional ResponseCache (True creates one with default settings).
+        :param context_builder: Optional PromptContextBuilder; created from the
+                                building_model of the first query if omitted.
         """
-        self.llm = llm_instance  # In real code, store an API key or loaded model.
+        if isinstance(llm_instance, LLMBackend):
+            self.llm = llm_instance
+        elif callable(llm_instance):
+            self.llm = LocalModelBackend(llm_instance)
+        else:
+            self.llm = MockLLMBackend()
+        self.max_tokens = max_tokens
+        self.query_stats = deque(maxlen=stats_window)
+        self.failures = 0
+        self.log = get_logger("LLMIntegration")
+        self.cache = ResponseCache() if cache is True else cache
+        self.context_builder = context_builder
 
-    def query_environment(self, user_query, recognized_objects, building_model):
+    def build_prompt(self, user_query, recognized_objects, building_model=None):
         """
-        Formulate a structured prompt about the recognized objects and building
-        context, then call the LLM to generate an answer.
-        
-        :param user_query: A string containing the user's question (e.g. "What am I looking at?")
-        :param recognized_objects: A list of dictionaries describing each recognized object:
-            Example:
-              [
-                {
-                  "name": "chair",
-                  "type": "furniture",
-                  "position": (x, y, z),
-                  "confidence": 0.94
-                },
-                ...
-              ]
-        :param building_model: The 3D building data structure loaded by ingestion (useful if you want
-                               to reference walls, rooms, or other architectural info).
-        
-        :return: A string containing the LLM's textual response.
+        Construct the textual prompt combining the user query and recognized object data.
         """
         # 1. Construct a simple textual summary of recognized objects
         if recognized_objects:
@@ -55,28 +115,237 @@ class LLMIntegration:
             recognized_summary = "No objects recognized at the moment."
 
         # 2. Build a prompt combining user_query + recognized object data
-        prompt = (
+        return (
             f"User Query: {user_query}\n"
             f"Environment Data:\n"
             f"{recognized_summary}\n\n"
             "Please answer the user query based on the recognized objects and building layout.\n"
         )
 
-        # 3. Send prompt to the LLM
-        # Here, we have a simple stub that returns a dummy response.
-        # In production, you might do something like:
-        # response_text = self.llm.generate(prompt)
-        # or:
-        # response_text = openai.Completion.create(
-        #     model="text-davinci-003", prompt=prompt, max_tokens=100
-        # ).choices[0].text.strip()
-        
-        print("[LLMIntegration] Prompt constructed for LLM:\n", prompt)
-        
-        # For demonstration, return a mock response:
-        response_text = (
-            "I see there are some recognized objects in front of you. "
-            "It looks like a placeholder answer because the LLM is mocked."
-        )
-        
+    def prepare_prompt(self, user_query, recognized_objects, building_model=None, user_position=None):
+        """
+        :return: (system, prompt) for the backend.
+        """
+        builder = self._get_context_builder(building_model)
+        if builder is not None:
+            return builder.build(user_query, recognized_objects, user_position)
+        return self.SYSTEM_PROMPT, self.build_prompt(user_query, recognized_objects, building_model)
+
+    def _get_context_builder(self, building_model):
+        if self.context_builder is None and building_model:
+            self.context_builder = PromptContextBuilder(building_model, system_prompt=self.SYSTEM_PROMPT)
+        return self.context_builder
+
+    def cache_location(self, user_position, building_model=None):
+        """
+        Location part of the response-cache key. Context-builder prompts
+        summarize the user's room and nearby distances, so their answers are
+        only reused at (about) the same place; None for position-free prompts.
+        """
+        builder = self._get_context_builder(building_model)
+        if self.cache is None or builder is None or user_position is None:
+            return None
+        room = builder.current_room(user_position)
+        name = None if room is None else room.get("label") or room.get("name")
+        return location_key(user_position, name, self.cache.quantum)
+
+    def query_environment(self, user_query, recognized_objects, building_model, stream=False,
+                          user_position=None):
+        """
+        Formulate a structured prompt about the recognized objects and building
+        context, then call the LLM to generate an answer.
+
+        :param user_query: A string containing the user's question (e.g. "What am I looking at?")
+        :param recognized_objects: A list of dictionaries describing each recognized object:
+            Example:
+              [
+                {
+                  "name": "chair",
+                  "type": "furniture",
+                  "position": (x, y, z),
+                  "confidence": 0.94
+                },
+                ...
+              ]
+        :param building_model: The 3D building data structure loaded by ingestion (useful if you want
+                               to reference walls, rooms, or other architectural info).
+        :param stream: If True, return a generator of text chunks instead (see stream_environment).
+        :param user_position: Optional (x, y, z) of the user, used to summarize the current room.
+
+        :return: A string containing the LLM's textual response.
+        """
+        if stream:
+            return self.stream_environment(user_query, recognized_objects, building_model, user_position)
+
+        location = self.cache_location(user_position, building_model)
+        cached = self._cached(user_query, recognized_objects, location)
+        if cached is not None:
+            return cached
+
+        system, prompt = self.prepare_prompt(user_query, recognized_objects, building_model, user_position)
+        self.log.debug("Prompt constructed for LLM:\n%s", prompt, key="prompt")
+
+        stats = {}
+        try:
+            response_text = self.llm.complete(prompt, system=system,
+                                              max_tokens=self.max_tokens, stats=stats)
+        except LLMBackendError as exc:
+            self.failures += 1
+            telemetry.counter("llm_failures").inc()
+            self.log.warning("LLM query failed: %s", exc)
+            return "Sorry, I could not reach the language model right now."
+
+        self._record_stats(stats)
+        response_text = response_text.strip()
+        if self.cache is not None:
+            self.cache.put(user_query, recognized_objects, response_text, location=location)
         return response_text
+
+    def stream_environment(self, user_query, recognized_objects, building_model, user_position=None):
+        """
+        Like query_environment, but yield the answer in chunks as the LLM produces them.
+        On a backend failure the fallback message is yielded instead.
+        """
+        return self._stream_environment(user_query, recognized_objects, building_model, user_position, {})
+
+    def _stream_environment(self, user_query, recognized_objects, building_model, user_position, stats):
+        """stream_environment, recording this query's latency in 'stats' (left empty on a cache hit)."""
+        location = self.cache_location(user_position, building_model)
+        cached = self._cached(user_query, recognized_objects, location)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        system, prompt = self.prepare_prompt(user_query, recognized_objects, building_model, user_position)
+        self.log.debug("Prompt constructed for LLM (streaming):\n%s", prompt, key="prompt")
+
+        try:
+            for chunk in self.llm.timed_stream(prompt, system=system,
+                                               max_tokens=self.max_tokens, stats=stats):
+                chunks.append(chunk)
+                yield chunk
+        except LLMBackendError as exc:
+            self.failures += 1
+            telemetry.counter("llm_failures").inc()
+            self.log.warning("LLM query failed: %s", exc)
+            yield "Sorry, I could not reach the language model right now."
+            return
+
+        self._record_stats(stats)
+        if self.cache is not None:
+            self.cache.put(user_query, recognized_objects, "".join(chunks).strip(), location=location)
+
+    def stream_sentences(self, user_query, recognized_objects, building_model, user_position=None):
+        """
+        Yield the answer sentence by sentence, as soon as each one is complete,
+        so it can be handed to text-to-speech while the LLM is still generating.
+        Time to the first sentence is recorded as 'ttfs_s' in query_stats.
+        """
+        start = time.perf_counter()
+        first = True
+        stats = {}
+        chunks = self._stream_environment(user_query, recognized_objects, building_model, user_position, stats)
+        for sentence in split_sentences(chunks):
+            if first:
+                first = False
+                if stats:
+                    stats["ttfs_s"] = time.perf_counter() - start
+            yield sentence
+
+    async def query_environment_async(self, user_query, recognized_objects, building_model,
+                                      user_position=None, executor=None):
+        """
+        Awaitable query_environment: the blocking backend call runs in
+        'executor' (the loop's default executor if None).
+        """
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(
+            self.query_environment, user_query, recognized_objects, building_model,
+            user_position=user_position))
+
+    async def stream_sentences_async(self, user_query, recognized_objects, building_model,
+                                     user_position=None, executor=None):
+        """
+        Async generator variant of stream_sentences. The blocking stream is
+        consumed on a worker thread and each sentence is yielded on the event
+        loop as soon as it is complete.
+
+        Closing the generator (e.g. because the awaiting task was cancelled)
+        makes the worker stop after the current sentence and close the
+        backend stream.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        closed = threading.Event()
+        end = object()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # event loop already closed
+
+        def produce():
+            sentences = self.stream_sentences(user_query, recognized_objects, building_model, user_position)
+            try:
+                for sentence in sentences:
+                    if closed.is_set():
+                        break
+                    put(sentence)
+            except Exception as exc:
+                put(exc)
+            finally:
+                sentences.close()
+                put(end)
+
+        loop.run_in_executor(executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is end:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            closed.set()
+
+    def _cached(self, user_query, recognized_objects, location=None):
+        """Return a cached answer for this query, scene and location (see cache_location), or None."""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(user_query, recognized_objects, location=location)
+        if cached is not None:
+            telemetry.counter("llm_cache_hits").inc()
+            self.log.info("Answer served from cache (hit rate %.0f%%).", 100.0 * self.cache.hit_rate())
+        return cached
+
+    def _record_stats(self, stats):
+        if not stats:
+            return
+        # Stored by reference so stream_sentences can still add 'ttfs_s'
+        self.query_stats.append(stats)
+        telemetry.record("llm", stats["total_s"])
+        telemetry.histogram("llm_ttft_seconds").observe(stats["ttft_s"])
+        self.log.info("%s answered: ttft %.0f ms, total %.0f ms",
+                      self.llm.name, stats["ttft_s"] * 1000.0, stats["total_s"] * 1000.0)
+
+    def latency_summary(self):
+        """
+        :return: Dict with mean/max time-to-first-token and total latency (seconds)
+                 over the recent queries, or None if there were none.
+        """
+        if not self.query_stats:
+            return None
+        ttft = [s["ttft_s"] for s in self.query_stats]
+        total = [s["total_s"] for s in self.query_stats]
+        return {
+            "queries": len(self.query_stats),
+            "mean_ttft_s": sum(ttft) / len(ttft),
+            "max_ttft_s": max(ttft),
+            "mean_total_s": sum(total) / len(total),
+            "max_total_s": max(total),
+            "mean_ttfs_s": (sum(s["ttfs_s"] for s in self.query_stats if "ttfs_s" in s)
+                            / max(1, sum(1 for s in self.query_stats if "ttfs_s" in s))),
+            "failures": self.failures,
+        }
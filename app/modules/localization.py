@@ -0,0 +1,215 @@
+# app/modules/localization.py
+
+import math
+
+import numpy as np
+
+from .detections import name_type_position
+from .spatial_index import SpatialHashIndex
+
+
+class ParticleFilterLocalizer:
+    """
+    Estimates the user's (or a robot's) pose (x, y, yaw) in the building by
+    matching recognized objects against the known objects of the building model.
+
+    Each recognized object gives a label plus a camera-frame position
+    (as produced by ObjectRecognition.map_2D_to_3D: x to the right, z forward),
+    i.e. a range and bearing to some landmark with that label. Particles whose
+    predicted range/bearing to a same-label landmark agree get more weight.
+
+    All particle state lives in preallocated NumPy arrays and every step
+    (predict, weight, resample) is vectorized over particles and candidate
+    landmarks. Candidate landmarks are fetched from a SpatialHashIndex around
+    the particle cloud, so the cost does not grow with the size of the building.
+
+    Typical usage:
+      localizer = ParticleFilterLocalizer(building_model, n_particles=2000)
+      localizer.predict(dt)
+      localizer.update_from_recognized(recognized_objects)
+      x, y, yaw = localizer.estimate()
+    """
+
+    def __init__(self, building_model, n_particles=2000, range_sigma=0.5,
+                 bearing_sigma=0.2, motion_sigma=0.3, yaw_sigma=0.2,
+                 max_range=8.0, seed=0, initial_pose=None, initial_spread=1.0):
+        """
+        :param building_model: Data structure from ingestion.py (objects need a centroid).
+        :param n_particles: Number of particles.
+        :param range_sigma: Std. dev. (m) of range measurements.
+        :param bearing_sigma: Std. dev. (rad) of bearing measurements.
+        :param motion_sigma: Position diffusion (m per sqrt(second)) when no odometry is given.
+        :param yaw_sigma: Yaw diffusion (rad per sqrt(second)).
+        :param max_range: Landmarks beyond this distance are not considered.
+        :param seed: Seed for the random generator (deterministic runs).
+        :param initial_pose: Optional (x, y, yaw) prior; otherwise uniform over the landmarks' extent.
+        :param initial_spread: Std. dev. (m) around initial_pose.
+        """
+        self.n = int(n_particles)
+        self.range_sigma = range_sigma
+        self.bearing_sigma = bearing_sigma
+        self.motion_sigma = motion_sigma
+        self.yaw_sigma = yaw_sigma
+        self.max_range = max_range
+        self.rng = np.random.default_rng(seed)
+
+        self.index = SpatialHashIndex.from_building_model(building_model, cell_size=max_range / 2.0)
+
+        # Particle state (preallocated)
+        self.x = np.zeros(self.n)
+        self.y = np.zeros(self.n)
+        self.yaw = np.zeros(self.n)
+        self.log_w = np.zeros(self.n)
+        self._scratch = np.empty(self.n)
+
+        self.updates = 0
+        self.resamples = 0
+        self.reset(initial_pose, initial_spread)
+
+    def reset(self, pose=None, spread=1.0):
+        """
+        Re-initialize particles around 'pose', or uniformly over the extent of
+        the known landmarks (global localization) if pose is None.
+        """
+        if pose is not None:
+            self.x[:] = pose[0] + self.rng.normal(0.0, spread, self.n)
+            self.y[:] = pose[1] + self.rng.normal(0.0, spread, self.n)
+            self.yaw[:] = pose[2] + self.rng.normal(0.0, 0.3, self.n)
+        else:
+            positions = np.array([p for p, _, _ in self.index.items.values()] or [(0.0, 0.0, 0.0)],
+                                 dtype=np.float64)
+            lo = positions[:, :2].min(axis=0) - self.max_range / 2.0
+            hi = positions[:, :2].max(axis=0) + self.max_range / 2.0
+            self.x[:] = self.rng.uniform(lo[0], hi[0], self.n)
+            self.y[:] = self.rng.uniform(lo[1], hi[1], self.n)
+            self.yaw[:] = self.rng.uniform(-math.pi, math.pi, self.n)
+        self.log_w.fill(-math.log(self.n))
+
+    # ------------------------------------------------------------------
+    # Filter steps
+    # ------------------------------------------------------------------
+
+    def predict(self, dt, odometry=None):
+        """
+        Propagate particles by 'dt' seconds.
+
+        :param odometry: Optional (forward, left, dyaw) motion in the body frame
+                         since the last call (e.g., from a robot or VIO); without it
+                         particles only diffuse.
+        """
+        scale = math.sqrt(max(dt, 0.0))
+        if odometry is not None:
+            forward, left, dyaw = odometry
+            cos_y = np.cos(self.yaw)
+            sin_y = np.sin(self.yaw)
+            self.x += forward * cos_y - left * sin_y
+            self.y += forward * sin_y + left * cos_y
+            self.yaw += dyaw
+        self.x += self.rng.normal(0.0, self.motion_sigma * scale, self.n)
+        self.y += self.rng.normal(0.0, self.motion_sigma * scale, self.n)
+        self.yaw += self.rng.normal(0.0, self.yaw_sigma * scale, self.n)
+        np.arctan2(np.sin(self.yaw), np.cos(self.yaw), out=self.yaw)
+
+    def _candidate_landmarks(self, label):
+        """
+        Fetch same-label landmarks near the particle cloud from the spatial index.
+        :return: (M, 2) array, possibly empty.
+        """
+        cx = float(self.x.mean())
+        cy = float(self.y.mean())
+        spread = float(max(self.x.std(), self.y.std()))
+        hits = self.index.query_radius((cx, cy), self.max_range + 2.0 * spread, label=label)
+        if not hits:
+            return np.zeros((0, 2))
+        return np.array([pos[:2] for _, _, pos, _ in hits], dtype=np.float64)
+
+    def update(self, observations):
+        """
+        Weight particles by a batch of observations.
+
+        :param observations: Iterable of (label, (lateral, vertical, forward)) in the camera frame.
+        :return: Number of observations that matched at least one known landmark.
+        """
+        used = 0
+        log_w = self.log_w
+        for label, position in observations:
+            landmarks = self._candidate_landmarks(label)
+            if landmarks.shape[0] == 0:
+                continue
+            lateral, _, forward = position
+            obs_range = math.hypot(lateral, forward)
+            obs_bearing = math.atan2(-lateral, forward)  # left of the view axis is positive
+
+            # (N, M) predicted range/bearing from every particle to every candidate
+            dx = landmarks[None, :, 0] - self.x[:, None]
+            dy = landmarks[None, :, 1] - self.y[:, None]
+            pred_range = np.hypot(dx, dy)
+            pred_bearing = np.arctan2(dy, dx) - self.yaw[:, None]
+            bearing_err = np.arctan2(np.sin(pred_bearing - obs_bearing), np.cos(pred_bearing - obs_bearing))
+            ll = -0.5 * (((pred_range - obs_range) / self.range_sigma) ** 2
+                         + (bearing_err / self.bearing_sigma) ** 2)
+            # Data association: each particle explains the observation with its best landmark
+            log_w += ll.max(axis=1)
+            used += 1
+
+        if used:
+            log_w -= log_w.max()
+            np.exp(log_w, out=self._scratch)
+            log_w -= math.log(self._scratch.sum())
+            self.updates += 1
+            if self.effective_sample_size() < self.n / 2.0:
+                self.resample()
+        return used
+
+    def update_from_recognized(self, recognized_objects):
+        """
+        Convenience wrapper taking ObjectRecognition outputs (a RecognizedBatch
+        or associate_detection dicts).
+        """
+        return self.update((name, position) for name, _, position in name_type_position(recognized_objects))
+
+    def effective_sample_size(self):
+        np.exp(self.log_w, out=self._scratch)
+        return 1.0 / float(np.dot(self._scratch, self._scratch))
+
+    def resample(self):
+        """
+        Systematic (low-variance) resampling, vectorized with searchsorted.
+        """
+        np.exp(self.log_w, out=self._scratch)
+        cumulative = np.cumsum(self._scratch)
+        cumulative[-1] = 1.0
+        positions = (self.rng.random() + np.arange(self.n)) / self.n
+        idx = np.searchsorted(cumulative, positions)
+        self.x[:] = self.x[idx]
+        self.y[:] = self.y[idx]
+        self.yaw[:] = self.yaw[idx]
+        self.log_w.fill(-math.log(self.n))
+        self.resamples += 1
+
+    # ------------------------------------------------------------------
+    # Estimates
+    # ------------------------------------------------------------------
+
+    def estimate(self):
+        """
+        :return: Weighted mean pose (x, y, yaw) with a circular mean for yaw.
+        """
+        w = np.exp(self.log_w)
+        x = float(np.dot(w, self.x))
+        y = float(np.dot(w, self.y))
+        yaw = math.atan2(float(np.dot(w, np.sin(self.yaw))), float(np.dot(w, np.cos(self.yaw))))
+        return (x, y, yaw)
+
+    def position_std(self):
+        """
+        :return: Weighted standard deviation (m) of the particle positions.
+        """
+        w = np.exp(self.log_w)
+        x, y, _ = self.estimate()
+        var = float(np.dot(w, (self.x - x) ** 2 + (self.y - y) ** 2))
+        return math.sqrt(var)
+
+    def is_converged(self, threshold=0.5):
+        """True once the position uncertainty is below 'threshold' meters."""
+        return self.position_std() < threshold
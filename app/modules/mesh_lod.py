@@ -0,0 +1,309 @@
+# app/modules/mesh_lod.py
+
+import json
+import os
+
+import numpy as np
+
+
+# Clustering cell sizes (m) of the generated levels, finest first
+DEFAULT_CELL_SIZES = (0.02, 0.05, 0.1, 0.25, 0.5)
+LOD_CACHE_SUFFIX = ".lod.npz"
+_CACHE_VERSION = 1
+
+
+def triangulate(faces):
+    """
+    Fan-triangulate faces (sequences of vertex indices; polygons allowed).
+    :return: (M, 3) int64 array.
+    """
+    triangles = []
+    for face in faces:
+        for k in range(1, len(face) - 1):
+            triangles.append((face[0], face[k], face[k + 1]))
+    return np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+
+def cluster_simplify(vertices, faces, cell_size):
+    """
+    Vertex-clustering decimation: vertices are snapped to a uniform grid of
+    'cell_size', every cluster is replaced by the mean of its vertices, and
+    triangles that collapse (or duplicate another triangle) are dropped.
+    Fully vectorized; cost is O(N log N) in the vertex count.
+
+    :param vertices: (N, 3) float array.
+    :param faces: (M, 3) int array of triangles.
+    :param cell_size: Cluster size in meters.
+    :return: (vertices (K, 3), faces (L, 3), max_error) where max_error is the
+             largest distance (m) any input vertex moved.
+    """
+    if vertices.shape[0] == 0 or faces.shape[0] == 0:
+        return vertices.copy(), faces.copy(), 0.0
+    keys = np.floor(vertices / cell_size).astype(np.int64)
+    _, cluster, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.reshape(-1)
+    representatives = np.stack([np.bincount(cluster, weights=vertices[:, k], minlength=counts.size)
+                                for k in range(3)], axis=1) / counts[:, None]
+    max_error = float(np.linalg.norm(vertices - representatives[cluster], axis=1).max())
+
+    new_faces = cluster[faces]
+    a, b, c = new_faces[:, 0], new_faces[:, 1], new_faces[:, 2]
+    new_faces = new_faces[(a != b) & (b != c) & (a != c)]
+    if new_faces.shape[0]:
+        _, first = np.unique(np.sort(new_faces, axis=1), axis=0, return_index=True)
+        new_faces = new_faces[np.sort(first)]
+
+    # Keep only the vertices still referenced by a triangle
+    used = np.unique(new_faces)
+    remap = np.full(counts.size, -1, dtype=np.int64)
+    remap[used] = np.arange(used.size)
+    return representatives[used], remap[new_faces], max_error
+
+
+class LODLevel:
+    """One level of detail of a mesh group."""
+
+    __slots__ = ("cell_size", "vertices", "faces", "max_error")
+
+    def __init__(self, cell_size, vertices, faces, max_error):
+        self.cell_size = cell_size
+        self.vertices = vertices
+        self.faces = faces
+        self.max_error = max_error
+
+    def __repr__(self):
+        return (f"LODLevel(cell_size={self.cell_size}, faces={self.faces.shape[0]}, "
+                f"max_error={self.max_error:.3f})")
+
+
+class MeshLODSet:
+    """
+    Levels of detail for every object of a building model.
+
+    Each entry of model_data["objects"] that has faces is one mesh group;
+    geometry faces not owned by any object (walls in some models) form one
+    extra group. Level 0 is the full-resolution mesh; coarser levels come from
+    cluster_simplify at increasing cell sizes (levels that remove no triangle
+    are skipped). Levels are built on demand per group, or all at once with
+    build_all(), and can be saved to / loaded from an .npz cache next to the
+    model file, so re-ingesting a large scan does not decimate it again.
+
+    Consumers ask for the coarsest level within their accuracy:
+      lod = model_data["lod"]
+      vertices, faces = lod.geometry_arrays(tolerance=0.05)   # whole building
+      level = lod.select(3, tolerance=0.1)                    # one object
+
+    Typical usage:
+      lod = MeshLODSet(model_data, cache_path="building.obj.lod.npz", stamp=stamp)
+      lod.load() or (lod.build_all(), lod.save())
+    """
+
+    def __init__(self, model_data, cell_sizes=DEFAULT_CELL_SIZES, cache_path=None, stamp=None):
+        """
+        :param model_data: Building model from ingestion.py.
+        :param cell_sizes: Cluster sizes (m) of the coarser levels, finest first.
+        :param cache_path: Optional .npz file for save()/load().
+        :param stamp: Identifies the source model version (e.g. size and mtime);
+                      a cache with a different stamp is ignored.
+        """
+        self.cell_sizes = tuple(sorted(cell_sizes))
+        self.cache_path = cache_path
+        self.stamp = stamp
+        self.vertices = self._vertex_array(model_data)
+        self._vertex_buffer = self.vertices  # spare capacity for append_vertices
+        self.group_names = []
+        self.group_faces = []
+        self.n_objects = 0
+        self._collect_groups(model_data)
+        self._levels = [None] * len(self.group_faces)
+        self._merged = {}
+
+    @staticmethod
+    def _vertex_array(model_data):
+        geometry = model_data.get("geometry") if model_data else None
+        if not geometry or not isinstance(geometry, dict) or not geometry.get("vertices"):
+            return np.zeros((0, 3))
+        return np.asarray(geometry["vertices"], dtype=np.float64)[:, :3]
+
+    def _collect_groups(self, model_data):
+        owned = set()
+        for i, obj in enumerate(model_data.get("objects", []) if model_data else []):
+            faces = obj.get("faces") or []
+            self.group_names.append(obj.get("name") or obj.get("label") or f"object_{i}")
+            self.group_faces.append(triangulate(faces))
+            owned.update(tuple(face) for face in faces)
+        self.n_objects = len(self.group_faces)
+        geometry = model_data.get("geometry") if model_data else None
+        rest = [face for face in (geometry.get("faces", []) if isinstance(geometry, dict) else [])
+                if tuple(face) not in owned]
+        if rest:
+            self.group_names.append("__unassigned__")
+            self.group_faces.append(triangulate(rest))
+
+    def __len__(self):
+        return len(self.group_faces)
+
+    # ------------------------------------------------------------------
+    # Building levels
+    # ------------------------------------------------------------------
+
+    def levels(self, group):
+        """:return: The LODLevels of a group (index into model_data["objects"]), finest first."""
+        if self._levels[group] is None:
+            self._levels[group] = self._build(self.group_faces[group])
+        return self._levels[group]
+
+    def _build(self, faces):
+        # Local copy of the group's vertices, so decimation ignores other objects
+        used = np.unique(faces)
+        local_vertices = self.vertices[used]
+        local_faces = np.searchsorted(used, faces)
+        levels = [LODLevel(0.0, local_vertices, local_faces, 0.0)]
+        for cell_size in self.cell_sizes:
+            vertices, simplified, error = cluster_simplify(local_vertices, local_faces, cell_size)
+            if simplified.shape[0] >= levels[-1].faces.shape[0]:
+                continue
+            levels.append(LODLevel(cell_size, vertices, simplified, error))
+        return levels
+
+    def append_vertices(self, vertices):
+        """
+        Extend the shared vertex array (new mesh groups reference the appended
+        rows). The backing buffer doubles when full, so repeated appends take
+        amortized constant time per vertex.
+        """
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        n = self.vertices.shape[0]
+        needed = n + vertices.shape[0]
+        if needed > self._vertex_buffer.shape[0]:
+            buffer = np.empty((max(needed, 2 * self._vertex_buffer.shape[0]), 3))
+            buffer[:n] = self.vertices
+            self._vertex_buffer = buffer
+        self._vertex_buffer[n:needed] = vertices
+        self.vertices = self._vertex_buffer[:needed]
+
+    def compact_vertices(self, keep):
+        """
+        Drop the vertices where the boolean mask 'keep' is False and renumber
+        the group faces. Built levels hold their own vertices and stay valid.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        remap = np.cumsum(keep) - 1
+        self.vertices = self._vertex_buffer = self.vertices[keep]
+        self.group_faces = [remap[faces] for faces in self.group_faces]
+
+    def set_group(self, group, name, faces):
+        """
+        Replace the mesh of object 'group', or add one (group == n_objects).
+        Its levels are rebuilt on demand; other groups keep theirs.
+        """
+        if group == self.n_objects:
+            self.group_names.insert(group, name)
+            self.group_faces.insert(group, triangulate(faces))
+            self._levels.insert(group, None)
+            self.n_objects += 1
+        else:
+            self.group_names[group] = name
+            self.group_faces[group] = triangulate(faces)
+            self._levels[group] = None
+        self._merged = {}
+
+    def remove_group(self, group):
+        """Remove object 'group'; the last object's group takes its place (as in model_updates.py)."""
+        last = self.n_objects - 1
+        for items in (self.group_names, self.group_faces, self._levels):
+            items[group] = items[last]
+            del items[last]
+        self.n_objects -= 1
+        self._merged = {}
+
+    def build_all(self):
+        for group in range(len(self)):
+            self.levels(group)
+        return self
+
+    def select(self, group, tolerance):
+        """:return: The coarsest LODLevel of a group whose error is within 'tolerance' (m)."""
+        best = None
+        for level in self.levels(group):
+            if level.max_error <= tolerance:
+                best = level
+        return best
+
+    def geometry_arrays(self, tolerance):
+        """
+        Merge the coarsest acceptable level of every group into one mesh.
+        :return: (vertices (N, 3) float array, faces (M, 3) int array).
+        """
+        key = float(tolerance)
+        if key not in self._merged:
+            vertex_chunks, face_chunks, offset = [], [], 0
+            for group in range(len(self)):
+                level = self.select(group, tolerance)
+                vertex_chunks.append(level.vertices)
+                face_chunks.append(level.faces + offset)
+                offset += level.vertices.shape[0]
+            if not vertex_chunks:
+                return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+            self._merged[key] = (np.concatenate(vertex_chunks), np.concatenate(face_chunks))
+        return self._merged[key]
+
+    def summary(self):
+        """:return: Face count and error per level, summed over groups built so far."""
+        rows = {}
+        for levels in self._levels:
+            for level in levels or ():
+                row = rows.setdefault(level.cell_size, {"cell_size": level.cell_size, "faces": 0, "max_error": 0.0})
+                row["faces"] += int(level.faces.shape[0])
+                row["max_error"] = max(row["max_error"], level.max_error)
+        return [rows[k] for k in sorted(rows)]
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def save(self, path=None):
+        """Write all levels built so far to an .npz file."""
+        path = path or self.cache_path
+        arrays = {}
+        meta = {"version": _CACHE_VERSION, "stamp": self.stamp, "cell_sizes": list(self.cell_sizes),
+                "groups": []}
+        for group, levels in enumerate(self._levels):
+            entry = []
+            for k, level in enumerate(levels or ()):
+                arrays[f"v_{group}_{k}"] = level.vertices
+                arrays[f"f_{group}_{k}"] = level.faces.astype(np.int32)
+                entry.append([level.cell_size, level.max_error])
+            meta["groups"].append(entry if levels is not None else None)
+        arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        print(f"[MeshLODSet] Saved LOD cache to {path}")
+
+    def load(self, path=None):
+        """
+        Load levels from an .npz cache written by save() for the same model
+        version and cell sizes.
+        :return: True if the cache was used.
+        """
+        path = path or self.cache_path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+                if (meta.get("version") != _CACHE_VERSION or meta.get("stamp") != self.stamp
+                        or tuple(meta.get("cell_sizes", ())) != self.cell_sizes
+                        or len(meta.get("groups", ())) != len(self)):
+                    return False
+                for group, entry in enumerate(meta["groups"]):
+                    if entry is None:
+                        continue
+                    self._levels[group] = [
+                        LODLevel(cell_size, data[f"v_{group}_{k}"], data[f"f_{group}_{k}"].astype(np.int64), error)
+                        for k, (cell_size, error) in enumerate(entry)]
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"[MeshLODSet] Ignoring unreadable LOD cache {path}: {exc}")
+            return False
+        self._merged = {}
+        return True
@@ -1,5 +1,9 @@
 # app/modules/ml_model_manager.py
 
+import os
+
+from .llm_backends import LocalStandInLLMServer, MockLLMBackend, OpenAICompatibleClient
+
 class MLModelManager:
     """
     Manages loading and initializing different machine learning models required by
@@ -8,15 +12,33 @@ class MLModelManager:
       - A large language model (LLM) for environment Q&A
     """
 
-    def __init__(self):
+    def __init__(self, llm_base_url=None, llm_model=None, llm_api_key=None,
+                 llm_timeout=30.0, llm_max_concurrency=4, llm_stand_in=False):
         """
         Optionally store paths or configs for the models.
         You could pass them in __init__ or load from a config file.
+
+        LLM settings fall back to the environment variables SMARTAR_LLM_BASE_URL,
+        SMARTAR_LLM_MODEL and SMARTAR_LLM_API_KEY (or OPENAI_API_KEY).
+
+        :param llm_base_url: OpenAI-compatible endpoint, e.g. "http://127.0.0.1:8080/v1".
+        :param llm_model: Model name sent to the endpoint.
+        :param llm_api_key: Optional bearer token.
+        :param llm_timeout: Per-request timeout in seconds.
+        :param llm_max_concurrency: Maximum number of concurrent LLM requests.
+        :param llm_stand_in: Start the bundled LocalStandInLLMServer and talk to it (offline demo).
         """
         # Example placeholders:
         self.detection_model_path = "path/to/detection/model"  # e.g., "yolov5s.pt"
         self.llm_model_path = "path/to/llm"                    # e.g., "gpt-neox-20B"
-        # In real usage, you might store or read config from environment or a JSON file.
+
+        self.llm_base_url = llm_base_url or os.environ.get("SMARTAR_LLM_BASE_URL")
+        self.llm_model = llm_model or os.environ.get("SMARTAR_LLM_MODEL", "gpt-4o-mini")
+        self.llm_api_key = llm_api_key or os.environ.get("SMARTAR_LLM_API_KEY") or os.environ.get("OPENAI_API_KEY")
+        self.llm_timeout = llm_timeout
+        self.llm_max_concurrency = llm_max_concurrency
+        self.llm_stand_in = llm_stand_in
+        self.llm_server = None
 
     def load_detection_model(self):
         """
@@ -52,27 +74,35 @@ class MLModelManager:
     def load_llm(self):
         """
         Load or initialize the large language model for environment Q&A.
-        
+
         Could be:
-          - A local model (using HuggingFace Transformers, GPT4All, llama.cpp, etc.)
-          - A remote API wrapper (OpenAI, Azure, Anthropic, etc.)
-        
-        Returns a reference to the LLM that can be used by LLMIntegration.
+          - A remote or self-hosted OpenAI-compatible endpoint (OpenAI, vLLM, llama.cpp server, Ollama)
+          - The bundled stand-in server (llm_stand_in=True), for offline runs
+          - A local model wrapped in LocalModelBackend (HuggingFace Transformers, GPT4All, llama.cpp, etc.)
+
+        Returns an LLMBackend that can be used by LLMIntegration; MockLLMBackend
+        if no endpoint is configured.
         """
-        print("[MLModelManager] Loading LLM from:", self.llm_model_path)
-        
-        # STUB: Return a mock LLM handle
-        # Real code might look like:
-        #
-        # import openai
-        # openai.api_key = "YOUR_API_KEY"
-        # return openai  # or return some kind of LLM client instance
-        #
-        # Or local model approach with HuggingFace:
-        # from transformers import AutoTokenizer, AutoModelForCausalLM
-        # tokenizer = AutoTokenizer.from_pretrained(self.llm_model_path)
-        # model = AutoModelForCausalLM.from_pretrained(self.llm_model_path)
-        # return (model, tokenizer)
-        
-        llm_stub = "mock_llm_instance"
-        return llm_stub
+        if self.llm_stand_in:
+            self.llm_server = LocalStandInLLMServer().start()
+            self.llm_base_url = self.llm_server.base_url
+            self.llm_model = "stand-in"
+
+        if not self.llm_base_url:
+            print("[MLModelManager] No LLM endpoint configured, using the mock LLM.")
+            return MockLLMBackend()
+
+        print("[MLModelManager] Using LLM '{}' at {}".format(self.llm_model, self.llm_base_url))
+        return OpenAICompatibleClient(
+            self.llm_base_url,
+            model=self.llm_model,
+            api_key=self.llm_api_key,
+            timeout=self.llm_timeout,
+            max_concurrency=self.llm_max_concurrency,
+        )
+
+    def shutdown(self):
+        """Stop the stand-in LLM server, if one was started."""
+        if self.llm_server is not None:
+            self.llm_server.stop()
+            self.llm_server = None
@@ -0,0 +1,446 @@
+# app/modules/model_updates.py
+
+import json
+import os
+import queue
+import time
+from collections import Counter
+
+import numpy as np
+
+from .ingestion import ModelIngestion
+from .instrumentation import telemetry
+
+
+def object_key(obj):
+    """Identity of a building-model object: its IFC GlobalId, else its name or label."""
+    return obj.get("global_id") or obj.get("name") or obj.get("label")
+
+
+class ModelDelta:
+    """
+    One change to a building model, applied by LiveModelUpdater.
+
+    Operations:
+      - "add": add an object (its key must be new)
+      - "replace": replace the object with the same key
+      - "put": add or replace (used for changed IFC subsets and drop-folder files)
+      - "remove": remove the object with 'key'
+    An object may carry its own mesh ('vertices' plus 'faces' indexing
+    into them); it is appended to the model geometry on apply.
+
+    Typical usage:
+      updater.submit(ModelDelta.remove("Chair 12"))
+      updater.submit(ModelDelta.mesh_group("Partition A", vertices, faces, label="wall"))
+    """
+
+    def __init__(self, op, key=None, obj=None, vertices=None):
+        self.op = op
+        self.obj = obj
+        self.vertices = vertices
+        self.key = key if key is not None else (object_key(obj) if obj else None)
+
+    def __repr__(self):
+        return f"ModelDelta({self.op!r}, {self.key!r})"
+
+    @classmethod
+    def add(cls, obj):
+        return cls("add", obj=obj)
+
+    @classmethod
+    def replace(cls, obj):
+        return cls("replace", obj=obj)
+
+    @classmethod
+    def put(cls, obj):
+        return cls("put", obj=obj)
+
+    @classmethod
+    def remove(cls, key):
+        return cls("remove", key=key)
+
+    @classmethod
+    def mesh_group(cls, name, vertices, faces, label=None, op="put"):
+        """
+        Add or replace a mesh group.
+        :param vertices: Sequence of (x, y, z).
+        :param faces: Sequences of indices into 'vertices'.
+        """
+        obj = {"name": name, "faces": [tuple(face) for face in faces]}
+        if label:
+            obj["label"] = label
+        return cls(op, obj=obj, vertices=[tuple(v[:3]) for v in vertices])
+
+
+def load_delta_file(filepath, ingestion=None):
+    """
+    Read the deltas described by one file:
+      - .obj: every object / group is a mesh group, added or replaced by name;
+      - .ifc: a changed IFC subset, products added or replaced by GlobalId;
+      - .json: {"remove": [key, ...], "add": [obj, ...], "replace": [obj, ...], "put": [obj, ...]}.
+    :return: List of ModelDelta.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == ".json":
+        with open(filepath, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        deltas = [ModelDelta.remove(key) for key in data.get("remove", [])]
+        for op in ("add", "replace", "put"):
+            deltas.extend(ModelDelta(op, obj=obj) for obj in data.get(op, []))
+        return deltas
+
+    ingestion = ingestion or ModelIngestion(lod_cache=False)
+    subset = ingestion.load_model(filepath)
+    if ext == ".ifc":
+        return [ModelDelta.put(obj) for obj in subset.get("objects", [])]
+    vertices = subset["geometry"]["vertices"] if subset.get("geometry") else []
+    deltas = []
+    for obj in subset.get("objects", []):
+        used = sorted({i for face in obj["faces"] for i in face})
+        local = {i: k for k, i in enumerate(used)}
+        deltas.append(ModelDelta.mesh_group(
+            obj["name"], [vertices[i] for i in used], [[local[i] for i in face] for face in obj["faces"]]))
+    return deltas
+
+
+class LiveModelUpdater:
+    """
+    Applies model deltas to a running system without re-ingesting the building.
+
+    Each delta edits building_model in place and is propagated incrementally:
+      - spatial indexes: only the changed object's entry is re-inserted;
+      - levels of detail (model["lod"]): only the changed group is rebuilt, on demand;
+      - occupancy grid: only the tiles under the old and new object bounds are
+        re-rasterized (OccupancyGrid.refresh_region);
+      - route cache: only routes through newly blocked cells, or routes a
+        newly freed cell could shorten, are dropped.
+    Removing an object moves the last object into its slot, so object ids
+    (positions in building_model["objects"]) of all other objects stay valid.
+    Each object's faces are kept as one run of geometry["faces"], so replacing
+    or removing it deletes that run only. Vertices appended for a mesh that is
+    later replaced or removed stay unused until compact() renumbers the
+    model, which happens once they make up 'compact_ratio' of all vertices.
+
+    Any thread may submit() deltas; apply_pending() applies them and must
+    run on the thread that plans routes (the main loop), like the other
+    stages of the scheduler. poll_directory() turns files dropped into a
+    folder into deltas (see load_delta_file).
+
+    Typical usage:
+      updater = LiveModelUpdater(building_model, planner=planner, indexes=[nav.object_index])
+      updater.submit(ModelDelta.remove("Chair 12"))
+      updater.apply_pending()
+    """
+
+    def __init__(self, building_model, planner=None, indexes=(), watch_dir=None, tile_cells=16,
+                 compact_ratio=0.5):
+        """
+        :param building_model: The live model from ingestion.py, edited in place.
+        :param planner: Optional GridPlanner whose grid and route cache are kept current.
+        :param indexes: SpatialHashIndex instances built with from_building_model.
+        :param watch_dir: Optional folder polled for delta files.
+        :param tile_cells: Edge length (cells) of the occupancy tiles redrawn per change.
+        :param compact_ratio: Fraction of unused vertices that triggers compact().
+        """
+        self.building_model = building_model
+        self.planner = planner
+        self.indexes = list(indexes)
+        self.watch_dir = watch_dir
+        self.tile_cells = tile_cells
+        self.compact_ratio = compact_ratio
+        self.listeners = []
+        self.applied = 0
+        self.failed = 0
+        self.compactions = 0
+        self.last_report = None
+
+        self._queue = queue.SimpleQueue()
+        self._seen = {}
+        self._keys = {}
+        for i, obj in enumerate(building_model.setdefault("objects", [])):
+            self._keys.setdefault(object_key(obj), i)
+        self._face_ranges = {}    # key -> (start, stop) of its faces in geometry["faces"]
+        self._vertex_ranges = {}  # key -> (start, stop) of the vertices appended for its mesh
+        self._dead_vertices = []  # vertex ranges of replaced or removed meshes
+        self._index_faces()
+
+    def add_index(self, index):
+        self.indexes.append(index)
+
+    def add_listener(self, fn):
+        """Call fn(report) after every applied delta (e.g. to drop a cached prompt context)."""
+        self.listeners.append(fn)
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+
+    def submit(self, delta):
+        """Queue a delta (thread-safe); it takes effect on the next apply_pending()."""
+        self._queue.put(delta)
+
+    def poll_directory(self):
+        """
+        Queue the deltas of new or modified files in watch_dir (sorted by name).
+        :return: Number of deltas queued.
+        """
+        if not self.watch_dir or not os.path.isdir(self.watch_dir):
+            return 0
+        queued = 0
+        for name in sorted(os.listdir(self.watch_dir)):
+            if os.path.splitext(name)[1].lower() not in (".json", ".obj", ".ifc"):
+                continue
+            path = os.path.join(self.watch_dir, name)
+            mtime = os.stat(path).st_mtime_ns
+            if self._seen.get(path) == mtime:
+                continue
+            self._seen[path] = mtime
+            try:
+                deltas = load_delta_file(path)
+            except (OSError, ValueError) as exc:
+                print(f"[LiveModelUpdater] Cannot read {path}: {exc}")
+                continue
+            print(f"[LiveModelUpdater] {len(deltas)} change(s) from {name}.")
+            for delta in deltas:
+                self.submit(delta)
+            queued += len(deltas)
+        return queued
+
+    def apply_pending(self):
+        """
+        Apply all queued deltas. Invalid ones (unknown key, duplicate add) are
+        reported and skipped.
+        :return: List of reports of the applied deltas.
+        """
+        reports = []
+        while True:
+            try:
+                delta = self._queue.get_nowait()
+            except queue.Empty:
+                return reports
+            try:
+                reports.append(self.apply(delta))
+            except (KeyError, ValueError) as exc:
+                self.failed += 1
+                print(f"[LiveModelUpdater] Skipping {delta}: {exc}")
+
+    def step(self):
+        """Poll the watch folder and apply pending deltas (one scheduler task)."""
+        self.poll_directory()
+        self.apply_pending()
+
+    # ------------------------------------------------------------------
+    # Applying
+    # ------------------------------------------------------------------
+
+    def apply(self, delta):
+        """
+        Apply one delta now.
+        :return: {"op", "key", "tiles", "blocked", "freed", "routes_dropped", "ms"}.
+        :raises KeyError: replace/remove of an unknown key.
+        :raises ValueError: add of an existing key, or an unknown op.
+        """
+        start = time.perf_counter()
+        with telemetry.span("model_update"):
+            boxes = []
+            if delta.op == "remove":
+                if delta.key not in self._keys:
+                    raise KeyError(f"no object '{delta.key}'")
+                boxes.append(self._remove(self._keys[delta.key]))
+            elif delta.op in ("add", "replace", "put"):
+                exists = delta.key in self._keys
+                if delta.op == "add" and exists:
+                    raise ValueError(f"object '{delta.key}' already exists")
+                if delta.op == "replace" and not exists:
+                    raise KeyError(f"no object '{delta.key}'")
+                boxes.extend(self._put(delta))
+            else:
+                raise ValueError(f"unknown op '{delta.op}'")
+            report = self._refresh_grid([box for box in boxes if box is not None])
+            dead = sum(stop - start for start, stop in self._dead_vertices)
+            if dead and dead >= self.compact_ratio * len(self._geometry()["vertices"]):
+                self.compact()
+
+        report.update(op=delta.op, key=delta.key, ms=round(1000.0 * (time.perf_counter() - start), 3))
+        self.applied += 1
+        self.last_report = report
+        for fn in self.listeners:
+            fn(report)
+        return report
+
+    def _geometry(self):
+        geometry = self.building_model.get("geometry")
+        if not isinstance(geometry, dict):
+            geometry = self.building_model["geometry"] = {"vertices": [], "faces": []}
+        return geometry
+
+    def _index_faces(self):
+        """
+        Reorder geometry["faces"] into the faces no object owns followed by one
+        run per object, and record the runs.
+        """
+        objects = self.building_model["objects"]
+        if not any(obj.get("faces") for obj in objects):
+            return
+        geometry = self._geometry()
+        owned = Counter(tuple(face) for obj in objects for face in obj.get("faces") or ())
+        faces = []
+        for face in geometry["faces"]:
+            if owned[tuple(face)] > 0:
+                owned[tuple(face)] -= 1
+            else:
+                faces.append(face)
+        for obj in objects:
+            if obj.get("faces"):
+                self._face_ranges.setdefault(object_key(obj), (len(faces), len(faces) + len(obj["faces"])))
+                faces.extend(obj["faces"])
+        geometry["faces"][:] = faces
+
+    def _put(self, delta):
+        """Add or replace; :return: XY boxes of the old and new geometry."""
+        obj = dict(delta.obj)
+        objects = self.building_model["objects"]
+        lod = self.building_model.get("lod")
+        vertex_range = None
+        if delta.vertices is not None:
+            geometry = self._geometry()
+            offset = len(geometry["vertices"])
+            vertex_range = (offset, offset + len(delta.vertices))
+            geometry["vertices"].extend(delta.vertices)
+            obj["faces"] = [tuple(i + offset for i in face) for face in obj["faces"]]
+            obj.update(ModelIngestion._object_bounds(geometry["vertices"], obj["faces"]))
+            if lod is not None:
+                lod.append_vertices(delta.vertices)
+
+        boxes = []
+        i = self._keys.get(delta.key)
+        if i is None:
+            i = len(objects)
+            objects.append(obj)
+            self._keys[delta.key] = i
+        else:
+            boxes.append(self._drop_mesh(delta.key, objects[i]))
+            objects[i] = obj
+        if vertex_range is not None and vertex_range[1] > vertex_range[0]:
+            self._vertex_ranges[delta.key] = vertex_range
+        if obj.get("faces"):
+            faces = self._geometry()["faces"]
+            self._face_ranges[delta.key] = (len(faces), len(faces) + len(obj["faces"]))
+            faces.extend(obj["faces"])
+            boxes.append(self._xy_box(obj))
+        if lod is not None:
+            lod.set_group(i, obj.get("name") or obj.get("label") or f"object_{i}", obj.get("faces") or [])
+        self._index(i, obj)
+        return boxes
+
+    def _remove(self, i):
+        """Swap-remove object i; :return: XY box of its geometry (or None)."""
+        objects = self.building_model["objects"]
+        key = object_key(objects[i])
+        box = self._drop_mesh(key, objects[i])
+        del self._keys[key]
+        last = len(objects) - 1
+        for index in self.indexes:
+            index.remove(i)
+        if i != last:
+            objects[i] = objects[last]
+            self._keys[object_key(objects[i])] = i
+            for index in self.indexes:
+                index.remove(last)
+            self._index(i, objects[i])
+        objects.pop()
+        lod = self.building_model.get("lod")
+        if lod is not None:
+            lod.remove_group(i)
+        return box
+
+    def _drop_mesh(self, key, obj):
+        """Delete the object's face run and retire its vertices; :return: XY box of its geometry (or None)."""
+        vertex_range = self._vertex_ranges.pop(key, None)
+        if vertex_range is not None:
+            self._dead_vertices.append(vertex_range)
+        face_range = self._face_ranges.pop(key, None)
+        if face_range is None:
+            return None
+        start, stop = face_range
+        del self._geometry()["faces"][start:stop]
+        for other, (s, e) in self._face_ranges.items():
+            if s >= stop:
+                self._face_ranges[other] = (s - (stop - start), e - (stop - start))
+        return self._xy_box(obj)
+
+    def compact(self):
+        """
+        Drop the vertices of replaced and removed meshes and renumber the faces
+        of the geometry, the objects and the levels of detail.
+        :return: Number of vertices dropped.
+        """
+        if not self._dead_vertices:
+            return 0
+        geometry = self._geometry()
+        keep = np.ones(len(geometry["vertices"]), dtype=bool)
+        for start, stop in self._dead_vertices:
+            keep[start:stop] = False
+        self._dead_vertices = []
+        remap = (np.cumsum(keep) - 1).tolist()
+
+        geometry["vertices"][:] = [v for v, kept in zip(geometry["vertices"], keep) if kept]
+        faces = geometry["faces"]
+        faces[:] = [tuple(remap[v] for v in face) for face in faces]
+        objects = self.building_model["objects"]
+        runs = {self._keys[key]: run for key, run in self._face_ranges.items()}
+        for i, obj in enumerate(objects):
+            if i in runs:
+                obj["faces"] = faces[runs[i][0]:runs[i][1]]
+            elif obj.get("faces"):
+                obj["faces"] = [tuple(remap[v] for v in face) for face in obj["faces"]]
+        self._vertex_ranges = {key: (remap[start], remap[start] + stop - start)
+                               for key, (start, stop) in self._vertex_ranges.items()}
+        lod = self.building_model.get("lod")
+        if lod is not None:
+            lod.compact_vertices(keep)
+        self.compactions += 1
+        return int(keep.size - keep.sum())
+
+    @staticmethod
+    def _xy_box(obj):
+        bounds = obj.get("bounds")
+        if not bounds:
+            return None
+        lo, hi = bounds
+        return (lo[0], lo[1]), (hi[0], hi[1])
+
+    def _index(self, i, obj):
+        position = obj.get("centroid") if obj.get("centroid") is not None else obj.get("position")
+        for index in self.indexes:
+            if position is None:
+                index.remove(i)
+            else:
+                index.insert(i, position, obj.get("label") or obj.get("name"))
+
+    def _refresh_grid(self, boxes):
+        report = {"tiles": 0, "blocked": 0, "freed": 0, "routes_dropped": 0}
+        if self.planner is None or not boxes:
+            return report
+        blocked, freed = set(), set()
+        for lo, hi in boxes:
+            change = self.planner.grid.refresh_region(self.building_model, lo, hi, tile_cells=self.tile_cells)
+            report["tiles"] += change["tiles"]
+            blocked.update(change["blocked"])
+            freed.update(change["freed"])
+        # A cell redrawn twice (old and new box overlap) may end up unchanged
+        blocked, freed = blocked - freed, freed - blocked
+        report["blocked"] = len(blocked)
+        report["freed"] = len(freed)
+        report["routes_dropped"] = self.planner.invalidate_changed(blocked, freed)
+        return report
+
+    def stats(self):
+        return {
+            "applied": self.applied,
+            "failed": self.failed,
+            "compactions": self.compactions,
+            "objects": len(self.building_model.get("objects", [])),
+            "route_cache_size": len(self.planner.route_cache) if self.planner is not None else 0,
+            "last": self.last_report,
+        }
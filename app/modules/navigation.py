@@ -1,83 +1,308 @@
 # app/modules/navigation.py
 
+import math
+
+import numpy as np
+
+from .path_planner import GridPlanner, OccupancyGrid, simplify_path
+from .spatial_index import SpatialHashIndex
+
+
+def describe_turn(angle):
+    """
+    Describe a heading change (radians, positive = counter-clockwise/left).
+    :return: e.g. "turn left", "bear right", or None for 'keep straight'.
+    """
+    degrees = math.degrees(angle)
+    side = "left" if degrees > 0 else "right"
+    magnitude = abs(degrees)
+    if magnitude < 20:
+        return None
+    if magnitude < 60:
+        return f"bear {side}"
+    if magnitude < 135:
+        return f"turn {side}"
+    return f"make a sharp {side} turn"
+
+
+def sentence_case(text):
+    """
+    Upper-case the first character only, so names like "TV" keep their case
+    (unlike str.capitalize, which lowercases the rest).
+    """
+    return text[:1].upper() + text[1:]
+
+
+class Route:
+    """
+    A simplified route, precomputed once into segment arrays and turn events
+    so that progress tracking is O(1) per update.
+
+    Segment i goes from 'starts[i]' along unit vector 'directions[i]' for
+    'lengths[i]' meters. 'instructions[i]' is announced when segment i begins.
+    """
+
+    def __init__(self, waypoints, target_name):
+        """
+        :param waypoints: Simplified list of (x, y) points (at least two).
+        :param target_name: Name used in the arrival instruction.
+        """
+        points = np.asarray(waypoints, dtype=np.float64)[:, :2]
+        deltas = points[1:] - points[:-1]
+        lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        keep = lengths > 1e-6
+        if not keep.any():
+            # Start and goal coincide: a single zero-length segment
+            deltas = np.array([[1.0, 0.0]])
+            lengths = np.array([0.0])
+            points = points[:1]
+        else:
+            points = np.vstack([points[:-1][keep], points[-1:]])
+            deltas = deltas[keep]
+            lengths = lengths[keep]
+
+        self.waypoints = [(float(p[0]), float(p[1])) for p in points]
+        self.starts = points[:-1] if len(points) > 1 else points
+        self.lengths = lengths
+        self.directions = deltas / np.where(lengths > 0, lengths, 1.0)[:, None]
+        self.total_length = float(lengths.sum())
+        self.target_name = target_name
+        self.instructions = self._build_instructions()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def _build_instructions(self):
+        """
+        Turn events: one instruction per segment combining the turn at its
+        start (if any) with its length and what comes next.
+        """
+        headings = np.arctan2(self.directions[:, 1], self.directions[:, 0])
+        instructions = []
+        for i, length in enumerate(self.lengths):
+            meters = max(int(round(length)), 1)
+            if i + 1 < len(self.lengths):
+                turn = headings[i + 1] - headings[i]
+                turn = math.atan2(math.sin(turn), math.cos(turn))
+                upcoming = describe_turn(turn) or "continue straight"
+                walk = f"walk {meters} meter{'s' if meters != 1 else ''}, then {upcoming}."
+            else:
+                walk = f"walk {meters} meter{'s' if meters != 1 else ''} to reach the {self.target_name}."
+
+            if i == 0:
+                text = f"Begin walking toward {self.target_name}: {walk}"
+            else:
+                turn = headings[i] - headings[i - 1]
+                turn = math.atan2(math.sin(turn), math.cos(turn))
+                now = describe_turn(turn)
+                text = f"{sentence_case(now)} now, and {walk}" if now else sentence_case(walk)
+            instructions.append(text)
+        return instructions
+
+    def progress(self, index, position):
+        """
+        Project 'position' onto segment 'index'.
+        :return: (along_track, cross_track) distances in meters.
+        """
+        offset = (position[0] - self.starts[index][0], position[1] - self.starts[index][1])
+        d = self.directions[index]
+        along = offset[0] * d[0] + offset[1] * d[1]
+        cross = abs(offset[0] * d[1] - offset[1] * d[0])
+        return along, cross
+
+
 class NavigationAssistance:
     """
     Provides navigation instructions for a human user, leveraging
     the building_model data (rooms, corridors) and basic pathfinding.
-    
+
     Typical usage:
-      nav_assistance = NavigationAssistance(building_model)
+      nav_assistance = NavigationAssistance(building_model, audio_engine=audio_engine)
       nav_assistance.start_navigation("fridge")
-    
-    For demonstration, this file includes:
-      - A stub pathfinding approach
-      - The ability to give textual or audio-based instructions
+      nav_assistance.update_navigation(user_position)   # every frame
+
+    When navigation starts (or the user strays), the target is looked up in the
+    building model, a path is planned and simplified with Ramer-Douglas-Peucker,
+    and the result is precomputed into turn events. Each update is then a
+    constant-time projection onto the current segment, and instructions are
+    only emitted when the guidance state changes.
     """
 
-    def __init__(self, building_model):
+    def __init__(self, building_model, planner=None, audio_engine=None,
+                 simplify_tolerance=0.3, deviation_threshold=1.0, arrival_radius=0.5,
+                 object_index=None):
         """
-        :param building_model: Data structure from ingestion.py, 
+        :param building_model: Data structure from ingestion.py,
                                containing geometry and semantic info.
+        :param planner: Optional shared GridPlanner. Built lazily from building_model if omitted.
+        :param audio_engine: Optional SpatialAudioEngine used to speak instructions.
+        :param simplify_tolerance: RDP tolerance (m) used to turn the raw path into turn events.
+        :param deviation_threshold: Cross-track distance (m) that triggers a replan.
+        :param arrival_radius: Distance (m) at which a segment end/target counts as reached.
+        :param object_index: Optional shared SpatialHashIndex of the building objects.
         """
-        self.building_model = building_model  # Not heavily used in this stub
+        self.building_model = building_model
+        self.planner = planner
+        self.audio_engine = audio_engine
+        self.simplify_tolerance = simplify_tolerance
+        self.deviation_threshold = deviation_threshold
+        self.arrival_radius = arrival_radius
+        if object_index is None:
+            object_index = SpatialHashIndex.from_building_model(building_model)
+        self.object_index = object_index
+
         self.destination = None
         self.is_navigating = False
+        self.target_position = None
+        self.route = None
+        self.segment_index = 0
+        self.replans = 0
+        self.last_instruction = None
+
+    def _get_planner(self):
+        if self.planner is None:
+            self.planner = GridPlanner(OccupancyGrid(self.building_model))
+        return self.planner
+
+    @staticmethod
+    def spoken_target(target_name):
+        """Drop a leading article but keep the casing ('the TV' -> 'TV'); used in spoken text."""
+        name = target_name.strip()
+        for article in ("the ", "a ", "an "):
+            if name.lower().startswith(article):
+                return name[len(article):]
+        return name
 
-    def start_navigation(self, target_name):
+    @classmethod
+    def normalize_target(cls, target_name):
+        """Lower-case a spoken target and drop a leading article ('the fridge' -> 'fridge')."""
+        return cls.spoken_target(target_name).lower()
+
+    def find_target_position(self, target_name, near=None):
+        """
+        Look up a named object in the building model (e.g. 'the fridge').
+        :return: (x, y) of the nearest match, or None if unknown.
+        """
+        name = self.normalize_target(target_name)
+        near = near or (0.0, 0.0)
+        hit = self.object_index.nearest(near, label=name)
+        if hit is None:
+            # Fall back to partial label matches, e.g. 'table' -> 'kitchen table'
+            for label in list(self.object_index.labels):
+                if name in label or label in name:
+                    hit = self.object_index.nearest(near, label=label)
+                    break
+        return None if hit is None else hit[2][:2]
+
+    def start_navigation(self, target_name, user_position=None):
         """
         Start guiding the user to a named target (e.g., 'fridge', 'kitchen table').
-        In a real system, you'd:
-          - Look up the target's location in building_model or a known dictionary
-          - Compute a path from the user's current location
-          - Provide step-by-step or continuous instructions
 
-        For demonstration, we store the target name and pretend we have a path.
+        If the user position is known, the route is planned immediately;
+        otherwise it is planned on the first update_navigation() with a position.
+        A target missing from the building model is reported to the user and
+        leaves any current navigation unchanged.
+
+        :return: True if navigation started.
         """
-        print(f"[Navigation] Starting navigation towards '{target_name}' (stub).")
+        target_position = self.find_target_position(
+            target_name, near=user_position[:2] if user_position else None)
+        if target_position is None:
+            print(f"[Navigation] Unknown destination '{target_name}'.")
+            self.last_instruction = None
+            self._provide_instruction(f"I do not know where the {self.spoken_target(target_name)} is.")
+            return False
+
+        print(f"[Navigation] Starting navigation towards '{target_name}'.")
 
-        # In a more advanced approach, you'd do something like:
-        # target_position = find_object_position_in_building(self.building_model, target_name)
-        # path = compute_path(current_user_position, target_position)
-        
         self.destination = target_name
         self.is_navigating = True
-        
-        # Provide initial instruction
-        self._provide_instruction(f"Begin walking toward {target_name}. Follow corridor ahead.")
+        self.route = None
+        self.segment_index = 0
+        self.last_instruction = None
+        self.target_position = target_position
+
+        if user_position is not None and self._plan_route(user_position):
+            self._provide_instruction(self.route.instructions[0])
+        else:
+            # Provide initial instruction until we know where the user is
+            self._provide_instruction(f"Begin walking toward {target_name}. Follow corridor ahead.")
+        return True
+
+    def _plan_route(self, user_position):
+        """
+        Plan and precompute a route from user_position to the target.
+        :return: True if a route is available.
+        """
+        if self.target_position is None:
+            return False
+        start = (user_position[0], user_position[1])
+        waypoints = self._get_planner().plan(start, self.target_position)
+        if waypoints is None:
+            # No path through the grid: guide in a straight line
+            waypoints = [start, self.target_position]
+        else:
+            # Connect the exact endpoints instead of cell centers
+            waypoints = [start] + waypoints[1:-1] + [self.target_position]
+        self.route = Route(simplify_path(waypoints, self.simplify_tolerance),
+                           self.spoken_target(self.destination))
+        self.segment_index = 0
+        return True
 
     def _provide_instruction(self, instruction_text):
         """
-        Print or play an instruction. In a real system, you might call
-        a text-to-speech engine or produce spatial audio cues (e.g., 'beeps' 
-        that indicate direction).
+        Print the instruction and speak it through the audio engine, if any.
+        Repeated identical instructions are suppressed.
         """
+        if instruction_text == self.last_instruction:
+            return
+        self.last_instruction = instruction_text
         print(f"[Navigation] Instruction: {instruction_text}")
+        if self.audio_engine is not None:
+            self.audio_engine.play_text(instruction_text)
 
     def update_navigation(self, user_position=None):
         """
         Periodically called in a loop to update instructions based on
-        the user's progress. For example, we might:
-          - Check how far the user has traveled
-          - Update instructions to 'turn left' or 'walk straight'
-        
-        :param user_position: A placeholder to represent user's (x, y, z).
-                              Real systems would use AR tracking or other sensors.
-        """
-        if not self.is_navigating or self.destination is None:
+        the user's progress. Only state changes (next turn, rerouting,
+        arrival) produce an instruction; otherwise this is silent and O(1).
+
+        :param user_position: The user's (x, y, z) in building coordinates,
+                              or None if unknown (e.g., before localization).
+        """
+        if not self.is_navigating or self.destination is None or user_position is None:
             return
 
-        # In a real system, you'd compare user_position to the path's next waypoint
-        # and decide if we need to instruct them to turn or keep walking.
-        
-        # We'll just demonstrate a simplified sequence:
-        # (In a real scenario, this might be a finite state machine or path steps.)
-        print("[Navigation] Currently guiding user... (stub update)")
+        if self.route is None:
+            if self._plan_route(user_position):
+                self._provide_instruction(self.route.instructions[0])
+            return
+
+        route = self.route
+        last = len(route) - 1
+
+        # Arrival check against the final target
+        tx, ty = route.waypoints[-1]
+        if math.hypot(user_position[0] - tx, user_position[1] - ty) <= self.arrival_radius:
+            self._provide_instruction(f"You have reached the {route.target_name}.")
+            self.is_navigating = False
+            self.destination = None
+            self.route = None
+            return
+
+        along, cross = route.progress(self.segment_index, user_position)
+
+        # Off route: re-run the planner from the current position
+        if cross > self.deviation_threshold:
+            self.replans += 1
+            self._plan_route(user_position)
+            self._provide_instruction("Rerouting. " + sentence_case(self.route.instructions[0].split(": ", 1)[-1]))
+            return
 
-        # Example condition: If we've "arrived" somehow, end navigation
-        # if user_position is close to the target:
-        #     self._provide_instruction(f"You have reached the {self.destination}.")
-        #     self.is_navigating = False
-        #     self.destination = None
+        # Reached the end of the current segment: announce the next turn event
+        if self.segment_index < last and along >= route.lengths[self.segment_index] - self.arrival_radius:
+            self.segment_index += 1
+            self._provide_instruction(route.instructions[self.segment_index])
 
     def stop_navigation(self):
         """
@@ -87,3 +312,4 @@ class NavigationAssistance:
             print(f"[Navigation] Navigation to '{self.destination}' canceled or completed.")
         self.is_navigating = False
         self.destination = None
+        self.route = None
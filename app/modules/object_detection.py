@@ -2,6 +2,8 @@
 
 import cv2
 
+from .detections import LABELS, DetectionBatch
+
 class ObjectDetection:
     """
     A simplified object detection module that uses a YOLO-like model 
@@ -28,7 +30,8 @@ class ObjectDetection:
     def detect_objects(self, frame):
         """
         Runs object detection on a single video frame (OpenCV image).
-        
+        Dict view of detect_batch(), for callers outside the frame pipeline.
+
         :param frame: An image in BGR format (numpy array) from an OpenCV capture.
         :return: A list of detection dictionaries. Example format:
                  [
@@ -40,15 +43,27 @@ class ObjectDetection:
                    ...
                  ]
         """
+        return self.detect_batch(frame).to_dicts()
+
+    def detect_batch(self, frame):
+        """
+        Runs object detection on a single video frame and returns the
+        detections as one columnar DetectionBatch (label ids, boxes,
+        confidences) instead of a dict per object.
+
+        :param frame: An image in BGR format (numpy array) from an OpenCV capture.
+        :return: A DetectionBatch (empty if frame is None).
+        """
         if frame is None:
             # No frame to process
-            return []
+            return DetectionBatch.empty()
 
         # In a real system, you would preprocess 'frame' (e.g., resize, normalize),
         # then pass it to your model's inference method. For example:
         #
         # results = self.model(frame)
         # parse out bounding boxes, class labels, confidences
+        # and keep them as arrays: DetectionBatch(class_ids, boxes, scores)
         #
         # The code below is a STUB that always returns one detection.
 
@@ -62,13 +77,5 @@ class ObjectDetection:
         x2 = int(width * 0.6)
         y2 = int(height * 0.6)
 
-        fake_detection = {
-            "label": "chair",
-            "bbox": (x1, y1, x2, y2),
-            "confidence": 0.90
-        }
-
-        # If you had multiple detections, you'd append them all to a list.
-        detections = [fake_detection]
-
-        return detections
+        # If you had multiple detections, you'd add a row per detection.
+        return DetectionBatch([LABELS.intern("chair")], [(x1, y1, x2, y2)], [0.90])
@@ -1,6 +1,11 @@
 # app/modules/object_recognition.py
 
 import json
+import threading
+
+import numpy as np
+
+from .detections import LABELS, DetectionBatch, RecognizedBatch
 
 class ObjectRecognition:
     """
@@ -33,6 +38,12 @@ class ObjectRecognition:
             print(f"[ObjectRecognition] Could not load furniture DB from {furniture_db_path}; using empty dict.")
             self.furniture_db = {}
 
+        # Per detector label id: interned name / type ids (-1 = not looked up yet)
+        self._name_lut = np.full(0, -1, dtype=np.int32)
+        self._type_lut = np.full(0, -1, dtype=np.int32)
+        self._descriptions = {}
+        self._lut_lock = threading.Lock()  # the recognizer is shared by server worker threads
+
     def map_2D_to_3D(self, bbox, camera_pose):
         """
         Convert a 2D bounding box (x1, y1, x2, y2) into a rough 3D position.
@@ -71,6 +82,50 @@ class ObjectRecognition:
         # into the building's coordinate frame. We'll just return as is.
         return (approximate_x, approximate_y, approximate_z)
 
+    def map_boxes_to_3D(self, boxes, camera_pose):
+        """
+        Vectorized map_2D_to_3D for an (N, 4) array of boxes.
+        :return: (N, 3) float array of camera-frame positions.
+        """
+        approximate_image_width = 640.0  # same assumptions as map_2D_to_3D
+        positions = np.zeros((boxes.shape[0], 3))
+        center_x = (boxes[:, 0] + boxes[:, 2]) / 2.0
+        positions[:, 0] = (center_x - approximate_image_width / 2.0) / (approximate_image_width / 2.0)
+        positions[:, 2] = 2.0
+        return positions
+
+    def _lookup(self, label_ids):
+        """Interned (name ids, type ids) for detector label ids, via the furniture DB (cached)."""
+        with self._lut_lock:
+            if label_ids.size and label_ids.max() >= self._name_lut.size:
+                grow = int(label_ids.max()) + 1 - self._name_lut.size
+                self._name_lut = np.concatenate([self._name_lut, np.full(grow, -1, dtype=np.int32)])
+                self._type_lut = np.concatenate([self._type_lut, np.full(grow, -1, dtype=np.int32)])
+            missing = label_ids[self._name_lut[label_ids] < 0]
+            for label_id in set(missing.tolist()):
+                label = LABELS.name(label_id)
+                info = self.recognize_object(label)
+                name_id = LABELS.intern(info.get("name", label))
+                self._type_lut[label_id] = LABELS.intern(info.get("type", "furniture"))
+                self._descriptions[name_id] = info.get("description", "")
+                self._name_lut[label_id] = name_id
+            return self._name_lut[label_ids], self._type_lut[label_ids]
+
+    def recognize_batch(self, detections, camera_pose):
+        """
+        associate_detection for a whole frame at once: positions are computed
+        for all boxes in one NumPy pass and furniture DB info is looked up once
+        per label, not once per object.
+
+        :param detections: A DetectionBatch (or a list of detection dicts).
+        :param camera_pose: e.g. (0.0, 0.0, 0.0) or some orientation data.
+        :return: A RecognizedBatch (iterates as RecognizedObject records).
+        """
+        batch = DetectionBatch.from_records(detections)
+        name_ids, type_ids = self._lookup(batch.label_ids)
+        return RecognizedBatch(name_ids, type_ids, self.map_boxes_to_3D(batch.boxes, camera_pose),
+                               batch.confidences, self._descriptions)
+
     def recognize_object(self, detection_label):
         """
         Match the detection label (e.g. "chair", "table") with known info from
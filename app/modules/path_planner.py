@@ -0,0 +1,463 @@
+# app/modules/path_planner.py
+
+import heapq
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Upper bound on the lattice points sampled per vectorized chunk of triangles
+_MAX_LATTICE_POINTS = 1 << 20
+
+
+class OccupancyGrid:
+    """
+    A 2D occupancy grid of the building floor plane, rasterized from the
+    ingested geometry.
+
+    Conventions: the floor is the XY plane and Z points up. A triangle blocks
+    a cell if part of it lies within the 'obstacle band' (between the floor
+    clearance and the robot/person height), so floors and ceilings stay free
+    while walls and furniture are marked occupied.
+
+    Two layers are kept:
+      - 'occupied': raw rasterized geometry
+      - 'blocked': 'occupied' dilated by the agent radius (used for planning)
+    """
+
+    def __init__(self, building_model, resolution=0.1, agent_radius=0.2,
+                 band=(0.05, 1.8), margin=1.0, default_extent=10.0, lod_tolerance=None):
+        """
+        :param building_model: Data structure from ingestion.py.
+        :param resolution: Cell size in meters.
+        :param agent_radius: Radius (m) used to dilate obstacles for planning.
+        :param band: (z_min, z_max) height band in which geometry blocks movement.
+        :param margin: Free border (m) added around the model's bounding box.
+        :param default_extent: Half-size (m) of the grid if the model has no geometry.
+        :param lod_tolerance: Geometric accuracy (m) needed. If the model carries
+                              levels of detail ("lod"), the coarsest level within
+                              it is rasterized. Defaults to half a cell.
+        """
+        self.resolution = float(resolution)
+        self.agent_radius = float(agent_radius)
+        self.band = band
+        self.lod_tolerance = 0.5 * self.resolution if lod_tolerance is None else lod_tolerance
+
+        vertices, faces = self._geometry_arrays(building_model, self.lod_tolerance)
+        if vertices.shape[0]:
+            lo = vertices[:, :2].min(axis=0) - margin
+            hi = vertices[:, :2].max(axis=0) + margin
+        else:
+            lo = np.array([-default_extent, -default_extent])
+            hi = np.array([default_extent, default_extent])
+
+        self.origin = (float(lo[0]), float(lo[1]))
+        self.cols = int(math.ceil((hi[0] - lo[0]) / self.resolution))
+        self.rows = int(math.ceil((hi[1] - lo[1]) / self.resolution))
+        self.occupied = np.zeros((self.rows, self.cols), dtype=bool)
+        self.blocked = np.zeros((self.rows, self.cols), dtype=bool)
+
+        self.rasterize_triangles(vertices, faces)
+        self.update_blocked()
+
+    @staticmethod
+    def _geometry_arrays(building_model, lod_tolerance=0.0):
+        """
+        :return: (vertices (N, 3) float array, faces (M, 3) int array).
+        """
+        lod = building_model.get("lod") if building_model else None
+        if lod is not None and lod_tolerance > 0:
+            return lod.geometry_arrays(lod_tolerance)
+        geometry = building_model.get("geometry") if building_model else None
+        if not geometry or not isinstance(geometry, dict) or not geometry.get("vertices"):
+            return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+        vertices = np.asarray(geometry["vertices"], dtype=np.float64)[:, :3]
+        triangles = [tuple(f[:3]) for f in geometry.get("faces", []) if len(f) >= 3]
+        faces = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        return vertices, faces
+
+    # ------------------------------------------------------------------
+    # Coordinate helpers
+    # ------------------------------------------------------------------
+
+    def world_to_cell(self, x, y):
+        """Return the (row, col) containing world position (x, y)."""
+        col = int(math.floor((x - self.origin[0]) / self.resolution))
+        row = int(math.floor((y - self.origin[1]) / self.resolution))
+        return row, col
+
+    def cell_to_world(self, row, col):
+        """Return the world (x, y) of a cell center."""
+        return (
+            self.origin[0] + (col + 0.5) * self.resolution,
+            self.origin[1] + (row + 0.5) * self.resolution,
+        )
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols
+
+    def is_free(self, row, col):
+        return self.in_bounds(row, col) and not self.blocked[row, col]
+
+    # ------------------------------------------------------------------
+    # Rasterization
+    # ------------------------------------------------------------------
+
+    def triangle_cells(self, vertices, faces):
+        """
+        Sample triangles at half-cell spacing and return the (rows, cols) of
+        every sample inside the obstacle band.
+        """
+        if faces.shape[0] == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        z_min, z_max = self.band
+        tri = vertices[faces]  # (M, 3, 3)
+        tri_z = tri[:, :, 2]
+        relevant = (tri_z.max(axis=1) >= z_min) & (tri_z.min(axis=1) <= z_max)
+        tri = tri[relevant]
+
+        a, ab, ac = tri[:, 0], tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]
+        edge = np.maximum(np.linalg.norm(ab, axis=1),
+                          np.maximum(np.linalg.norm(ac, axis=1), np.linalg.norm(tri[:, 2] - tri[:, 1], axis=1)))
+        lattice_sizes = np.maximum(np.ceil(edge / (self.resolution * 0.5)).astype(np.int64), 1)
+
+        all_rows = []
+        all_cols = []
+        # Triangles needing the same barycentric lattice are sampled together;
+        # z is evaluated first so x/y are only computed for in-band samples
+        for n in np.unique(lattice_sizes).tolist():
+            i, j = np.meshgrid(np.arange(n + 1), np.arange(n + 1), indexing="ij")
+            keep = (i + j) <= n
+            u = i[keep] / n
+            v = j[keep] / n
+            members = np.flatnonzero(lattice_sizes == n)
+            chunk = max(1, _MAX_LATTICE_POINTS // u.size)
+            for start in range(0, members.size, chunk):
+                k = members[start:start + chunk]
+                z = a[k, 2:3] + u * ab[k, 2:3] + v * ac[k, 2:3]
+                tri_idx, point_idx = np.nonzero((z >= z_min) & (z <= z_max))
+                t = k[tri_idx]
+                pu, pv = u[point_idx], v[point_idx]
+                x = a[t, 0] + pu * ab[t, 0] + pv * ac[t, 0]
+                y = a[t, 1] + pu * ab[t, 1] + pv * ac[t, 1]
+                all_cols.append(np.floor((x - self.origin[0]) / self.resolution).astype(np.int64))
+                all_rows.append(np.floor((y - self.origin[1]) / self.resolution).astype(np.int64))
+
+        if not all_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        rows = np.concatenate(all_rows)
+        cols = np.concatenate(all_cols)
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        return rows[inside], cols[inside]
+
+    def rasterize_triangles(self, vertices, faces):
+        """Mark the cells covered by the given triangles as occupied."""
+        rows, cols = self.triangle_cells(vertices, faces)
+        self.occupied[rows, cols] = True
+
+    def refresh_region(self, building_model, lo, hi, tile_cells=16):
+        """
+        Re-rasterize the part of the grid covered by the XY box lo..hi after
+        the building model changed there (see model_updates.py). Only the
+        tiles of tile_cells x tile_cells cells overlapping the box are cleared
+        and redrawn, from the triangles that overlap them; 'blocked' is then
+        recomputed around those tiles.
+
+        :param building_model: The (updated) building model this grid was built from.
+        :param lo: (x, y) lower corner of the changed area.
+        :param hi: (x, y) upper corner of the changed area.
+        :param tile_cells: Tile edge length in cells.
+        :return: {"tiles": n, "blocked": [(row, col)] newly blocked,
+                  "freed": [(row, col)] newly free}.
+        """
+        row0, col0 = self.world_to_cell(lo[0], lo[1])
+        row1, col1 = self.world_to_cell(hi[0], hi[1])
+        row0, col0 = max(row0 // tile_cells * tile_cells, 0), max(col0 // tile_cells * tile_cells, 0)
+        row1 = min((row1 // tile_cells + 1) * tile_cells, self.rows)
+        col1 = min((col1 // tile_cells + 1) * tile_cells, self.cols)
+        if row0 >= row1 or col0 >= col1:
+            return {"tiles": 0, "blocked": [], "freed": []}
+
+        self.occupied[row0:row1, col0:col1] = False
+        vertices, faces = self._geometry_arrays(building_model, self.lod_tolerance)
+        if faces.shape[0]:
+            x0, y0 = self.origin[0] + col0 * self.resolution, self.origin[1] + row0 * self.resolution
+            x1, y1 = self.origin[0] + col1 * self.resolution, self.origin[1] + row1 * self.resolution
+            tri = vertices[faces]
+            overlaps = ((tri[:, :, 0].max(axis=1) >= x0) & (tri[:, :, 0].min(axis=1) <= x1) &
+                        (tri[:, :, 1].max(axis=1) >= y0) & (tri[:, :, 1].min(axis=1) <= y1))
+            rows, cols = self.triangle_cells(vertices, faces[overlaps])
+            inside = (rows >= row0) & (rows < row1) & (cols >= col0) & (cols < col1)
+            self.occupied[rows[inside], cols[inside]] = True
+
+        # Dilation reaches 'r' cells beyond the redrawn tiles
+        r = int(math.ceil(self.agent_radius / self.resolution))
+        region = (max(row0 - r, 0), min(row1 + r, self.rows), max(col0 - r, 0), min(col1 + r, self.cols))
+        before = self.blocked[region[0]:region[1], region[2]:region[3]].copy()
+        self.update_blocked(region)
+        after = self.blocked[region[0]:region[1], region[2]:region[3]]
+
+        def cells(mask):
+            rows, cols = np.nonzero(mask)
+            return list(zip((rows + region[0]).tolist(), (cols + region[2]).tolist()))
+
+        tiles = -(-(row1 - row0) // tile_cells) * -(-(col1 - col0) // tile_cells)
+        return {"tiles": tiles, "blocked": cells(after & ~before), "freed": cells(before & ~after)}
+
+    def update_blocked(self, region=None):
+        """
+        Recompute the dilated 'blocked' layer, either everywhere or only inside
+        region = (row0, row1, col0, col1) (exclusive upper bounds).
+        """
+        r = int(math.ceil(self.agent_radius / self.resolution))
+        if region is None:
+            region = (0, self.rows, 0, self.cols)
+        row0, row1, col0, col1 = region
+        # Read occupied cells with an r-cell halo so dilation is exact at the region border
+        src_r0, src_r1 = max(row0 - r, 0), min(row1 + r, self.rows)
+        src_c0, src_c1 = max(col0 - r, 0), min(col1 + r, self.cols)
+        source = self.occupied[src_r0:src_r1, src_c0:src_c1]
+        dilated = source.copy()
+        h, w = source.shape
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                if dx == 0 and dy == 0 or math.hypot(dx, dy) > r:
+                    continue
+                dst = dilated[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)]
+                src = source[max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)]
+                np.logical_or(dst, src, out=dst)
+        self.blocked[row0:row1, col0:col1] = dilated[row0 - src_r0:row1 - src_r0,
+                                                     col0 - src_c0:col1 - src_c0]
+
+
+def simplify_path(points, tolerance):
+    """
+    Ramer-Douglas-Peucker simplification of a 2D polyline.
+
+    :param points: Sequence of (x, y) waypoints.
+    :param tolerance: Maximum perpendicular deviation (m) allowed.
+    :return: List of (x, y) points, always keeping the first and last.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 3:
+        return [(float(p[0]), float(p[1])) for p in pts]
+
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a = pts[first]
+        b = pts[last]
+        segment = pts[first + 1:last]
+        ab = b - a
+        norm = math.hypot(ab[0], ab[1])
+        if norm == 0.0:
+            dists = np.hypot(segment[:, 0] - a[0], segment[:, 1] - a[1])
+        else:
+            dists = np.abs(ab[0] * (segment[:, 1] - a[1]) - ab[1] * (segment[:, 0] - a[0])) / norm
+        idx = int(np.argmax(dists))
+        if dists[idx] > tolerance:
+            split = first + 1 + idx
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return [(float(p[0]), float(p[1])) for p in pts[keep]]
+
+
+class GridPlanner:
+    """
+    8-connected A* planner over an OccupancyGrid, with an LRU route cache.
+
+    Planning is read-only on the grid, so one planner can be shared by many
+    robots or users. Callers may pass 'penalty_cells' (e.g., cells reserved
+    by other robots) which are still traversable but more expensive.
+
+    Typical usage:
+      planner = GridPlanner(OccupancyGrid(building_model))
+      waypoints = planner.plan((0.0, 0.0), (5.0, 2.0))
+    """
+
+    NEIGHBORS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+    def __init__(self, grid, cache_size=256):
+        """
+        :param grid: An OccupancyGrid.
+        :param cache_size: Maximum number of cached routes.
+        """
+        self.grid = grid
+        self.cache_size = cache_size
+        self.route_cache = OrderedDict()  # (start_cell, goal_cell) -> list of cells
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def nearest_free_cell(self, row, col, max_radius=20):
+        """
+        Return the closest free cell to (row, col), searching rings outward.
+        """
+        if self.grid.is_free(row, col):
+            return row, col
+        for r in range(1, max_radius + 1):
+            best = None
+            for dr in range(-r, r + 1):
+                for dc in (-r, r) if abs(dr) != r else range(-r, r + 1):
+                    cell = (row + dr, col + dc)
+                    if self.grid.is_free(*cell):
+                        d = dr * dr + dc * dc
+                        if best is None or d < best[0]:
+                            best = (d, cell)
+            if best is not None:
+                return best[1]
+        return None
+
+    def plan_cells(self, start_cell, goal_cell, penalty_cells=None, penalty=5.0):
+        """
+        A* search between two grid cells.
+
+        :param penalty_cells: Optional set of (row, col) with extra traversal cost.
+        :param penalty: Extra cost (in cells) for entering a penalty cell.
+        :return: List of (row, col) from start to goal, or None if unreachable.
+        """
+        start = self.nearest_free_cell(*start_cell)
+        goal = self.nearest_free_cell(*goal_cell)
+        if start is None or goal is None:
+            return None
+
+        # The cache holds unpenalized routes; one that avoids every penalty cell
+        # is also the cheapest route with penalties, since they only add cost
+        key = (start, goal)
+        cached = self.route_cache.get(key)
+        if cached is not None and not self._crosses(cached, penalty_cells):
+            self.route_cache.move_to_end(key)
+            self.cache_hits += 1
+            return list(cached)
+        self.cache_misses += 1
+
+        if cached is None:
+            path = self._astar(start, goal)
+            if path is None:
+                return None
+            self.route_cache[key] = path
+            if len(self.route_cache) > self.cache_size:
+                self.route_cache.popitem(last=False)
+            if not self._crosses(path, penalty_cells):
+                return list(path)
+        return self._astar(start, goal, penalty_cells, penalty)
+
+    @staticmethod
+    def _crosses(path, cells):
+        return bool(cells) and any(cell in cells for cell in path)
+
+    def _astar(self, start, goal, penalty_cells=None, penalty=5.0):
+        """:return: Cheapest list of cells from start to goal, or None if unreachable."""
+        blocked = self.grid.blocked
+        rows, cols = self.grid.rows, self.grid.cols
+        goal_r, goal_c = goal
+
+        def heuristic(r, c):
+            dr = abs(r - goal_r)
+            dc = abs(c - goal_c)
+            return (dr + dc) + (math.sqrt(2) - 2) * min(dr, dc)
+
+        open_heap = [(heuristic(*start), 0.0, start)]
+        came_from = {start: None}
+        g_score = {start: 0.0}
+        path = None
+        while open_heap:
+            _, g, current = heapq.heappop(open_heap)
+            if current == goal:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = came_from[current]
+                path.reverse()
+                break
+            if g > g_score[current]:
+                continue
+            r, c = current
+            for dr, dc in self.NEIGHBORS:
+                nr, nc = r + dr, c + dc
+                if nr < 0 or nr >= rows or nc < 0 or nc >= cols or blocked[nr, nc]:
+                    continue
+                # Do not cut corners diagonally past blocked cells
+                if dr and dc and (blocked[r, nc] or blocked[nr, c]):
+                    continue
+                step = math.sqrt(2) if dr and dc else 1.0
+                if penalty_cells and (nr, nc) in penalty_cells:
+                    step += penalty
+                ng = g + step
+                if ng < g_score.get((nr, nc), float("inf")):
+                    g_score[(nr, nc)] = ng
+                    came_from[(nr, nc)] = current
+                    heapq.heappush(open_heap, (ng + heuristic(nr, nc), ng, (nr, nc)))
+        return path
+
+    def plan(self, start_xy, goal_xy, penalty_cells=None, simplify_tolerance=None):
+        """
+        Plan between two world positions.
+
+        :param start_xy: (x, y) start.
+        :param goal_xy: (x, y) goal.
+        :param penalty_cells: Optional set of (row, col) with extra cost.
+        :param simplify_tolerance: If set, simplify the result with simplify_path.
+        :return: List of (x, y) waypoints (cell centers), or None if unreachable.
+        """
+        cells = self.plan_cells(
+            self.grid.world_to_cell(*start_xy[:2]),
+            self.grid.world_to_cell(*goal_xy[:2]),
+            penalty_cells=penalty_cells,
+        )
+        if cells is None:
+            return None
+        waypoints = [self.grid.cell_to_world(r, c) for r, c in cells]
+        if simplify_tolerance is not None:
+            waypoints = simplify_path(waypoints, simplify_tolerance)
+        return waypoints
+
+    def invalidate_cache(self, cells=None):
+        """
+        Drop cached routes. If 'cells' (a set of (row, col)) is given, only
+        routes passing through one of those cells are removed.
+        """
+        if cells is None:
+            self.route_cache.clear()
+            return
+        stale = [key for key, path in self.route_cache.items()
+                 if any(cell in cells for cell in path)]
+        for key in stale:
+            del self.route_cache[key]
+
+    def invalidate_changed(self, blocked_cells=(), freed_cells=()):
+        """
+        Drop the cached routes a grid change can affect: routes through a
+        newly blocked cell, and routes a newly freed cell could shorten (the
+        octile distance from start to goal through that cell is shorter than
+        the cached route). Other routes stay cached.
+
+        :param blocked_cells: (row, col) cells that became blocked.
+        :param freed_cells: (row, col) cells that became free.
+        :return: Number of routes dropped.
+        """
+        before = len(self.route_cache)
+        if blocked_cells:
+            self.invalidate_cache(set(blocked_cells))
+        if freed_cells and self.route_cache:
+            freed = np.asarray(list(freed_cells), dtype=np.float64).reshape(-1, 2)
+
+            def octile(cell):
+                d = np.abs(freed - cell)
+                return d.sum(axis=1) + (math.sqrt(2) - 2) * d.min(axis=1)
+
+            stale = []
+            for key, path in self.route_cache.items():
+                steps = np.abs(np.diff(np.asarray(path, dtype=np.float64), axis=0)).sum(axis=1)
+                length = float(np.where(steps > 1, math.sqrt(2), steps).sum())
+                if float((octile(key[0]) + octile(key[1])).min()) < length - 1e-9:
+                    stale.append(key)
+            for key in stale:
+                del self.route_cache[key]
+        return before - len(self.route_cache)
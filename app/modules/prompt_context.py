@@ -0,0 +1,214 @@
+# app/modules/prompt_context.py
+
+import math
+import re
+from collections import Counter
+
+from .spatial_index import SpatialHashIndex
+
+
+ROOM_KEYWORDS = ("room", "kitchen", "corridor", "hall", "office", "bathroom", "lobby", "space")
+
+
+def estimate_tokens(text):
+    """
+    Rough token count (about four characters per token for English text).
+    Good enough to keep prompts under a budget without loading a tokenizer.
+    """
+    return len(text) // 4 + 1
+
+
+def describe_direction(lateral, forward):
+    """
+    Describe a camera-frame offset as e.g. "2.1 m ahead", "1.4 m to your left".
+    """
+    distance = math.hypot(lateral, forward)
+    bearing = math.degrees(math.atan2(lateral, forward))  # positive = right
+    side = "right" if bearing > 0 else "left"
+    magnitude = abs(bearing)
+    if magnitude < 15:
+        where = "ahead"
+    elif magnitude < 60:
+        where = f"ahead to your {side}"
+    elif magnitude < 120:
+        where = f"to your {side}"
+    else:
+        where = "behind you"
+    return f"{distance:.1f} m {where}"
+
+
+def is_room(obj):
+    """True for building-model objects that describe a room/space rather than furniture."""
+    if str(obj.get("type", "")).lower() == "ifcspace":
+        return True
+    name = str(obj.get("label") or obj.get("name") or "").lower()
+    return any(keyword in name for keyword in ROOM_KEYWORDS)
+
+
+class PromptContextBuilder:
+    """
+    Builds compact, token-budgeted LLM prompts from the recognized objects
+    and the building model.
+
+    - Only the top-K recognized objects are kept, ranked by query keywords,
+      field of view and distance.
+    - The room containing the user and nearby known objects are summarized
+      from the building model.
+    - The stable part (instructions + building summary) is returned as the
+      system message and never changes for a building, so providers with
+      prefix caching can reuse it across queries.
+
+    Typical usage:
+      builder = PromptContextBuilder(building_model, max_objects=8, token_budget=600)
+      system, prompt = builder.build("Where is the chair?", recognized_objects, user_position)
+    """
+
+    def __init__(self, building_model, system_prompt="", max_objects=8, token_budget=600,
+                 fov_deg=90.0, max_range=8.0, nearby_radius=5.0, max_nearby=5):
+        """
+        :param building_model: Data structure from ingestion.py.
+        :param system_prompt: Fixed instructions placed at the start of the system message.
+        :param max_objects: Maximum number of recognized objects described (top-K).
+        :param token_budget: Approximate token limit for system message + prompt.
+        :param fov_deg: Horizontal field of view; objects inside it rank higher.
+        :param max_range: Recognized objects farther than this are dropped.
+        :param nearby_radius: Radius (m) for known building objects around the user.
+        :param max_nearby: Maximum number of nearby building objects listed.
+        """
+        self.building_model = building_model or {}
+        self.max_objects = max_objects
+        self.token_budget = token_budget
+        self.half_fov = math.radians(fov_deg) / 2.0
+        self.max_range = max_range
+        self.nearby_radius = nearby_radius
+        self.max_nearby = max_nearby
+
+        objects = self.building_model.get("objects", [])
+        self.rooms = [obj for obj in objects if is_room(obj) and obj.get("bounds")]
+        self.index = SpatialHashIndex.from_building_model(
+            {"objects": [obj if not is_room(obj) else {} for obj in objects]})
+
+        # Stable prefix, computed once per building
+        building_summary = self._building_summary()
+        self.system = (system_prompt + "\n" + building_summary).strip()
+        # Never let the stable part take more than half of the budget
+        limit = max(1, self.token_budget // 2) * 4
+        if len(self.system) > limit:
+            self.system = self.system[:limit].rsplit(" ", 1)[0] + " ..."
+
+    def _building_summary(self):
+        counts = Counter(label for label in (item[1] for item in self.index.items.values()) if label)
+        parts = [f"Building model: {len(self.index)} known objects"]
+        if self.rooms:
+            names = sorted({str(r.get("label") or r.get("name")) for r in self.rooms})
+            parts.append("rooms: " + ", ".join(names))
+        if counts:
+            common = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:12]
+            parts.append("object types: " + ", ".join(f"{label} x{n}" for label, n in common))
+        return "; ".join(parts) + "."
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def query_keywords(user_query):
+        return set(re.findall(r"[a-z]+", user_query.lower()))
+
+    def rank_objects(self, user_query, recognized_objects):
+        """
+        :return: Up to max_objects recognized objects, most relevant first.
+        """
+        keywords = self.query_keywords(user_query)
+        scored = []
+        for i, obj in enumerate(recognized_objects or ()):
+            lateral, _, forward = obj.get("position", (0.0, 0.0, 0.0))
+            distance = math.hypot(lateral, forward)
+            if distance > self.max_range:
+                continue
+            name = str(obj.get("name", "")).lower()
+            mentioned = bool(keywords & set(name.split())) or name in keywords
+            in_view = forward > 0 and abs(math.atan2(lateral, forward)) <= self.half_fov
+            score = 10.0 * mentioned + 2.0 * in_view + 1.0 / (1.0 + distance)
+            scored.append((-score, i, obj))
+        scored.sort(key=lambda item: (item[0], item[1]))
+        return [obj for _, _, obj in scored[:self.max_objects]]
+
+    def current_room(self, user_position):
+        """
+        :return: The room object whose XY bounds contain the user, or None.
+        """
+        if user_position is None:
+            return None
+        x, y = user_position[0], user_position[1]
+        for room in self.rooms:
+            lo, hi = room["bounds"]
+            if lo[0] <= x <= hi[0] and lo[1] <= y <= hi[1]:
+                return room
+        return None
+
+    def room_summary(self, user_position):
+        """
+        Compact description of the user's room and the nearest known objects.
+        """
+        if user_position is None:
+            return ""
+        lines = []
+        room = self.current_room(user_position)
+        if room is not None:
+            lo, hi = room["bounds"]
+            lines.append("Current room: {} ({:.0f} x {:.0f} m)".format(
+                room.get("label") or room.get("name"), hi[0] - lo[0], hi[1] - lo[1]))
+        nearby = self.index.query_radius(user_position[:2], self.nearby_radius)[:self.max_nearby]
+        if nearby:
+            lines.append("Nearby known objects: " + ", ".join(
+                f"{label} {dist:.1f} m" for dist, _, _, label in nearby if label))
+        return "\n".join(lines)
+
+    # ------------------------------------------------------------------
+    # Prompt
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def describe_object(obj):
+        lateral, _, forward = obj.get("position", (0.0, 0.0, 0.0))
+        if obj.get("source") == "model":
+            # In view according to the building model, not detected in the frame
+            return "Object: {}, {}, from the building model".format(
+                obj.get("name", "unknown object"), describe_direction(lateral, forward))
+        return "Object: {}, {}, confidence {:.2f}".format(
+            obj.get("name", "unknown object"), describe_direction(lateral, forward),
+            obj.get("confidence", 0.0))
+
+    def build(self, user_query, recognized_objects, user_position=None):
+        """
+        :return: (system, prompt). 'system' is the stable prefix; 'prompt'
+                 holds the room summary, the selected objects and the query,
+                 trimmed so both together stay within token_budget.
+        """
+        question = f"User Query: {user_query}\n"
+        headers = "Environment Data:\n\nRecognized objects (most relevant first):\n\n"
+        budget = (self.token_budget - estimate_tokens(self.system)
+                  - estimate_tokens(question) - estimate_tokens(headers))
+
+        sections = []
+        room = self.room_summary(user_position)
+        if room and estimate_tokens(room) <= budget:
+            sections.append(room)
+            budget -= estimate_tokens(room)
+
+        object_lines = []
+        for obj in self.rank_objects(user_query, recognized_objects):
+            line = self.describe_object(obj)
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            object_lines.append(line)
+            budget -= cost
+        if object_lines:
+            sections.append("Recognized objects (most relevant first):\n" + "\n".join(object_lines))
+        else:
+            sections.append("No objects recognized at the moment.")
+
+        prompt = "Environment Data:\n" + "\n".join(sections) + "\n\n" + question
+        return self.system, prompt
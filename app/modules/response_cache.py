@@ -0,0 +1,179 @@
+# app/modules/response_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+FILLER_WORDS = {"please", "hey", "hi", "ok", "okay", "um", "uh", "now", "right"}
+
+
+def normalize_query(query):
+    """
+    Normalize a spoken query so trivially different phrasings share a cache key:
+    lower-case, punctuation removed, filler words dropped, whitespace collapsed.
+    ("Hey, what am I looking at?" -> "what am i looking at")
+    """
+    words = re.sub(r"[^\w\s]", " ", query.lower()).split()
+    return " ".join(w for w in words if w not in FILLER_WORDS)
+
+
+def scene_digest(recognized_objects, quantum=0.5):
+    """
+    Digest of the recognized-objects set: labels plus positions quantized to
+    'quantum' meters, order-independent. Small detection jitter inside one
+    quantization cell yields the same digest.
+
+    :param recognized_objects: Dicts with "name" and "position" (x, y, z).
+    :return: Short hex string.
+    """
+    entries = []
+    for obj in recognized_objects or ():
+        x, y, z = obj.get("position", (0.0, 0.0, 0.0))
+        entries.append((
+            str(obj.get("name", "unknown")).lower(),
+            int(round(x / quantum)),
+            int(round(y / quantum)),
+            int(round(z / quantum)),
+        ))
+    entries.sort()
+    return hashlib.sha1(repr(entries).encode()).hexdigest()[:16]
+
+
+def location_key(user_position, room=None, quantum=0.5):
+    """
+    Cache-key part for where the user is: the room name (if known) and the
+    XY position quantized to 'quantum' meters. Prompts that summarize the
+    user's room and distances depend on it.
+
+    :return: Short string, or None if the position is unknown.
+    """
+    if user_position is None:
+        return None
+    x, y = user_position[0], user_position[1]
+    return f"{room or '-'}@{int(round(x / quantum))},{int(round(y / quantum))}"
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of LLM answers keyed on (normalized query, scene digest,
+    optional location key). Safe to share between threads (glasses sessions).
+
+    Users ask the same few questions while the scene barely changes; a hit
+    returns the previous answer without invoking the LLM.
+
+    Typical usage:
+      cache = ResponseCache(ttl_s=30.0, path="llm_cache.json")
+      answer = cache.get(query, recognized_objects)
+      if answer is None:
+          answer = ...  # ask the LLM
+          cache.put(query, recognized_objects, answer)
+      cache.save()
+    """
+
+    def __init__(self, ttl_s=30.0, max_entries=256, quantum=0.5, path=None):
+        """
+        :param ttl_s: Seconds an answer stays valid.
+        :param max_entries: Maximum number of entries (least recently used are evicted).
+        :param quantum: Position quantization (m) for the scene digest.
+        :param path: Optional JSON file for on-disk persistence (loaded now, written by save()).
+        """
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.quantum = quantum
+        self.path = path
+        self.entries = OrderedDict()  # key -> (timestamp, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def key(self, query, recognized_objects, location=None):
+        key = normalize_query(query) + "|" + scene_digest(recognized_objects, self.quantum)
+        return key if location is None else key + "|" + location
+
+    def get(self, query, recognized_objects, now=None, location=None):
+        """
+        :param location: Optional location_key(); answers given elsewhere do not match.
+        :return: Cached response, or None on a miss or an expired entry.
+        """
+        now = time.time() if now is None else now
+        key = self.key(query, recognized_objects, location)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl_s:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, query, recognized_objects, response, now=None, location=None):
+        now = time.time() if now is None else now
+        key = self.key(query, recognized_objects, location)
+        with self._lock:
+            self.entries[key] = (now, response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate(),
+        }
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path=None):
+        """
+        Write non-expired entries to 'path' (default: self.path) atomically.
+        """
+        path = path or self.path
+        if not path:
+            return
+        now = time.time()
+        with self._lock:
+            data = [[k, t, r] for k, (t, r) in self.entries.items() if now - t <= self.ttl_s]
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        path = path or self.path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            print(f"[ResponseCache] Could not load cache from {path}: {exc}")
+            return
+        now = time.time()
+        with self._lock:
+            for key, timestamp, response in data:
+                if now - timestamp <= self.ttl_s:
+                    self.entries[key] = (timestamp, response)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -0,0 +1,159 @@
+# app/modules/robot_integration.py
+
+from .instrumentation import get_logger
+
+class RobotBackend:
+    """
+    Interface between RobotIntegration and a concrete robot driver.
+
+    A backend could wrap:
+      - Real hardware (serial motor controller, ROS /cmd_vel + /odom, etc.)
+      - A simulator (see robot_simulation.SimulatedRobotBackend)
+      - A replay of a recorded session
+
+    Subclasses override the methods they support; the defaults describe
+    a robot without odometry or camera.
+    """
+
+    def connect(self):
+        """
+        Open the connection to the robot.
+        :return: True if the robot is ready to receive commands.
+        """
+        return True
+
+    def disconnect(self):
+        """Close the connection and release resources."""
+        pass
+
+    def send_motor_command(self, linear_speed, angular_speed):
+        """
+        Forward a velocity command (m/s, rad/s) to the robot.
+        """
+        pass
+
+    def get_pose(self):
+        """
+        :return: (x, y, theta) from odometry/SLAM, or None if unavailable.
+        """
+        return None
+
+    def set_pose(self, x, y, theta):
+        """
+        Reset the backend's pose estimate (e.g., after relocalization).
+        """
+        pass
+
+    def get_camera_frame(self):
+        """
+        :return: A BGR image (numpy array) or None if no camera is available.
+        """
+        return None
+
+
+class StubRobotBackend(RobotBackend):
+    """
+    Placeholder for real hardware. It accepts every command and provides
+    neither odometry nor camera frames.
+
+    In a real robot you'd replace this with, for example:
+      - rospy publishers/subscribers for /cmd_vel, /odom and /camera/image_raw
+      - pyserial writes to a motor controller
+    """
+    pass
+
+
+class RobotIntegration:
+    """
+    Manages the interface between the framework and the robot.
+
+    Responsibilities:
+      - Connect to the robot through a pluggable backend (hardware stub, simulator, replay).
+      - Send motor commands (linear/angular velocity).
+      - Track the robot pose (x, y, theta) in the building coordinate system.
+      - Retrieve camera frames for object detection.
+
+    Typical usage:
+      robot = RobotIntegration()                                  # hardware stub
+      robot = RobotIntegration(SimulatedRobotBackend(model))      # headless simulator
+      robot.connect_robot_hardware()
+      robot.send_motor_command(0.1, 0.0)
+    """
+
+    def __init__(self, backend=None, verbose=True):
+        """
+        :param backend: A RobotBackend instance. Defaults to StubRobotBackend.
+        :param verbose: If True, motor commands are logged (at most one line per second,
+                        repeats are counted). Disable for load tests or any loop running many robots.
+        """
+        self.backend = backend if backend is not None else StubRobotBackend()
+        self.verbose = verbose
+        self.log = get_logger("RobotIntegration")
+        self.connected = False
+        self.current_pose = (0.0, 0.0, 0.0)  # (x, y, theta)
+
+    def connect_robot_hardware(self):
+        """
+        Connect to the robot via the configured backend.
+        """
+        print(f"[RobotIntegration] Connecting via {type(self.backend).__name__}...")
+        self.connected = bool(self.backend.connect())
+        if self.connected:
+            print("[RobotIntegration] Robot connected.")
+        else:
+            print("[RobotIntegration] Robot NOT connected.")
+
+    def send_motor_command(self, linear_speed, angular_speed):
+        """
+        Send a velocity command to the robot.
+
+        :param linear_speed: Forward speed in m/s.
+        :param angular_speed: Turn rate in rad/s (positive = counter-clockwise).
+        """
+        if not self.connected:
+            self.log.warning("Warning: Robot not connected. Ignoring motor command.")
+            return
+
+        if self.verbose:
+            self.log.info("Motor cmd - lin: %.2f, ang: %.2f", linear_speed, angular_speed, key="motor")
+        self.backend.send_motor_command(linear_speed, angular_speed)
+
+    def get_robot_pose(self):
+        """
+        Return the current robot pose (x, y, theta). Backends with odometry
+        refresh the pose; otherwise the last value set is returned.
+        """
+        if self.connected:
+            pose = self.backend.get_pose()
+            if pose is not None:
+                self.current_pose = pose
+        return self.current_pose
+
+    def set_robot_pose(self, x, y, theta):
+        """
+        Overwrite the robot pose, e.g. after relocalization against the building model.
+        """
+        self.current_pose = (x, y, theta)
+        if self.connected:
+            self.backend.set_pose(x, y, theta)
+            if self.verbose:
+                print(f"[RobotIntegration] Pose set to (x={x:.2f}, y={y:.2f}, theta={theta:.2f})")
+
+    def get_robot_camera_frame(self):
+        """
+        Retrieve the latest camera frame from the robot.
+        :return: An image in BGR format (numpy array) or None if not available.
+        """
+        if not self.connected:
+            return None
+        return self.backend.get_camera_frame()
+
+    def disconnect(self):
+        """
+        Stop the robot and close the backend connection.
+        """
+        if self.connected:
+            self.backend.send_motor_command(0.0, 0.0)
+            self.backend.disconnect()
+        self.connected = False
+        print("[RobotIntegration] Robot disconnected.")
@@ -17,18 +17,31 @@ class RobotNavigation:
     RobotNavigation module in Python.
     """
 
-    def __init__(self, building_model, robot_integration):
+    def __init__(self, building_model, robot_integration, costmap=None):
         """
         :param building_model: Data structure from ingestion, describing the environment.
         :param robot_integration: Instance of RobotIntegration for sending motor commands 
                                   and receiving pose updates.
+        :param costmap: Optional LocalCostmap for transient obstacles. When given,
+                        every update re-centers it on the robot and checks the
+                        point ahead for collisions before driving forward.
         """
         self.building_model = building_model
         self.robot_integration = robot_integration
+        self.costmap = costmap
 
         # If the robot is told to go somewhere, store the target here
         self.target_location = None   # (x, y) in building coordinate space
         self.arrival_threshold = 0.2  # distance in meters for "close enough"
+        self.lookahead_distance = 0.3 # distance in meters probed for obstacles
+        self.blocked = False
+
+        # Optional planned route (list of (x, y)); the last waypoint is the target
+        self.waypoints = []
+        self.waypoint_threshold = 0.15   # distance in meters to advance to the next waypoint
+        self.max_linear_speed = 0.3      # m/s when following a planned route
+        self.heading_gain = 1.5          # rad/s per rad of heading error
+        self.max_angular_speed = 1.0     # rad/s
 
     def set_destination(self, x, y):
         """
@@ -41,11 +54,56 @@ class RobotNavigation:
         self.target_location = (x, y)
         print(f"[RobotNavigation] Destination set to (x={x:.2f}, y={y:.2f})")
 
+    def set_path(self, waypoints):
+        """
+        Follow a planned route, e.g. from GridPlanner.plan(). The robot steers
+        toward each waypoint in turn; the last waypoint becomes the destination.
+
+        :param waypoints: List of (x, y) in building coordinates.
+        """
+        if not waypoints:
+            self.clear_destination()
+            return
+        self.waypoints = [tuple(w[:2]) for w in waypoints]
+        self.target_location = self.waypoints[-1]
+        print(f"[RobotNavigation] Following path with {len(self.waypoints)} waypoint(s) "
+              f"to (x={self.target_location[0]:.2f}, y={self.target_location[1]:.2f})")
+
+    def current_waypoint(self):
+        """Return the waypoint the robot is currently heading to, or the target."""
+        return self.waypoints[0] if self.waypoints else self.target_location
+
     def clear_destination(self):
         """Clear the current destination, causing the robot to stop navigating."""
         self.target_location = None
+        self.waypoints = []
         print("[RobotNavigation] Destination cleared.")
 
+    def update_obstacles(self, recognized_objects, pose=None):
+        """
+        Feed recognized objects (camera-frame positions) into the local costmap.
+
+        :param recognized_objects: Output of ObjectRecognition.associate_detection.
+        :param pose: Robot pose (x, y, theta) at capture time; defaults to the current pose.
+        """
+        if self.costmap is None:
+            return
+        if pose is None:
+            pose = self.robot_integration.get_robot_pose()
+        self.costmap.update_origin(pose[0], pose[1])
+        self.costmap.update_from_recognized_objects(recognized_objects, pose)
+
+    def _path_blocked(self, pose):
+        """
+        Check the costmap at the robot position and 'lookahead_distance' ahead.
+        """
+        x_now, y_now, theta_now = pose
+        self.costmap.update_origin(x_now, y_now)
+        self.costmap.update()
+        x_ahead = x_now + self.lookahead_distance * math.cos(theta_now)
+        y_ahead = y_now + self.lookahead_distance * math.sin(theta_now)
+        return self.costmap.is_collision(x_ahead, y_ahead)
+
     def update_navigation(self):
         """
         Called periodically (e.g., in the main loop) to move the robot toward the target
@@ -76,7 +134,25 @@ class RobotNavigation:
             self.clear_destination()
             return
 
-        # 5. Otherwise, move forward
+        # 5. Stop in front of transient obstacles (only report state changes)
+        if self.costmap is not None:
+            blocked = self._path_blocked(current_pose)
+            if blocked != self.blocked:
+                self.blocked = blocked
+                if blocked:
+                    print("[RobotNavigation] Obstacle ahead. Waiting for path to clear.")
+                else:
+                    print("[RobotNavigation] Path clear. Resuming.")
+            if blocked:
+                self.robot_integration.send_motor_command(0.0, 0.0)
+                return
+
+        # 6. With a planned route, steer toward the current waypoint
+        if self.waypoints:
+            self._follow_waypoints(current_pose)
+            return
+
+        # 7. Otherwise, move forward
         #    This is a naive approach. A real approach might:
         #      - Compute heading error
         #      - Rotate the robot towards the heading
@@ -86,3 +162,25 @@ class RobotNavigation:
         angular_speed = 0.0 # no turning in this simplified approach
 
         self.robot_integration.send_motor_command(linear_speed, angular_speed)
+
+    def _follow_waypoints(self, pose):
+        """
+        Proportional heading controller toward the current waypoint.
+        Rotates in place when the heading error is large.
+        """
+        x_now, y_now, theta_now = pose
+        while len(self.waypoints) > 1:
+            wx, wy = self.waypoints[0]
+            if math.hypot(wx - x_now, wy - y_now) > self.waypoint_threshold:
+                break
+            self.waypoints.pop(0)
+
+        wx, wy = self.waypoints[0]
+        desired = math.atan2(wy - y_now, wx - x_now)
+        error = math.atan2(math.sin(desired - theta_now), math.cos(desired - theta_now))
+        angular_speed = max(-self.max_angular_speed, min(self.max_angular_speed, self.heading_gain * error))
+        if abs(error) > math.pi / 4:
+            linear_speed = 0.0
+        else:
+            linear_speed = self.max_linear_speed * math.cos(error)
+        self.robot_integration.send_motor_command(linear_speed, angular_speed)
@@ -0,0 +1,275 @@
+# app/modules/robot_simulation.py
+
+import math
+import time
+
+import numpy as np
+
+from .costmap import LocalCostmap
+from .robot_integration import RobotBackend, RobotIntegration
+from .robot_navigation import RobotNavigation
+
+
+def model_points(building_model, edge_spacing=0.05, lod_tolerance=None):
+    """
+    Extract an (N, 3) array of world points describing the building geometry:
+    all vertices plus points sampled along every face edge, so a renderer can
+    draw a wireframe by projecting points only.
+
+    :param building_model: Data structure from ingestion.py.
+    :param edge_spacing: Distance (m) between samples along each edge.
+    :param lod_tolerance: If given and the model carries levels of detail,
+                          use the coarsest level within this accuracy (m).
+    :return: float64 array of shape (N, 3); empty if the model has no geometry.
+    """
+    lod = building_model.get("lod") if building_model else None
+    geometry = building_model.get("geometry") if building_model else None
+    if lod is not None and lod_tolerance:
+        vertices, faces = lod.geometry_arrays(lod_tolerance)
+    elif not geometry or not isinstance(geometry, dict) or not geometry.get("vertices"):
+        return np.zeros((0, 3), dtype=np.float64)
+    else:
+        vertices = np.asarray(geometry["vertices"], dtype=np.float64)[:, :3]
+        faces = geometry.get("faces", [])
+    # Every face edge as a (start, end) vertex index pair; faces may be ragged polygons
+    sizes = np.fromiter((len(face) for face in faces), dtype=np.int64, count=len(faces))
+    if not sizes.sum():
+        return vertices
+    flat = np.concatenate([np.asarray(face, dtype=np.int64) for face in faces if len(face)])
+    sizes = sizes[sizes > 0]
+    first = np.cumsum(sizes) - sizes
+    nxt = np.arange(1, flat.size + 1)
+    nxt[first + sizes - 1] = first  # close each polygon
+    edges = np.stack([flat, flat[nxt]], axis=1)  # (E, 2)
+
+    starts = vertices[edges[:, 0]]
+    spans = vertices[edges[:, 1]] - starts
+    counts = np.maximum((np.linalg.norm(spans, axis=1) / edge_spacing).astype(np.int64), 1)
+    edge_of = np.repeat(np.arange(edges.shape[0]), counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = (step * (1.0 / counts)[edge_of])[:, None]
+    return np.concatenate([vertices, starts[edge_of] + t * spans[edge_of]], axis=0)
+
+
+class SyntheticCameraRenderer:
+    """
+    Renders cheap synthetic camera frames of the building model from a robot pose.
+
+    The geometry is converted once into a point cloud (vertices + edge samples).
+    Each render is a single vectorized pinhole projection into a caller-provided
+    buffer, so one renderer can be shared by many simulated robots.
+
+    Conventions: the building's floor is the XY plane and Z points up.
+    """
+
+    def __init__(self, building_model, frame_size=(240, 320), hfov_deg=70.0,
+                 camera_height=0.5, max_depth=15.0, lod_tolerance=0.05):
+        """
+        :param building_model: Data structure from ingestion.py.
+        :param frame_size: (height, width) of rendered frames.
+        :param hfov_deg: Horizontal field of view in degrees.
+        :param camera_height: Camera height above the floor in meters.
+        :param max_depth: Points farther than this are not drawn.
+        :param lod_tolerance: Geometric accuracy (m) of the drawn wireframe (see model_points).
+        """
+        self.height, self.width = frame_size
+        self.camera_height = camera_height
+        self.max_depth = max_depth
+        self.fx = (self.width / 2.0) / math.tan(math.radians(hfov_deg) / 2.0)
+        self.fy = self.fx
+        self.cx = self.width / 2.0
+        self.cy = self.height / 2.0
+        self.points = model_points(building_model, lod_tolerance=lod_tolerance)
+
+        # Static background: darker "ceiling" above the horizon, lighter "floor" below
+        rows = np.linspace(40, 120, self.height, dtype=np.float64)
+        self.background = np.repeat(rows[:, None], self.width, axis=1).astype(np.uint8)
+        self.background = np.repeat(self.background[:, :, None], 3, axis=2)
+
+    def new_frame_buffer(self):
+        """Allocate a frame buffer suitable for render()."""
+        return np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def render(self, pose, out):
+        """
+        Render the model as seen from the robot pose into 'out'.
+
+        :param pose: (x, y, theta) robot pose.
+        :param out: Buffer from new_frame_buffer(); it is overwritten and returned.
+        """
+        np.copyto(out, self.background)
+        if self.points.shape[0] == 0:
+            return out
+
+        x, y, theta = pose
+        cos_t = math.cos(theta)
+        sin_t = math.sin(theta)
+        dx = self.points[:, 0] - x
+        dy = self.points[:, 1] - y
+        dz = self.points[:, 2] - self.camera_height
+
+        depth = dx * cos_t + dy * sin_t
+        right = dx * sin_t - dy * cos_t
+        visible = (depth > 0.1) & (depth < self.max_depth)
+        if not visible.any():
+            return out
+
+        depth = depth[visible]
+        u = (self.cx + self.fx * right[visible] / depth).astype(np.int64)
+        v = (self.cy - self.fy * dz[visible] / depth).astype(np.int64)
+        inside = (u >= 0) & (u < self.width) & (v >= 0) & (v < self.height)
+
+        shade = (255.0 - np.clip(depth[inside] * (200.0 / self.max_depth), 0.0, 200.0)).astype(np.uint8)
+        out[v[inside], u[inside]] = shade[:, None]
+        return out
+
+
+class SimulatedRobotBackend(RobotBackend):
+    """
+    Deterministic headless robot for tests and load testing.
+
+    Motor commands are integrated with an exact unicycle model over a fixed
+    time step 'dt'. Simulated time only advances when a command is sent (or
+    step() is called), never with the wall clock, so a run is fully
+    reproducible and can execute as fast as the CPU allows.
+    """
+
+    def __init__(self, building_model=None, dt=0.05, start_pose=(0.0, 0.0, 0.0),
+                 renderer=None, frame_size=(240, 320), seed=0, pixel_noise=0,
+                 max_linear=1.0, max_angular=2.0):
+        """
+        :param building_model: Data structure from ingestion.py (used to render frames).
+        :param dt: Simulated seconds per control step.
+        :param start_pose: Initial (x, y, theta).
+        :param renderer: Optional shared SyntheticCameraRenderer. Share one renderer
+                         across robots of the same building to avoid duplicate geometry.
+        :param frame_size: (height, width) used when creating a private renderer.
+        :param seed: Seed for the deterministic pixel noise generator.
+        :param pixel_noise: Max amplitude of uniform pixel noise (0 disables it).
+        :param max_linear: Speed limit in m/s.
+        :param max_angular: Turn rate limit in rad/s.
+        """
+        self.dt = dt
+        self.pose = tuple(float(v) for v in start_pose)
+        self.renderer = renderer if renderer is not None else SyntheticCameraRenderer(
+            building_model, frame_size=frame_size)
+        self.frame = self.renderer.new_frame_buffer()
+        self.pixel_noise = pixel_noise
+        self.rng = np.random.default_rng(seed)
+        self.max_linear = max_linear
+        self.max_angular = max_angular
+        self.command = (0.0, 0.0)
+        self.sim_time = 0.0
+        self.steps = 0
+
+    def connect(self):
+        return True
+
+    def send_motor_command(self, linear_speed, angular_speed):
+        """
+        Store the (clamped) command and advance the simulation by one step.
+        """
+        linear = max(-self.max_linear, min(self.max_linear, linear_speed))
+        angular = max(-self.max_angular, min(self.max_angular, angular_speed))
+        self.command = (linear, angular)
+        self.step()
+
+    def step(self, dt=None):
+        """
+        Integrate the current command over 'dt' seconds.
+        """
+        dt = self.dt if dt is None else dt
+        v, w = self.command
+        x, y, theta = self.pose
+        if abs(w) < 1e-9:
+            x += v * dt * math.cos(theta)
+            y += v * dt * math.sin(theta)
+        else:
+            new_theta = theta + w * dt
+            x += (v / w) * (math.sin(new_theta) - math.sin(theta))
+            y -= (v / w) * (math.cos(new_theta) - math.cos(theta))
+            theta = math.atan2(math.sin(new_theta), math.cos(new_theta))
+        self.pose = (x, y, theta)
+        self.sim_time += dt
+        self.steps += 1
+
+    def get_pose(self):
+        return self.pose
+
+    def set_pose(self, x, y, theta):
+        self.pose = (float(x), float(y), float(theta))
+
+    def get_camera_frame(self):
+        """
+        Render the current view. The returned array is reused by the next call.
+        """
+        frame = self.renderer.render(self.pose, self.frame)
+        if self.pixel_noise:
+            noise = self.rng.integers(0, self.pixel_noise + 1, size=frame.shape, dtype=np.uint8)
+            np.add(frame, noise, out=frame, casting="unsafe")
+        return frame
+
+
+def run_load_test(building_model, detector, recognizer, n_robots=10, n_ticks=100,
+                  dt=0.05, seed=0, frame_size=(240, 320)):
+    """
+    Run the full robot perception + navigation stack for many simulated robots
+    in one process, in lockstep, as fast as possible.
+
+    Each tick, every robot: renders a frame, runs detection and recognition,
+    updates its local costmap and runs RobotNavigation (which sends one motor
+    command, advancing its simulator by 'dt').
+
+    :param building_model: Data structure from ingestion.py (shared by all robots).
+    :param detector: ObjectDetection instance (shared).
+    :param recognizer: ObjectRecognition instance (shared).
+    :param n_robots: Number of simulated robots.
+    :param n_ticks: Control ticks to simulate.
+    :param dt: Simulated seconds per tick.
+    :param seed: Seed for start poses and goals.
+    :return: Dict with timing statistics, including 'realtime_factor'
+             (simulated seconds per wall-clock second; > 1 is faster than real time).
+    """
+    rng = np.random.default_rng(seed)
+    renderer = SyntheticCameraRenderer(building_model, frame_size=frame_size)
+
+    robots = []
+    for i in range(n_robots):
+        start = (float(rng.uniform(-5, 5)), float(rng.uniform(-5, 5)), float(rng.uniform(-math.pi, math.pi)))
+        backend = SimulatedRobotBackend(dt=dt, start_pose=start, renderer=renderer, seed=seed + i)
+        robot = RobotIntegration(backend, verbose=False)
+        robot.connect_robot_hardware()
+        # Obstacle decay follows simulated time, so results do not depend on machine speed
+        nav = RobotNavigation(building_model, robot, costmap=LocalCostmap(clock=lambda b=backend: b.sim_time))
+        # RobotNavigation drives straight ahead, so place goals along the start heading
+        distance = float(rng.uniform(1.0, 4.0))
+        nav.set_destination(start[0] + distance * math.cos(start[2]),
+                            start[1] + distance * math.sin(start[2]))
+        robots.append((robot, nav))
+
+    tick_times = np.zeros(n_ticks * n_robots, dtype=np.float64)
+    wall_start = time.perf_counter()
+    k = 0
+    for _ in range(n_ticks):
+        for robot, nav in robots:
+            t0 = time.perf_counter()
+            frame = robot.get_robot_camera_frame()
+            pose = robot.get_robot_pose()
+            detections = detector.detect_batch(frame)
+            recognized = recognizer.recognize_batch(detections, camera_pose=pose)
+            nav.update_obstacles(recognized, pose=pose)
+            nav.update_navigation()
+            tick_times[k] = time.perf_counter() - t0
+            k += 1
+    wall_time = time.perf_counter() - wall_start
+
+    sim_time = n_ticks * dt
+    return {
+        "n_robots": n_robots,
+        "n_ticks": n_ticks,
+        "sim_time_s": sim_time,
+        "wall_time_s": wall_time,
+        "realtime_factor": sim_time / wall_time if wall_time > 0 else float("inf"),
+        "robot_tick_mean_ms": float(tick_times.mean() * 1000.0) if k else 0.0,
+        "robot_tick_p95_ms": float(np.percentile(tick_times, 95) * 1000.0) if k else 0.0,
+    }
@@ -0,0 +1,258 @@
+# app/modules/scheduler.py
+
+import math
+import time
+
+from .instrumentation import telemetry
+
+
+class PeriodicTask:
+    """One periodic job of a LoopScheduler and its run statistics."""
+
+    def __init__(self, name, fn, rate_hz, priority):
+        self.name = name
+        self.fn = fn
+        self.rate_hz = float(rate_hz)
+        self.period = 1.0 / self.rate_hz
+        self.priority = priority
+        self.next_due = None
+        self.runs = 0
+        self.shed = 0
+        self.overruns = 0   # periods skipped because the task ran late
+        self.busy_s = 0.0
+        self.max_s = 0.0
+        self.avg_s = None   # moving average of the run time
+        self._shed_counter = telemetry.counter("scheduler_shed", {"task": name})
+
+    def advance(self, now):
+        """
+        Move the deadline past 'now', skipping (not replaying) missed periods.
+        :return: Number of periods missed.
+        """
+        self.next_due += self.period
+        if self.next_due > now:
+            return 0
+        missed = math.floor((now - self.next_due) / self.period) + 1
+        self.next_due += missed * self.period
+        self.overruns += missed
+        return missed
+
+    def load(self):
+        """Expected busy fraction at the target rate (from the average run time)."""
+        return 0.0 if self.avg_s is None else self.avg_s * self.rate_hz
+
+
+class LoopScheduler:
+    """
+    Cooperative, rate-controlled main loop.
+
+    Each task declares a target rate and a priority (0 = highest). The loop
+    runs whatever is due in priority order, then sleeps until the next
+    deadline (a coarse sleep followed by a short spin, so deadlines are met
+    without burning a core). Late tasks skip the periods they missed rather
+    than running back-to-back to catch up.
+
+    Load shedding: every 'window_s' the loop counts as overloaded if the
+    fraction of time spent inside tasks exceeds 'overload_threshold' or a
+    task above the lowest running priority missed a deadline. The lowest
+    running priority level is then shed (its due runs are skipped and
+    counted). A shed level is restored once the current load plus its
+    expected load stays below 'recover_threshold', or after 'probe_s' to
+    re-measure it. Priority 0 is never shed.
+
+    Typical usage:
+      scheduler = LoopScheduler()
+      scheduler.add_task("capture", user_interact.capture_frame, rate_hz=30, priority=0)
+      scheduler.add_task("detection", user_interact.process_frame, rate_hz=15, priority=2)
+      scheduler.run()                     # until stop() or Ctrl+C
+      print(scheduler.stats())
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, cpu_clock=time.process_time,
+                 overload_threshold=0.9, recover_threshold=0.7, window_s=2.0, probe_s=10.0,
+                 spin_s=0.0005):
+        """
+        :param clock: Monotonic time source (seconds).
+        :param sleep: Sleep function matching 'clock'.
+        :param cpu_clock: Process CPU time source, for the CPU utilization report.
+        :param overload_threshold: Busy fraction above which a priority level is shed.
+        :param recover_threshold: Busy fraction below which a shed level is restored.
+        :param window_s: Length of the load measurement window.
+        :param probe_s: Time after which a shed level is restored to re-measure its load.
+        :param spin_s: Final part of each wait spent spinning instead of sleeping (0 disables).
+        """
+        self.clock = clock
+        self.sleep = sleep
+        self.cpu_clock = cpu_clock
+        self.overload_threshold = overload_threshold
+        self.recover_threshold = recover_threshold
+        self.window_s = window_s
+        self.probe_s = probe_s
+        self.spin_s = spin_s
+        self.tasks = []
+        self.max_priority = None   # None = run every priority level
+        self.running = False
+        self._start = None
+        self._cpu_start = None
+        self._window_start = None
+        self._window_busy = 0.0
+        self._window_misses = 0    # deadline misses of tasks above the lowest running level
+        self._shed_since = None
+        self.utilization = 0.0     # busy fraction of the last complete window
+
+    def add_task(self, name, fn, rate_hz, priority=1):
+        """
+        :param name: Task name used in stats().
+        :param fn: Callable run once per period.
+        :param rate_hz: Target rate.
+        :param priority: 0 = highest (never shed); larger numbers are shed first.
+        :return: The PeriodicTask.
+        """
+        if rate_hz <= 0:
+            raise ValueError(f"Task '{name}' needs a positive rate, got {rate_hz}")
+        task = PeriodicTask(name, fn, rate_hz, priority)
+        self.tasks.append(task)
+        return task
+
+    def _lowest_priority(self):
+        return max((t.priority for t in self.tasks), default=0)
+
+    def _running_floor(self):
+        """Lowest priority level (largest number) currently allowed to run."""
+        return self._lowest_priority() if self.max_priority is None else self.max_priority
+
+    def _allowed(self, task):
+        return task.priority == 0 or self.max_priority is None or task.priority <= self.max_priority
+
+    def _begin(self):
+        now = self.clock()
+        self._start = self._window_start = now
+        self._cpu_start = self.cpu_clock()
+        for task in self.tasks:
+            task.next_due = now
+
+    def _update_load(self, now):
+        elapsed = now - self._window_start
+        if elapsed < self.window_s:
+            return
+        self.utilization = self._window_busy / elapsed
+        misses = self._window_misses
+        self._window_start = now
+        self._window_busy = 0.0
+        self._window_misses = 0
+        current = self._running_floor()
+        levels = sorted({t.priority for t in self.tasks})
+        if (self.utilization > self.overload_threshold or misses) and current > 0:
+            self.max_priority = max(p for p in levels if p < current)
+            self._shed_since = now
+            print(f"[LoopScheduler] Overloaded ({100 * self.utilization:.0f}% busy, {misses} missed "
+                  f"deadline(s)): shedding priority > {self.max_priority}")
+            return
+        if self.max_priority is None:
+            return
+        level = min(p for p in levels if p > self.max_priority)
+        projected = self.utilization + sum(t.load() for t in self.tasks if t.priority == level)
+        if projected < self.recover_threshold or now - self._shed_since >= self.probe_s:
+            self.max_priority = None if level == levels[-1] else level
+            self._shed_since = now
+            print(f"[LoopScheduler] Restoring priority {level} ({100 * self.utilization:.0f}% busy)")
+
+    def run_once(self):
+        """
+        Run every task that is due (highest priority first), then update the
+        load estimate. Does not sleep.
+        :return: Number of tasks run.
+        """
+        if self._start is None:
+            self._begin()
+        now = self.clock()
+        due = sorted((t for t in self.tasks if t.next_due <= now), key=lambda t: (t.priority, t.next_due))
+        ran = 0
+        for task in due:
+            if not self._allowed(task):
+                task.shed += 1
+                task._shed_counter.inc()
+                task.next_due += task.period * (math.floor((now - task.next_due) / task.period) + 1)
+                continue
+            start = self.clock()
+            task.fn()
+            end = self.clock()
+            duration = end - start
+            task.runs += 1
+            task.busy_s += duration
+            task.max_s = max(task.max_s, duration)
+            task.avg_s = duration if task.avg_s is None else 0.8 * task.avg_s + 0.2 * duration
+            self._window_busy += duration
+            missed = task.advance(end)
+            if missed and task.priority < self._running_floor():
+                self._window_misses += missed
+            ran += 1
+        self._update_load(self.clock())
+        return ran
+
+    def next_deadline(self):
+        return min(t.next_due for t in self.tasks)
+
+    def sleep_until(self, deadline):
+        """Sleep coarsely, then spin for the last 'spin_s' seconds."""
+        remaining = deadline - self.clock()
+        if remaining > self.spin_s:
+            self.sleep(remaining - self.spin_s)
+        if self.spin_s > 0:
+            while self.clock() < deadline:
+                pass
+
+    def run(self, duration=None, stop_when=None):
+        """
+        Run until stop() is called, 'duration' seconds have passed or
+        stop_when() returns True.
+        """
+        if not self.tasks:
+            raise ValueError("LoopScheduler has no tasks")
+        if self._start is None:
+            self._begin()
+        end = None if duration is None else self.clock() + duration
+        self.running = True
+        while self.running:
+            if stop_when is not None and stop_when():
+                break
+            self.run_once()
+            deadline = self.next_deadline()
+            if end is not None:
+                if self.clock() >= end:
+                    break
+                deadline = min(deadline, end)
+            self.sleep_until(deadline)
+        self.running = False
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        """
+        :return: Wall time, busy and CPU utilization, and per task the target
+                 vs achieved rate, shed / overrun counts and run times.
+        """
+        if self._start is None:
+            return {"wall_s": 0.0, "busy_utilization": 0.0, "cpu_utilization": 0.0, "tasks": {}}
+        wall = max(self.clock() - self._start, 1e-9)
+        busy = sum(t.busy_s for t in self.tasks)
+        return {
+            "wall_s": round(wall, 3),
+            "busy_utilization": round(busy / wall, 3),
+            "cpu_utilization": round((self.cpu_clock() - self._cpu_start) / wall, 3),
+            "shedding_above_priority": self.max_priority,
+            "tasks": {
+                t.name: {
+                    "priority": t.priority,
+                    "target_hz": t.rate_hz,
+                    "achieved_hz": round(t.runs / wall, 2),
+                    "runs": t.runs,
+                    "shed": t.shed,
+                    "overruns": t.overruns,
+                    "mean_ms": round(1000.0 * t.busy_s / t.runs, 3) if t.runs else 0.0,
+                    "max_ms": round(1000.0 * t.max_s, 3),
+                }
+                for t in self.tasks
+            },
+        }
@@ -0,0 +1,476 @@
+# app/modules/session_recording.py
+
+import bisect
+import json
+import struct
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+from .glasses_integration import GlassesIntegration
+from .robot_integration import RobotBackend
+
+
+# File layout:
+#   MAGIC
+#   chunk*            each: CHUNK_HEADER (n_bytes) + zlib-compressed records
+#   index (JSON)      chunk offsets/time ranges + metadata
+#   FOOTER            (index offset, index length, FOOTER_MAGIC)
+# A record is RECORD_HEADER (t, kind, n_bytes) + payload. Frames are stored
+# as encoded images (JPEG by default), the other streams as small structs.
+MAGIC = b"SARSESS1"
+FOOTER_MAGIC = b"SARINDX1"
+CHUNK_HEADER = struct.Struct("<I")
+RECORD_HEADER = struct.Struct("<dBI")
+FOOTER = struct.Struct("<QQ8s")
+VECTOR3 = struct.Struct("<3d")
+
+FRAME, HEAD, POSE, VOICE = 1, 2, 3, 4
+KIND_NAMES = {FRAME: "frame", HEAD: "head", POSE: "pose", VOICE: "voice"}
+
+
+class SessionFormatError(Exception):
+    """Raised when a file is not a valid (or complete) session recording."""
+
+
+class SessionWriter:
+    """
+    Records the live inputs of a run into one chunked, seekable file:
+    camera frames (image-compressed), head orientation, robot poses and
+    voice commands, each with a timestamp (seconds since the recording started).
+
+    Records are grouped into chunks of 'chunk_seconds' that are compressed
+    independently; an index of chunk offsets written on close() lets a reader
+    seek to any time without decompressing the preceding chunks.
+
+    Typical usage:
+      with SessionWriter("session.sar") as writer:
+          writer.write_frame(frame)
+          writer.write_head_orientation((yaw, pitch, roll))
+          writer.write_voice_command("Where is the fridge?")
+    """
+
+    def __init__(self, path, chunk_seconds=1.0, frame_format=".jpg", jpeg_quality=90, metadata=None):
+        """
+        :param path: Output file.
+        :param chunk_seconds: Time span of one chunk (seek granularity).
+        :param frame_format: ".jpg" (compact) or ".png" (lossless).
+        :param jpeg_quality: JPEG quality (0-100).
+        :param metadata: Optional JSON-serializable dict stored in the index.
+        """
+        self.path = path
+        self.chunk_seconds = chunk_seconds
+        self.frame_format = frame_format
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if frame_format == ".jpg" else []
+        self.metadata = dict(metadata or {}, frame_format=frame_format, created=time.time())
+
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.chunks = []  # [offset, n_bytes, t_start, t_end]
+        self.counts = {name: 0 for name in KIND_NAMES.values()}
+        self._buffer = []
+        self._chunk_start = None
+        self._t0 = None
+        self._last_t = 0.0
+
+    def _timestamp(self, t):
+        if t is None:
+            now = time.monotonic()
+            if self._t0 is None:
+                self._t0 = now
+            t = now - self._t0
+        # Keep the stream monotonic so readers can bisect on time
+        self._last_t = max(self._last_t, t)
+        return self._last_t
+
+    def _write(self, kind, payload, t):
+        t = self._timestamp(t)
+        if self._chunk_start is None:
+            self._chunk_start = t
+        elif t - self._chunk_start >= self.chunk_seconds:
+            self._flush()
+            self._chunk_start = t
+        self._buffer.append(RECORD_HEADER.pack(t, kind, len(payload)))
+        self._buffer.append(payload)
+        self.counts[KIND_NAMES[kind]] += 1
+        return t
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        data = zlib.compress(b"".join(self._buffer), 1)
+        offset = self.file.tell()
+        self.file.write(CHUNK_HEADER.pack(len(data)))
+        self.file.write(data)
+        self.chunks.append([offset, len(data), self._chunk_start, self._last_t])
+        self._buffer = []
+
+    def write_frame(self, frame, t=None):
+        ok, encoded = cv2.imencode(self.frame_format, frame, self.encode_params)
+        if not ok:
+            raise ValueError(f"Could not encode frame as {self.frame_format}")
+        return self._write(FRAME, encoded.tobytes(), t)
+
+    def write_head_orientation(self, orientation, t=None):
+        return self._write(HEAD, VECTOR3.pack(*orientation), t)
+
+    def write_pose(self, pose, t=None):
+        return self._write(POSE, VECTOR3.pack(*pose), t)
+
+    def write_voice_command(self, command, t=None):
+        return self._write(VOICE, command.encode("utf-8"), t)
+
+    def close(self):
+        if self.file is None:
+            return
+        self._flush()
+        index = json.dumps({"chunks": self.chunks, "counts": self.counts,
+                            "duration": self._last_t, "metadata": self.metadata}).encode("utf-8")
+        offset = self.file.tell()
+        self.file.write(index)
+        self.file.write(FOOTER.pack(offset, len(index), FOOTER_MAGIC))
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionReader:
+    """
+    Random-access reader for files written by SessionWriter.
+
+    Typical usage:
+      reader = SessionReader("session.sar")
+      for t, kind, value in reader.events(start=12.0):
+          ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise SessionFormatError(f"{path} is not a session recording")
+            size = f.seek(0, 2)
+            if size < len(MAGIC) + FOOTER.size:
+                raise SessionFormatError(f"{path} has no index (recording not closed?)")
+            f.seek(size - FOOTER.size)
+            offset, length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != FOOTER_MAGIC:
+                raise SessionFormatError(f"{path} has no index (recording not closed?)")
+            f.seek(offset)
+            index = json.loads(f.read(length))
+        self.chunks = index["chunks"]
+        self.counts = index["counts"]
+        self.duration = index["duration"]
+        self.metadata = index["metadata"]
+        self._chunk_ends = [c[3] for c in self.chunks]
+
+    def _read_chunk(self, f, chunk):
+        offset, n_bytes = chunk[0], chunk[1]
+        f.seek(offset + CHUNK_HEADER.size)
+        data = zlib.decompress(f.read(n_bytes))
+        pos = 0
+        while pos < len(data):
+            t, kind, size = RECORD_HEADER.unpack_from(data, pos)
+            pos += RECORD_HEADER.size
+            yield t, kind, data[pos:pos + size]
+            pos += size
+
+    @staticmethod
+    def decode(kind, payload):
+        if kind == FRAME:
+            return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if kind in (HEAD, POSE):
+            return VECTOR3.unpack(payload)
+        return payload.decode("utf-8")
+
+    def events(self, start=0.0, kinds=None):
+        """
+        Yield (t, kind_name, value) in time order from time 'start' on.
+        Only the chunks overlapping [start, end] are read and decompressed.
+
+        :param kinds: Optional set of kind names ("frame", "head", "pose", "voice").
+        """
+        first = bisect.bisect_left(self._chunk_ends, start)
+        with open(self.path, "rb") as f:
+            for chunk in self.chunks[first:]:
+                for t, kind, payload in self._read_chunk(f, chunk):
+                    name = KIND_NAMES[kind]
+                    if t < start or (kinds is not None and name not in kinds):
+                        continue
+                    yield t, name, self.decode(kind, payload)
+
+
+class SessionPlayer:
+    """
+    Replays a recorded session, frame by frame.
+
+    Each next_frame() call advances the session to the next recorded frame;
+    head orientation and pose become the latest values recorded up to that
+    frame, and voice commands recorded up to it are queued. With
+    realtime=True, next_frame() sleeps until the frame's original time
+    (scaled by 'speed'); otherwise frames are returned as fast as they are
+    requested. Either way the consumer sees the same sequence of inputs, so
+    runs are reproducible.
+
+    'clock()' returns the session time, to be used in place of the wall
+    clock by time-dependent code (localization, cue timing).
+    """
+
+    def __init__(self, path, realtime=False, speed=1.0, start=0.0):
+        self.reader = SessionReader(path)
+        self.realtime = realtime
+        self.speed = speed
+        self.start = start
+        self.time = start
+        self.head_orientation = (0.0, 0.0, 0.0)
+        self.pose = None
+        self.voice_commands = []
+        self.frames = 0
+        self.finished = False
+        self._events = self.reader.events(start=start)
+        self._pending = None
+        self._wall_start = None
+        self._wall_elapsed = 0.0
+
+    def clock(self):
+        return self.time
+
+    def _next_event(self):
+        if self._pending is not None:
+            event, self._pending = self._pending, None
+            return event
+        return next(self._events, None)
+
+    def next_frame(self):
+        """
+        :return: The next frame (BGR numpy array), or None at the end of the session.
+        """
+        if self.finished:
+            return None
+        while True:
+            event = self._next_event()
+            if event is None:
+                break
+            t, kind, value = event
+            self.time = t
+            if kind == "frame":
+                self._pace(t)
+                self.frames += 1
+                return value
+            if kind == "head":
+                self.head_orientation = value
+            elif kind == "pose":
+                self.pose = value
+            elif kind == "voice":
+                self.voice_commands.append(value)
+        self.finished = True
+        if self._wall_start is not None:
+            self._wall_elapsed = time.monotonic() - self._wall_start
+        return None
+
+    def _pace(self, t):
+        now = time.monotonic()
+        if self._wall_start is None:
+            self._wall_start = now
+        if self.realtime:
+            delay = self._wall_start + (t - self.start) / self.speed - now
+            if delay > 0:
+                time.sleep(delay)
+
+    def pop_voice_command(self):
+        """
+        :return: The oldest pending voice command, including commands recorded
+                 right after the current frame (same processing tick), or None.
+        """
+        if not self.voice_commands and not self.finished:
+            event = self._next_event()
+            if event is not None and event[1] == "voice":
+                self.voice_commands.append(event[2])
+            else:
+                self._pending = event
+        return self.voice_commands.pop(0) if self.voice_commands else None
+
+    def stats(self):
+        """
+        :return: Frames replayed, session and wall time, and replay speed relative to recording.
+        """
+        wall = self._wall_elapsed if self.finished else (
+            time.monotonic() - self._wall_start if self._wall_start is not None else 0.0)
+        session = self.time - self.start
+        return {
+            "frames": self.frames,
+            "session_s": session,
+            "wall_s": wall,
+            "fps": self.frames / wall if wall > 0 else 0.0,
+            "speedup": session / wall if wall > 0 else 0.0,
+        }
+
+
+# ----------------------------------------------------------------------
+# Recording wrappers
+# ----------------------------------------------------------------------
+
+class RecordingGlasses:
+    """
+    Wraps a GlassesIntegration and records its frames (each preceded by the
+    head orientation at capture time) and voice commands.
+
+    Typical usage:
+      glasses = RecordingGlasses(GlassesIntegration(), SessionWriter("session.sar"))
+    """
+
+    def __init__(self, glasses, writer):
+        self.glasses = glasses
+        self.writer = writer
+
+    def __getattr__(self, name):
+        return getattr(self.glasses, name)
+
+    def get_camera_frame(self):
+        frame = self.glasses.get_camera_frame()
+        if frame is not None:
+            # Orientation is stored just before its frame so replay sees both together
+            self.writer.write_head_orientation(self.glasses.get_head_orientation())
+            self.writer.write_frame(frame)
+        return frame
+
+    def get_head_orientation(self):
+        return self.glasses.get_head_orientation()
+
+    def capture_voice_command(self):
+        command = self.glasses.capture_voice_command()
+        if command:
+            self.writer.write_voice_command(command)
+        return command
+
+    def release(self):
+        self.glasses.release()
+        self.writer.close()
+
+
+class RecordingRobotBackend(RobotBackend):
+    """
+    Wraps a RobotBackend and records its camera frames, each preceded by
+    the pose it was taken from.
+    """
+
+    def __init__(self, backend, writer):
+        self.backend = backend
+        self.writer = writer
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def connect(self):
+        return self.backend.connect()
+
+    def disconnect(self):
+        self.backend.disconnect()
+        self.writer.close()
+
+    def send_motor_command(self, linear_speed, angular_speed):
+        self.backend.send_motor_command(linear_speed, angular_speed)
+
+    def get_pose(self):
+        return self.backend.get_pose()
+
+    def set_pose(self, x, y, theta):
+        self.backend.set_pose(x, y, theta)
+
+    def get_camera_frame(self):
+        frame = self.backend.get_camera_frame()
+        if frame is not None:
+            pose = self.backend.get_pose()
+            if pose is not None:
+                self.writer.write_pose(pose)
+            self.writer.write_frame(frame)
+        return frame
+
+
+# ----------------------------------------------------------------------
+# Replay sources
+# ----------------------------------------------------------------------
+
+class ReplayGlassesIntegration(GlassesIntegration):
+    """
+    GlassesIntegration fed from a recorded session instead of a device.
+
+    Typical usage:
+      glasses = ReplayGlassesIntegration("session.sar", realtime=False)
+      glasses.connect_hardware()
+      while not glasses.finished:
+          user_interaction.process_input()
+    """
+
+    def __init__(self, path, realtime=False, speed=1.0, start=0.0):
+        super().__init__(use_webcam_for_testing=False)
+        self.player = SessionPlayer(path, realtime=realtime, speed=speed, start=start)
+
+    @property
+    def finished(self):
+        return self.player.finished
+
+    def clock(self):
+        return self.player.clock()
+
+    def connect_hardware(self):
+        self.connected = True
+        mode = "real time" if self.player.realtime else "as fast as possible"
+        print(f"[GlassesIntegration] Replaying {self.player.reader.path} "
+              f"({self.player.reader.counts['frame']} frames, {mode}).")
+
+    def get_camera_frame(self):
+        if not self.connected:
+            return None
+        return self.player.next_frame()
+
+    def get_head_orientation(self):
+        if not self.connected:
+            return (0.0, 0.0, 0.0)
+        return self.player.head_orientation
+
+    def capture_voice_command(self):
+        if not self.connected:
+            return None
+        return self.player.pop_voice_command()
+
+    def release(self):
+        self.connected = False
+        print(f"[GlassesIntegration] Replay finished: {self.player.stats()}")
+
+
+class ReplayRobotBackend(RobotBackend):
+    """
+    RobotBackend fed from a recorded session. Motor commands are counted
+    but have no effect: poses and frames come from the recording.
+    """
+
+    def __init__(self, path, realtime=False, speed=1.0, start=0.0):
+        self.player = SessionPlayer(path, realtime=realtime, speed=speed, start=start)
+        self.motor_commands = 0
+
+    @property
+    def finished(self):
+        return self.player.finished
+
+    def clock(self):
+        return self.player.clock()
+
+    def send_motor_command(self, linear_speed, angular_speed):
+        self.motor_commands += 1
+
+    def get_pose(self):
+        return self.player.pose
+
+    def get_camera_frame(self):
+        return self.player.next_frame()
+
+    def disconnect(self):
+        print(f"[ReplayRobotBackend] Replay finished: {self.player.stats()}")
@@ -1,5 +1,17 @@
 # app/modules/spatial_audio.py
 
+import math
+import time
+
+from .audio_thread import AudioRenderThread
+from .instrumentation import get_logger
+from .binaural import BinauralRenderer, NullSink, WavFileSink, generate_hrtf_set, HRTFSet
+from .tts import CachedTTS, StandInTTSEngine
+from .voice_manager import VoiceManager
+
+SPEECH_LABEL = "__speech__"
+
+
 class SpatialAudioEngine:
     """
     Implements spatial (3D) audio rendering, typically with HRTFs or binaural audio techniques.
@@ -10,39 +22,187 @@ class SpatialAudioEngine:
       - Use OpenAL or FMOD or another audio engine that supports 3D positioning.
       - Load a Head-Related Transfer Function (HRTF) dataset for more accurate binaural rendering.
       - Continuously update the user’s head orientation, re-rendering the audio scene accordingly.
+
+    Here, rendering is done by BinauralRenderer (block-based FFT convolution
+    with an HRTF set); blocks go to an output sink (WAV file or null sink), so
+    the engine runs headless. After start_realtime(), rendering runs on its
+    own AudioRenderThread and cue/orientation changes are queued to it, so
+    the audio never waits for the perception loop. Speech comes from a
+    CachedTTS, so repeated instructions and object names play without
+    synthesis latency.
     """
 
-    def __init__(self):
+    def __init__(self, sample_rate=16000, block_size=256, max_sources=32,
+                 hrtf_path=None, output_path=None, max_catch_up_blocks=8, max_voices=6,
+                 tts=None):
         """
         You could load HRTF data or initialize a specialized audio engine here.
-        For demonstration, we'll store a stub state that says 'not initialized'.
+
+        :param sample_rate: Output sample rate (Hz).
+        :param block_size: Samples rendered per block.
+        :param max_sources: Number of simultaneously rendered sources.
+        :param hrtf_path: Optional .npz HRTF set (see HRTFSet.save); a synthetic set is generated otherwise.
+        :param output_path: Optional WAV file receiving the rendered audio; a null sink is used otherwise.
+        :param max_catch_up_blocks: Maximum blocks rendered by a single update() after a stall.
+        :param max_voices: Hard limit on object cues rendered at once (see VoiceManager).
+        :param tts: CachedTTS used by play_text; a stand-in engine is used if None.
         """
         self.initialized = False
-        self.sound_sources = {}  # e.g., track active sounds by ID or label
+        self.sound_sources = {}  # label -> renderer slot
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.max_sources = max_sources
+        self.hrtf_path = hrtf_path
+        self.output_path = output_path
+        self.max_catch_up_blocks = max_catch_up_blocks
+        self.renderer = None
+        self.sink = None
+        self.head_yaw = 0.0
+        self._last_update = None
+        self.audio_thread = None
+        self.voice_manager = VoiceManager(max_voices=min(max_voices, max_sources))
+        self.log = get_logger("SpatialAudioEngine")
+        self.tts = tts if tts is not None else CachedTTS(StandInTTSEngine(sample_rate))
 
     def initialize(self):
         """
         Prepare or load the audio backend (e.g., open an audio device).
         Possibly load HRTF data, etc.
         """
-        print("[SpatialAudioEngine] Initializing the spatial audio engine (stub).")
-        # In a real system, you might do something like:
-        # self.open_audio_device()
-        # self.load_hrtf("path/to/hrtf_data.wav")
+        print("[SpatialAudioEngine] Initializing the spatial audio engine.")
+        if self.hrtf_path:
+            hrtf = HRTFSet.load(self.hrtf_path)
+            self.sample_rate = hrtf.sample_rate
+        else:
+            hrtf = generate_hrtf_set(sample_rate=self.sample_rate)
+        self.renderer = BinauralRenderer(hrtf, block_size=self.block_size, max_sources=self.max_sources)
+        self.sink = WavFileSink(self.output_path, self.sample_rate) if self.output_path else NullSink()
         self.initialized = True
 
-    def update(self):
+    def update(self, now=None):
         """
         Called periodically (e.g., once per frame or on a timer) to update 3D audio.
-        If using a real audio engine, you'd update listener orientation, 
-        source positions, or apply Doppler effects, etc.
+        Renders as many blocks as correspond to the time elapsed since the last
+        call (at most max_catch_up_blocks) and writes them to the sink.
+
+        With the real-time thread running, this does nothing (rendering is
+        paced by the audio thread instead).
+
+        :return: Number of blocks rendered.
         """
-        if not self.initialized:
+        if not self.initialized or self.audio_thread is not None:
+            return 0
+        now = time.monotonic() if now is None else now
+        if self._last_update is None:
+            self._last_update = now
+            return 0
+        block_s = self.block_size / self.sample_rate
+        n_blocks = int((now - self._last_update) / block_s)
+        self._last_update += n_blocks * block_s
+        if n_blocks > self.max_catch_up_blocks:
+            # After a long stall, skip ahead instead of rendering a burst
+            n_blocks = self.max_catch_up_blocks
+            self._last_update = now
+        for _ in range(n_blocks):
+            self.render_block()
+        return n_blocks
+
+    def render_block(self):
+        """Render one block and send it to the sink."""
+        block = self.renderer.render()
+        self.sink.write(block)
+        return block
+
+    def start_realtime(self, target_blocks=4, use_clock=True):
+        """
+        Move rendering to a dedicated AudioRenderThread. With use_clock=True an
+        internal clock pulls blocks into the sink at the audio rate; otherwise a
+        sound-device callback should call self.audio_thread.pull_block().
+        """
+        if self.audio_thread is not None:
             return
-        # In a real engine, you might do:
-        # self.audio_library.set_listener_orientation(self.current_head_orientation)
-        # self.audio_library.update_spatialization()
-        # For now, we do nothing.
+        self.audio_thread = AudioRenderThread(
+            self.renderer.render, self._apply_command, self.block_size, self.sample_rate,
+            sink=self.sink, target_blocks=target_blocks, use_clock=use_clock)
+        self.audio_thread.start()
+        print("[SpatialAudioEngine] Real-time audio thread started "
+              f"({self.audio_thread.stats()['latency_ms']:.0f} ms buffer).")
+
+    def stop_realtime(self):
+        if self.audio_thread is not None:
+            self.audio_thread.stop()
+            print(f"[SpatialAudioEngine] Audio thread stopped: {self.audio_thread.stats()}")
+            self.audio_thread = None
+
+    def _submit(self, command):
+        """Apply a control command now, or queue it for the audio thread."""
+        if self.audio_thread is not None:
+            self.audio_thread.submit(command)
+        else:
+            self._apply_command(command)
+
+    def _apply_command(self, command):
+        """
+        Execute a control command on the renderer (on the audio thread when running).
+        Commands: ("play", label, azimuth, distance), ("move", label, azimuth, distance),
+        ("stop", label), ("yaw", yaw), ("speak", pcm).
+        """
+        kind = command[0]
+        if kind == "yaw":
+            self.renderer.set_listener_yaw(command[1])
+            slot = self.sound_sources.get(SPEECH_LABEL)
+            if slot is not None and self.renderer.active[slot]:
+                self.renderer.move_source(slot, 0.0)  # speech stays head-locked
+        elif kind == "speak":
+            # A new utterance replaces the one currently playing
+            slot = self.sound_sources.pop(SPEECH_LABEL, None)
+            if slot is not None:
+                self.renderer.stop_source(slot)
+            self.renderer.add_cue(SPEECH_LABEL, command[1])
+            slot = self.renderer.add_source(SPEECH_LABEL, 0.0, 1.0)
+            if slot is not None:
+                self.sound_sources[SPEECH_LABEL] = slot
+        elif kind == "move":
+            _, label, azimuth, distance = command
+            slot = self.sound_sources.get(label)
+            if slot is not None and self.renderer.active[slot]:
+                self.renderer.move_source(slot, azimuth, distance)
+        elif kind == "play":
+            _, label, azimuth, distance = command
+            slot = self.sound_sources.get(label)
+            if (slot is not None and self.renderer.active[slot]
+                    and self.renderer.cue[slot] == self.renderer.cue_names[label]):
+                self.renderer.move_source(slot, azimuth, distance)
+                self.renderer.cursor[slot] = 0
+                return
+            slot = self.renderer.add_source(label, azimuth, distance)
+            if slot is None:
+                self.log.warning("No free source slot for '%s'.", label, key="no_slot")
+                return
+            self.sound_sources[label] = slot
+        elif kind == "stop":
+            slot = self.sound_sources.pop(command[1], None)
+            if slot is not None:
+                self.renderer.stop_source(slot)
+
+    def set_head_orientation(self, yaw):
+        """
+        Update the listener's head yaw (radians, right positive). Sources stay
+        anchored in the world; the renderer crossfades to the new filters.
+        """
+        self.head_yaw = yaw
+        if self.renderer is not None:
+            self._submit(("yaw", yaw))
+
+    def cost_report(self):
+        """CPU cost per rendered block grouped by number of active sources."""
+        return self.renderer.cost_report() if self.renderer is not None else []
+
+    def shutdown(self):
+        """Stop the audio thread, then flush and close the output sink."""
+        self.stop_realtime()
+        if self.sink is not None:
+            self.sink.close()
 
     def play_spatial_cue(self, label, position):
         """
@@ -50,21 +210,40 @@ class SpatialAudioEngine:
         so that the user perceives it from the correct direction.
 
         :param label: A string identifying the object or sound (e.g., "chair").
-        :param position: A 3D tuple (x, y, z) in the building's coordinate system.
-        
-        In reality, you'd:
-          - Create or retrieve an audio source for 'label'.
-          - Position it at 'position' in 3D.
-          - Play the sound with your HRTF or spatial audio pipeline.
+        :param position: A 3D tuple (x, y, z) relative to the listener's head
+                         (x to the right, z forward), as produced by ObjectRecognition.
 
-        This stub just prints a message to the console.
+        The cue for 'label' is (re)started from that direction; a label has at
+        most one active source.
         """
         if not self.initialized:
-            print("[SpatialAudioEngine] Warning: Engine not initialized.")
+            self.log.warning("Warning: Engine not initialized.")
             return
 
         x, y, z = position
-        print(f"[SpatialAudioEngine] Playing spatial cue for '{label}' at approx. ({x:.2f}, {y:.2f}, {z:.2f}).")
+        self.log.debug("Playing spatial cue for '%s' at approx. (%.2f, %.2f, %.2f).", label, x, y, z, key=label)
+        azimuth = math.atan2(x, z)
+        distance = math.sqrt(x * x + y * y + z * z)
+        self._submit(("play", label, azimuth, distance))
+
+    def update_cues(self, recognized_objects, now=None):
+        """
+        Per-frame entry point for object cues: the VoiceManager picks at most
+        max_voices sources (by type, distance and novelty); only those are
+        rendered, the others stay virtual.
+
+        :param recognized_objects: Dicts with "name", "type" and "position" (listener frame).
+        """
+        if not self.initialized:
+            return
+        now = time.monotonic() if now is None else now
+        start, stop, move = self.voice_manager.update(recognized_objects, now)
+        for label in stop:
+            self._submit(("stop", label))
+        for source in start:
+            self._submit(("play", source.label, source.azimuth, source.distance))
+        for source in move:
+            self._submit(("move", source.label, source.azimuth, source.distance))
 
     def stop_spatial_cue(self, label):
         """
@@ -75,23 +254,34 @@ class SpatialAudioEngine:
         if not self.initialized:
             return
 
-        # In a real system, find the source by 'label' and stop it.
-        print(f"[SpatialAudioEngine] Stopping spatial cue for '{label}'.")
+        self.log.debug("Stopping spatial cue for '%s'.", label, key=label)
+        self._submit(("stop", label))
 
     def play_text(self, text):
         """
-        Optional: Convert the given text to speech and play it in a 3D or stereo manner.
-        Could integrate with a TTS engine.
-        
-        For instance, you might do:
-          - Use pyttsx3 or an external TTS service
-          - Output as a short audio buffer, then position that buffer 
-            in 3D relative to the user or just center it.
+        Convert the given text to speech (through the CachedTTS) and play it
+        centered in front of the listener. Cached utterances, or ones assembled
+        from cached phrases, start without waiting for the TTS engine.
+        """
+        if not self.initialized:
+            self.log.warning("Warning: Engine not initialized.")
+            return
+        self.play_speech(text, self.synthesize_speech(text))
 
-        This stub simply prints to console.
+    def synthesize_speech(self, text):
         """
+        Synthesize 'text' without playing it. The CachedTTS is thread-safe, so
+        this may run on a worker thread while the caller keeps rendering cues.
+        :return: Mono float32 PCM for play_speech.
+        """
+        return self.tts.synthesize(text)
+
+    def play_speech(self, text, pcm):
+        """Play speech already synthesized by synthesize_speech (cheap; no TTS work)."""
         if not self.initialized:
-            print("[SpatialAudioEngine] Warning: Engine not initialized.")
+            self.log.warning("Warning: Engine not initialized.")
             return
 
         print(f"[SpatialAudioEngine] [TTS] {text}")
+        if len(pcm):
+            self._submit(("speak", pcm))
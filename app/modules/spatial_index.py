@@ -0,0 +1,142 @@
+# app/modules/spatial_index.py
+
+import math
+from collections import defaultdict
+
+
+def object_centroid(obj):
+    """
+    Return the (x, y, z) centroid of a building-model object, or None.
+    Accepts objects with a 'centroid' (from ingestion) or a 'position'.
+    """
+    if obj.get("centroid") is not None:
+        return tuple(obj["centroid"])
+    if obj.get("position") is not None:
+        return tuple(obj["position"])
+    return None
+
+
+class SpatialHashIndex:
+    """
+    A uniform-grid spatial hash over labeled 3D points, indexed on the floor
+    plane (X, Y). Used to look up building-model objects by position and
+    label (e.g., 'the nearest fridge', 'all objects within 3 m').
+
+    Inserts, removals and radius queries only touch the buckets overlapping
+    the query, so cost depends on local density rather than object count.
+
+    Typical usage:
+      index = SpatialHashIndex.from_building_model(building_model)
+      fridge = index.nearest((x, y), label="fridge")
+    """
+
+    def __init__(self, cell_size=2.0):
+        """
+        :param cell_size: Bucket edge length in meters.
+        """
+        self.cell_size = float(cell_size)
+        self.buckets = defaultdict(dict)  # (i, j) -> {item_id: (position, label)}
+        self.items = {}                   # item_id -> (position, label, bucket)
+        self.labels = defaultdict(set)    # label -> {item_id}
+
+    @classmethod
+    def from_building_model(cls, building_model, cell_size=2.0):
+        """
+        Index every object of the building model that has a centroid or position.
+        Item ids are the objects' positions in building_model["objects"].
+        """
+        index = cls(cell_size=cell_size)
+        for i, obj in enumerate((building_model or {}).get("objects", [])):
+            position = object_centroid(obj)
+            if position is None:
+                continue
+            index.insert(i, position, obj.get("label") or obj.get("name"))
+        return index
+
+    def _bucket(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def __len__(self):
+        return len(self.items)
+
+    def insert(self, item_id, position, label=None):
+        """
+        Insert or move an item.
+        :param position: (x, y) or (x, y, z).
+        :param label: Optional label, normalized to lower case.
+        """
+        if item_id in self.items:
+            self.remove(item_id)
+        label = label.lower() if label else None
+        bucket = self._bucket(position[0], position[1])
+        self.buckets[bucket][item_id] = (tuple(position), label)
+        self.items[item_id] = (tuple(position), label, bucket)
+        if label:
+            self.labels[label].add(item_id)
+
+    def remove(self, item_id):
+        """Remove an item; unknown ids are ignored."""
+        entry = self.items.pop(item_id, None)
+        if entry is None:
+            return
+        _, label, bucket = entry
+        bucket_items = self.buckets[bucket]
+        bucket_items.pop(item_id, None)
+        if not bucket_items:
+            del self.buckets[bucket]
+        if label:
+            self.labels[label].discard(item_id)
+            if not self.labels[label]:
+                del self.labels[label]
+
+    def get(self, item_id):
+        """:return: (position, label) or None."""
+        entry = self.items.get(item_id)
+        return None if entry is None else entry[:2]
+
+    def query_radius(self, position, radius, label=None):
+        """
+        Return [(distance, item_id, position, label)] within 'radius' of position
+        (floor-plane distance), sorted by distance.
+        """
+        x, y = position[0], position[1]
+        label = label.lower() if label else None
+        i0, j0 = self._bucket(x - radius, y - radius)
+        i1, j1 = self._bucket(x + radius, y + radius)
+        r2 = radius * radius
+        results = []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                bucket_items = self.buckets.get((i, j))
+                if not bucket_items:
+                    continue
+                for item_id, (pos, item_label) in bucket_items.items():
+                    if label is not None and item_label != label:
+                        continue
+                    d2 = (pos[0] - x) ** 2 + (pos[1] - y) ** 2
+                    if d2 <= r2:
+                        results.append((math.sqrt(d2), item_id, pos, item_label))
+        results.sort(key=lambda r: r[0])
+        return results
+
+    def nearest(self, position, label=None, max_radius=100.0):
+        """
+        Return (distance, item_id, position, label) of the nearest item, optionally
+        restricted to a label, searching expanding rings of buckets. None if not found.
+        """
+        label = label.lower() if label else None
+        if label is not None and label not in self.labels:
+            return None
+        if not self.items:
+            return None
+        radius = self.cell_size
+        while radius <= max_radius:
+            found = self.query_radius(position, radius, label=label)
+            if found:
+                return found[0]
+            radius *= 2.0
+        return None
+
+    def ids_with_label(self, label):
+        """Return the set of item ids with the given label."""
+        return set(self.labels.get(label.lower(), ())) if label else set()
@@ -0,0 +1,313 @@
+# app/modules/tts.py
+
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import pyttsx3  # Offline TTS (pip install pyttsx3)
+except ImportError:
+    pyttsx3 = None
+
+
+# Fragments of NavigationAssistance / UserInteraction messages worth synthesizing up front
+COMMON_PHRASES = [
+    "Begin walking toward", "walk", "meter", "meters", "then", "now, and",
+    "turn left", "turn right", "bear left", "bear right", "make a sharp left turn",
+    "make a sharp right turn", "continue straight", "to reach the", "You have reached the",
+    "Rerouting.", "Navigation stopped.", "I can see", "ahead", "to your left", "to your right",
+    "behind you", "Follow corridor ahead.", "The", "is", "a", "and",
+] + [str(n) for n in range(1, 21)]
+
+
+def normalize_words(text):
+    """Lower-case words without punctuation, used for cache keys."""
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+class StandInTTSEngine:
+    """
+    Deterministic offline stand-in for a TTS engine (tests, headless runs):
+    every word becomes a short tone whose pitch depends on the word, with
+    a configurable synthesis delay to mimic a real engine's latency.
+    """
+
+    name = "stand-in"
+
+    def __init__(self, sample_rate=16000, seconds_per_char=0.0):
+        self.sample_rate = sample_rate
+        self.seconds_per_char = seconds_per_char
+        self.calls = 0
+
+    def synthesize(self, text, voice="default"):
+        self.calls += 1
+        if self.seconds_per_char:
+            time.sleep(self.seconds_per_char * len(text))
+        chunks = []
+        gap = np.zeros(int(0.03 * self.sample_rate), dtype=np.float32)
+        for word in normalize_words(text):
+            duration = 0.06 + 0.02 * len(word)
+            t = np.arange(int(duration * self.sample_rate)) / self.sample_rate
+            pitch = 150.0 + (sum(map(ord, word + voice)) % 40) * 5.0
+            envelope = np.sin(math.pi * t / duration)
+            chunks.append((0.3 * envelope * np.sin(2.0 * math.pi * pitch * t)).astype(np.float32))
+            chunks.append(gap)
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+
+class Pyttsx3TTSEngine:
+    """
+    Offline TTS through pyttsx3 (eSpeak / SAPI5 / NSSS), rendered to a
+    temporary WAV file and resampled to 'sample_rate'.
+    """
+
+    name = "pyttsx3"
+
+    def __init__(self, sample_rate=16000):
+        if pyttsx3 is None:
+            raise ImportError("pyttsx3 is not installed")
+        self.sample_rate = sample_rate
+        self._engine = pyttsx3.init()
+        self._lock = threading.Lock()  # pyttsx3 engines are not thread-safe
+
+    def synthesize(self, text, voice="default"):
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            with self._lock:
+                if voice != "default":
+                    self._engine.setProperty("voice", voice)
+                self._engine.save_to_file(text, path)
+                self._engine.runAndWait()
+            with wave.open(path) as wav:
+                rate = wav.getframerate()
+                channels = wav.getnchannels()
+                pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").astype(np.float32) / 32768.0
+        finally:
+            os.remove(path)
+        if channels > 1:
+            pcm = pcm.reshape(-1, channels).mean(axis=1)
+        if rate != self.sample_rate and len(pcm):
+            n_out = int(len(pcm) * self.sample_rate / rate)
+            pcm = np.interp(np.linspace(0, len(pcm) - 1, n_out), np.arange(len(pcm)), pcm).astype(np.float32)
+        return pcm
+
+
+def make_tts_engine(kind="auto", sample_rate=16000):
+    """
+    :param kind: "pyttsx3", "standin", or "auto" (pyttsx3 if installed).
+    """
+    if kind in ("auto", "pyttsx3") and pyttsx3 is not None:
+        try:
+            return Pyttsx3TTSEngine(sample_rate)
+        except Exception as exc:  # no speech backend on this machine
+            print(f"[TTS] pyttsx3 unavailable ({exc}); using the stand-in engine.")
+    elif kind == "pyttsx3":
+        print("[TTS] pyttsx3 not installed; using the stand-in engine.")
+    return StandInTTSEngine(sample_rate)
+
+
+class CachedTTS:
+    """
+    TTS front end with an LRU cache of synthesized PCM keyed by (voice, text).
+
+    - Whole utterances are cached, so repeated instructions play instantly.
+    - Phrase-level reuse: cached phrases are indexed in a word trie; a new
+      utterance that is mostly covered by cached phrases (e.g. "Begin walking
+      toward" + "the" + "fridge") is assembled by concatenating them and only
+      the uncovered words are synthesized.
+    - prewarm() synthesizes a vocabulary (furniture DB names, navigation
+      phrases) in a background thread at startup.
+
+    Typical usage:
+      tts = CachedTTS(make_tts_engine())
+      tts.prewarm(list(furniture_db) + COMMON_PHRASES)
+      pcm = tts.synthesize("Begin walking toward the fridge")
+    """
+
+    def __init__(self, engine, voice="default", max_bytes=32 * 1024 * 1024,
+                 min_coverage=0.5, gap_s=0.04):
+        """
+        :param engine: Object with synthesize(text, voice) -> float32 PCM and 'sample_rate'.
+        :param voice: Voice identifier (part of the cache key).
+        :param max_bytes: Memory budget for cached PCM; least recently used entries are evicted.
+        :param min_coverage: Fraction of words that must come from cached phrases to assemble an utterance.
+        :param gap_s: Silence inserted between concatenated fragments.
+        """
+        self.engine = engine
+        self.voice = voice
+        self.sample_rate = engine.sample_rate
+        self.max_bytes = max_bytes
+        self.min_coverage = min_coverage
+        self._gap = np.zeros(int(gap_s * self.sample_rate), dtype=np.float32)
+
+        self.cache = OrderedDict()  # (voice, phrase) -> PCM
+        self.trie = {}              # voice -> word trie of cached phrases
+        self.bytes = 0
+        self._lock = threading.RLock()
+        self._prewarm_thread = None
+
+        self.hits = 0
+        self.composed = 0
+        self.misses = 0
+        self.evictions = 0
+        self.synthesis_s = 0.0
+        self.last_latency_s = 0.0
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _get(self, voice, phrase):
+        with self._lock:
+            pcm = self.cache.get((voice, phrase))
+            if pcm is not None:
+                self.cache.move_to_end((voice, phrase))
+            return pcm
+
+    def _put(self, voice, phrase, pcm):
+        with self._lock:
+            key = (voice, phrase)
+            if key in self.cache:
+                return
+            self.cache[key] = pcm
+            self.bytes += pcm.nbytes
+            node = self.trie.setdefault(voice, {})
+            for word in phrase.split():
+                node = node.setdefault(word, {})
+            node["$"] = True
+            while self.bytes > self.max_bytes and len(self.cache) > 1:
+                (old_voice, old_phrase), old = self.cache.popitem(last=False)
+                self.bytes -= old.nbytes
+                self.evictions += 1
+                self._trie_remove(old_voice, old_phrase)
+
+    def _trie_remove(self, voice, phrase):
+        node = self.trie.get(voice, {})
+        for word in phrase.split():
+            node = node.get(word)
+            if node is None:
+                return
+        node.pop("$", None)
+
+    def _synthesize_phrase(self, phrase, voice):
+        start = time.perf_counter()
+        pcm = np.asarray(self.engine.synthesize(phrase, voice), dtype=np.float32)
+        self.synthesis_s += time.perf_counter() - start
+        self._put(voice, phrase, pcm)
+        return pcm
+
+    def _longest_cached(self, voice, words, start):
+        """Length of the longest cached phrase starting at words[start], or 0."""
+        node = self.trie.get(voice, {})
+        best = 0
+        for i in range(start, len(words)):
+            node = node.get(words[i])
+            if node is None:
+                break
+            if "$" in node:
+                best = i - start + 1
+        return best
+
+    # ------------------------------------------------------------------
+    # Synthesis
+    # ------------------------------------------------------------------
+
+    def synthesize(self, text, voice=None):
+        """
+        :return: Mono float32 PCM at self.sample_rate.
+        """
+        start = time.perf_counter()
+        voice = voice or self.voice
+        words = normalize_words(text)
+        phrase = " ".join(words)
+        pcm = self._get(voice, phrase)
+        if pcm is not None:
+            self.hits += 1
+        else:
+            pcm = self._compose(voice, words)
+            if pcm is not None:
+                self.composed += 1
+            else:
+                self.misses += 1
+                pcm = self._synthesize_phrase(phrase, voice)
+        self.last_latency_s = time.perf_counter() - start
+        return pcm
+
+    def _compose(self, voice, words):
+        """
+        Assemble an utterance from cached phrases (greedy longest match),
+        synthesizing only uncovered runs. Returns None if too little is cached.
+        """
+        with self._lock:
+            plan = []  # (cached, start, end)
+            covered = 0
+            i = 0
+            while i < len(words):
+                n = self._longest_cached(voice, words, i)
+                if n:
+                    plan.append((True, i, i + n))
+                    covered += n
+                    i += n
+                else:
+                    if plan and not plan[-1][0]:
+                        plan[-1] = (False, plan[-1][1], i + 1)
+                    else:
+                        plan.append((False, i, i + 1))
+                    i += 1
+        if not words or covered < self.min_coverage * len(words):
+            return None
+
+        pieces = []
+        for cached, s, e in plan:
+            phrase = " ".join(words[s:e])
+            pcm = self._get(voice, phrase) if cached else None
+            if pcm is None:
+                pcm = self._synthesize_phrase(phrase, voice)
+            pieces.append(pcm)
+            pieces.append(self._gap)
+        result = np.concatenate(pieces[:-1])
+        self._put(voice, " ".join(words), result)
+        return result
+
+    def prewarm(self, phrases, voice=None, background=True):
+        """
+        Synthesize 'phrases' ahead of time (in a daemon thread by default).
+        """
+        voice = voice or self.voice
+        phrases = [" ".join(normalize_words(p)) for p in phrases]
+
+        def work():
+            for phrase in phrases:
+                if phrase and self._get(voice, phrase) is None:
+                    self._synthesize_phrase(phrase, voice)
+
+        if background:
+            self._prewarm_thread = threading.Thread(target=work, name="tts-prewarm", daemon=True)
+            self._prewarm_thread.start()
+        else:
+            work()
+
+    def wait_prewarm(self, timeout=None):
+        if self._prewarm_thread is not None:
+            self._prewarm_thread.join(timeout)
+
+    def stats(self):
+        requests = self.hits + self.composed + self.misses
+        return {
+            "entries": len(self.cache),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "composed": self.composed,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "reuse_rate": (self.hits + self.composed) / requests if requests else 0.0,
+            "synthesis_s": self.synthesis_s,
+        }
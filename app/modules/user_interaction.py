@@ -1,5 +1,13 @@
 # app/modules/user_interaction.py
 
+import math
+import time
+
+from .instrumentation import telemetry
+from .intent_parser import IntentParser
+from .prompt_context import describe_direction
+from .view_query import merge_detections
+
 class UserInteraction:
     """
     Manages user interaction for the HUMAN / AR-glasses mode.
@@ -18,7 +26,11 @@ class UserInteraction:
             object_detector,
             object_recognizer,
             nav,
-            llm
+            llm,
+            localizer=None,
+            intent_parser=None,
+            clock=time.monotonic,
+            view_query=None
         ):
         """
         :param glasses_integration: An instance of GlassesIntegration for camera, orientation, voice commands
@@ -27,6 +39,12 @@ class UserInteraction:
         :param object_recognizer: An instance of ObjectRecognition to map detections to 3D
         :param nav: An instance of NavigationAssistance for guiding the user
         :param llm: An instance of LLMIntegration for answering environment-related queries
+        :param localizer: Optional ParticleFilterLocalizer that estimates the user position
+                          by matching recognized objects against the building model
+        :param intent_parser: Optional IntentParser; built from the furniture DB vocabulary if omitted
+        :param clock: Time source in seconds; replays pass the session clock so runs are deterministic
+        :param view_query: Optional ViewQuery; once the user is localized, building-model objects in
+                           view are added to the detections for 'describe' and LLM questions
         """
         self.glasses = glasses_integration
         self.audio = audio_engine
@@ -34,44 +52,152 @@ class UserInteraction:
         self.recognizer = object_recognizer
         self.navigation = nav
         self.llm = llm
+        self.localizer = localizer
+        self.clock = clock
+        self.view_query = view_query
+        self._frames = telemetry.counter("frames_processed", {"mode": "human"})
+        self._detections = telemetry.counter("detections", {"mode": "human"})
+        self._voice_commands = telemetry.counter("voice_commands")
+        self._last_localization_time = None
+        self._pending_frame = None
 
         # Keep track of currently detected objects in view
         self.detected_objects = []
 
+        # User (x, y, z) in building coordinates, if a localization source provides it
+        self.user_position = None
+
+        # Fast path for structured commands; vocabulary from the furniture DB and building model
+        self.intents = intent_parser if intent_parser is not None else self.build_intent_parser(object_recognizer)
+        self.last_response = None
+
+    @staticmethod
+    def build_intent_parser(object_recognizer):
+        """IntentParser with the furniture DB and building model labels as vocabulary."""
+        intent_parser = IntentParser(getattr(object_recognizer, "furniture_db", {}) or {})
+        building_model = getattr(object_recognizer, "building_model", None) or {}
+        intent_parser.add_vocabulary(
+            obj.get("label") or obj.get("name") for obj in building_model.get("objects", [])
+            if obj.get("label") or obj.get("name"))
+        return intent_parser
+
     def process_input(self):
         """
         1. Retrieve a camera frame from glasses_integration (if available).
         2. Run object detection -> create or update self.detected_objects.
         3. For each recognized object, play a short or continuous spatial cue (optional).
         4. Poll for voice commands -> handle them appropriately (LLM queries, navigation).
+
+        The steps are also available separately (capture_frame, process_frame,
+        poll_voice, update_guidance) so a LoopScheduler can run them at
+        different rates.
+        """
+        self.capture_frame()
+        self.process_frame()
+        self.poll_voice()
+        self.update_guidance()
+
+    def capture_frame(self):
+        """
+        Grab the newest camera frame; it replaces any frame not processed yet.
+        :return: True if a frame was captured.
+        """
+        with telemetry.span("capture"):
+            frame = self.glasses.get_camera_frame()
+        if frame is None:
+            return False
+        self._pending_frame = frame
+        return True
+
+    def process_frame(self):
+        """
+        Run detection, recognition, spatial cues and localization on the
+        latest captured frame.
+        :return: True if a frame was processed.
         """
-        # 1. Get camera frame
-        frame = self.glasses.get_camera_frame()
-        if frame is not None:
-            # 2. Detect objects
-            detections = self.detector.detect_objects(frame)
+        frame, self._pending_frame = self._pending_frame, None
+        if frame is None:
+            return False
+        self.apply_detections(self.detect(frame))
+        return True
 
-            # Convert 2D detections to 3D + retrieve furniture DB info
-            new_objects = []
+    def detect(self, frame):
+        """
+        Run the object detector on a frame. Touches no other state, so the
+        asyncio runtime can call it from a worker thread.
+        """
+        self._frames.inc()
+        with telemetry.span("detect"):
+            # Columnar DetectionBatch when the detector provides one
+            detect = getattr(self.detector, "detect_batch", None) or self.detector.detect_objects
+            detections = detect(frame)
+        self._detections.inc(len(detections))
+        return detections
+
+    def apply_detections(self, detections):
+        """
+        Map detections to 3D objects, then update spatial cues and localization.
+        """
+        # Convert 2D detections to 3D + retrieve furniture DB info
+        with telemetry.span("recognize"):
             head_orientation = self.glasses.get_head_orientation()  # e.g. (pitch, yaw, roll)
+            if hasattr(self.recognizer, "recognize_batch"):
+                # One RecognizedBatch per frame instead of a dict per object
+                new_objects = self.recognizer.recognize_batch(detections, head_orientation)
+            else:
+                # Associate each detection with recognized object data + 3D position
+                new_objects = [self.recognizer.associate_detection(d, head_orientation) for d in detections]
 
-            for d in detections:
-                # Associate detection with recognized object data + 3D position
-                recognized_obj = self.recognizer.associate_detection(d, head_orientation)
-                new_objects.append(recognized_obj)
+        # Spatial cues: the engine's voice manager decides which objects are audible
+        with telemetry.span("audio"):
+            # Building yaw is counter-clockwise; the audio listener yaw is clockwise
+            self.audio.set_head_orientation(-head_orientation[0])
+            self.audio.update_cues(new_objects, now=self.clock())
 
-                # Example: play a short beep or TTS once for each newly recognized object
-                label = recognized_obj["name"]
-                position = recognized_obj["position"]
-                self.audio.play_spatial_cue(label, position)
+        # Update internal list
+        self.detected_objects = new_objects
 
-            # Update internal list
-            self.detected_objects = new_objects
+        # Localize the user against the building model's known objects
+        if self.localizer is not None:
+            with telemetry.span("localize"):
+                self._update_localization(new_objects)
 
-        # 2. Check for voice commands
+    def poll_voice(self):
+        """Check for a voice command and handle it."""
         command = self.glasses.capture_voice_command()
         if command:
-            self.handle_voice_command(command)
+            with telemetry.span("voice_command"):
+                self.handle_voice_command(command)
+
+    def update_guidance(self):
+        """Advance route guidance (cheap; only speaks on turn events)."""
+        with telemetry.span("navigation"):
+            self.navigation.update_navigation(self.user_position)
+
+    def objects_in_view(self):
+        """
+        The current detections, plus the building-model objects in the view
+        frustum (if a ViewQuery is set and the user is localized).
+        """
+        if self.view_query is None or self.user_position is None:
+            return self.detected_objects
+        visible = self.view_query.visible_objects(self.user_position, self.glasses.get_head_orientation())
+        return merge_detections(self.detected_objects, visible)
+
+    def _update_localization(self, recognized_objects):
+        """
+        Advance the localizer with the time since the last frame and the
+        current detections; publish the position once the filter has converged.
+        """
+        now = self.clock()
+        dt = 0.0 if self._last_localization_time is None else now - self._last_localization_time
+        self._last_localization_time = now
+
+        self.localizer.predict(dt)
+        self.localizer.update_from_recognized(recognized_objects)
+        if self.localizer.is_converged():
+            x, y, _ = self.localizer.estimate()
+            self.user_position = (x, y, 0.0)
 
     def handle_voice_command(self, command):
         """
@@ -79,46 +205,108 @@ class UserInteraction:
           - "What am I looking at?"
           - "Navigate to the fridge."
           - "Where is the table?"
+
+        Structured commands (navigate, where is, describe, stop, repeat) are
+        parsed by the IntentParser and answered locally; only open-ended
+        questions are sent to the LLM.
+        """
+        self.handle_intent(self.receive_command(command))
+
+    def receive_command(self, command):
+        """
+        Count and log a voice command, then parse it.
+        :return: The Intent to pass to handle_intent (or to answer asynchronously).
         """
+        self._voice_commands.inc()
         print(f"[UserInteraction] Voice command received: {command}")
-        cmd_lower = command.strip().lower()
-
-        # Basic pattern matching:
-        if "navigate" in cmd_lower:
-            # E.g. "navigate to the fridge"
-            # Extract the destination object name
-            target = cmd_lower.replace("navigate to", "").strip()
-            self.navigation.start_navigation(target)
-
-        elif "what am i looking at" in cmd_lower or "what is around" in cmd_lower:
-            # Ask LLM about recognized objects
-            response = self.llm.query_environment(
-                command,
-                self.detected_objects,
-                self.recognizer.building_model
-            )
-            # For demonstration, just print the LLM response to console
-            print(f"[LLM] {response}")
-
-            # Optionally, you can speak it via TTS if your audio engine supports that:
-            # self.audio.play_text(response)
-
-        elif "where is" in cmd_lower:
-            # e.g. "where is the table?"
-            # Could look up the object in self.detected_objects or building model
-            # Then respond with direction or distance
-            object_name = cmd_lower.replace("where is", "").strip()
-            matched = [obj for obj in self.detected_objects if object_name in obj['name'].lower()]
-            if matched:
-                # For simplicity, pick the first matched object
-                obj_info = matched[0]
-                position = obj_info["position"]
-                answer = f"The {obj_info['name']} is at approximate 3D position {position}."
-                print(f"[UserInteraction] {answer}")
-                # Optional TTS:
-                # self.audio.play_text(answer)
+        return self.intents.parse(command)
+
+    def question_sentences(self, intent, asynchronous=False, executor=None):
+        """
+        Send an open-ended question to the LLM.
+        :param asynchronous: Return an async iterator (LLMIntegration.stream_sentences_async).
+        :param executor: Executor for the asynchronous stream.
+        :return: The answer's sentences, each complete as soon as it is generated.
+        """
+        print("[UserInteraction] Open-ended question, asking the LLM "
+              f"({self.intents.llm_calls_avoided} LLM calls avoided so far).")
+        args = (intent.text, self.objects_in_view(), self.recognizer.building_model)
+        if asynchronous:
+            return self.llm.stream_sentences_async(*args, user_position=self.user_position, executor=executor)
+        return self.llm.stream_sentences(*args, user_position=self.user_position)
+
+    def record_answer(self, sentences):
+        """Remember the spoken LLM answer for 'repeat'."""
+        self.last_response = " ".join(sentences)
+        print(f"[LLM] {self.last_response}")
+
+    def handle_intent(self, intent):
+        """Execute a parsed command (see handle_voice_command)."""
+        target = intent.slots.get("target")
+
+        if intent.name == "navigate":
+            self.navigation.start_navigation(target, user_position=self.user_position)
+
+        elif intent.name == "where_is":
+            self._say(self._locate(target))
+
+        elif intent.name == "describe":
+            self._say(self._describe_scene())
+
+        elif intent.name == "stop":
+            self.navigation.stop_navigation()
+            self._say("Navigation stopped.")
+
+        elif intent.name == "repeat":
+            if self.last_response:
+                self._say(self.last_response)
             else:
-                print("[UserInteraction] Not currently detected or unknown object.")
+                self._say("I have not said anything yet.")
+
         else:
-            # Unrecognized command
-            print("[UserInteraction] Command not recognized or not supported.")
+            # Open-ended question: ask the LLM and speak each sentence as soon as
+            # it is complete, so the user hears the start of the answer while
+            # the rest is still being generated
+            sentences = []
+            for sentence in self.question_sentences(intent):
+                sentences.append(sentence)
+                self.audio.play_text(sentence)
+            self.record_answer(sentences)
+
+    def _say(self, text):
+        """Print and speak a locally generated answer, remembering it for 'repeat'."""
+        self.last_response = text
+        print(f"[UserInteraction] {text}")
+        self.audio.play_text(text)
+
+    def _locate(self, target):
+        """
+        Answer 'where is <target>' from the current detections, falling back
+        to the building model if the object is not in view.
+        """
+        matched = [obj for obj in self.detected_objects if target and target in obj["name"].lower()]
+        if matched:
+            # Report the closest match
+            obj_info = min(matched, key=lambda o: math.hypot(o["position"][0], o["position"][2]))
+            lateral, _, forward = obj_info["position"]
+            return f"The {obj_info['name']} is {describe_direction(lateral, forward)}."
+
+        if self.user_position is not None and self.navigation is not None:
+            position = self.navigation.find_target_position(target, near=self.user_position[:2])
+            if position is not None:
+                distance = math.hypot(position[0] - self.user_position[0], position[1] - self.user_position[1])
+                return f"The {target} is not in view; the nearest one is about {distance:.0f} meters away."
+        return f"I cannot see a {target} right now."
+
+    def _describe_scene(self, max_objects=5):
+        """Deterministic summary of the recognized objects (and known objects in view), nearest first."""
+        objects = self.objects_in_view()
+        if not objects:
+            return "I do not see any recognized objects right now."
+        nearest = sorted(objects,
+                         key=lambda o: math.hypot(o["position"][0], o["position"][2]))[:max_objects]
+        parts = [f"a {obj['name']} {describe_direction(obj['position'][0], obj['position'][2])}"
+                 for obj in nearest]
+        if len(parts) > 1:
+            parts[-1] = "and " + parts[-1]
+        return "I can see " + ", ".join(parts) + "."
@@ -0,0 +1,374 @@
+# app/modules/view_query.py
+
+import math
+
+import numpy as np
+
+from .instrumentation import telemetry
+from .mesh_lod import triangulate
+
+
+class AABBTree:
+    """
+    Bounding-volume hierarchy over axis-aligned boxes, stored as flat arrays.
+
+    Items are split at the median of their box centers along the longest
+    axis until at most 'leaf_size' remain. Queries descend only into nodes
+    whose box can contain a hit, so their cost grows with the number of hits
+    and the tree depth rather than with the item count.
+
+    Typical usage:
+      tree = AABBTree(lows, highs)
+      ids, visited = tree.query_planes(normals, offsets)   # e.g. a view frustum
+      ids = tree.query_segment(origin, end)                # e.g. an occlusion ray
+    """
+
+    def __init__(self, lows, highs, leaf_size=4):
+        """
+        :param lows: (N, 3) lower box corners.
+        :param highs: (N, 3) upper box corners.
+        :param leaf_size: Maximum number of items per leaf.
+        """
+        self.lows = np.asarray(lows, dtype=np.float64).reshape(-1, 3)
+        self.highs = np.asarray(highs, dtype=np.float64).reshape(-1, 3)
+        self.leaf_size = max(int(leaf_size), 1)
+        self.order = np.arange(self.lows.shape[0])
+        node_lo, node_hi, left, right, start, end = [], [], [], [], [], []
+        centers = (self.lows + self.highs) / 2.0
+
+        def build(s, e):
+            node = len(start)
+            idx = self.order[s:e]
+            node_lo.append(self.lows[idx].min(axis=0))
+            node_hi.append(self.highs[idx].max(axis=0))
+            left.append(-1)
+            right.append(-1)
+            start.append(s)
+            end.append(e)
+            if e - s > self.leaf_size:
+                c = centers[idx]
+                axis = int(np.argmax(c.max(axis=0) - c.min(axis=0)))
+                mid = (s + e) // 2
+                self.order[s:e] = idx[np.argpartition(c[:, axis], mid - s)]
+                left[node] = build(s, mid)
+                right[node] = build(mid, e)
+            return node
+
+        if self.lows.shape[0]:
+            build(0, self.lows.shape[0])
+        self.node_lo = np.asarray(node_lo, dtype=np.float64).reshape(-1, 3)
+        self.node_hi = np.asarray(node_hi, dtype=np.float64).reshape(-1, 3)
+        self.left = left
+        self.right = right
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.lows.shape[0]
+
+    def query_planes(self, normals, offsets):
+        """
+        Items whose box is not completely outside one of the half-spaces
+        normal . p + offset >= 0 (e.g. the six planes of a frustum).
+
+        :param normals: (P, 3) inward plane normals.
+        :param offsets: (P,) plane offsets.
+        :return: (int array of item indices, number of nodes visited).
+        """
+        normals = np.asarray(normals, dtype=np.float64)
+        offsets = np.asarray(offsets, dtype=np.float64)
+        positive = normals >= 0
+        found = []
+        visited = 0
+        stack = [0] if len(self) else []
+        while stack:
+            node = stack.pop()
+            visited += 1
+            lo, hi = self.node_lo[node], self.node_hi[node]
+            # Farthest corner along each normal outside -> whole node outside
+            if np.any((np.where(positive, hi, lo) * normals).sum(axis=1) + offsets < 0):
+                continue
+            items = self.order[self.start[node]:self.end[node]]
+            # Nearest corner inside every plane -> whole node inside
+            if np.all((np.where(positive, lo, hi) * normals).sum(axis=1) + offsets >= 0):
+                found.append(items)
+            elif self.left[node] < 0:
+                corners = np.where(positive[None], self.highs[items][:, None], self.lows[items][:, None])
+                inside = ((corners * normals[None]).sum(axis=2) + offsets[None] >= 0).all(axis=1)
+                found.append(items[inside])
+            else:
+                stack.append(self.left[node])
+                stack.append(self.right[node])
+        ids = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+        return ids, visited
+
+    def query_segment(self, origin, end):
+        """:return: Int array of the items whose box the segment origin -> end crosses."""
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(end, dtype=np.float64) - origin
+        direction = np.where(np.abs(direction) < 1e-12, 1e-12, direction)
+        inv = 1.0 / direction
+        found = []
+        stack = [0] if len(self) else []
+        while stack:
+            node = stack.pop()
+            t1 = (self.node_lo[node] - origin) * inv
+            t2 = (self.node_hi[node] - origin) * inv
+            t_near = np.minimum(t1, t2).max()
+            t_far = np.maximum(t1, t2).min()
+            if t_far < max(t_near, 0.0) or t_near > 1.0:
+                continue
+            if self.left[node] < 0:
+                found.append(self.order[self.start[node]:self.end[node]])
+            else:
+                stack.append(self.left[node])
+                stack.append(self.right[node])
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+
+def segment_hits_triangles(origin, end, triangles, eps=1e-6):
+    """
+    Moller-Trumbore test of the segment origin -> end against (M, 3, 3)
+    triangles, ignoring hits within 'eps' of either end.
+    :return: True if any triangle is crossed.
+    """
+    if triangles.shape[0] == 0:
+        return False
+    direction = end - origin
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    e1 = b - a
+    e2 = c - a
+    p = np.cross(direction, e2)
+    det = (e1 * p).sum(axis=1)
+    valid = np.abs(det) > 1e-12
+    inv = np.where(valid, 1.0 / np.where(valid, det, 1.0), 0.0)
+    s = origin - a
+    u = (s * p).sum(axis=1) * inv
+    q = np.cross(s, e1)
+    v = (q * direction).sum(axis=1) * inv
+    t = (q * e2).sum(axis=1) * inv
+    hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > eps) & (t < 1.0 - eps)
+    return bool(hit.any())
+
+
+def view_basis(yaw, pitch=0.0):
+    """
+    Unit (forward, right, up) vectors of a view direction. Yaw is measured
+    counter-clockwise from +X on the floor plane (as in localization.py),
+    pitch upward from the floor plane.
+    """
+    cp, sp = math.cos(pitch), math.sin(pitch)
+    forward = np.array([math.cos(yaw) * cp, math.sin(yaw) * cp, sp])
+    right = np.array([math.sin(yaw), -math.cos(yaw), 0.0])
+    up = np.cross(right, forward)
+    return forward, right, up
+
+
+class ViewQuery:
+    """
+    Answers "which building-model objects are in front of the user?".
+
+    Given the user's position and head orientation, returns the known objects
+    inside the camera's view frustum, nearest first, dropping those hidden
+    behind the building mesh. Objects are culled with an AABBTree over their
+    bounds; occlusion rays are tested against a second tree over the mesh
+    triangles (a coarse level of detail if the model carries one).
+
+    Results use the recognized-object format (camera-frame 'position' =
+    (lateral, vertical, forward)) with "source": "model", so they can be
+    merged with live detections (merge_detections) before reaching
+    LLMIntegration.
+
+    Typical usage:
+      view = ViewQuery(building_model)
+      visible = view.visible_objects(user_position, head_orientation)
+      objects = merge_detections(detected_objects, visible)
+    """
+
+    def __init__(self, building_model, hfov_deg=70.0, vfov_deg=50.0, max_range=10.0, near=0.1,
+                 eye_height=1.6, occlusion=True, lod_tolerance=0.1, point_radius=0.25, leaf_size=4):
+        """
+        :param building_model: Data structure from ingestion.py.
+        :param hfov_deg: Horizontal field of view of the camera.
+        :param vfov_deg: Vertical field of view of the camera.
+        :param max_range: Far plane (m).
+        :param near: Near plane (m).
+        :param eye_height: Eye height (m) above the user position.
+        :param occlusion: Drop objects hidden behind the building mesh.
+        :param lod_tolerance: Accuracy (m) of the occluder mesh if the model has levels of detail.
+        :param point_radius: Half-size (m) of the box of objects known only by a position.
+        :param leaf_size: Items per leaf of the hierarchies.
+        """
+        self.building_model = building_model or {}
+        self.half_h = math.radians(hfov_deg) / 2.0
+        self.half_v = math.radians(vfov_deg) / 2.0
+        self.max_range = max_range
+        self.near = near
+        self.eye_height = eye_height
+        self.occlusion = occlusion
+        self.lod_tolerance = lod_tolerance
+        self.point_radius = point_radius
+        self.leaf_size = leaf_size
+
+        self.queries = 0
+        self.nodes_visited = 0
+        self.occluded = 0
+        self._stale = True
+
+    def invalidate(self):
+        """Rebuild the hierarchies on the next query (e.g. after a model update)."""
+        self._stale = True
+
+    def _build(self):
+        objects = self.building_model.get("objects", [])
+        ids, lows, highs = [], [], []
+        for i, obj in enumerate(objects):
+            if obj.get("bounds"):
+                lo, hi = obj["bounds"]
+            elif obj.get("position") is not None or obj.get("centroid") is not None:
+                center = np.asarray(obj.get("centroid") or obj.get("position"), dtype=np.float64)[:3]
+                lo, hi = center - self.point_radius, center + self.point_radius
+            else:
+                continue
+            ids.append(i)
+            lows.append(lo)
+            highs.append(hi)
+        self.object_ids = np.asarray(ids, dtype=np.int64)
+        self.object_tree = AABBTree(lows, highs, leaf_size=self.leaf_size)
+
+        vertices, faces, self.triangle_owner = self._occluder_mesh()
+        self.triangles = vertices[faces] if faces.shape[0] else np.zeros((0, 3, 3))
+        self.triangle_tree = AABBTree(self.triangles.min(axis=1) if faces.shape[0] else np.zeros((0, 3)),
+                                      self.triangles.max(axis=1) if faces.shape[0] else np.zeros((0, 3)),
+                                      leaf_size=self.leaf_size)
+        self._stale = False
+
+    def _occluder_mesh(self):
+        """:return: (vertices, (M, 3) faces, (M,) owning object id or -1)."""
+        lod = self.building_model.get("lod")
+        vertex_chunks, face_chunks, owners, offset = [], [], [], 0
+        if lod is not None:
+            for group in range(len(lod)):
+                level = lod.select(group, self.lod_tolerance)
+                vertex_chunks.append(level.vertices)
+                face_chunks.append(level.faces + offset)
+                owners.append(np.full(level.faces.shape[0], group if group < lod.n_objects else -1))
+                offset += level.vertices.shape[0]
+            vertices = np.concatenate(vertex_chunks) if vertex_chunks else np.zeros((0, 3))
+        else:
+            geometry = self.building_model.get("geometry")
+            if not isinstance(geometry, dict) or not geometry.get("vertices"):
+                return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64), np.zeros(0, dtype=np.int64)
+            vertices = np.asarray(geometry["vertices"], dtype=np.float64)[:, :3]
+            owned = set()
+            for i, obj in enumerate(self.building_model.get("objects", [])):
+                faces = obj.get("faces") or []
+                face_chunks.append(triangulate(faces))
+                owners.append(np.full(face_chunks[-1].shape[0], i))
+                owned.update(tuple(face) for face in faces)
+            face_chunks.append(triangulate([f for f in geometry.get("faces", []) if tuple(f) not in owned]))
+            owners.append(np.full(face_chunks[-1].shape[0], -1))
+        if not face_chunks:
+            return vertices, np.zeros((0, 3), dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return vertices, np.concatenate(face_chunks), np.concatenate(owners).astype(np.int64)
+
+    def frustum(self, eye, yaw, pitch=0.0):
+        """:return: (normals (6, 3), offsets (6,)) of the inward frustum planes."""
+        forward, right, up = view_basis(yaw, pitch)
+        ch, sh = math.cos(self.half_h), math.sin(self.half_h)
+        cv, sv = math.cos(self.half_v), math.sin(self.half_v)
+        normals = np.array([
+            forward,                 # near
+            -forward,                # far
+            sh * forward - ch * right,
+            sh * forward + ch * right,
+            sv * forward - cv * up,
+            sv * forward + cv * up,
+        ])
+        offsets = -(normals @ eye)
+        offsets[0] -= self.near
+        offsets[1] += self.max_range
+        return normals, offsets
+
+    def _is_occluded(self, eye, target, object_id):
+        candidates = self.triangle_tree.query_segment(eye, target)
+        if candidates.size == 0:
+            return False
+        candidates = candidates[self.triangle_owner[candidates] != object_id]
+        return segment_hits_triangles(eye, target, self.triangles[candidates])
+
+    def visible_objects(self, user_position, head_orientation, max_objects=None):
+        """
+        :param user_position: (x, y[, z]) of the user's feet in building coordinates.
+        :param head_orientation: (yaw, pitch, roll) in radians.
+        :param max_objects: Optional limit, nearest first.
+        :return: List of object dicts: "name", "type", "description", "position"
+                 (lateral, vertical, forward in the camera frame), "distance",
+                 "confidence", "object_id" and "source": "model"; nearest first.
+        """
+        with telemetry.span("view_query"):
+            if self._stale:
+                self._build()
+            z = user_position[2] if len(user_position) > 2 else 0.0
+            eye = np.array([user_position[0], user_position[1], z + self.eye_height], dtype=np.float64)
+            yaw, pitch = head_orientation[0], head_orientation[1] if len(head_orientation) > 1 else 0.0
+            normals, offsets = self.frustum(eye, yaw, pitch)
+            hits, visited = self.object_tree.query_planes(normals, offsets)
+            self.queries += 1
+            self.nodes_visited += visited
+
+            forward, right, up = view_basis(yaw, pitch)
+            objects = self.building_model.get("objects", [])
+            results = []
+            for slot in hits:
+                object_id = int(self.object_ids[slot])
+                obj = objects[object_id]
+                center = (self.object_tree.lows[slot] + self.object_tree.highs[slot]) / 2.0
+                offset = center - eye
+                distance = float(np.linalg.norm(offset))
+                if self.occlusion and self._is_occluded(eye, center, object_id):
+                    self.occluded += 1
+                    continue
+                results.append({
+                    "name": obj.get("label") or obj.get("name") or f"object {object_id}",
+                    "type": obj.get("type", "building"),
+                    "description": obj.get("description", ""),
+                    "position": (float(offset @ right), float(offset @ up), float(offset @ forward)),
+                    "distance": distance,
+                    "confidence": 1.0,
+                    "object_id": object_id,
+                    "source": "model",
+                })
+            results.sort(key=lambda o: o["distance"])
+            if max_objects is not None:
+                results = results[:max_objects]
+        return results
+
+    def stats(self):
+        return {
+            "objects": len(self.object_tree) if not self._stale else None,
+            "queries": self.queries,
+            "mean_nodes_visited": round(self.nodes_visited / self.queries, 1) if self.queries else 0.0,
+            "occluded": self.occluded,
+        }
+
+
+def merge_detections(detected_objects, visible_objects, match_radius=1.0):
+    """
+    Combine live detections with the model objects in view. Detections come
+    first; a model object with the same name within 'match_radius' (m, camera
+    frame) of a detection is taken as the same object and dropped.
+
+    :return: New list: detections, then unmatched model objects (nearest first).
+    """
+    merged = list(detected_objects or ())
+    for obj in visible_objects or ():
+        name = str(obj.get("name", "")).lower()
+        px, _, pz = obj["position"]
+        duplicate = any(
+            str(d.get("name", "")).lower() == name
+            and math.hypot(d["position"][0] - px, d["position"][2] - pz) <= match_radius
+            for d in detected_objects or ())
+        if not duplicate:
+            merged.append(obj)
+    return merged
@@ -0,0 +1,170 @@
+# app/modules/voice_manager.py
+
+import math
+
+from .detections import name_type_position
+
+
+# Relative importance of furniture DB 'type' values; obstacles matter most
+DEFAULT_TYPE_WEIGHTS = {
+    "obstacle": 3.0,
+    "human": 3.0,
+    "structure": 2.0,
+    "furniture": 1.5,
+    "appliance": 1.0,
+    "unknown": 1.0,
+    "lighting": 0.5,
+    "misc": 0.5,
+}
+
+
+class VirtualSource:
+    """
+    A tracked sound source. Pooled and reused; 'voice' is True while it is
+    actually rendered, False while it is virtual (tracked but silent).
+    """
+
+    __slots__ = ("label", "type", "position", "azimuth", "distance",
+                 "first_seen", "last_seen", "last_trigger", "priority", "voice")
+
+    def reset(self, label, obj_type, now):
+        self.label = label
+        self.type = obj_type
+        self.position = (0.0, 0.0, 0.0)
+        self.azimuth = 0.0
+        self.distance = 0.0
+        self.first_seen = now
+        self.last_seen = now
+        self.last_trigger = None
+        self.priority = 0.0
+        self.voice = False
+
+
+class VoiceManager:
+    """
+    Decides which recognized objects get an audible voice.
+
+    Every recognized object is tracked as a (pooled) VirtualSource. Each
+    update scores them by type weight, distance and novelty; only the
+    'max_voices' best audible ones are rendered, the rest stay virtual and
+    can be promoted later without losing their state. Because the renderer
+    never sees more than 'max_voices' sources, rendering cost is constant
+    no matter how cluttered the room is.
+
+    Typical usage:
+      manager = VoiceManager(max_voices=6)
+      start, stop, move = manager.update(recognized_objects, now)
+    """
+
+    def __init__(self, max_voices=6, type_weights=None, audible_distance=8.0,
+                 novelty_boost=2.0, novelty_half_life=3.0, forget_after=2.0,
+                 retrigger_interval=1.0, pool_size=64):
+        """
+        :param max_voices: Hard limit on simultaneously rendered sources.
+        :param type_weights: Mapping from furniture DB 'type' to importance.
+        :param audible_distance: Sources farther than this (m) are always virtual.
+        :param novelty_boost: Extra priority factor for newly seen objects.
+        :param novelty_half_life: Seconds over which the novelty boost decays.
+        :param forget_after: Seconds without detection before a source is released.
+        :param retrigger_interval: Seconds between repeated cues of a rendered source.
+        :param pool_size: Number of preallocated VirtualSource objects.
+        """
+        self.max_voices = max_voices
+        self.type_weights = dict(DEFAULT_TYPE_WEIGHTS, **(type_weights or {}))
+        self.audible_distance = audible_distance
+        self.novelty_boost = novelty_boost
+        self.novelty_decay = math.log(2.0) / novelty_half_life
+        self.forget_after = forget_after
+        self.retrigger_interval = retrigger_interval
+
+        self.pool = [VirtualSource() for _ in range(pool_size)]
+        self.sources = {}  # label -> VirtualSource
+        self.created = 0  # sources allocated beyond the preallocated pool
+        self.promotions = 0
+        self.demotions = 0
+
+    def _acquire(self, label, obj_type, now):
+        if self.pool:
+            source = self.pool.pop()
+        else:
+            source = VirtualSource()
+            self.created += 1
+        source.reset(label, obj_type, now)
+        return source
+
+    def _release(self, source):
+        self.pool.append(source)
+
+    def priority(self, source, now):
+        if source.distance > self.audible_distance:
+            return 0.0
+        weight = self.type_weights.get(source.type, 1.0)
+        proximity = 1.0 / (1.0 + source.distance)
+        novelty = 1.0 + self.novelty_boost * math.exp(-self.novelty_decay * (now - source.first_seen))
+        return weight * proximity * novelty
+
+    def update(self, recognized_objects, now):
+        """
+        Track the current detections and reassign voices.
+
+        :param recognized_objects: A RecognizedBatch, or dicts / records with "name",
+                                   "position" (listener frame) and optional "type".
+        :return: (start, stop, move) where
+                 start: sources to (re)trigger now,
+                 stop: labels whose voice was taken away or that disappeared,
+                 move: rendered sources whose direction should be updated.
+        """
+        for label, obj_type, (x, y, z) in name_type_position(recognized_objects):
+            source = self.sources.get(label)
+            if source is None:
+                source = self.sources[label] = self._acquire(label, obj_type, now)
+            source.position = (x, y, z)
+            source.azimuth = math.atan2(x, z)
+            source.distance = math.sqrt(x * x + y * y + z * z)
+            source.last_seen = now
+
+        stop = []
+        for label in [l for l, s in self.sources.items() if now - s.last_seen > self.forget_after]:
+            source = self.sources.pop(label)
+            if source.voice:
+                stop.append(label)
+            self._release(source)
+
+        for source in self.sources.values():
+            source.priority = self.priority(source, now)
+        ranked = sorted((s for s in self.sources.values() if s.priority > 0.0),
+                        key=lambda s: s.priority, reverse=True)
+        winners = {s.label for s in ranked[:self.max_voices]}
+
+        start, move = [], []
+        for source in self.sources.values():
+            if source.label in winners:
+                if not source.voice:
+                    source.voice = True
+                    self.promotions += 1
+                if source.last_trigger is None or now - source.last_trigger >= self.retrigger_interval:
+                    source.last_trigger = now
+                    start.append(source)
+                else:
+                    move.append(source)
+            elif source.voice:
+                source.voice = False
+                source.last_trigger = None
+                self.demotions += 1
+                stop.append(source.label)
+        return start, stop, move
+
+    @property
+    def n_voices(self):
+        return sum(1 for s in self.sources.values() if s.voice)
+
+    def stats(self):
+        return {
+            "tracked": len(self.sources),
+            "voices": self.n_voices,
+            "virtual": len(self.sources) - self.n_voices,
+            "pooled_free": len(self.pool),
+            "created": self.created,
+            "promotions": self.promotions,
+            "demotions": self.demotions,
+        }
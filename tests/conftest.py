@@ -0,0 +1,67 @@
+# tests/conftest.py
+
+import time
+import numpy as np
+import pytest
+
+
+class FakeAudio:
+    """
+    Stands in for SpatialAudioEngine: records every text passed to play_text
+    and counts cue updates.
+    """
+
+    def __init__(self):
+        self.spoken = []
+        self.cue_updates = 0
+
+    def set_head_orientation(self, yaw):
+        pass
+
+    def update_cues(self, objects, now=None):
+        self.cue_updates += 1
+
+    def play_text(self, text):
+        self.spoken.append(text)
+
+
+class FakeGlasses:
+    """
+    Stands in for GlassesIntegration: a fixed head orientation, blank camera
+    frames and scripted voice commands.
+    """
+
+    def __init__(self, commands=(), frame_delay=0.0):
+        """
+        :param commands: (seconds after creation, command text) pairs, in order.
+        :param frame_delay: Seconds each camera read blocks.
+        """
+        self.commands = list(commands)
+        self.frame_delay = frame_delay
+        self.start = time.monotonic()
+        self.frames = 0
+
+    def get_camera_frame(self):
+        if self.frame_delay:
+            time.sleep(self.frame_delay)
+        self.frames += 1
+        return np.zeros((8, 8, 3), dtype=np.uint8)
+
+    def get_head_orientation(self):
+        return (0.0, 0.0, 0.0)
+
+    def capture_voice_command(self):
+        if self.commands and time.monotonic() - self.start >= self.commands[0][0]:
+            return self.commands.pop(0)[1]
+        return None
+
+
+@pytest.fixture
+def fake_audio():
+    return FakeAudio()
+
+
+@pytest.fixture
+def fake_glasses():
+    """Factory: fake_glasses(commands=(), frame_delay=0.0) -> FakeGlasses."""
+    return FakeGlasses
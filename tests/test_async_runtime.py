@@ -0,0 +1,113 @@
+# tests/test_async_runtime.py
+
+import asyncio
+import threading
+import time
+import numpy as np
+from app.modules.async_runtime import AsyncUserInteraction
+from app.modules.llm_integration import LLMIntegration
+from app.modules.user_interaction import UserInteraction
+
+
+class FakeDetector:
+    def detect_objects(self, frame):
+        time.sleep(0.005)  # CPU-bound stand-in, runs on the detection thread
+        return [{"label": "chair", "bbox": (0, 0, 4, 4), "confidence": 0.9}]
+
+
+class FakeRecognizer:
+    building_model = {"objects": []}
+    furniture_db = {"chair": {}}
+
+    def associate_detection(self, detection, head_orientation):
+        return {"name": detection["label"], "position": (0.0, 0.0, 2.0), "confidence": 0.9}
+
+
+class FakeNavigation:
+    def __init__(self):
+        self.stopped = False
+
+    def update_navigation(self, user_position=None):
+        pass
+
+    def stop_navigation(self):
+        self.stopped = True
+
+
+class SlowModel:
+    """Streams one sentence every 'delay' seconds; records whether the stream was closed early."""
+
+    def __init__(self, n_sentences=3, delay=0.3):
+        self.n_sentences = n_sentences
+        self.delay = delay
+        self.closed_early = threading.Event()
+
+    def __call__(self, prompt, max_tokens):
+        def chunks():
+            try:
+                for i in range(self.n_sentences):
+                    time.sleep(self.delay)
+                    yield f"Sentence number {i + 1}. "
+            except GeneratorExit:
+                self.closed_early.set()
+                raise
+        return chunks()
+
+
+def make_runtime(glasses, audio, model):
+    nav = FakeNavigation()
+    ui = UserInteraction(glasses, audio, FakeDetector(), FakeRecognizer(), nav, LLMIntegration(model))
+    return AsyncUserInteraction(ui, frame_rate=50.0, voice_rate=50.0), nav
+
+
+def test_perception_keeps_running_during_llm_answer(fake_glasses, fake_audio):
+    model = SlowModel(n_sentences=3, delay=0.3)
+    glasses = fake_glasses([(0.0, "Is the hallway clear?")], frame_delay=0.002)
+    runtime, _ = make_runtime(glasses, fake_audio, model)
+    asyncio.run(runtime.run(duration=1.2))
+
+    assert fake_audio.spoken == ["Sentence number 1.", "Sentence number 2.", "Sentence number 3."]
+    assert runtime.ui.last_response == "Sentence number 1. Sentence number 2. Sentence number 3."
+    # Frames kept flowing while the answer was streamed (~1 s of it)
+    assert runtime.frames > 20 and fake_audio.cue_updates == runtime.frames
+    assert runtime.stats()["max_loop_lag_ms"] < 100.0
+
+
+def test_newer_command_cancels_previous_answer(fake_glasses, fake_audio):
+    model = SlowModel(n_sentences=5, delay=0.2)
+    glasses = fake_glasses([(0.0, "Is the hallway clear?"), (0.3, "Stop")], frame_delay=0.002)
+    runtime, nav = make_runtime(glasses, fake_audio, model)
+    asyncio.run(runtime.run(duration=1.0))
+
+    assert runtime.superseded == 1 and nav.stopped
+    assert fake_audio.spoken == ["Sentence number 1.", "Navigation stopped."]
+    assert model.closed_early.wait(1.0)
+
+
+def test_speech_is_synthesized_off_the_loop_thread(fake_glasses, fake_audio):
+    synth_threads = set()
+
+    def synthesize_speech(text):
+        synth_threads.add(threading.current_thread().name)
+        return np.zeros(16, dtype=np.float32)
+
+    fake_audio.synthesize_speech = synthesize_speech
+    fake_audio.play_speech = lambda text, pcm: fake_audio.spoken.append(text)
+    model = SlowModel(n_sentences=2, delay=0.05)
+    runtime, _ = make_runtime(fake_glasses([(0.0, "Is the hallway clear?")]), fake_audio, model)
+    asyncio.run(runtime.run(stop_when=lambda: len(fake_audio.spoken) == 2))
+
+    assert runtime.ui.last_response == "Sentence number 1. Sentence number 2."
+    assert synth_threads and threading.main_thread().name not in synth_threads
+    assert runtime.stats()["voice_commands"] == 1
+
+
+def test_stream_sentences_async_yields_sentences():
+    llm = LLMIntegration(lambda prompt, max_tokens: iter(["The chair is ", "ahead. The table ", "is left."]))
+
+    async def collect():
+        return [s async for s in llm.stream_sentences_async("What is here?", [], None)]
+
+    assert asyncio.run(collect()) == ["The chair is ahead.", "The table is left."]
+    assert asyncio.run(llm.query_environment_async("What is here?", [], None)) == \
+        "The chair is ahead. The table is left."
@@ -0,0 +1,51 @@
+# tests/test_benchmark_suite.py
+
+import json
+from app.modules.benchmark_suite import (compare_to_baseline, flatten_metrics, load_results, run_suite,
+                                         save_results, synthetic_building)
+from app.modules.path_planner import GridPlanner, OccupancyGrid
+
+
+def test_synthetic_building_rooms_are_connected():
+    model = synthetic_building(4)
+    assert len(model["objects"]) == 4
+    planner = GridPlanner(OccupancyGrid(model))
+    # Opposite corners of the 2x2 grid of rooms are reachable through the doorways
+    assert planner.plan((1.0, 1.0), (7.0, 7.0)) is not None
+
+
+def test_compare_to_baseline_respects_metric_direction():
+    baseline = {"metrics": {"planner.query.mean_ms": 10.0, "robot_loop.fps": 100.0,
+                            "planner.query.min_ms": 1.0, "planner.grid_cells": 100.0}}
+    current = {"metrics": {"planner.query.mean_ms": 13.0, "robot_loop.fps": 60.0,
+                           "planner.query.min_ms": 5.0, "planner.grid_cells": 500.0}}
+    regressions = compare_to_baseline(current, baseline, tolerance=0.2)
+    assert [r["metric"] for r in regressions] == ["robot_loop.fps", "planner.query.mean_ms"]
+    assert abs(regressions[0]["change"] - 0.4) < 1e-9
+
+    faster = {"metrics": {"planner.query.mean_ms": 5.0, "robot_loop.fps": 300.0}}
+    assert compare_to_baseline(faster, baseline) == []
+
+
+def test_compare_to_baseline_skips_noisy_metrics():
+    baseline = {"metrics": {"planner.query.p95_ms": 10.0, "audio.sources_8.block_max_ms": 0.3,
+                            "detection.frame.mean_ms": 0.002, "detection.frames_per_s": 500000.0,
+                            "ingestion.rooms_1.mean_ms": 0.8}}
+    current = {"metrics": {name: value * 5 if name.endswith("_ms") else value / 5
+                           for name, value in baseline["metrics"].items()}}
+    assert compare_to_baseline(current, baseline) == []
+    assert [r["metric"] for r in compare_to_baseline(current, baseline, min_ms=0.5)] == [
+        "ingestion.rooms_1.mean_ms"]
+
+
+def test_quick_suite_writes_machine_readable_results(tmp_path):
+    results = run_suite(quick=True, only={"recognition", "planner", "audio"})
+    assert set(results["benchmarks"]) == {"recognition", "planner", "audio"}
+    assert results["hardware"]["cpu_count"] >= 1
+    assert results["metrics"] == flatten_metrics(results["benchmarks"])
+    assert results["metrics"]["recognition.associations_per_s"] > 0
+
+    path = str(tmp_path / "results.json")
+    save_results(results, path)
+    assert load_results(path) == json.loads(json.dumps(results))
+    assert compare_to_baseline(results, load_results(path)) == []
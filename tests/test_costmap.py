@@ -0,0 +1,114 @@
+# tests/test_costmap.py
+
+import math
+import numpy as np
+import pytest
+from app.modules.costmap import LocalCostmap, camera_to_world
+from app.modules.robot_navigation import RobotNavigation
+
+
+@pytest.fixture
+def costmap():
+    """
+    A small 4m x 4m costmap with 10cm cells, centered on the origin.
+    """
+    cm = LocalCostmap(size_m=4.0, resolution=0.1, inflation_radius=0.3,
+                      inscribed_radius=0.15, decay_time=1.0)
+    cm.update_origin(0.0, 0.0)
+    return cm
+
+
+class FakeRobot:
+    """
+    Minimal stand-in for RobotIntegration that records motor commands.
+    """
+    def __init__(self, pose=(0.0, 0.0, 0.0)):
+        self.pose = pose
+        self.commands = []
+
+    def get_robot_pose(self):
+        return self.pose
+
+    def send_motor_command(self, linear, angular):
+        self.commands.append((linear, angular))
+
+
+def test_camera_to_world_forward():
+    """
+    An object straight ahead of a robot facing +Y lands on the +Y axis.
+    """
+    x, y = camera_to_world((0.0, 0.0, 2.0), (1.0, 1.0, math.pi / 2))
+    assert x == pytest.approx(1.0)
+    assert y == pytest.approx(3.0)
+
+
+def test_mark_and_inflate(costmap):
+    """
+    A marked point is lethal, nearby cells are inscribed, far cells stay free.
+    """
+    costmap.mark_points([[1.0, 0.0]], now=0.0)
+    costmap.update(now=0.0)
+
+    assert costmap.cost_at(1.0, 0.0) == LocalCostmap.LETHAL
+    assert costmap.is_collision(1.1, 0.0)
+    assert 0 < costmap.cost_at(1.25, 0.0) < LocalCostmap.INSCRIBED
+    assert costmap.cost_at(-1.0, 0.0) == LocalCostmap.FREE
+
+
+def test_decay_forgets_old_obstacles(costmap):
+    """
+    Obstacles not re-observed within decay_time disappear.
+    """
+    costmap.mark_points([[0.5, 0.5]], now=0.0)
+    costmap.update(now=0.5)
+    assert costmap.is_collision(0.5, 0.5)
+
+    costmap.update(now=2.0)
+    assert not costmap.is_collision(0.5, 0.5)
+
+
+def test_ray_clearing_keeps_hit(costmap):
+    """
+    Clearing removes obstacles along the ray but keeps the endpoint.
+    """
+    costmap.mark_points([[0.5, 0.0], [1.5, 0.0]], now=0.0)
+    costmap.update_from_points((0.0, 0.0), [[1.5, 0.0]], now=0.1)
+    costmap.update(now=0.1)
+
+    assert costmap.cost_at(0.5, 0.0) < LocalCostmap.INSCRIBED
+    assert costmap.cost_at(1.5, 0.0) == LocalCostmap.LETHAL
+
+
+def test_scroll_preserves_obstacles_without_reallocating(costmap):
+    """
+    Moving the window keeps obstacles at the same world position and reuses buffers.
+    """
+    buffers = {id(costmap.last_seen), id(costmap._scratch)}
+    costmap.mark_points([[0.5, 0.5]], now=0.0)
+
+    costmap.update_origin(1.0, 0.3)
+    costmap.update(now=0.0)
+    assert costmap.cost_at(0.5, 0.5) == LocalCostmap.LETHAL
+    assert {id(costmap.last_seen), id(costmap._scratch)} == buffers
+
+    # Scrolling far away drops everything
+    costmap.update_origin(50.0, 50.0)
+    costmap.update(now=0.0)
+    assert not np.isfinite(costmap.last_seen).any()
+
+
+def test_robot_navigation_stops_for_obstacle(costmap):
+    """
+    RobotNavigation refuses to drive forward when the costmap reports a collision ahead.
+    """
+    robot = FakeRobot(pose=(0.0, 0.0, 0.0))
+    nav = RobotNavigation({"geometry": None, "objects": []}, robot, costmap=costmap)
+    nav.set_destination(3.0, 0.0)
+
+    nav.update_navigation()
+    assert robot.commands[-1] == (0.1, 0.0)
+
+    costmap.mark_points([[0.3, 0.0]])
+    nav.update_navigation()
+    assert robot.commands[-1] == (0.0, 0.0)
+    assert nav.blocked
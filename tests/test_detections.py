@@ -0,0 +1,139 @@
+# tests/test_detections.py
+
+import sys
+import threading
+import numpy as np
+from app.modules.benchmark_suite import bench_allocations
+from app.modules.detections import LABELS, DetectionBatch, LabelTable, RecognizedBatch, RecognizedObject
+from app.modules.localization import ParticleFilterLocalizer
+from app.modules.object_detection import ObjectDetection
+from app.modules.object_recognition import ObjectRecognition
+from app.modules.voice_manager import VoiceManager
+
+
+def make_recognizer(tmp_path):
+    db_path = tmp_path / "db.json"
+    db_path.write_text('{"chair": {"name": "chair", "type": "furniture", "description": "A wooden chair."},'
+                       ' "fridge": {"name": "fridge", "type": "appliance", "description": "A fridge."}}')
+    return ObjectRecognition({"geometry": None, "objects": []}, str(db_path))
+
+
+def test_records_read_like_the_legacy_dicts():
+    obj = RecognizedObject("chair", "furniture", "A chair.", (0.1, 0.0, 2.0), 0.9)
+    assert obj["name"] == "chair" and obj.get("type") == "furniture"
+    assert obj.get("missing", "x") == "x" and "position" in obj and "label" not in obj
+    assert obj == {"name": "chair", "type": "furniture", "description": "A chair.",
+                   "position": (0.1, 0.0, 2.0), "confidence": 0.9}
+    assert not hasattr(obj, "__dict__")
+
+
+def test_label_table_interns_each_label_once_across_threads():
+    table = LabelTable()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append([table.intern(f"label{i}") for i in range(200)])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(table) == 200 and all(ids == results[0] for ids in results)
+    assert [table.name(i) for i in results[0]] == [f"label{i}" for i in range(200)]
+
+
+def test_detection_batch_round_trips_dicts():
+    records = [{"label": "chair", "bbox": (10, 20, 110, 220), "confidence": 0.5},
+               {"label": "fridge", "bbox": (300, 0, 400, 300), "confidence": 0.75}]
+    batch = DetectionBatch.from_records(records)
+    assert len(batch) == 2 and batch.label_ids.dtype == np.int32 and batch.boxes.shape == (2, 4)
+    assert batch.to_dicts() == records
+    assert batch[1]["label"] == "fridge"
+    assert len(DetectionBatch.empty()) == 0 and not DetectionBatch.empty()
+
+    detector = ObjectDetection("mock_detection_model")
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    assert detector.detect_batch(frame).to_dicts() == detector.detect_objects(frame)
+    # The dict view keeps the legacy types: integer pixel boxes, the detector's confidence
+    detection, = detector.detect_objects(frame)
+    assert all(type(v) is int for v in detection["bbox"]) and detection["confidence"] == 0.9
+
+
+def test_recognize_batch_matches_associate_detection(tmp_path):
+    recognizer = make_recognizer(tmp_path)
+    records = [{"label": label, "bbox": (40.0 * k, 80.0, 40.0 * k + 90.0, 220.0), "confidence": 0.8}
+               for k, label in enumerate(["chair", "fridge", "unknown_thing", "chair"])]
+    pose = (0.0, 0.0, 0.0)
+    batch = recognizer.recognize_batch(DetectionBatch.from_records(records), pose)
+    assert isinstance(batch, RecognizedBatch)
+    expected = [recognizer.associate_detection(d, pose) for d in records]
+    for got, want in zip(batch.to_dicts(), expected):
+        assert got["name"] == want["name"] and got["type"] == want["type"]
+        assert got["description"] == want["description"]
+        assert np.allclose(got["position"], want["position"])
+        assert np.isclose(got["confidence"], want["confidence"])
+    # DB info is looked up once per label, then served from the tables
+    assert recognizer._name_lut[LABELS.intern("chair")] == LABELS.intern("chair")
+
+
+def test_recognize_batch_is_safe_across_threads(tmp_path):
+    recognizer = make_recognizer(tmp_path)
+    barrier = threading.Barrier(8)
+    errors, mismatches = [], []
+
+    def worker(k):
+        barrier.wait()
+        try:
+            for i in range(500):
+                # New label ids every frame force the lookup tables to grow
+                labels = ["chair", f"thread{k}_thing{i}", "fridge", f"shared_thing{i}"]
+                records = [{"label": label, "bbox": (0, 0, 10, 10), "confidence": 0.5} for label in labels]
+                batch = recognizer.recognize_batch(DetectionBatch.from_records(records), (0.0, 0.0, 0.0))
+                if list(batch.names()) != labels:
+                    mismatches.append(list(batch.names()))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(8)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads often enough to hit the race
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert not errors and not mismatches
+
+
+def test_consumers_accept_batches(tmp_path):
+    recognizer = make_recognizer(tmp_path)
+    records = [{"label": "chair", "bbox": (100.0, 80.0, 200.0, 220.0), "confidence": 0.9},
+               {"label": "fridge", "bbox": (400.0, 50.0, 500.0, 300.0), "confidence": 0.9}]
+    pose = (0.0, 0.0, 0.0)
+    batch = recognizer.recognize_batch(DetectionBatch.from_records(records), pose)
+    dicts = [recognizer.associate_detection(d, pose) for d in records]
+
+    from_batch, from_dicts = VoiceManager(), VoiceManager()
+    started = [[(s.label, s.type, s.position) for s in vm.update(objs, now=0.0)[0]]
+               for vm, objs in ((from_batch, batch), (from_dicts, dicts))]
+    assert started[0] == started[1] and sorted(from_batch.sources) == ["chair", "fridge"]
+
+    model = {"geometry": None, "objects": [{"name": "chair", "centroid": (2.0, 0.0, 0.5)},
+                                           {"name": "fridge", "centroid": (2.0, -1.0, 0.9)}]}
+    localizers = [ParticleFilterLocalizer(model, n_particles=200, seed=3) for _ in range(2)]
+    assert localizers[0].update_from_recognized(batch) == localizers[1].update_from_recognized(dicts) == 2
+    assert np.allclose(localizers[0].log_w, localizers[1].log_w)
+
+
+def test_batches_cut_per_object_allocations(tmp_path):
+    results = bench_allocations(make_recognizer(tmp_path), object_counts=(10, 50), n_frames=5)
+    small, large = results["objects_10"], results["objects_50"]
+    # A fixed handful of containers per frame, instead of a dict (or more) per object
+    assert large["batch"]["gc_objects"] <= small["batch"]["gc_objects"] + 1
+    assert large["batch"]["gc_objects"] < large["dicts"]["gc_objects"] / 10
+    assert large["dicts"]["gc_objects"] > small["dicts"]["gc_objects"]
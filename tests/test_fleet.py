@@ -0,0 +1,76 @@
+# tests/test_fleet.py
+
+import pytest
+from app.modules.fleet import FleetServer, PathReservationTable, fleet_scaling_report
+from app.modules.object_detection import ObjectDetection
+from app.modules.object_recognition import ObjectRecognition
+
+
+@pytest.fixture
+def floor_model():
+    """
+    An empty 3m x 3m floor.
+    """
+    return {
+        "geometry": {
+            "vertices": [(0.0, 0.0, 0.0), (3.0, 0.0, 0.0), (3.0, 3.0, 0.0), (0.0, 3.0, 0.0)],
+            "faces": [(0, 1, 2), (0, 2, 3)],
+        },
+        "objects": [{"name": "fridge", "centroid": (2.5, 2.5, 0.9)}],
+        "format": "OBJ",
+    }
+
+
+def test_reservations_conflict_and_release():
+    """
+    A second robot cannot reserve a cell/slot already held by the first one.
+    """
+    table = PathReservationTable(slot_s=1.0, slack_slots=0)
+    assert table.reserve_path(0, [(0, 0), (0, 1)], start_time=0.0, cell_time=1.0) == 0
+    assert table.holder((0, 1), 1.5) == 0
+
+    assert table.reserve_path(1, [(0, 1)], start_time=1.0, cell_time=1.0) == 1
+    assert table.cells_reserved_by_others(1) == {(0, 0), (0, 1)}
+
+    table.release(0)
+    assert table.holder((0, 1), 1.5) is None
+    assert table.cells_reserved_by_others(1) == set()
+
+
+def test_fleet_shares_one_service(floor_model, tmp_path):
+    """
+    Several simulated robots run concurrently against one planner service
+    and the report contains per-robot latencies.
+    """
+    db_path = tmp_path / "db.json"
+    db_path.write_text("{}")
+    server = FleetServer(floor_model, ObjectDetection("mock"), ObjectRecognition(floor_model, str(db_path)),
+                         workers=2)
+    sessions = [server.add_simulated_robot() for _ in range(4)]
+    sessions[0].assign_goal("fridge")
+
+    report = server.run(n_ticks=30)
+    assert report["fleet_size"] == 4
+    assert report["plans"] >= 4
+    assert len(report["per_robot"]) == 4
+    assert all(r["ticks"] == 30 for r in report["per_robot"])
+    assert all(s.service is server.service for s in sessions)
+
+
+def test_scaling_runs_do_not_share_state(floor_model, tmp_path):
+    """
+    Every fleet size starts from a fresh planner service, and costmaps age
+    obstacles on the fleet's virtual clock.
+    """
+    db_path = tmp_path / "db.json"
+    db_path.write_text("{}")
+    detector, recognizer = ObjectDetection("mock"), ObjectRecognition(floor_model, str(db_path))
+    first, second = fleet_scaling_report(floor_model, detector, recognizer, fleet_sizes=(2, 2), n_ticks=10,
+                                         workers=1)
+    assert first["plans"] == second["plans"]
+    assert first["route_cache_hits"] == second["route_cache_hits"]
+
+    server = FleetServer(floor_model, detector, recognizer, workers=1)
+    session = server.add_simulated_robot()
+    server.run(n_ticks=5)
+    assert session.navigation.costmap.clock() == pytest.approx(4 * server.period)
@@ -0,0 +1,115 @@
+# tests/test_glasses_server.py
+
+import asyncio
+import numpy as np
+import pytest
+from app.modules.glasses_server import (GlassesClient, GlassesServer, ProtocolError, encode_message,
+                                        read_message, run_load_levels)
+from app.modules.llm_integration import LLMIntegration
+from app.modules.object_detection import ObjectDetection
+from app.modules.object_recognition import ObjectRecognition
+
+
+@pytest.fixture
+def server(tmp_path):
+    model = {
+        "geometry": {
+            "vertices": [(0.0, 0.0, 0.0), (6.0, 0.0, 0.0), (6.0, 6.0, 0.0), (0.0, 6.0, 0.0)],
+            "faces": [(0, 1, 2), (0, 2, 3)],
+        },
+        "objects": [{"name": "fridge", "centroid": (5.0, 5.0, 0.9)}],
+        "format": "OBJ",
+    }
+    db_path = tmp_path / "db.json"
+    db_path.write_text('{"chair": {"name": "chair", "type": "furniture", "description": "A chair."}}')
+    return GlassesServer(model, ObjectDetection("mock"), ObjectRecognition(model, str(db_path)),
+                         LLMIntegration(lambda prompt, max_tokens: "A chair is in front of you."), workers=2)
+
+
+def test_message_round_trip():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_message({"type": "frame", "seq": 3}, b"\xff\xd8jpeg"))
+        reader.feed_data(b"\x00\x00\x00\x02\x00\x00\x00\x00[]")
+        reader.feed_eof()
+        first = await read_message(reader)
+        with pytest.raises(ProtocolError):
+            await read_message(reader)
+        return first, await read_message(reader)
+
+    first, end = asyncio.run(run())
+    assert first == ({"type": "frame", "seq": 3}, b"\xff\xd8jpeg")
+    assert end is None
+
+
+def test_clients_get_cues_and_answers(server):
+    frame = np.full((120, 160, 3), 128, dtype=np.uint8)
+
+    async def run():
+        port = await server.start()
+        try:
+            alice, bob = GlassesClient("alice"), GlassesClient("bob")
+            assert {await alice.connect("127.0.0.1", port), await bob.connect("127.0.0.1", port)} == {0, 1}
+            for _ in range(3):
+                await alice.send_frame(frame)
+                await bob.send_frame(frame, head=(0.5, 0.0, 0.0))
+                await asyncio.sleep(0.02)
+            await alice.send_voice("Where is the chair?")
+            await bob.send_voice("Is it safe to sit here?")
+            await bob.send_voice("Navigate to the fridge")
+            await alice.close()
+            await bob.close()
+            return alice, bob, server.stats()
+        finally:
+            await server.stop()
+
+    alice, bob, stats = asyncio.run(run())
+    assert alice.stats()["cues_received"] == 3 and len(alice.latencies) == 3
+    assert alice.cues[0]["objects"][0]["name"] == "chair"
+    assert alice.spoken and alice.spoken[0].startswith("The chair is")
+    # The navigation command supersedes the LLM answer or follows it
+    assert any("fridge" in text for text in bob.spoken)
+    assert stats["active_sessions"] == 0
+    assert [s["frames_received"] for s in stats["sessions"]] == [3, 3]
+
+
+def test_failing_frame_does_not_end_the_session(server):
+    class FlakyDetector:
+        def __init__(self, detector):
+            self.detector = detector
+            self.calls = 0
+
+        def detect_batch(self, frame):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("inference failed")
+            return self.detector.detect_batch(frame)
+
+    server.detector = FlakyDetector(server.detector)
+    frame = np.full((120, 160, 3), 128, dtype=np.uint8)
+
+    async def run():
+        port = await server.start()
+        try:
+            client = GlassesClient("flaky")
+            await client.connect("127.0.0.1", port)
+            for _ in range(3):
+                await client.send_frame(frame)
+                await asyncio.sleep(0.05)
+            await client.close()
+            return client, server.stats()
+        finally:
+            await server.stop()
+
+    client, stats = asyncio.run(run())
+    assert len(client.cues) == 2 and stats["sessions"][0]["frames_dropped"] == 1
+
+
+def test_load_levels_report_per_client_latency(server):
+    rows = asyncio.run(run_load_levels(server, concurrency=(1, 3), n_frames=6, fps=30.0,
+                                       frame_shape=(96, 128)))
+    assert [row["clients"] for row in rows] == [1, 3]
+    assert rows[1]["frames_sent"] == 18 and len(rows[1]["per_client"]) == 3
+    for row in rows:
+        assert row["frames_answered"] > 0
+        assert 0.0 < row["latency_mean_ms"] <= row["latency_max_ms"]
@@ -0,0 +1,85 @@
+# tests/test_instrumentation.py
+
+import json
+import logging
+import time
+import urllib.request
+from app.modules.instrumentation import RateLimitedLogger, Telemetry
+
+
+def test_disabled_telemetry_records_nothing():
+    telemetry = Telemetry()
+    with telemetry.span("detect"):
+        pass
+    telemetry.counter("frames").inc()
+    telemetry.histogram("latency").observe(0.2)
+    telemetry.record("llm", 0.5)
+    assert telemetry.stage_summary() == {}
+    assert telemetry.counter("frames").value == 0
+    assert telemetry.histogram("latency").count == 0
+    assert not telemetry.trace_events
+
+
+def test_spans_feed_histograms_and_chrome_trace(tmp_path):
+    telemetry = Telemetry(enabled=True, trace=True)
+    for _ in range(3):
+        with telemetry.span("detect"):
+            time.sleep(0.002)
+    telemetry.record("llm", 0.25)
+
+    summary = telemetry.stage_summary()
+    assert summary["detect"]["count"] == 3 and summary["detect"]["mean_ms"] >= 2.0
+    assert summary["llm"]["mean_ms"] == 250.0
+
+    path = str(tmp_path / "trace.json")
+    assert telemetry.write_chrome_trace(path) == 4
+    events = json.load(open(path))["traceEvents"]
+    assert {e["name"] for e in events} == {"detect", "llm"}
+    assert all(e["ph"] == "X" and e["dur"] > 0 for e in events)
+
+
+def test_prometheus_text_format():
+    telemetry = Telemetry(enabled=True)
+    telemetry.counter("frames_processed", {"mode": "human"}).inc(5)
+    histogram = telemetry.histogram("stage_duration_seconds", {"stage": "detect"}, buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.5):
+        histogram.observe(value)
+
+    text = telemetry.prometheus_text()
+    assert 'smartar_frames_processed_total{mode="human"} 5' in text
+    assert "# TYPE smartar_stage_duration_seconds histogram" in text
+    assert 'smartar_stage_duration_seconds_bucket{stage="detect",le="0.01"} 1' in text
+    assert 'smartar_stage_duration_seconds_bucket{stage="detect",le="0.1"} 2' in text
+    assert 'smartar_stage_duration_seconds_bucket{stage="detect",le="+Inf"} 3' in text
+    assert 'smartar_stage_duration_seconds_count{stage="detect"} 3' in text
+
+
+def test_metrics_endpoint():
+    telemetry = Telemetry(enabled=True)
+    telemetry.counter("frames_processed").inc()
+    port = telemetry.serve(0)
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+    finally:
+        telemetry.stop_server()
+    assert "smartar_frames_processed_total 1" in body
+
+
+def test_rate_limited_logger(capsys):
+    log = RateLimitedLogger("Test", interval_s=60.0)
+    for i in range(5):
+        log.info("Motor cmd %d", i, key="motor")
+    log.debug("hidden %d", 1)
+    assert capsys.readouterr().out == "[Test] Motor cmd 0\n"
+    assert log.suppressed == {"motor": 4}
+
+    log.interval_s = 0.0
+    log.warning("Motor cmd %d", 5, key="motor")
+    assert capsys.readouterr().out == "[Test] Motor cmd 5 (4 similar message(s) suppressed)\n"
+
+    logging.getLogger("smartar").setLevel(logging.DEBUG)
+    try:
+        log.debug("shown %d", 1)
+    finally:
+        logging.getLogger("smartar").setLevel(logging.INFO)
+    assert capsys.readouterr().out == "[Test] shown 1\n"
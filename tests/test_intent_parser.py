@@ -0,0 +1,96 @@
+# tests/test_intent_parser.py
+
+import pytest
+from app.modules.intent_parser import IntentParser
+from app.modules.user_interaction import UserInteraction
+
+
+@pytest.fixture
+def parser():
+    return IntentParser(vocabulary=["chair", "table", "kitchen table", "fridge", "door"])
+
+
+@pytest.mark.parametrize("text, name, target", [
+    ("Navigate to the fridge.", "navigate", "fridge"),
+    ("Hey, take me to the kitchen table please", "navigate", "kitchen table"),
+    ("guide me towards the door", "navigate", "door"),
+    ("Where is the chair?", "where_is", "chair"),
+    ("where's my old table", "where_is", "table"),
+    ("find the door", "where_is", "door"),
+    ("find the stapler", "question", None),
+    ("Where are we going?", "question", None),
+    ("Find out what time it is", "question", None),
+    ("What am I looking at?", "describe", None),
+    ("what is around me", "describe", None),
+    ("Describe the objects around me", "describe", None),
+    ("Stop navigation", "stop", None),
+    ("cancel", "stop", None),
+    ("Say that again", "repeat", None),
+    ("Is it safe to sit on this chair?", "question", None),
+    ("What color is the table?", "question", None),
+])
+def test_parse(parser, text, name, target):
+    intent = parser.parse(text)
+    assert intent.name == name
+    assert intent.slots.get("target") == target
+
+
+def test_llm_calls_avoided_and_parse_time(parser):
+    for text in ["where is the fridge", "repeat", "Why is the door open?"]:
+        parser.parse(text)
+    stats = parser.stats()
+    assert stats["llm_calls_avoided"] == 2
+    assert stats["llm_calls"] == 1
+    assert stats["mean_parse_us"] < 1000.0
+
+
+class FakeRecognizer:
+    building_model = {"objects": [{"name": "sofa", "centroid": (3.0, 4.0, 0.4)}]}
+    furniture_db = {"chair": {}, "table": {}}
+
+
+class FakeNavigation:
+    def __init__(self):
+        self.started = None
+        self.stopped = False
+
+    def start_navigation(self, target, user_position=None):
+        self.started = target
+
+    def stop_navigation(self):
+        self.stopped = True
+
+    def find_target_position(self, target, near=None):
+        return (3.0, 4.0) if target == "sofa" else None
+
+
+class ExplodingLLM:
+    def stream_sentences(self, *args, **kwargs):
+        raise AssertionError("structured commands must not reach the LLM")
+
+
+def test_structured_commands_are_answered_locally(fake_audio):
+    nav = FakeNavigation()
+    ui = UserInteraction(None, fake_audio, None, FakeRecognizer(), nav, ExplodingLLM())
+    ui.detected_objects = [
+        {"name": "chair", "position": (1.0, 0.0, 1.0)},
+        {"name": "table", "position": (0.0, 0.0, 3.0)},
+    ]
+    ui.user_position = (0.0, 0.0, 0.0)
+
+    ui.handle_voice_command("Navigate to the sofa")
+    ui.handle_voice_command("Where is the chair?")
+    ui.handle_voice_command("Where is the sofa?")
+    ui.handle_voice_command("What am I looking at?")
+    ui.handle_voice_command("Repeat")
+    ui.handle_voice_command("Stop")
+
+    assert nav.started == "sofa" and nav.stopped
+    assert fake_audio.spoken == [
+        "The chair is 1.4 m ahead to your right.",
+        "The sofa is not in view; the nearest one is about 5 meters away.",
+        "I can see a chair 1.4 m ahead to your right, and a table 3.0 m ahead.",
+        "I can see a chair 1.4 m ahead to your right, and a table 3.0 m ahead.",
+        "Navigation stopped.",
+    ]
+    assert ui.intents.llm_calls_avoided == 6
@@ -0,0 +1,160 @@
+# tests/test_llm_broker.py
+
+import asyncio
+import threading
+import time
+import pytest
+from app.modules.llm_backends import LLMBackendError, LocalModelBackend
+from app.modules.llm_broker import (
+    PRIORITY_DESCRIPTION,
+    PRIORITY_SAFETY,
+    BrokerClosed,
+    BrokeredLLM,
+    LLMRequestBroker,
+    RateLimitExceeded,
+)
+from app.modules.llm_integration import LLMIntegration
+
+
+SCENE = [{"name": "chair", "position": (0.0, 0.0, 2.0), "confidence": 0.9}]
+
+
+class RecordingModel:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, max_tokens):
+        time.sleep(self.delay)
+        query = prompt.split("User Query: ")[1].split("\n")[0]
+        with self.lock:
+            self.calls.append(query)
+        return f"Answer to {query}"
+
+    def batch(self, prompts, max_tokens):
+        with self.lock:
+            self.batches.append(len(prompts))
+        return [f"Answer to {p.split('User Query: ')[1].splitlines()[0]}" for p in prompts]
+
+
+def test_identical_in_flight_prompts_share_one_call():
+    model = RecordingModel(delay=0.05)
+    broker = LLMRequestBroker(LLMIntegration(model.generate), user_burst=10)
+
+    async def run():
+        answers = await asyncio.gather(*(broker.submit(f"user{i}", "Is the way clear?", SCENE) for i in range(5)))
+        await broker.close()
+        return answers
+
+    answers = asyncio.run(run())
+    assert answers == ["Answer to Is the way clear?"] * 5
+    assert model.calls == ["Is the way clear?"]
+    assert broker.metrics()["deduplicated"] == 4
+
+
+def test_concurrent_queries_are_coalesced_into_batches():
+    model = RecordingModel()
+    backend = LocalModelBackend(model.generate, batch_fn=model.batch)
+    broker = LLMRequestBroker(LLMIntegration(backend), max_batch=8, batch_window_s=0.02, user_burst=10)
+
+    async def run():
+        answers = await asyncio.gather(*(broker.submit(f"user{i}", f"question {i}", SCENE) for i in range(6)))
+        await broker.close()
+        return answers
+
+    answers = asyncio.run(run())
+    assert answers == [f"Answer to question {i}" for i in range(6)]
+    assert sum(model.batches) + len(model.calls) == 6
+    assert broker.metrics()["backend_calls"] < 6
+
+
+def test_safety_messages_jump_the_queue():
+    model = RecordingModel(delay=0.02)
+    broker = LLMRequestBroker(LLMIntegration(model.generate), max_parallel=1, user_burst=10)
+
+    async def run():
+        descriptions = [asyncio.create_task(broker.submit("u", f"describe {i}", SCENE)) for i in range(4)]
+        await asyncio.sleep(0.005)  # first description is now running
+        safety = asyncio.create_task(broker.submit("u", "stairs ahead?", SCENE, priority=PRIORITY_SAFETY))
+        await asyncio.gather(safety, *descriptions)
+        await broker.close()
+
+    asyncio.run(run())
+    assert model.calls.index("stairs ahead?") == 1
+    by_priority = broker.metrics()["queue_delay_by_priority"]
+    assert by_priority[PRIORITY_SAFETY]["mean_ms"] < by_priority[PRIORITY_DESCRIPTION]["p95_ms"]
+
+
+def test_per_user_rate_limit_exempts_safety():
+    model = RecordingModel()
+    broker = LLMRequestBroker(LLMIntegration(model.generate), user_rate=0.01, user_burst=2)
+
+    async def run():
+        await broker.submit("alice", "q1", SCENE)
+        await broker.submit("alice", "q2", SCENE)
+        with pytest.raises(RateLimitExceeded):
+            await broker.submit("alice", "q3", SCENE)
+        await broker.submit("bob", "q3", SCENE)
+        await broker.submit("alice", "obstacle?", SCENE, priority=PRIORITY_SAFETY)
+        await broker.close()
+
+    asyncio.run(run())
+    metrics = broker.metrics()
+    assert metrics["rate_limited"] == 1
+    assert metrics["queue_delay"]["count"] == 4
+
+
+def test_close_fails_undispatched_requests():
+    model = RecordingModel(delay=0.05)
+    broker = LLMRequestBroker(LLMIntegration(model.generate), max_parallel=1, user_burst=10)
+
+    async def run():
+        running = asyncio.create_task(broker.submit("u", "first", SCENE))
+        await asyncio.sleep(0.01)  # 'first' holds the only slot
+        queued = [asyncio.create_task(broker.submit("u", f"queued {i}", SCENE)) for i in range(3)]
+        await asyncio.sleep(0.005)
+        await broker.close()
+        return await running, await asyncio.gather(*queued, return_exceptions=True)
+
+    first, queued = asyncio.run(run())
+    assert first == "Answer to first"
+    assert all(isinstance(result, BrokerClosed) for result in queued)
+    assert not broker.in_flight
+
+
+def test_short_batch_response_fails_unmatched_requests():
+    model = RecordingModel()
+    backend = LocalModelBackend(model.generate, batch_fn=lambda prompts, max_tokens: ["Only one answer"])
+    broker = LLMRequestBroker(LLMIntegration(backend), batch_window_s=0.02, user_burst=10)
+
+    async def run():
+        results = await asyncio.gather(*(broker.submit("u", f"q{i}", SCENE) for i in range(3)),
+                                       return_exceptions=True)
+        await broker.close()
+        return results
+
+    results = asyncio.run(run())
+    assert results[0] == "Only one answer"
+    assert all(isinstance(result, LLMBackendError) for result in results[1:])
+    assert not broker.in_flight
+
+
+def test_brokered_llm_streams_answers_and_speaks_rejections():
+    broker = LLMRequestBroker(LLMIntegration(lambda prompt, max_tokens: "The way is clear. Go ahead."),
+                              user_rate=0.01, user_burst=1)
+    alice = BrokeredLLM(broker, "alice")
+
+    async def ask(query):
+        return [s async for s in alice.stream_sentences_async(query, SCENE, None)]
+
+    async def run():
+        answers = [await ask("Is the way clear?"), await ask("Is it still clear?")]
+        await broker.close()
+        return answers
+
+    first, rejected = asyncio.run(run())
+    assert first == ["The way is clear.", "Go ahead."]
+    assert " ".join(rejected) == BrokeredLLM.RATE_LIMITED_ANSWER
+    assert broker.metrics()["rate_limited"] == 1
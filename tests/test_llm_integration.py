@@ -0,0 +1,163 @@
+# tests/test_llm_integration.py
+
+import threading
+import pytest
+from app.modules.llm_backends import (
+    LLMBackend,
+    LLMBackendError,
+    LocalModelBackend,
+    LocalStandInLLMServer,
+    MockLLMBackend,
+    OpenAICompatibleClient,
+)
+from app.modules.llm_integration import LLMIntegration, split_sentences
+from app.modules.user_interaction import UserInteraction
+
+
+RECOGNIZED = [
+    {"name": "chair", "position": (0.5, 0.0, 2.0), "confidence": 0.9},
+    {"name": "table", "position": (-1.0, 0.0, 3.0), "confidence": 0.8},
+]
+
+
+@pytest.fixture
+def server():
+    srv = LocalStandInLLMServer(token_delay=0.001).start()
+    yield srv
+    srv.stop()
+
+
+def test_mock_string_keeps_placeholder_answer():
+    llm = LLMIntegration("mock_llm_instance")
+    assert isinstance(llm.llm, MockLLMBackend)
+    answer = llm.query_environment("What am I looking at?", RECOGNIZED, None)
+    assert "placeholder" in answer
+    assert llm.latency_summary()["queries"] == 1
+
+
+def test_backend_base_is_abstract_and_batches_sequentially():
+    with pytest.raises(TypeError):
+        LLMBackend()
+    backend = LocalModelBackend(lambda prompt, max_tokens: prompt.upper())
+    assert not backend.supports_batching
+    assert backend.complete_batch(["a", "b"]) == ["A", "B"]
+
+
+def test_callable_is_wrapped_as_local_model():
+    llm = LLMIntegration(lambda prompt, max_tokens: "A chair." if "chair" in prompt else "Nothing.")
+    assert llm.query_environment("What is here?", RECOGNIZED, None) == "A chair."
+
+
+def test_streamed_answer_and_latency_stats(server):
+    client = OpenAICompatibleClient(server.base_url, model="stand-in", timeout=5.0)
+    llm = LLMIntegration(client)
+    answer = llm.query_environment("What am I looking at?", RECOGNIZED, None)
+    assert answer == "I can see 2 object(s): chair, table. The nearest one is the chair."
+
+    stats = client.last_stats
+    assert stats["chunks"] > 1
+    assert 0.0 < stats["ttft_s"] <= stats["total_s"]
+    client.close()
+
+
+def test_keep_alive_connections_are_reused(server):
+    client = OpenAICompatibleClient(server.base_url, model="stand-in", timeout=5.0)
+    for _ in range(5):
+        client.complete("Object: sofa, at (0, 0, 1), confidence 0.90")
+    assert server.requests == 5
+    assert server.connections == 1
+    assert client.connections_opened == 1
+    client.close()
+
+
+def test_concurrency_limit(server):
+    client = OpenAICompatibleClient(server.base_url, model="stand-in", timeout=5.0, max_concurrency=2)
+    results = []
+
+    def worker():
+        results.append(client.complete("hello"))
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 6
+    # Never more connections than allowed concurrent requests
+    assert server.connections <= 2
+    client.close()
+
+
+def test_timeout_and_unreachable_endpoint():
+    slow = LocalStandInLLMServer(first_token_delay=0.5).start()
+    try:
+        client = OpenAICompatibleClient(slow.base_url, model="stand-in", timeout=0.1)
+        with pytest.raises(LLMBackendError):
+            client.complete("hello")
+    finally:
+        slow.stop()
+
+    llm = LLMIntegration(OpenAICompatibleClient("http://127.0.0.1:9/v1", model="x", timeout=0.5))
+    answer = llm.query_environment("What am I looking at?", [], None)
+    assert "could not reach" in answer
+    assert llm.failures == 1
+
+
+def test_split_sentences_across_chunks():
+    chunks = ["The chair is", " ahead. The ta", "ble is 1.5 m to your", " left. Dr. ", "Who is here? Bye"]
+    assert list(split_sentences(chunks)) == [
+        "The chair is ahead.",
+        "The table is 1.5 m to your left.",
+        "Dr. Who is here?",
+        "Bye",
+    ]
+
+
+def test_stream_sentences_first_sentence_before_completion():
+    answer = "The chair is right ahead. The table is two meters to your left. There is also a lamp."
+    srv = LocalStandInLLMServer(responder=lambda messages: answer, token_delay=0.01).start()
+    try:
+        llm = LLMIntegration(OpenAICompatibleClient(srv.base_url, model="stand-in", timeout=5.0))
+        sentences = list(llm.stream_sentences("What am I looking at?", RECOGNIZED, None))
+    finally:
+        srv.stop()
+
+    assert sentences == [
+        "The chair is right ahead.",
+        "The table is two meters to your left.",
+        "There is also a lamp.",
+    ]
+    stats = llm.query_stats[-1]
+    assert stats["ttft_s"] <= stats["ttfs_s"] < stats["total_s"]
+    assert llm.latency_summary()["mean_ttfs_s"] == stats["ttfs_s"]
+
+
+def test_interleaved_streams_keep_their_own_stats():
+    backend = LocalModelBackend(lambda prompt, max_tokens: iter(["First sentence here. ", "Second one follows."]),
+                                max_concurrency=2)
+    llm = LLMIntegration(backend)
+    first = llm.stream_sentences("Is the hallway clear?", RECOGNIZED, None)
+    second = llm.stream_sentences("Where can I sit?", RECOGNIZED, None)
+    assert next(first) == next(second) == "First sentence here."
+    list(first), list(second)
+
+    assert len(llm.query_stats) == 2 and llm.query_stats[0] is not llm.query_stats[1]
+    assert all("ttfs_s" in stats and stats["total_s"] is not None for stats in llm.query_stats)
+
+
+class FakeRecognizer:
+    building_model = None
+
+
+def test_voice_query_is_spoken_sentence_by_sentence(fake_audio):
+
+    def generate(prompt, max_tokens):
+        # Streaming local model: the first sentence must be spoken before the second is produced
+        yield "You are facing a chair. "
+        assert fake_audio.spoken == ["You are facing a chair."]
+        yield "A table is behind it."
+
+    ui = UserInteraction(None, fake_audio, None, FakeRecognizer(), None, LLMIntegration(generate))
+    ui.handle_voice_command("Is there somewhere I can sit down?")
+    assert fake_audio.spoken == ["You are facing a chair.", "A table is behind it."]
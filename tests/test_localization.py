@@ -0,0 +1,81 @@
+# tests/test_localization.py
+
+import math
+import pytest
+from app.modules.glasses_integration import GlassesIntegration
+from app.modules.localization import ParticleFilterLocalizer
+
+
+@pytest.fixture
+def room_model():
+    """
+    A room with four distinct landmarks around the origin.
+    """
+    return {
+        "geometry": None,
+        "objects": [
+            {"name": "fridge", "centroid": (4.0, 0.0, 0.9)},
+            {"name": "table", "centroid": (0.0, 4.0, 0.4)},
+            {"name": "door", "centroid": (-4.0, 0.0, 1.0)},
+            {"name": "lamp", "centroid": (0.0, -4.0, 1.2)},
+        ],
+        "format": "OBJ",
+    }
+
+
+def observe(pose, landmark):
+    """
+    Camera-frame (lateral, vertical, forward) position of a landmark seen from pose.
+    """
+    dx = landmark[0] - pose[0]
+    dy = landmark[1] - pose[1]
+    forward = dx * math.cos(pose[2]) + dy * math.sin(pose[2])
+    lateral = dx * math.sin(pose[2]) - dy * math.cos(pose[2])
+    return (lateral, 0.0, forward)
+
+
+def test_converges_to_true_pose(room_model):
+    """
+    Repeated observations of two landmarks localize the user from a uniform prior.
+    """
+    true_pose = (1.0, 0.5, 0.3)
+    localizer = ParticleFilterLocalizer(room_model, n_particles=3000, seed=1)
+    assert not localizer.is_converged()
+    # The glasses only report the filter's yaw once it has converged
+    glasses = GlassesIntegration(use_webcam_for_testing=False)
+    glasses.connected = True
+    glasses.localizer = localizer
+    assert glasses.get_head_orientation() == (0.0, 0.0, 0.0)
+
+    for _ in range(15):
+        localizer.predict(0.05)
+        localizer.update([
+            ("fridge", observe(true_pose, (4.0, 0.0))),
+            ("table", observe(true_pose, (0.0, 4.0))),
+        ])
+
+    x, y, yaw = localizer.estimate()
+    assert (x, y) == pytest.approx(true_pose[:2], abs=0.3)
+    assert yaw == pytest.approx(true_pose[2], abs=0.2)
+    assert localizer.is_converged()
+    assert localizer.resamples > 0
+    assert glasses.get_head_orientation() == (yaw, 0.0, 0.0)
+
+
+def test_unknown_labels_are_ignored(room_model):
+    """
+    Observations of objects that are not in the building model leave weights untouched.
+    """
+    localizer = ParticleFilterLocalizer(room_model, n_particles=500)
+    before = localizer.estimate()
+    assert localizer.update([("sofa", (0.0, 0.0, 2.0))]) == 0
+    assert localizer.estimate() == before
+
+
+def test_update_from_recognized_objects(room_model):
+    """
+    Output of ObjectRecognition.associate_detection can be fed directly.
+    """
+    localizer = ParticleFilterLocalizer(room_model, n_particles=500, initial_pose=(0.0, 0.0, 0.0))
+    recognized = [{"name": "fridge", "type": "appliance", "position": (0.0, 0.0, 4.0), "confidence": 0.9}]
+    assert localizer.update_from_recognized(recognized) == 1
@@ -0,0 +1,91 @@
+# tests/test_mesh_lod.py
+
+import numpy as np
+import pytest
+from app.modules.ingestion import ModelIngestion, pywavefront
+from app.modules.mesh_lod import MeshLODSet, cluster_simplify
+from app.modules.path_planner import OccupancyGrid
+
+
+def grid_wall(n=40, size=2.0, x=1.0):
+    """A finely tessellated vertical wall: (n+1)^2 vertices, 2*n^2 triangles."""
+    ys, zs = np.meshgrid(np.linspace(-size / 2, size / 2, n + 1), np.linspace(0.0, size, n + 1), indexing="ij")
+    vertices = [(x, float(y), float(z)) for y, z in zip(ys.ravel(), zs.ravel())]
+    faces = []
+    for i in range(n):
+        for j in range(n):
+            a, b, c, d = i * (n + 1) + j, (i + 1) * (n + 1) + j, (i + 1) * (n + 1) + j + 1, i * (n + 1) + j + 1
+            faces += [(a, b, c), (a, c, d)]
+    return vertices, faces
+
+
+def wall_model():
+    vertices, faces = grid_wall()
+    return {"geometry": {"vertices": vertices, "faces": faces},
+            "objects": [{"name": "wall", "faces": faces}]}
+
+
+def test_cluster_simplify_reduces_faces_with_bounded_error():
+    vertices, faces = grid_wall()
+    v = np.asarray(vertices)
+    f = np.asarray(faces)
+    new_v, new_f, error = cluster_simplify(v, f, cell_size=0.25)
+    assert new_f.shape[0] < f.shape[0] / 10
+    assert new_f.max() < new_v.shape[0]
+    # Representatives stay inside their cell
+    assert 0.0 < error <= 0.25 * np.sqrt(3)
+
+
+def test_select_returns_coarsest_level_within_tolerance():
+    lod = MeshLODSet(wall_model())
+    levels = lod.levels(0)
+    assert levels[0].max_error == 0.0 and levels[0].faces.shape[0] == 2 * 40 * 40
+    assert [lv.faces.shape[0] for lv in levels] == sorted((lv.faces.shape[0] for lv in levels), reverse=True)
+
+    assert lod.select(0, 0.0) is levels[0]
+    coarse = lod.select(0, 1.0)
+    assert coarse is levels[-1]
+    mid = lod.select(0, 0.1)
+    assert mid.max_error <= 0.1 and mid.faces.shape[0] < levels[0].faces.shape[0]
+
+
+def test_occupancy_grid_uses_lod_with_same_footprint():
+    model = wall_model()
+    full = OccupancyGrid(dict(model), resolution=0.1, agent_radius=0.0)
+    model["lod"] = MeshLODSet(model)
+    simplified = OccupancyGrid(model, resolution=0.1, agent_radius=0.0)
+    vertices, faces = model["lod"].geometry_arrays(0.05)
+    assert faces.shape[0] < 2 * 40 * 40
+    # The wall blocks the same cells up to one cell of slack
+    diff = np.logical_xor(full.blocked, simplified.blocked).sum()
+    assert diff <= 0.1 * full.blocked.sum()
+
+
+def test_cache_round_trip_and_stamp_invalidation(tmp_path):
+    path = str(tmp_path / "wall.obj.lod.npz")
+    lod = MeshLODSet(wall_model(), cache_path=path, stamp="v1").build_all()
+    lod.save()
+
+    cached = MeshLODSet(wall_model(), cache_path=path, stamp="v1")
+    assert cached.load()
+    assert [lv.faces.shape[0] for lv in cached.levels(0)] == [lv.faces.shape[0] for lv in lod.levels(0)]
+    assert np.allclose(cached.select(0, 0.1).vertices, lod.select(0, 0.1).vertices)
+
+    assert not MeshLODSet(wall_model(), cache_path=path, stamp="v2").load()
+    assert not MeshLODSet(wall_model(), cell_sizes=(0.1,), cache_path=path, stamp="v1").load()
+
+
+@pytest.mark.skipif(pywavefront is None, reason="pywavefront not installed")
+def test_ingestion_attaches_and_caches_lod(tmp_path):
+    vertices, faces = grid_wall(n=20)
+    lines = ["o wall"] + [f"v {x} {y} {z}" for x, y, z in vertices] + \
+            [f"f {a + 1} {b + 1} {c + 1}" for a, b, c in faces]
+    path = tmp_path / "wall.obj"
+    path.write_text("\n".join(lines))
+
+    model = ModelIngestion().load_model(str(path), build_lod=True)
+    assert isinstance(model["lod"], MeshLODSet) and len(model["lod"]) == 1
+    assert (tmp_path / "wall.obj.lod.npz").exists()
+
+    again = ModelIngestion().load_model(str(path))
+    assert again["lod"]._levels[0] is not None  # served from the cache, not rebuilt
@@ -0,0 +1,138 @@
+# tests/test_model_updates.py
+
+import json
+import numpy as np
+from app.modules.mesh_lod import MeshLODSet
+from app.modules.model_updates import LiveModelUpdater, ModelDelta
+from app.modules.path_planner import GridPlanner, OccupancyGrid
+from app.modules.spatial_index import SpatialHashIndex
+
+
+def wall(x0, y0, x1, y1, height=2.0):
+    """Vertices and faces of a vertical wall quad from (x0, y0) to (x1, y1)."""
+    vertices = [(x0, y0, 0.0), (x1, y1, 0.0), (x1, y1, height), (x0, y0, height)]
+    return vertices, [(0, 1, 2), (0, 2, 3)]
+
+
+def room_model():
+    """A 10 m x 10 m room with a chair and a fridge."""
+    model = {"geometry": {"vertices": [], "faces": []}, "objects": []}
+    updater = LiveModelUpdater(model)
+    for name, corners in (("south", (0, 0, 10, 0)), ("east", (10, 0, 10, 10)),
+                          ("north", (10, 10, 0, 10)), ("west", (0, 10, 0, 0))):
+        updater.apply(ModelDelta.mesh_group(name, *wall(*corners), label="wall"))
+    updater.apply(ModelDelta.add({"name": "chair", "label": "chair", "position": (2.0, 2.0, 0.0)}))
+    updater.apply(ModelDelta.add({"name": "fridge", "label": "fridge", "position": (8.0, 8.0, 0.0)}))
+    return model
+
+
+def make_updater(model):
+    planner = GridPlanner(OccupancyGrid(model, resolution=0.1, agent_radius=0.2))
+    index = SpatialHashIndex.from_building_model(model)
+    return LiveModelUpdater(model, planner=planner, indexes=[index]), planner, index
+
+
+def rebuilt(model):
+    return OccupancyGrid(model, resolution=0.1, agent_radius=0.2)
+
+
+def test_added_wall_updates_grid_tiles_and_route_cache():
+    model = room_model()
+    updater, planner, _ = make_updater(model)
+    crossing = planner.plan((2.0, 5.0), (8.0, 5.0))
+    beside = planner.plan((1.0, 1.0), (1.0, 3.0))
+    assert len(planner.route_cache) == 2
+
+    updater.submit(ModelDelta.mesh_group("partition", *wall(5.0, 0.0, 5.0, 8.0), label="wall"))
+    report, = updater.apply_pending()
+
+    # Same grid as a full rebuild, but only the tiles under the partition were redrawn
+    assert np.array_equal(planner.grid.blocked, rebuilt(model).blocked)
+    total_tiles = -(-planner.grid.rows // 16) * -(-planner.grid.cols // 16)
+    assert 0 < report["tiles"] < total_tiles / 2
+    assert report["blocked"] > 0 and report["routes_dropped"] == 1
+    assert beside is not None and len(planner.route_cache) == 1
+
+    detour = planner.plan((2.0, 5.0), (8.0, 5.0))
+    assert max(y for _, y in detour) > 8.0 and len(detour) > len(crossing)
+
+
+def test_removed_wall_frees_cells_and_drops_routes_it_shortens():
+    model = room_model()
+    model_before = rebuilt(model).blocked.copy()
+    updater, planner, _ = make_updater(model)
+    updater.apply(ModelDelta.mesh_group("partition", *wall(5.0, 0.0, 5.0, 8.0)))
+    planner.plan((2.0, 5.0), (8.0, 5.0))   # detour around the partition
+    planner.plan((1.0, 1.0), (1.0, 3.0))   # far away, unaffected
+
+    report = updater.apply(ModelDelta.remove("partition"))
+    assert report["freed"] > 0 and report["blocked"] == 0
+    assert report["routes_dropped"] == 1 and len(planner.route_cache) == 1
+    assert np.array_equal(planner.grid.blocked, model_before)
+
+
+def test_remove_keeps_object_ids_consistent():
+    model = room_model()
+    updater, _, index = make_updater(model)
+    updater.apply(ModelDelta.remove("chair"))   # the fridge moves into the chair's slot
+
+    names = [obj["name"] for obj in model["objects"]]
+    assert "chair" not in names and len(names) == 5
+    assert index.ids_with_label("chair") == set()
+    fridge_id, = index.ids_with_label("fridge")
+    assert model["objects"][fridge_id]["name"] == "fridge"
+
+    updater.apply(ModelDelta.replace({"name": "fridge", "label": "fridge", "position": (3.0, 7.0, 0.0)}))
+    assert index.nearest((0.0, 0.0), label="fridge")[2][:2] == (3.0, 7.0)
+
+
+def test_lod_groups_follow_updates():
+    model = room_model()
+    model["lod"] = MeshLODSet(model)
+    updater, planner, _ = make_updater(model)
+    updater.apply(ModelDelta.mesh_group("partition", *wall(5.0, 0.0, 5.0, 8.0)))
+    updater.apply(ModelDelta.remove("south"))
+
+    assert model["lod"].n_objects == len(model["objects"])
+    assert model["lod"].group_names == [obj["name"] for obj in model["objects"]]
+    assert np.array_equal(planner.grid.blocked, rebuilt(model).blocked)
+
+
+def test_replaced_meshes_are_compacted():
+    model = room_model()
+    model["lod"] = MeshLODSet(model)
+    updater, planner, _ = make_updater(model)
+    for k in range(12):
+        updater.apply(ModelDelta.mesh_group("partition", *wall(5.0, 0.0, 5.0, 2.0 + 0.5 * k)))
+
+    # Old partition meshes do not pile up; faces and LOD still match the model
+    assert updater.compactions > 0 and len(model["geometry"]["vertices"]) <= 2 * 4 * 5
+    geometry = model["geometry"]
+    assert np.allclose(model["lod"].vertices, np.asarray(geometry["vertices"]))
+    assert sorted(geometry["faces"]) == sorted(face for obj in model["objects"] for face in obj.get("faces", []))
+    assert np.array_equal(planner.grid.blocked, rebuilt(model).blocked)
+    assert model["lod"].select(len(model["objects"]) - 1, 0.0).vertices.max(axis=0)[1] == 7.5
+
+
+def test_removing_an_object_keeps_identical_faces_of_others():
+    vertices, faces = wall(5.0, 0.0, 5.0, 8.0)
+    model = {"geometry": {"vertices": list(vertices), "faces": list(faces)},
+             "objects": [{"name": "partition", "faces": list(faces)}, {"name": "glass", "faces": list(faces)}]}
+    model["geometry"]["faces"].extend(faces)
+    updater = LiveModelUpdater(model)
+    updater.apply(ModelDelta.remove("glass"))
+    assert model["geometry"]["faces"] == faces and model["objects"][0]["faces"] == faces
+
+
+def test_drop_folder_and_invalid_deltas(tmp_path):
+    model = room_model()
+    updater, _, index = make_updater(model)
+    updater.watch_dir = str(tmp_path)
+    (tmp_path / "01_furniture.json").write_text(json.dumps(
+        {"remove": ["chair", "sofa"], "add": [{"name": "desk", "label": "desk", "position": (4.0, 4.0, 0.0)}]}))
+
+    updater.step()
+    assert updater.applied == 2 and updater.failed == 1  # "sofa" is unknown
+    assert index.ids_with_label("desk") and not index.ids_with_label("chair")
+    updater.step()  # unchanged files are not applied again
+    assert updater.applied == 2
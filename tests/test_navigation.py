@@ -6,11 +6,13 @@ from app.modules.navigation import NavigationAssistance
 @pytest.fixture
 def navigation_instance():
     """
-    Provides a fresh NavigationAssistance object with a mock building_model.
+    Provides a fresh NavigationAssistance object with a mock building_model
+    that knows a fridge and a door.
     """
     fake_building_model = {
         "geometry": None,
-        "objects": [],
+        "objects": [{"name": "fridge", "centroid": (4.0, 4.0, 0.9)},
+                    {"name": "door", "centroid": (0.0, 4.0, 1.0)}],
         "format": "OBJ"  # Just a stub
     }
     return NavigationAssistance(fake_building_model)
@@ -32,6 +34,19 @@ def test_start_navigation(navigation_instance, capsys):
     assert "Starting navigation towards 'fridge'" in captured.out
     assert "Begin walking toward fridge" in captured.out
 
+def test_unknown_destination_does_not_start(navigation_instance, capsys):
+    """
+    A target missing from the building model is reported as unknown instead
+    of starting guidance toward nowhere.
+    """
+    assert navigation_instance.start_navigation("the kitchen") is False
+    assert not navigation_instance.is_navigating
+    assert navigation_instance.destination is None
+
+    captured = capsys.readouterr()
+    assert "I do not know where the kitchen is." in captured.out
+    assert "Begin walking" not in captured.out
+
 def test_update_navigation_not_navigating(navigation_instance, capsys):
     """
     If we call update_navigation without having started navigation,
@@ -41,17 +56,18 @@ def test_update_navigation_not_navigating(navigation_instance, capsys):
     captured = capsys.readouterr()
     assert captured.out == ""
 
-def test_update_navigation_in_progress(navigation_instance, capsys):
+def test_update_navigation_without_route_is_silent(navigation_instance, capsys):
     """
-    If navigation is in progress, update_navigation should print 
-    a stub message indicating we are guiding the user.
+    If the target is not in the building model, update_navigation has no route
+    to follow and must not print anything on every loop iteration.
     """
     navigation_instance.start_navigation("kitchen")
     capsys.readouterr()  # clear buffer
 
+    navigation_instance.update_navigation(user_position=(0, 0, 0))
     navigation_instance.update_navigation(user_position=(0, 0, 0))
     captured = capsys.readouterr()
-    assert "[Navigation] Currently guiding user... (stub update)" in captured.out
+    assert captured.out == ""
 
 def test_stop_navigation(navigation_instance, capsys):
     """
@@ -66,3 +82,96 @@ def test_stop_navigation(navigation_instance, capsys):
     assert not navigation_instance.is_navigating
     assert navigation_instance.destination is None
     assert "Navigation to 'door' canceled or completed." in captured.out
+
+
+@pytest.fixture
+def l_shaped_navigation(fake_audio):
+    """
+    A 6m x 6m floor with a fridge at (4, 4). The route from the origin is
+    simplified to few segments and guidance is spoken through the fake_audio fixture.
+    """
+    building_model = {
+        "geometry": {
+            "vertices": [(0.0, 0.0, 0.0), (6.0, 0.0, 0.0), (6.0, 6.0, 0.0), (0.0, 6.0, 0.0),
+                         (2.0, 1.0, 0.0), (2.0, 6.0, 0.0), (2.0, 6.0, 1.5), (2.0, 1.0, 1.5)],
+            "faces": [(0, 1, 2), (0, 2, 3), (4, 5, 6), (4, 6, 7)],
+        },
+        "objects": [{"name": "fridge", "centroid": (4.0, 4.0, 0.9)}],
+        "format": "OBJ",
+    }
+    return NavigationAssistance(building_model, audio_engine=fake_audio), fake_audio
+
+
+def test_route_precomputes_turn_events(l_shaped_navigation):
+    """
+    Starting with a known position plans a route around the wall and turns it
+    into a handful of turn events instead of a cell-by-cell path.
+    """
+    nav, audio = l_shaped_navigation
+    nav.start_navigation("the fridge", user_position=(1.0, 4.0, 0.0))
+
+    assert nav.route is not None
+    assert 2 <= len(nav.route) <= 6
+    assert nav.route.waypoints[-1] == pytest.approx((4.0, 4.0))
+    assert audio.spoken == [nav.route.instructions[0]]
+    assert "fridge" in audio.spoken[0]
+
+
+def test_instructions_only_on_state_change(l_shaped_navigation):
+    """
+    Updates along a segment are silent; reaching its end announces the next
+    turn event; arriving ends navigation.
+    """
+    nav, audio = l_shaped_navigation
+    nav.start_navigation("fridge", user_position=(1.0, 4.0, 0.0))
+    route = nav.route
+
+    start = route.starts[0]
+    direction = route.directions[0]
+    for t in (0.1, 0.2, 0.3):
+        nav.update_navigation(user_position=(start[0] + direction[0] * t, start[1] + direction[1] * t, 0.0))
+    assert len(audio.spoken) == 1
+
+    end = route.waypoints[1]
+    nav.update_navigation(user_position=(end[0], end[1], 0.0))
+    assert len(audio.spoken) == 2
+    assert nav.segment_index == 1
+
+    nav.update_navigation(user_position=(4.0, 4.0, 0.0))
+    assert audio.spoken[-1] == "You have reached the fridge."
+    assert not nav.is_navigating
+
+
+def test_deviation_triggers_replan(l_shaped_navigation):
+    """
+    Straying far from the current segment re-runs the planner once.
+    """
+    nav, audio = l_shaped_navigation
+    nav.start_navigation("fridge", user_position=(1.0, 4.0, 0.0))
+    nav.update_navigation(user_position=(5.5, 0.5, 0.0))
+    assert nav.replans == 1
+    assert audio.spoken[-1].startswith("Rerouting.")
+
+
+def test_spoken_instructions_keep_target_case(fake_audio):
+    """
+    Sentence-initial capitalization must not lowercase names such as "TV".
+    """
+    building_model = {
+        "geometry": {
+            "vertices": [(0.0, 0.0, 0.0), (6.0, 0.0, 0.0), (6.0, 6.0, 0.0), (0.0, 6.0, 0.0),
+                         (2.0, 1.0, 0.0), (2.0, 6.0, 0.0), (2.0, 6.0, 1.5), (2.0, 1.0, 1.5)],
+            "faces": [(0, 1, 2), (0, 2, 3), (4, 5, 6), (4, 6, 7)],
+        },
+        "objects": [{"name": "TV", "centroid": (4.0, 4.0, 0.9)}],
+        "format": "OBJ",
+    }
+    nav = NavigationAssistance(building_model, audio_engine=fake_audio)
+    nav.start_navigation("TV", user_position=(1.0, 4.0, 0.0))
+    assert all("tv" not in text for text in nav.route.instructions)
+    assert nav.route.instructions[-1].endswith("to reach the TV.")
+
+    # Straight past the wall from here: the reroute is a single walk to the TV
+    nav.update_navigation(user_position=(4.0, 2.0, 0.0))
+    assert nav.replans == 1
+    assert fake_audio.spoken[-1] == "Rerouting. Walk 2 meters to reach the TV."
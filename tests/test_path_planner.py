@@ -0,0 +1,107 @@
+# tests/test_path_planner.py
+
+import pytest
+from app.modules.path_planner import GridPlanner, OccupancyGrid, simplify_path
+from app.modules.spatial_index import SpatialHashIndex
+
+
+@pytest.fixture
+def wall_model():
+    """
+    A 4m x 4m floor with a 1.5m-high wall along x=2 from y=0 to y=3,
+    leaving a gap between y=3 and y=4.
+    """
+    return {
+        "geometry": {
+            "vertices": [
+                (0.0, 0.0, 0.0), (4.0, 0.0, 0.0), (4.0, 4.0, 0.0), (0.0, 4.0, 0.0),
+                (2.0, 0.0, 0.0), (2.0, 3.0, 0.0), (2.0, 3.0, 1.5), (2.0, 0.0, 1.5),
+            ],
+            "faces": [(0, 1, 2), (0, 2, 3), (4, 5, 6), (4, 6, 7)],
+        },
+        "objects": [
+            {"name": "fridge", "centroid": (3.5, 0.5, 0.9)},
+            {"name": "table", "centroid": (1.0, 1.0, 0.4)},
+            {"name": "chair", "centroid": (1.5, 1.2, 0.4)},
+        ],
+        "format": "OBJ",
+    }
+
+
+@pytest.fixture
+def planner(wall_model):
+    return GridPlanner(OccupancyGrid(wall_model, resolution=0.1, agent_radius=0.1, margin=0.0))
+
+
+def test_grid_marks_walls_but_not_floor(planner):
+    """
+    The vertical wall is blocked; the flat floor is free.
+    """
+    grid = planner.grid
+    assert grid.blocked[grid.world_to_cell(2.0, 1.5)]
+    assert not grid.blocked[grid.world_to_cell(1.0, 1.0)]
+    assert not grid.blocked[grid.world_to_cell(2.0, 3.5)]
+
+
+def test_plan_goes_around_wall(planner):
+    """
+    A path from one side of the wall to the other passes through the gap.
+    """
+    path = planner.plan((1.0, 1.0), (3.0, 1.0))
+    assert path is not None
+    assert max(y for _, y in path) > 3.0
+    assert path[-1] == pytest.approx((3.05, 1.05))
+
+
+def test_route_cache_hits(planner):
+    """
+    Planning the same route twice is served from the cache.
+    """
+    planner.plan((1.0, 1.0), (3.0, 1.0))
+    planner.plan((1.0, 1.0), (3.0, 1.0))
+    assert planner.cache_hits == 1
+    # Invalidating cells elsewhere keeps the route; touching one of its cells drops it
+    planner.invalidate_cache({planner.grid.world_to_cell(0.5, 3.5)})
+    assert len(planner.route_cache) == 1
+    route = next(iter(planner.route_cache.values()))
+    planner.invalidate_cache({route[len(route) // 2]})
+    assert not planner.route_cache
+
+
+def test_simplify_path_keeps_corners():
+    """
+    RDP removes collinear points and keeps the corner.
+    """
+    points = [(0, 0), (1, 0), (2, 0), (3, 0), (3, 1), (3, 2)]
+    assert simplify_path(points, 0.01) == [(0, 0), (3, 0), (3, 2)]
+
+
+def test_spatial_index_lookup(wall_model):
+    """
+    The spatial index finds objects by label and radius.
+    """
+    index = SpatialHashIndex.from_building_model(wall_model, cell_size=1.0)
+    assert len(index) == 3
+    hit = index.nearest((0.0, 0.0), label="Fridge")
+    assert hit[3] == "fridge"
+    near = index.query_radius((1.2, 1.1), 0.5)
+    assert [label for _, _, _, label in near] == ["table", "chair"]
+
+    index.remove(2)
+    assert index.nearest((1.5, 1.2), label="chair") is None
+
+
+def test_penalty_cells_reuse_the_cached_route(planner):
+    """
+    Reservations elsewhere do not bypass the route cache; a cached route
+    crossing a penalty cell is replanned around it without being replaced.
+    """
+    route = planner.plan_cells(planner.grid.world_to_cell(1.0, 1.0), planner.grid.world_to_cell(3.0, 1.0))
+    far_away = {planner.grid.world_to_cell(0.2, 0.2)}
+    assert planner.plan_cells(route[0], route[-1], penalty_cells=far_away) == route
+    assert planner.cache_hits == 1
+
+    on_route = {route[len(route) // 2]}
+    detour = planner.plan_cells(route[0], route[-1], penalty_cells=on_route)
+    assert detour is not None and not on_route & set(detour)
+    assert planner.route_cache[(route[0], route[-1])] == route
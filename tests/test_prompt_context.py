@@ -0,0 +1,74 @@
+# tests/test_prompt_context.py
+
+import pytest
+from app.modules.llm_integration import LLMIntegration
+from app.modules.prompt_context import PromptContextBuilder, estimate_tokens
+
+
+@pytest.fixture
+def building_model():
+    return {
+        "geometry": None,
+        "objects": [
+            {"name": "kitchen", "type": "IfcSpace", "bounds": ((0.0, 0.0, 0.0), (5.0, 4.0, 3.0))},
+            {"name": "hall", "type": "IfcSpace", "bounds": ((5.0, 0.0, 0.0), (12.0, 4.0, 3.0))},
+            {"name": "fridge", "centroid": (4.5, 3.5, 0.9)},
+            {"name": "table", "centroid": (2.0, 2.0, 0.4)},
+            {"name": "chair", "centroid": (2.5, 1.5, 0.4)},
+            {"name": "sofa", "centroid": (10.0, 2.0, 0.4)},
+        ],
+    }
+
+
+def recognized(n):
+    # Many objects spread around the user; one lamp far behind
+    objects = [{"name": f"box{i}", "position": (0.3 * i - 3.0, 0.0, 1.0 + 0.2 * i), "confidence": 0.6}
+               for i in range(n)]
+    objects.append({"name": "lamp", "position": (0.0, 0.0, -2.0), "confidence": 0.9})
+    return objects
+
+
+def test_top_k_prefers_query_keywords_then_field_of_view(building_model):
+    builder = PromptContextBuilder(building_model, max_objects=3)
+    ranked = builder.rank_objects("Where is the lamp?", recognized(40))
+    assert len(ranked) == 3
+    assert ranked[0]["name"] == "lamp"   # mentioned, even though it is behind the user
+    lateral, _, forward = ranked[1]["position"]
+    assert forward > 0 and abs(lateral) <= forward
+
+
+def test_room_summary_and_stable_system_prefix(building_model):
+    builder = PromptContextBuilder(building_model, system_prompt="Be brief.")
+    system_a, prompt_a = builder.build("What am I looking at?", recognized(2), user_position=(1.0, 1.0, 0.0))
+    system_b, prompt_b = builder.build("Where is the sofa?", [], user_position=(8.0, 2.0, 0.0))
+
+    assert system_a == system_b
+    assert system_a.startswith("Be brief.")
+    assert "rooms: hall, kitchen" in system_a
+    assert "Current room: kitchen (5 x 4 m)" in prompt_a
+    assert "Nearby known objects: table" in prompt_a
+    assert "Current room: hall" in prompt_b
+    assert "No objects recognized" in prompt_b
+    assert prompt_a.rstrip().endswith("User Query: What am I looking at?")
+
+
+def test_token_budget_is_enforced(building_model):
+    builder = PromptContextBuilder(building_model, max_objects=100, token_budget=200)
+    system, prompt = builder.build("What am I looking at?", recognized(200), user_position=(1.0, 1.0, 0.0))
+    assert estimate_tokens(system) + estimate_tokens(prompt) <= 200 + 5
+    assert "Object:" in prompt
+
+
+def test_llm_integration_uses_building_model(building_model):
+    prompts = []
+
+    def generate(prompt, max_tokens):
+        prompts.append(prompt)
+        return "ok"
+
+    llm = LLMIntegration(generate)
+    llm.query_environment("What am I looking at?", recognized(50), building_model,
+                          user_position=(1.0, 1.0, 0.0))
+    assert isinstance(llm.context_builder, PromptContextBuilder)
+    assert prompts[0].count("Object:") == llm.context_builder.max_objects
+    assert "Current room: kitchen" in prompts[0]
@@ -0,0 +1,101 @@
+# tests/test_response_cache.py
+
+import threading
+from app.modules.llm_integration import LLMIntegration
+from app.modules.response_cache import ResponseCache, normalize_query, scene_digest
+
+
+SCENE = [
+    {"name": "chair", "position": (0.52, 0.0, 2.01), "confidence": 0.9},
+    {"name": "table", "position": (-1.0, 0.0, 3.0), "confidence": 0.8},
+]
+
+
+def test_normalize_query_and_scene_digest():
+    assert normalize_query("Hey, what am I looking at?") == "what am i looking at"
+    jittered = [
+        {"name": "Table", "position": (-1.04, 0.02, 2.97), "confidence": 0.5},
+        {"name": "chair", "position": (0.49, 0.0, 1.98), "confidence": 0.7},
+    ]
+    assert scene_digest(SCENE) == scene_digest(jittered)
+    moved = [dict(SCENE[0], position=(2.0, 0.0, 2.0)), SCENE[1]]
+    assert scene_digest(SCENE) != scene_digest(moved)
+
+
+def test_ttl_and_lru_eviction():
+    cache = ResponseCache(ttl_s=10.0, max_entries=2)
+    cache.put("a", SCENE, "A", now=0.0)
+    cache.put("b", SCENE, "B", now=0.0)
+    assert cache.get("a", SCENE, now=1.0) == "A"   # 'a' is now most recently used
+    cache.put("c", SCENE, "C", now=1.0)            # evicts 'b'
+    assert cache.get("b", SCENE, now=1.0) is None
+    assert cache.get("c", SCENE, now=20.0) is None  # expired
+    assert cache.evictions == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(path=path)
+    cache.put("What am I looking at?", SCENE, "A chair and a table.")
+    cache.save()
+    restored = ResponseCache(path=path)
+    assert restored.get("what am i looking at", SCENE) == "A chair and a table."
+
+
+def test_cache_is_shared_safely_between_threads():
+    cache = ResponseCache(max_entries=16)
+
+    def worker(k):
+        for i in range(500):
+            cache.put(f"question {k} {i % 40}", SCENE, "answer")
+            cache.get(f"question {(k + 1) % 4} {i % 40}", SCENE)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache.entries) == 16 and cache.hits + cache.misses == 2000
+
+
+def test_llm_not_invoked_for_near_identical_scene():
+    calls = []
+
+    def generate(prompt, max_tokens):
+        calls.append(prompt)
+        return "A chair and a table."
+
+    llm = LLMIntegration(generate, cache=True)
+    first = llm.query_environment("What am I looking at?", SCENE, None)
+    jittered = [dict(o, position=tuple(v + 0.05 for v in o["position"])) for o in SCENE]
+    second = llm.query_environment("what am i looking at", jittered, None)
+    streamed = list(llm.stream_sentences("What am I looking at?", SCENE, None))
+
+    assert first == second == "A chair and a table."
+    assert streamed == ["A chair and a table."]
+    assert len(calls) == 1
+    assert llm.cache.hit_rate() == 2 / 3
+
+
+def test_answers_are_not_reused_in_another_room():
+    """
+    Context-builder prompts describe the user's room, so the same question
+    about the same view is only answered from cache at the same place.
+    """
+    building = {"geometry": None, "objects": [
+        {"name": "kitchen", "type": "IfcSpace", "bounds": ((0.0, 0.0, 0.0), (5.0, 4.0, 3.0))},
+        {"name": "hall", "type": "IfcSpace", "bounds": ((5.0, 0.0, 0.0), (12.0, 4.0, 3.0))},
+    ]}
+    calls = []
+
+    def generate(prompt, max_tokens):
+        calls.append(prompt)
+        return "You are in the kitchen." if "Current room: kitchen" in prompt else "You are in the hall."
+
+    llm = LLMIntegration(generate, cache=True)
+    ask = (lambda position: llm.query_environment("Where am I?", SCENE, building, user_position=position))
+    assert ask((2.0, 2.0, 0.0)) == "You are in the kitchen."
+    assert ask((2.1, 2.1, 0.0)) == "You are in the kitchen."
+    assert ask((8.0, 2.0, 0.0)) == "You are in the hall."
+    assert len(calls) == 2
@@ -0,0 +1,122 @@
+# tests/test_robot_simulation.py
+
+import math
+import numpy as np
+import pytest
+from app.modules.object_detection import ObjectDetection
+from app.modules.object_recognition import ObjectRecognition
+from app.modules.robot_integration import RobotIntegration
+from app.modules.robot_simulation import SimulatedRobotBackend, model_points, run_load_test
+
+
+@pytest.fixture
+def wall_model():
+    """
+    A building model with a single 4m wall, 2m in front of the origin (along +X).
+    """
+    return {
+        "geometry": {
+            "vertices": [(2.0, -2.0, 0.0), (2.0, 2.0, 0.0), (2.0, 2.0, 2.0), (2.0, -2.0, 2.0)],
+            "faces": [(0, 1, 2), (0, 2, 3)],
+        },
+        "objects": [],
+        "format": "OBJ",
+    }
+
+
+@pytest.fixture
+def sim_robot(wall_model):
+    """
+    A connected RobotIntegration backed by the simulator.
+    """
+    robot = RobotIntegration(SimulatedRobotBackend(wall_model, dt=0.1), verbose=False)
+    robot.connect_robot_hardware()
+    return robot
+
+
+def test_motor_commands_integrate_into_pose(sim_robot):
+    """
+    Driving forward for 10 steps at 0.5 m/s moves the robot 0.5 m along +X.
+    """
+    for _ in range(10):
+        sim_robot.send_motor_command(0.5, 0.0)
+    x, y, theta = sim_robot.get_robot_pose()
+    assert x == pytest.approx(0.5)
+    assert y == pytest.approx(0.0)
+    assert theta == pytest.approx(0.0)
+
+
+def test_turning_is_exact(sim_robot):
+    """
+    Turning in place for pi/2 radians ends facing +Y without translating.
+    """
+    for _ in range(10):
+        sim_robot.send_motor_command(0.0, math.pi / 2)
+    x, y, theta = sim_robot.get_robot_pose()
+    assert (x, y) == pytest.approx((0.0, 0.0))
+    assert theta == pytest.approx(math.pi / 2)
+
+
+def test_model_points_samples_every_polygon_edge():
+    """
+    Vertices come first, then each edge of each (possibly non-triangular) face
+    sampled from its start vertex at edge_spacing, closing every polygon.
+    """
+    model = {
+        "geometry": {
+            "vertices": [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0), (0.0, 1.0, 0.0)],
+            "faces": [(0, 1, 2, 3), (0, 1, 2)],
+        },
+    }
+    points = model_points(model, edge_spacing=0.25)
+    # 4 vertices + 4 unit edges x 4 samples + (2 unit edges x 4 + one sqrt(2) edge x 5)
+    assert points.shape == (4 + 16 + 13, 3)
+    assert np.allclose(points[4:8], [(0.0, 0.0, 0.0), (0.25, 0.0, 0.0), (0.5, 0.0, 0.0), (0.75, 0.0, 0.0)])
+    # The square's closing edge runs from vertex 3 back to vertex 0
+    assert np.allclose(points[16:20], [(0.0, 1.0, 0.0), (0.0, 0.75, 0.0), (0.0, 0.5, 0.0), (0.0, 0.25, 0.0)])
+    assert np.allclose(points[-5:, 0], points[-5:, 1])
+
+    empty = {"geometry": {"vertices": [(0.0, 0.0, 0.0)], "faces": []}}
+    assert model_points(empty).shape == (1, 3)
+
+
+def test_rendered_frame_shows_model(sim_robot):
+    """
+    Facing the wall draws geometry into the frame; facing away leaves the background.
+    """
+    frame = sim_robot.get_robot_camera_frame()
+    assert frame.shape == (240, 320, 3)
+    assert frame.dtype == np.uint8
+    assert frame.max() > 120
+
+    sim_robot.set_robot_pose(0.0, 0.0, math.pi)
+    frame = sim_robot.get_robot_camera_frame()
+    assert frame.max() <= 120
+
+
+def test_simulation_is_deterministic(wall_model):
+    """
+    Two robots with the same seed and commands produce identical frames and poses.
+    """
+    frames = []
+    for _ in range(2):
+        backend = SimulatedRobotBackend(wall_model, seed=7, pixel_noise=5)
+        backend.send_motor_command(0.3, 0.2)
+        frames.append((backend.get_pose(), backend.get_camera_frame().copy()))
+    assert frames[0][0] == frames[1][0]
+    assert np.array_equal(frames[0][1], frames[1][1])
+
+
+def test_load_test_runs_faster_than_real_time(wall_model, tmp_path):
+    """
+    Several robots running the whole stack should beat wall-clock time.
+    """
+    db_path = tmp_path / "db.json"
+    db_path.write_text('{"chair": {"name": "chair", "type": "furniture", "description": ""}}')
+    detector = ObjectDetection("mock_detection_model")
+    recognizer = ObjectRecognition(wall_model, str(db_path))
+
+    stats = run_load_test(wall_model, detector, recognizer, n_robots=5, n_ticks=20, dt=0.05)
+    assert stats["n_robots"] == 5
+    assert stats["sim_time_s"] == pytest.approx(1.0)
+    assert stats["realtime_factor"] > 1.0
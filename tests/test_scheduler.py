@@ -0,0 +1,81 @@
+# tests/test_scheduler.py
+
+from app.modules.scheduler import LoopScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 0.0)
+
+
+def make_scheduler(clock, **kwargs):
+    return LoopScheduler(clock=clock, sleep=clock.sleep, cpu_clock=clock, spin_s=0.0, **kwargs)
+
+
+def busy(clock, seconds):
+    def fn():
+        clock.now += seconds
+    return fn
+
+
+def test_tasks_run_at_their_target_rates():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    scheduler.add_task("capture", busy(clock, 0.001), rate_hz=30, priority=0)
+    scheduler.add_task("voice", busy(clock, 0.001), rate_hz=5, priority=1)
+    scheduler.run(duration=2.0)
+
+    stats = scheduler.stats()
+    assert abs(stats["tasks"]["capture"]["achieved_hz"] - 30) <= 1.0
+    assert abs(stats["tasks"]["voice"]["achieved_hz"] - 5) <= 0.5
+    assert stats["tasks"]["capture"]["overruns"] == 0
+    assert stats["busy_utilization"] < 0.1
+    assert scheduler.max_priority is None
+
+
+def test_late_task_skips_missed_periods():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    task = scheduler.add_task("slow", busy(clock, 0.25), rate_hz=10, priority=0)
+    scheduler.run(duration=1.0)
+    # Each run takes 2.5 periods: the missed ones are skipped, not replayed
+    assert task.runs == 4
+    assert task.overruns >= 8
+    assert task.next_due > clock.now - task.period
+
+
+def test_overload_sheds_low_priority_then_recovers():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, window_s=0.5, probe_s=2.0)
+    load = {"detect": 0.09}
+    scheduler.add_task("capture", busy(clock, 0.005), rate_hz=30, priority=0)
+    scheduler.add_task("detection", lambda: busy(clock, load["detect"])(), rate_hz=15, priority=2)
+    scheduler.run(duration=2.0)
+
+    stats = scheduler.stats()
+    assert stats["tasks"]["detection"]["shed"] > 0
+    assert stats["tasks"]["capture"]["shed"] == 0
+    assert scheduler.max_priority is not None
+
+    # Still too expensive to restore from its measured cost, but a probe after
+    # 'probe_s' re-measures it and keeps it once it has become cheap
+    load["detect"] = 0.001
+    scheduler.run(duration=3.0)
+    assert scheduler.max_priority is None
+    assert scheduler.stats()["tasks"]["detection"]["runs"] > 40
+
+
+def test_stop_when_ends_the_loop():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    calls = []
+    scheduler.add_task("tick", lambda: calls.append(clock.now), rate_hz=100)
+    scheduler.run(stop_when=lambda: len(calls) >= 10)
+    assert len(calls) == 10
+    assert abs(calls[-1] - 0.09) < 1e-9
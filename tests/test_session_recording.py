@@ -0,0 +1,117 @@
+# tests/test_session_recording.py
+
+import time
+import numpy as np
+import pytest
+from app.modules.robot_integration import RobotIntegration
+from app.modules.robot_simulation import SimulatedRobotBackend
+from app.modules.session_recording import (RecordingRobotBackend, ReplayGlassesIntegration, ReplayRobotBackend,
+                                           SessionFormatError, SessionReader, SessionWriter)
+
+
+@pytest.fixture
+def wall_model():
+    return {
+        "geometry": {
+            "vertices": [(2.0, -2.0, 0.0), (2.0, 2.0, 0.0), (2.0, 2.0, 2.0), (2.0, -2.0, 2.0)],
+            "faces": [(0, 1, 2), (0, 2, 3)],
+        },
+        "objects": [],
+        "format": "OBJ",
+    }
+
+
+def write_glasses_session(path, n_frames=20, dt=0.05):
+    """Frames with a counter pixel, a turning head and two voice commands."""
+    with SessionWriter(path, chunk_seconds=0.2, frame_format=".png") as writer:
+        for i in range(n_frames):
+            t = i * dt
+            frame = np.zeros((24, 32, 3), dtype=np.uint8)
+            frame[0, 0, 0] = i
+            writer.write_head_orientation((0.1 * i, 0.0, 0.0), t=t)
+            writer.write_frame(frame, t=t)
+            if i in (3, 11):
+                writer.write_voice_command(f"command {i}", t=t + 0.01)
+
+
+def test_round_trip_and_seek(tmp_path):
+    path = str(tmp_path / "session.sar")
+    write_glasses_session(path)
+    reader = SessionReader(path)
+    assert reader.counts == {"frame": 20, "head": 20, "pose": 0, "voice": 2}
+    assert len(reader.chunks) > 3
+    assert reader.duration == pytest.approx(0.95)
+
+    frames = [v for _, kind, v in reader.events(kinds={"frame"})]
+    assert [int(f[0, 0, 0]) for f in frames] == list(range(20))
+
+    # Seeking starts at the right record and skips earlier chunks
+    t, kind, value = next(reader.events(start=0.5, kinds={"frame"}))
+    assert t == pytest.approx(0.5) and int(value[0, 0, 0]) == 10
+
+
+def test_unclosed_recording_is_rejected(tmp_path):
+    path = str(tmp_path / "broken.sar")
+    writer = SessionWriter(path)
+    writer.write_voice_command("hello", t=0.0)
+    writer.file.flush()
+    with pytest.raises(SessionFormatError):
+        SessionReader(path)
+    writer.close()
+    assert SessionReader(path).counts["voice"] == 1
+
+
+def test_glasses_replay_delivers_inputs_in_recorded_ticks(tmp_path):
+    path = str(tmp_path / "session.sar")
+    write_glasses_session(path)
+    glasses = ReplayGlassesIntegration(path)
+    glasses.connect_hardware()
+
+    ticks = []
+    while True:
+        frame = glasses.get_camera_frame()
+        if frame is None:
+            break
+        ticks.append((int(frame[0, 0, 0]), glasses.get_head_orientation()[0],
+                      glasses.capture_voice_command(), glasses.clock()))
+    assert glasses.finished
+    assert len(ticks) == 20
+    assert ticks[5][1] == pytest.approx(0.5)
+    assert [(i, cmd) for i, _, cmd, _ in ticks if cmd] == [(3, "command 3"), (11, "command 11")]
+    assert ticks[-1][3] == pytest.approx(0.95)
+    assert glasses.player.stats()["speedup"] > 1.0
+
+
+def test_realtime_replay_keeps_recorded_pace(tmp_path):
+    path = str(tmp_path / "session.sar")
+    write_glasses_session(path, n_frames=6, dt=0.04)
+    glasses = ReplayGlassesIntegration(path, realtime=True)
+    glasses.connect_hardware()
+    start = time.monotonic()
+    while glasses.get_camera_frame() is not None:
+        pass
+    assert time.monotonic() - start >= 0.19
+
+
+def test_robot_record_and_replay_is_identical(tmp_path, wall_model):
+    path = str(tmp_path / "robot.sar")
+    backend = RecordingRobotBackend(SimulatedRobotBackend(wall_model, dt=0.1, frame_size=(60, 80)),
+                                    SessionWriter(path, frame_format=".png"))
+    robot = RobotIntegration(backend, verbose=False)
+    robot.connect_robot_hardware()
+    live = []
+    for _ in range(10):
+        frame = robot.get_robot_camera_frame().copy()
+        live.append((frame, robot.get_robot_pose()))
+        robot.send_motor_command(0.5, 0.3)
+    robot.disconnect()
+
+    replay = RobotIntegration(ReplayRobotBackend(path), verbose=False)
+    replay.connect_robot_hardware()
+    for frame, pose in live:
+        np.testing.assert_array_equal(replay.get_robot_camera_frame(), frame)
+        assert replay.get_robot_pose() == pytest.approx(pose)
+        replay.send_motor_command(0.5, 0.3)
+    assert replay.get_robot_camera_frame() is None
+    assert replay.backend.finished
+    assert replay.backend.motor_commands == 10
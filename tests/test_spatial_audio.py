@@ -0,0 +1,203 @@
+# tests/test_spatial_audio.py
+
+import math
+import time
+import wave
+import numpy as np
+import pytest
+from app.modules.audio_thread import AudioRenderThread, SPSCRing
+from app.modules.binaural import BinauralRenderer, HRTFSet, benchmark_renderer, generate_hrtf_set
+from app.modules.spatial_audio import SpatialAudioEngine
+from app.modules.voice_manager import VoiceManager
+
+
+@pytest.fixture(scope="module")
+def hrtf():
+    return generate_hrtf_set(sample_rate=16000, n_azimuths=72, taps=64)
+
+
+def energy(block):
+    return (block ** 2).sum(axis=0)  # (left, right)
+
+
+def render_blocks(renderer, n):
+    return np.concatenate([renderer.render().copy() for _ in range(n)])
+
+
+def test_overlap_add_matches_direct_convolution(hrtf):
+    renderer = BinauralRenderer(hrtf, block_size=128, max_sources=4)
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal(128 * 10).astype(np.float32)
+    renderer.add_cue("noise", signal)
+    renderer.add_source("noise", azimuth=math.radians(40), distance=1.0)
+
+    out = render_blocks(renderer, 11)
+    index = hrtf.index(math.radians(40))
+    for ear in (0, 1):
+        expected = np.convolve(signal, hrtf.hrirs[index, ear])
+        np.testing.assert_allclose(out[:len(expected), ear], expected, atol=1e-4)
+        assert np.abs(out[len(expected):, ear]).max() < 1e-4
+
+
+def test_direction_and_head_rotation(hrtf):
+    renderer = BinauralRenderer(hrtf, block_size=256)
+    renderer.add_source("beep", azimuth=math.radians(90), distance=1.0, loop=True)
+    left, right = energy(render_blocks(renderer, 4))
+    assert right > 2.0 * left
+
+    # Turning the head 90 degrees right puts the source in front
+    renderer.set_listener_yaw(math.radians(90))
+    render_blocks(renderer, 1)  # crossfade block
+    assert renderer.crossfades == 1
+    left, right = energy(render_blocks(renderer, 4))
+    assert left == pytest.approx(right, rel=0.05)
+
+
+def test_crossfade_starts_from_previous_filter(hrtf):
+    a = BinauralRenderer(hrtf, block_size=256)
+    b = BinauralRenderer(hrtf, block_size=256)
+    for r in (a, b):
+        r.add_source("beep", azimuth=-1.0, distance=1.0, loop=True)
+        render_blocks(r, 2)
+    b.set_listener_yaw(1.5)
+    block_a = a.render().copy()
+    block_b = b.render().copy()
+    np.testing.assert_allclose(block_a[0], block_b[0], atol=1e-6)
+    assert not np.allclose(block_a[-16:], block_b[-16:])
+
+
+def test_one_shot_cues_end_and_slots_are_reused(hrtf):
+    renderer = BinauralRenderer(hrtf, block_size=256, max_sources=2)
+    renderer.add_cue("click", np.ones(300, dtype=np.float32))
+    assert renderer.add_source("click", 0.0) == 0
+    assert renderer.add_source("click", 0.0) == 1
+    assert renderer.add_source("click", 0.0) is None
+    render_blocks(renderer, 2)
+    assert renderer.n_active == 0
+
+
+def test_hrtf_set_round_trip(hrtf, tmp_path):
+    path = str(tmp_path / "hrtf.npz")
+    hrtf.save(path)
+    loaded = HRTFSet.load(path)
+    np.testing.assert_array_equal(loaded.hrirs, hrtf.hrirs)
+    assert loaded.sample_rate == 16000
+
+
+def test_engine_renders_headless_to_wav(tmp_path):
+    path = str(tmp_path / "out.wav")
+    engine = SpatialAudioEngine(block_size=256, output_path=path)
+    engine.initialize()
+    engine.play_spatial_cue("chair", (1.0, 0.0, 2.0))
+    engine.play_spatial_cue("chair", (1.0, 0.0, 2.0))  # restarts the same source
+    assert engine.renderer.n_active == 1
+
+    engine.update(now=0.0)
+    assert engine.update(now=0.081) == 5     # 5 blocks of 16 ms
+    assert engine.update(now=10.0) == 8      # stall: capped catch-up
+    engine.set_head_orientation(0.5)
+    engine.render_block()
+    engine.shutdown()
+
+    with wave.open(path) as wav:
+        assert wav.getnchannels() == 2
+        assert wav.getnframes() == 14 * 256
+    assert engine.cost_report()
+
+
+def test_cost_per_block_report():
+    rows = benchmark_renderer(source_counts=(1, 16), n_blocks=20)
+    assert [r["sources"] for r in rows] == [1, 16]
+    assert all(r["mean_us"] > 0 and r["load"] < 1.0 for r in rows)
+
+
+def test_spsc_ring_drops_when_full():
+    ring = SPSCRing(capacity=2)
+    assert ring.push(1) and ring.push(2)
+    assert not ring.push(3)
+    assert ring.dropped == 1
+    assert ring.pop() == 1 and ring.pop() == 2 and ring.pop() is None
+
+
+def test_underrun_fades_out_instead_of_clicking():
+    ones = np.ones((64, 2), dtype=np.float32)
+    thread = AudioRenderThread(lambda: ones, lambda c: None, block_size=64, sample_rate=16000,
+                               target_blocks=2, use_clock=False)
+    thread.render_ahead()
+    np.testing.assert_array_equal(thread.pull_block(), ones)
+    np.testing.assert_array_equal(thread.pull_block(), ones)
+
+    faded = thread.pull_block()    # ring empty: fade the last block out
+    assert faded[0, 0] == 1.0 and faded[-1, 0] == 0.0
+    assert np.all(np.diff(faded[:, 0]) <= 0)
+    assert not thread.pull_block().any()  # then silence
+    assert thread.stats()["underruns"] == 2
+
+
+def test_perception_stall_does_not_starve_audio(tmp_path):
+    engine = SpatialAudioEngine(block_size=256)
+    engine.initialize()
+    engine.start_realtime(target_blocks=4)
+    thread = engine.audio_thread
+    try:
+        engine.play_spatial_cue("chair", (1.0, 0.0, 2.0))
+        time.sleep(0.25)               # perception loop stalls for ~15 blocks
+        engine.set_head_orientation(0.3)
+        engine.play_spatial_cue("table", (-1.0, 0.0, 1.0))
+        time.sleep(0.1)
+    finally:
+        engine.shutdown()
+
+    assert engine.audio_thread is None  # shutdown stopped the thread
+    stats = thread.stats()
+    assert stats["underruns"] == 0
+    assert stats["blocks_played"] >= 15
+    assert engine.sink.frames == stats["blocks_played"] * 256
+    assert engine.renderer.listener_yaw == 0.3
+    assert "table" in engine.sound_sources
+
+
+def cluttered_room(n):
+    objects = [{"name": f"book{i}", "type": "misc", "position": (0.1 * i - 2.0, 0.0, 1.0 + 0.1 * i)}
+               for i in range(n)]
+    objects.append({"name": "person", "type": "human", "position": (0.5, 0.0, 4.0)})
+    objects.append({"name": "far door", "type": "structure", "position": (0.0, 0.0, 20.0)})
+    return objects
+
+
+def test_voice_limit_prioritizes_obstacles_and_virtualizes_the_rest():
+    manager = VoiceManager(max_voices=4, pool_size=8)
+    start, stop, move = manager.update(cluttered_room(30), now=0.0)
+    labels = {s.label for s in start}
+    assert len(labels) == 4
+    assert "person" in labels           # human outranks nearer misc objects
+    assert "far door" not in labels     # beyond audible distance
+    assert manager.stats()["virtual"] == 28
+    assert manager.created == 24        # pool of 8 reused first
+
+    # Within the retrigger interval the same voices are only moved
+    start, stop, move = manager.update(cluttered_room(30), now=0.5)
+    assert not start and not stop and len(move) == 4
+
+
+def test_novelty_and_forgetting():
+    manager = VoiceManager(max_voices=1, novelty_half_life=1.0, forget_after=100.0)
+    chair = {"name": "chair", "type": "furniture", "position": (0.0, 0.0, 2.0)}
+    lamp = {"name": "lamp", "type": "appliance", "position": (0.0, 0.0, 2.0)}
+    manager.update([chair], now=0.0)
+    start, stop, _ = manager.update([chair, lamp], now=10.0)
+    assert [s.label for s in start] == ["lamp"] and stop == ["chair"]   # new lamp wins briefly
+    start, stop, _ = manager.update([chair, lamp], now=20.0)
+    assert [s.label for s in start] == ["chair"] and stop == ["lamp"]   # novelty decayed
+    _, stop, _ = manager.update([], now=121.0)
+    assert stop == ["chair"] and manager.stats()["tracked"] == 0
+    assert len(manager.pool) == 64
+
+
+def test_rendering_cost_does_not_grow_with_scene_size():
+    engine = SpatialAudioEngine(block_size=256, max_voices=6)
+    engine.initialize()
+    engine.update_cues(cluttered_room(200), now=0.0)
+    assert engine.renderer.n_active == 6
+    engine.render_block()
+    assert engine.cost_report()[-1]["sources"] == 6
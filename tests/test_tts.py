@@ -0,0 +1,73 @@
+# tests/test_tts.py
+
+import numpy as np
+from app.modules.spatial_audio import SPEECH_LABEL, SpatialAudioEngine
+from app.modules.tts import CachedTTS, StandInTTSEngine
+
+
+def test_repeated_text_is_served_from_cache():
+    engine = StandInTTSEngine()
+    tts = CachedTTS(engine)
+    first = tts.synthesize("Turn left now.")
+    second = tts.synthesize("turn left now")  # same words, different casing/punctuation
+    assert engine.calls == 1
+    assert second is first
+    assert tts.stats()["hits"] == 1
+
+
+def test_templated_phrase_is_assembled_from_cached_fragments():
+    engine = StandInTTSEngine(seconds_per_char=0.002)
+    tts = CachedTTS(engine)
+    tts.prewarm(["Begin walking toward", "the", "fridge", "sofa"], background=False)
+    calls = engine.calls
+
+    pcm = tts.synthesize("Begin walking toward the fridge")
+    assert engine.calls == calls  # nothing new synthesized
+    assert tts.composed == 1
+    assert tts.last_latency_s < 0.01
+    parts = [tts.cache[("default", p)] for p in ("begin walking toward", "the", "fridge")]
+    assert len(pcm) == sum(len(p) for p in parts) + 2 * len(tts._gap)
+
+    # Only the uncovered word is synthesized
+    tts.synthesize("Begin walking toward the big sofa")
+    assert engine.calls == calls + 1
+    assert ("default", "big") in tts.cache
+
+
+def test_mostly_uncached_text_is_synthesized_whole():
+    engine = StandInTTSEngine()
+    tts = CachedTTS(engine)
+    tts.prewarm(["the"], background=False)
+    tts.synthesize("Where did I leave the keys")
+    assert tts.misses == 1 and tts.composed == 0
+    assert ("default", "where did i leave the keys") in tts.cache
+
+
+def test_lru_eviction_respects_memory_budget():
+    engine = StandInTTSEngine()
+    one_word = engine.synthesize("chair").nbytes
+    tts = CachedTTS(engine, max_bytes=3 * one_word)
+    for word in ("chair", "table", "stool", "lamps"):
+        tts.synthesize(word)
+    assert tts.bytes <= 3 * one_word
+    assert ("default", "chair") not in tts.cache
+    assert tts._longest_cached("default", ["chair"], 0) == 0
+
+
+def test_background_prewarm_and_engine_playback():
+    tts = CachedTTS(StandInTTSEngine())
+    tts.prewarm(["chair", "table", "You have reached the"])
+    tts.wait_prewarm(timeout=5.0)
+    assert tts.stats()["entries"] == 3
+
+    engine = SpatialAudioEngine(tts=tts)
+    engine.initialize()
+    engine.play_text("You have reached the chair.")
+    assert tts.composed == 1
+    slot = engine.sound_sources[SPEECH_LABEL]
+    assert engine.renderer.active[slot]
+    block = engine.render_block()
+    assert np.abs(block).max() > 0.0
+    # Head-locked: speech stays centered when the head turns
+    engine.set_head_orientation(1.0)
+    assert engine.renderer.world_azimuth[slot] == 1.0
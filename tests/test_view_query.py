@@ -0,0 +1,101 @@
+# tests/test_view_query.py
+
+import math
+import numpy as np
+from app.modules.mesh_lod import MeshLODSet
+from app.modules.prompt_context import PromptContextBuilder
+from app.modules.view_query import AABBTree, ViewQuery, merge_detections
+
+
+def box_object(name, center, half=0.3):
+    lo = tuple(c - half for c in center)
+    hi = tuple(c + half for c in center)
+    return {"name": name, "label": name, "bounds": (lo, hi), "centroid": tuple(center)}
+
+
+def wall_model(objects, wall_x=None):
+    """Objects plus, optionally, a wall plane x = wall_x (y in -5..5, z in 0..3)."""
+    model = {"geometry": {"vertices": [], "faces": []}, "objects": list(objects)}
+    if wall_x is not None:
+        model["geometry"]["vertices"] = [(wall_x, -5.0, 0.0), (wall_x, 5.0, 0.0), (wall_x, 5.0, 3.0), (wall_x, -5.0, 3.0)]
+        model["geometry"]["faces"] = [(0, 1, 2), (0, 2, 3)]
+    return model
+
+
+def test_frustum_query_matches_brute_force_and_is_sublinear():
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(-100, 100, size=(5000, 3))
+    tree = AABBTree(centers - 0.5, centers + 0.5)
+    view = ViewQuery({}, max_range=15.0)
+    normals, offsets = view.frustum(np.array([0.0, 0.0, 1.6]), yaw=0.3)
+
+    ids, visited = tree.query_planes(normals, offsets)
+    corners = np.where(normals[None] >= 0, (centers + 0.5)[:, None], (centers - 0.5)[:, None])
+    expected = np.nonzero(((corners * normals[None]).sum(axis=2) + offsets >= 0).all(axis=1))[0]
+    assert sorted(ids.tolist()) == expected.tolist()
+    assert visited < 5000 / 20
+
+
+def test_visible_objects_in_frustum_sorted_by_distance():
+    model = wall_model([box_object("fridge", (5.0, 0.0, 1.0)), box_object("chair", (2.0, -0.5, 0.5)),
+                        box_object("sofa", (-3.0, 0.0, 0.5)), box_object("lamp", (2.0, 4.0, 1.0)),
+                        {"name": "plant", "position": (12.0, 0.0, 0.5)}])
+    view = ViewQuery(model, hfov_deg=70.0, max_range=10.0)
+    visible = view.visible_objects((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+
+    # Behind (sofa), outside the 35 degree half-angle (lamp) and beyond max_range (plant) are culled
+    assert [o["name"] for o in visible] == ["chair", "fridge"]
+    lateral, vertical, forward = visible[0]["position"]
+    assert abs(forward - 2.0) < 1e-9 and abs(lateral - 0.5) < 1e-9 and vertical < 0  # right of the view axis, below the eyes
+    assert visible[0]["source"] == "model"
+
+    # Turning left by 90 degrees brings the lamp into view
+    names = [o["name"] for o in view.visible_objects((0.0, 0.0, 0.0), (math.pi / 2, 0.0, 0.0))]
+    assert names == ["lamp"]
+
+
+def test_objects_behind_the_mesh_are_occluded():
+    cabinet = box_object("cabinet", (1.5, 0.0, 1.0))
+    model = wall_model([box_object("fridge", (4.0, 0.0, 1.0)), cabinet], wall_x=2.5)
+    view = ViewQuery(model)
+    assert [o["name"] for o in view.visible_objects((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))] == ["cabinet"]
+    assert view.occluded == 1
+
+    no_check = ViewQuery(model, occlusion=False)
+    assert [o["name"] for o in no_check.visible_objects((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))] == ["cabinet", "fridge"]
+
+
+def test_object_mesh_does_not_occlude_itself_with_lod():
+    # The wall is the object itself: its own triangles must not hide its centroid
+    model = wall_model([], wall_x=3.0)
+    model["objects"] = [{"name": "whiteboard", "faces": model["geometry"]["faces"],
+                         "bounds": ((3.0, -5.0, 0.0), (3.0, 5.0, 3.0)), "centroid": (3.0, 0.0, 1.5)}]
+    model["lod"] = MeshLODSet(model)
+    visible = ViewQuery(model).visible_objects((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+    assert [o["name"] for o in visible] == ["whiteboard"]
+
+
+def test_merge_with_detections_before_the_llm_prompt():
+    detected = [{"name": "chair", "position": (0.4, 0.0, 2.1), "confidence": 0.9}]
+    visible = [{"name": "chair", "position": (0.5, -1.1, 2.0), "source": "model", "confidence": 1.0},
+               {"name": "fridge", "position": (0.0, -0.6, 5.0), "source": "model", "confidence": 1.0}]
+    merged = merge_detections(detected, visible)
+    assert [o["name"] for o in merged] == ["chair", "fridge"] and merged[0] is detected[0]
+
+    _, prompt = PromptContextBuilder({}).build("What am I looking at?", merged)
+    assert "chair" in prompt and "fridge, 5.0 m ahead, from the building model" in prompt
+
+
+def test_describe_includes_known_objects_once_localized(fake_glasses, fake_audio):
+    from app.modules.user_interaction import UserInteraction
+
+    class Recognizer:
+        building_model = wall_model([box_object("fridge", (4.0, 0.0, 1.0))])
+        furniture_db = {}
+
+    ui = UserInteraction(fake_glasses(), fake_audio, None, Recognizer(), None, None,
+                         view_query=ViewQuery(Recognizer.building_model))
+    assert ui.objects_in_view() == []  # not localized yet
+    ui.user_position = (0.0, 0.0, 0.0)
+    ui.handle_voice_command("Describe the objects around me")
+    assert fake_audio.spoken[-1] == "I can see a fridge 4.0 m ahead."